@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+基准测试：全量重写 Excel vs 增量备份
+
+在临时 SQLite 库中生成 --rows 行订单，模拟 --runs 次备份，每次之间更新 --changes 行:
+    full         每次用 openpyxl 普通模式重写整张表的工作簿（原备份方式）
+    incremental  IncrementalBackup 只追加变化的行（CSV 变更日志 + write_only 工作簿）
+输出每次备份的平均耗时、写入字节数，以及最后一次合并快照的耗时。
+
+使用方法:
+    python benchmarks/bench_backup.py --rows 100000 --changes 500 --runs 5
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.incremental_backup import BackupTable, IncrementalBackup
+
+
+def make_db(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE order_table (id INTEGER PRIMARY KEY, order_no TEXT, product_name TEXT, "
+                 "quantity INTEGER, total_amount REAL, status TEXT, updated_at TEXT)")
+    conn.executemany(
+        "INSERT INTO order_table VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"PO{i:08d}", f"A4打印纸 {i % 50}", i % 20 + 1, round(i % 997 * 1.37, 2), "paid",
+          "2024-05-01 00:00:00") for i in range(1, rows + 1)))
+    conn.commit()
+    conn.close()
+
+
+def apply_changes(path: str, rows: int, changes: int, run: int, rng: random.Random):
+    conn = sqlite3.connect(path)
+    stamp = f"2024-05-{run + 2:02d} 00:00:00"
+    ids = rng.sample(range(1, rows + 1), changes)
+    conn.executemany("UPDATE order_table SET status = 'shipped', updated_at = ? WHERE id = ?",
+                     [(stamp, i) for i in ids])
+    conn.commit()
+    conn.close()
+
+
+def full_rewrite(path: str, out: str) -> int:
+    from openpyxl import Workbook
+
+    conn = sqlite3.connect(path)
+    cursor = conn.execute("SELECT * FROM order_table ORDER BY id")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append([d[0] for d in cursor.description])
+    for row in cursor:
+        sheet.append(list(row))
+    workbook.save(out)
+    conn.close()
+    return os.path.getsize(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量备份基准测试")
+    parser.add_argument("--rows", type=int, default=100000, help="订单表行数")
+    parser.add_argument("--changes", type=int, default=500, help="每次备份之间变化的行数")
+    parser.add_argument("--runs", type=int, default=5, help="备份次数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.sqlite3")
+        make_db(db, args.rows)
+        rng = random.Random(args.seed)
+        backup = IncrementalBackup(ConnectionFactory("sqlite", sqlite_path=db), [BackupTable("order_table")],
+                                   backup_dir=os.path.join(tmp, "backup"), excel_dir=os.path.join(tmp, "excel"),
+                                   compact_every=0, compact_bytes=0)
+        # 首次备份两种方式都要导出全表，不计入对比
+        backup.run()
+
+        full_times, full_bytes, inc_times, inc_bytes = [], [], [], []
+        for run in range(args.runs):
+            apply_changes(db, args.rows, args.changes, run, rng)
+            started = time.perf_counter()
+            full_bytes.append(full_rewrite(db, os.path.join(tmp, f"full_{run}.xlsx")))
+            full_times.append(time.perf_counter() - started)
+
+            report = backup.run()
+            inc_times.append(report.elapsed)
+            inc_bytes.append(report.bytes_written)
+
+        started = time.perf_counter()
+        snapshot = backup.compact(backup.tables[0])
+        compact_seconds = time.perf_counter() - started
+
+    print(f"订单 {args.rows} 行，每次变化 {args.changes} 行，备份 {args.runs} 次")
+    print(f"{'方式':<12} {'平均耗时(s)':>12} {'平均写入(KB)':>14} {'行/秒':>10}")
+    print(f"{'full':<12} {statistics.mean(full_times):>12.3f} {statistics.mean(full_bytes) / 1024:>14.1f} "
+          f"{args.rows / statistics.mean(full_times):>10.0f}")
+    print(f"{'incremental':<12} {statistics.mean(inc_times):>12.3f} {statistics.mean(inc_bytes) / 1024:>14.1f} "
+          f"{args.changes / statistics.mean(inc_times):>10.0f}")
+    print(f"合并快照 {os.path.basename(snapshot)}: {compact_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
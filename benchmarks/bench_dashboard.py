@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+基准测试：看板数据层
+
+在临时 SQLite 库中生成 --orders 条订单、--skus 个库存 SKU、--alerts 条预警，
+模拟 Streamlit 一次重跑（订单汇总 + 第一页 + 总数、库存汇总 + 低库存、预警第一页）的耗时:
+    full      全表读取后在 Python 中聚合、截取第一页（每次重跑都查库）
+    queries   DashboardQueries 服务端聚合 + 游标分页（不缓存）
+    cached    以数据版本号为键缓存查询结果（与 dashboard_cache 中 st.cache_data 的键一致）
+
+另外对比翻到第 --deep-page 页时 OFFSET 分页和游标分页的耗时，
+并通过 ProgressBus 发布"下单"完成事件，验证缓存随数据版本失效。
+
+使用方法:
+    python benchmarks/bench_dashboard.py --orders 100000 --reruns 20
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.dashboard_data import (
+    DashboardInvalidator, DashboardQueries, DataVersion, DOMAIN_ALERTS, DOMAIN_INVENTORY, DOMAIN_ORDERS,
+    INDEX_MIGRATION
+)
+from src.services.progress_bus import ProgressBus
+from src.services.sql_runner import run_sql_script
+from src.services.workflow_checkpoint import STAGE_ORDER
+
+STATUSES = ["pending", "paid", "shipped", "delivered", "cancelled"]
+
+
+def make_db(path: str, orders: int, skus: int, alerts: int, seed: int):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE order_table (id INTEGER PRIMARY KEY, order_no TEXT, product_name TEXT, "
+                 "quantity INTEGER, total_amount REAL, status TEXT, updated_at TEXT)")
+    conn.executemany(
+        "INSERT INTO order_table VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"PO{i:08d}", f"A4打印纸 {i % 50}", i % 20 + 1, round(rng.uniform(10, 2000), 2),
+          rng.choice(STATUSES), "2024-05-01 00:00:00") for i in range(1, orders + 1)))
+    conn.execute("CREATE TABLE inventory_table (id INTEGER PRIMARY KEY, sku_id TEXT, quantity INTEGER, "
+                 "alert_threshold INTEGER, updated_at TEXT)")
+    conn.executemany(
+        "INSERT INTO inventory_table VALUES (?, ?, ?, ?, ?)",
+        ((i, f"SKU{i:08d}", rng.randint(0, 500), rng.choice([0, 20, 50]), "2024-05-01 00:00:00")
+         for i in range(1, skus + 1)))
+    conn.execute("CREATE TABLE alert_table (id INTEGER PRIMARY KEY, alert_type TEXT, message TEXT, created_at TEXT)")
+    conn.executemany(
+        "INSERT INTO alert_table VALUES (?, ?, ?, ?)",
+        ((i, rng.choice(["low_stock", "logistics"]), f"预警 {i}", "2024-05-01 00:00:00")
+         for i in range(1, alerts + 1)))
+    conn.commit()
+    conn.close()
+
+
+def rerun_full(factory: ConnectionFactory, page_size: int) -> dict:
+    """对照组：全表读取后在 Python 中聚合"""
+    with factory.connection() as conn:
+        orders = conn.execute("SELECT * FROM order_table").fetchall()
+        inventory = conn.execute("SELECT * FROM inventory_table").fetchall()
+        alerts = conn.execute("SELECT * FROM alert_table").fetchall()
+    by_status = {}
+    for row in orders:
+        count, amount = by_status.get(row[5], (0, 0.0))
+        by_status[row[5]] = (count + 1, amount + row[4])
+    page = sorted(orders, key=lambda r: -r[0])[:page_size]
+    low = sorted((r for r in inventory if r[3] > 0 and r[2] < r[3]), key=lambda r: r[2] - r[3])[:100]
+    return {"orders": len(orders), "by_status": by_status, "page": page, "low": low,
+            "alerts": sorted(alerts, key=lambda r: -r[0])[:page_size]}
+
+
+def rerun_queries(queries: DashboardQueries, page_size: int) -> dict:
+    return {"summary": queries.order_summary(), "page": queries.orders_page(page_size=page_size),
+            "count": queries.count_orders(), "inventory": queries.inventory_summary(),
+            "low": queries.low_stock(100), "alerts": queries.alerts_page(page_size=page_size),
+            "alert_count": queries.count_alerts()}
+
+
+class VersionedCache:
+    """按 (查询, 数据版本, 参数) 缓存结果，模拟 st.cache_data"""
+
+    def __init__(self, queries: DashboardQueries, version: DataVersion):
+        self.queries = queries
+        self.version = version
+        self.memo = {}
+        self.misses = 0
+
+    def get(self, name: str, domain: str, *args):
+        key = (name, self.version.get(domain), args)
+        if key not in self.memo:
+            self.misses += 1
+            self.memo[key] = getattr(self.queries, name)(*args)
+        return self.memo[key]
+
+    def rerun(self, page_size: int) -> dict:
+        return {"summary": self.get("order_summary", DOMAIN_ORDERS),
+                "page": self.get("orders_page", DOMAIN_ORDERS, None, None, None, page_size),
+                "count": self.get("count_orders", DOMAIN_ORDERS),
+                "inventory": self.get("inventory_summary", DOMAIN_INVENTORY),
+                "low": self.get("low_stock", DOMAIN_INVENTORY, 100),
+                "alerts": self.get("alerts_page", DOMAIN_ALERTS, None, page_size),
+                "alert_count": self.get("count_alerts", DOMAIN_ALERTS)}
+
+
+def timed(func, reruns: int) -> float:
+    """多次执行取中位数（毫秒）"""
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def publish_order_completed(version: DataVersion):
+    bus = ProgressBus()
+    invalidator = bus.subscribe(DashboardInvalidator(version))
+    await bus.start()
+    bus.publish(STAGE_ORDER, "running", "提交订单")
+    bus.publish(STAGE_ORDER, "completed", "下单成功")
+    await bus.close()
+    return invalidator.bumps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="看板数据层基准测试")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--alerts", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--deep-page", type=int, default=300, help="对比 OFFSET 与游标分页的页码")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "dashboard.sqlite3")
+        started = time.perf_counter()
+        make_db(db, args.orders, args.skus, args.alerts, args.seed)
+        print(f"生成数据: 订单 {args.orders}、库存 {args.skus}、预警 {args.alerts} 行（{time.perf_counter() - started:.1f}s）")
+
+        factory = ConnectionFactory("sqlite", sqlite_path=db)
+        queries = DashboardQueries(factory)
+        with factory.connection() as conn, open(INDEX_MIGRATION, encoding="utf-8") as f:
+            report = run_sql_script(conn, f.read())
+        print(f"创建索引（{os.path.basename(INDEX_MIGRATION)}）: {report.executed} 个")
+        version = DataVersion(os.path.join(tmp, "version"))
+        cache = VersionedCache(queries, version)
+
+        full_ms = timed(lambda: rerun_full(factory, args.page_size), max(3, args.reruns // 4))
+        queries_ms = timed(lambda: rerun_queries(queries, args.page_size), args.reruns)
+        cached_ms = timed(lambda: cache.rerun(args.page_size), args.reruns)
+        print(f"\n{'方式':<10} {'每次重跑(ms)':>12}")
+        print(f"{'full':<10} {full_ms:>12.1f}")
+        print(f"{'queries':<10} {queries_ms:>12.1f}")
+        print(f"{'cached':<10} {cached_ms:>12.2f}")
+
+        # 深分页：OFFSET vs 游标（页码不超过 status=paid 的总页数）
+        deep = min(args.deep_page, max(queries.count_orders(status="paid") // args.page_size - 1, 0))
+        cursor = None
+        for _ in range(deep):
+            cursor = queries.orders_page(status="paid", cursor=cursor, page_size=args.page_size).next_cursor
+        cursor_ms = timed(lambda: queries.orders_page(status="paid", cursor=cursor, page_size=args.page_size),
+                          args.reruns)
+        with factory.connection() as conn:
+            offset_ms = timed(lambda: conn.execute("SELECT * FROM order_table WHERE status = ? ORDER BY id DESC "
+                                                   "LIMIT ? OFFSET ?",
+                                                   ("paid", args.page_size + 1, deep * args.page_size)).fetchall(),
+                              args.reruns)
+        print(f"\n第 {deep + 1} 页（status=paid）: OFFSET {offset_ms:.2f}ms, 游标 {cursor_ms:.2f}ms")
+
+        # 数据版本失效
+        misses = cache.misses
+        cache.rerun(args.page_size)
+        hits_before = cache.misses - misses
+        bumps = asyncio.run(publish_order_completed(version))
+        misses = cache.misses
+        cache.rerun(args.page_size)
+        print(f"\n缓存失效: 未发布事件时重跑查询 {hits_before} 次；发布\"{STAGE_ORDER}\"完成事件"
+              f"（版本更新 {bumps} 次）后重跑查询 {cache.misses - misses} 次（订单的3个查询）")
+
+
+if __name__ == "__main__":
+    main()
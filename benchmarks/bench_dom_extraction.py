@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+基准测试：单次遍历DOM提取引擎 vs 原调试脚本的多次 querySelectorAll 扫描
+
+对 benchmarks/fixtures/ 下保存的商品页，以及把它们膨胀到指定节点数的合成页面，
+分别执行原脚本的分析 JS 和 DomExtractor 编译出的 JS，输出页面内耗时与往返耗时。
+
+使用方法:
+    python benchmarks/bench_dom_extraction.py --nodes 20000 --repeat 10
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import glob
+import statistics
+import tempfile
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from src.services.dom_extractor import SKU_ANALYSIS_RULES, SKU_KEYWORD_RULES, compile_rules
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# ========== 原脚本中的分析JS（保持原样，作为对照组） ==========
+LEGACY_PAGE_ANALYSIS_JS = """
+    var result = {skuContainers: [], skuItems: [], clickableItems: [], pageInfo: {}};
+    var containerSelectors = ['[class*="obj-sku"]', '[class*="sku-wrapper"]', '[class*="skuList"]',
+        '[class*="sku-list"]', '[data-spm*="sku"]', '[class*="detail-sku"]', '[class*="offer-sku"]'];
+    containerSelectors.forEach(function(sel) {
+        var elems = document.querySelectorAll(sel);
+        if (elems.length > 0) {
+            result.skuContainers.push({selector: sel, count: elems.length,
+                                       html: elems[0].outerHTML.substring(0, 500)});
+        }
+    });
+    var itemSelectors = ['[class*="obj-content"]', '[class*="obj-item"]', '[class*="sku-item"]',
+        '[class*="prop-item"]'];
+    itemSelectors.forEach(function(sel) {
+        var elems = document.querySelectorAll(sel);
+        if (elems.length > 0) {
+            var texts = [];
+            for (var i = 0; i < Math.min(elems.length, 5); i++) {
+                texts.push(elems[i].innerText.substring(0, 100));
+            }
+            result.skuItems.push({selector: sel, count: elems.length, sampleTexts: texts});
+        }
+    });
+    var clickableSelectors = ['[class*="obj-item"]:not([class*="disabled"])',
+        '[class*="sku-item"]:not([class*="disabled"])', 'span[class*="item"]', 'a[class*="item"]'];
+    clickableSelectors.forEach(function(sel) {
+        var elems = document.querySelectorAll(sel);
+        if (elems.length > 0) {
+            var items = [];
+            for (var i = 0; i < Math.min(elems.length, 10); i++) {
+                var el = elems[i];
+                var rect = el.getBoundingClientRect();
+                items.push({text: el.innerText.split('\\n')[0].substring(0, 50),
+                            className: el.className.substring(0, 100),
+                            visible: rect.width > 0 && rect.height > 0,
+                            position: {top: rect.top, left: rect.left}});
+            }
+            result.clickableItems.push({selector: sel, count: elems.length, items: items});
+        }
+    });
+    var titleElem = document.querySelector('[class*="title"], h1, .mod-detail-title');
+    result.pageInfo.title = titleElem ? titleElem.innerText.substring(0, 100) : '未找到标题';
+    result.pageInfo.url = window.location.href;
+    return result;
+"""
+
+LEGACY_KEYWORD_SEARCH_JS = """
+    var result = {byClass: {}, byDataAttr: [], allClasses: []};
+    var keywords = ['sku', 'spec', 'prop', 'attr', 'option', 'select', 'color', 'size'];
+    var allElements = document.querySelectorAll('*');
+    keywords.forEach(function(keyword) { result.byClass[keyword] = []; });
+    for (var i = 0; i < allElements.length; i++) {
+        var el = allElements[i];
+        var className = el.className;
+        if (typeof className === 'string' && className.length > 0) {
+            keywords.forEach(function(keyword) {
+                if (className.toLowerCase().includes(keyword)) {
+                    if (result.byClass[keyword].length < 3) {
+                        result.byClass[keyword].push({tag: el.tagName, class: className.substring(0, 100),
+                            text: el.innerText ? el.innerText.substring(0, 100) : ''});
+                    }
+                }
+            });
+        }
+        if (el.dataset) {
+            Object.keys(el.dataset).forEach(function(key) {
+                if (key.toLowerCase().includes('sku') || key.toLowerCase().includes('spec')) {
+                    if (result.byDataAttr.length < 5) {
+                        result.byDataAttr.push({tag: el.tagName, dataKey: key,
+                                                dataValue: el.dataset[key].substring(0, 50)});
+                    }
+                }
+            });
+        }
+    }
+    var selectors = ['[class*="detail-buy"]', '[class*="buy-area"]', '[class*="purchase"]',
+        '[class*="order-area"]', '[class*="mod-detail"]', '[class*="offer-detail"]'];
+    for (var i = 0; i < selectors.length; i++) {
+        var el = document.querySelector(selectors[i]);
+        if (el) {
+            result.buyArea = {selector: selectors[i], html: el.outerHTML.substring(0, 2000),
+                              text: el.innerText.substring(0, 500)};
+            break;
+        }
+    }
+    return result;
+"""
+
+_FILLER_BLOCK = (
+    '<div class="desc-block recommend-wrapper">'
+    '<p class="desc-line">商品详情描述文字</p>'
+    '<span class="desc-tag">热销</span>'
+    '<img class="desc-img" alt="">'
+    '</div>'
+)
+
+
+def _timed(js: str) -> str:
+    """包装脚本，返回页面内耗时（毫秒）和结果"""
+    return ("var __t0 = performance.now();"
+            "var __r = (function(){" + js + "})();"
+            "return {ms: performance.now() - __t0, result: __r};")
+
+
+def inflate_fixture(path: str, nodes: int, out_dir: str) -> str:
+    """把样例页膨胀到约 nodes 个节点：一半插在SKU区域之前，一半在之后"""
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    per_block = 4
+    half = _FILLER_BLOCK * max(1, nodes // per_block // 2)
+    html = html.replace("<body>", "<body>\n" + half, 1)
+    html = html.replace("</body>", half + "\n</body>", 1)
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_path = os.path.join(out_dir, f"{name}.{nodes}.html")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return out_path
+
+
+def bench_page(driver, url: str, repeat: int) -> list:
+    driver.get(url)
+    node_count = driver.execute_script("return document.getElementsByTagName('*').length")
+    cases = [
+        ("debug_1688_page 原脚本", _timed(LEGACY_PAGE_ANALYSIS_JS)),
+        ("debug_1688_page 单次遍历", _timed(compile_rules(SKU_ANALYSIS_RULES))),
+        ("debug_1688_v2 原脚本", _timed(LEGACY_KEYWORD_SEARCH_JS)),
+        ("debug_1688_v2 单次遍历", _timed(compile_rules(SKU_KEYWORD_RULES))),
+    ]
+    rows = []
+    for label, script in cases:
+        page_ms, trip_ms = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            res = driver.execute_script(script)
+            trip_ms.append((time.perf_counter() - started) * 1000)
+            page_ms.append(res["ms"])
+        rows.append((label, node_count, statistics.median(page_ms), statistics.median(trip_ms)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOM提取引擎基准测试")
+    parser.add_argument("--nodes", type=int, default=20000, help="合成页面的目标节点数")
+    parser.add_argument("--repeat", type=int, default=10, help="每种脚本重复次数")
+    parser.add_argument("--fixtures", type=str, default=FIXTURE_DIR, help="样例页目录")
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not fixtures:
+        print(f"❌ 未找到样例页: {args.fixtures}")
+        return
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--window-size=1440,900")
+    driver = webdriver.Chrome(options=chrome_options)
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = []
+            for path in fixtures:
+                pages.append(path)
+                pages.append(inflate_fixture(path, args.nodes, tmp))
+
+            print(f"{'页面':<40} {'脚本':<24} {'节点数':>8} {'页面内(ms)':>12} {'往返(ms)':>10}")
+            print("-" * 100)
+            for path in pages:
+                for label, nodes, page_ms, trip_ms in bench_page(driver, "file://" + path, args.repeat):
+                    print(f"{os.path.basename(path):<40} {label:<24} {nodes:>8} "
+                          f"{page_ms:>12.2f} {trip_ms:>10.2f}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
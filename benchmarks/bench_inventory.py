@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+基准测试：百万 SKU 库存引擎
+
+    1. 批量登记 --skus 个 SKU，统计内存占用
+    2. 按批应用 --events 个随机出入库事件，每批后检查预警:
+           dirty  只检查变更过的 SKU（InventoryEngine.check_alerts）
+           scan   每次全量扫描所有 SKU（对照组）
+    3. 在临时 SQLite 库中生成同样的 inventory_table（约 0.1% 数量不一致），按块流式对账，
+       对比 fetchall 一次读完的内存峰值
+
+使用方法:
+    python benchmarks/bench_inventory.py --skus 1000000 --events 2000000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.inventory_engine import InventoryEngine, iter_inventory_rows
+
+
+def engine_bytes(engine: InventoryEngine) -> int:
+    """引擎主要结构的内存（不含 SKU 字符串本身）"""
+    return (sys.getsizeof(engine._index) + sys.getsizeof(engine._skus)
+            + engine._qty.itemsize * len(engine._qty) + engine._threshold.itemsize * len(engine._threshold)
+            + len(engine._flags))
+
+
+def make_skus(n: int) -> list:
+    return [f"SKU{i:08d}" for i in range(n)]
+
+
+def bench_events(engine: InventoryEngine, skus: list, events: int, batch: int, rng: random.Random,
+                 mode: str) -> tuple:
+    apply_seconds = check_seconds = 0.0
+    alerts = 0
+    n = len(skus)
+    for _ in range(events // batch):
+        chunk = [(skus[rng.randrange(n)], rng.randint(-20, 20)) for _ in range(batch)]
+        started = time.perf_counter()
+        engine.apply_events(chunk)
+        apply_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        if mode == "dirty":
+            alerts += len(engine.check_alerts(include_recovered=False))
+        else:
+            alerts += len(engine.low_stock())
+        check_seconds += time.perf_counter() - started
+    return apply_seconds, check_seconds, alerts
+
+
+def make_table(path: str, skus: list, engine: InventoryEngine, rng: random.Random, mismatch: float):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE inventory_table (sku_id TEXT PRIMARY KEY, quantity INTEGER, alert_threshold INTEGER)")
+    conn.executemany(
+        "INSERT INTO inventory_table VALUES (?, ?, ?)",
+        ((sku, engine.quantity(sku) + (rng.randint(1, 5) if rng.random() < mismatch else 0),
+          engine.threshold(sku)) for sku in skus))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="库存引擎基准测试")
+    parser.add_argument("--skus", type=int, default=1000000)
+    parser.add_argument("--events", type=int, default=2000000)
+    parser.add_argument("--batch", type=int, default=10000, help="每批事件数（每批后检查一次预警）")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="对账每块行数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    skus = make_skus(args.skus)
+    quantities = array("q", (rng.randint(0, 500) for _ in range(args.skus)))
+    thresholds = array("q", (rng.choice((0, 10, 20, 50)) for _ in range(args.skus)))
+
+    started = time.perf_counter()
+    engine = InventoryEngine()
+    engine.bulk_register(skus, quantities, thresholds)
+    engine.check_alerts()
+    print(f"登记 {args.skus} 个SKU: {time.perf_counter() - started:.2f}s, "
+          f"引擎结构 {engine_bytes(engine) / 1024 / 1024:.1f} MB（{engine_bytes(engine) / args.skus:.0f} 字节/SKU）")
+
+    print(f"\n{'预警检查':<8} {'事件/秒':>12} {'检查总耗时(s)':>14} {'每次检查(ms)':>13} {'新预警':>8}")
+    for mode in ("dirty", "scan"):
+        rng_mode = random.Random(args.seed + 1)
+        apply_s, check_s, alerts = bench_events(engine, skus, args.events, args.batch, rng_mode, mode)
+        checks = args.events // args.batch
+        print(f"{mode:<8} {args.events / apply_s:>12.0f} {check_s:>14.2f} {check_s / checks * 1000:>13.2f} "
+              f"{alerts if mode == 'dirty' else '-':>8}")
+    engine.check_alerts()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "inventory.sqlite3")
+        make_table(db, skus, engine, rng, mismatch=0.001)
+        factory = ConnectionFactory("sqlite", sqlite_path=db)
+
+        report = engine.reconcile(iter_inventory_rows(factory, args.chunk_size), fix=False)
+        print("\n" + report.format())
+
+        tracemalloc.start()
+        engine.reconcile(iter_inventory_rows(factory, args.chunk_size), fix=False)
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        with factory.connection() as conn:
+            rows = conn.execute("SELECT sku_id, quantity, alert_threshold FROM inventory_table").fetchall()
+        engine.reconcile([rows], fix=False)
+        fetchall_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"对账内存峰值: 流式 {streamed_peak / 1024 / 1024:.1f} MB, "
+              f"fetchall {fetchall_peak / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+基准测试：LLM 选品响应缓存与相同请求合并
+
+在本地启动一个模拟 chat/completions 服务（固定延迟，统计收到的请求数），
+依次测量:
+    1. 冷启动：N 个并发的相同选品请求（SingleFlight 合并为 1 次上游调用）
+    2. 热缓存：重复 N 次相同需求（全部命中持久化缓存）
+    3. 候选集变化：改动一个候选商品价格后重新请求（指纹变化，应未命中）
+
+使用方法:
+    python benchmarks/bench_llm_cache.py --concurrency 20 --latency 0.5
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services.llm_cache import LLMResponseCache
+from src.services.llm_client import LLMClient
+
+CANDIDATES = [
+    {"platform": "1688", "product_id": "725887578825", "product_name": "A4打印纸 70g 500张/包",
+     "unit_price": 18.5, "freight": 0},
+    {"platform": "1688", "product_id": "615201234567", "product_name": "A4复印纸 80g 500张",
+     "unit_price": 22.0, "freight": 5},
+    {"platform": "jd", "product_id": "100012345678", "product_name": "得力A4打印纸 70g 5包",
+     "unit_price": 95.0, "freight": 0},
+]
+
+
+class MockCompletionServer:
+    """模拟 OpenAI 兼容的 chat/completions 接口"""
+
+    def __init__(self, latency: float = 0.5, chunk_delay: float = 0.02, truncate_at: int = None):
+        """
+        Args:
+            latency: 首个片段前的延迟
+            chunk_delay: 每个片段（约一个token）的生成时间，非流式时整段生成完才返回
+            truncate_at: 流式输出到第几个字符时截断（模拟 max_tokens 用尽）
+        """
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.truncate_at = truncate_at
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                server.requests += 1
+                time.sleep(server.latency)
+                content = json.dumps({"recommendations": [
+                    {"index": 1, "score": 92, "reason": "单价最低且包邮"},
+                    {"index": 2, "score": 85, "reason": "克重更高"},
+                    {"index": 3, "score": 80, "reason": "京东自营发货快"},
+                ]}, ensure_ascii=False)
+                if body.get("stream"):
+                    self._stream(content)
+                    return
+                time.sleep(server.chunk_delay * ((len(content) + 2) // 3))
+                data = json.dumps({
+                    "model": body.get("model"),
+                    "choices": [{"message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 300, "completion_tokens": 80},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, content: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                finish = "stop"
+                if server.truncate_at is not None:
+                    content, finish = content[:server.truncate_at], "length"
+                # 约每个 token 2~3 个字符
+                for i in range(0, len(content), 3):
+                    event = {"choices": [{"delta": {"content": content[i:i + 3]}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(server.chunk_delay)
+                event = {"choices": [{"delta": {}, "finish_reason": finish}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/chat/completions"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+async def run(concurrency: int, latency: float):
+    demand = {"product_name": "A4打印纸", "quantity": 10, "budget": 500}
+    with MockCompletionServer(latency) as server, tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(os.path.join(tmp, "llm_cache.sqlite3"), ttl=3600, max_entries=100)
+        client = LLMClient(api_base=server.url, api_key="test", model="mock-model",
+                           system_prompt="你是采购助手", cache=cache)
+        try:
+            t = time.perf_counter()
+            results = await asyncio.gather(*[
+                client.select_products(demand, CANDIDATES) for _ in range(concurrency)
+            ])
+            cold = time.perf_counter() - t
+            assert all(r["parsed"] for r in results)
+            print(f"冷启动 {concurrency} 个并发请求: {cold:.3f}s, 上游请求 {server.requests} 次")
+
+            t = time.perf_counter()
+            # 需求文本大小写/全角/空白不同，规范化后命中同一条缓存
+            for i in range(concurrency):
+                name = "Ａ４打印纸 " if i % 2 else " a4打印纸"
+                r = await client.select_products({**demand, "product_name": name}, CANDIDATES[::-1])
+                assert r["cached"]
+            warm = time.perf_counter() - t
+            print(f"热缓存 {concurrency} 次: {warm:.3f}s（平均 {warm / concurrency * 1000:.2f}ms）, "
+                  f"上游请求 {server.requests} 次")
+
+            changed = [dict(CANDIDATES[0], unit_price=17.9)] + CANDIDATES[1:]
+            r = await client.select_products(demand, changed)
+            print(f"候选价格变化后: cached={r['cached']}, 上游请求 {server.requests} 次")
+            print(client.metrics.report())
+        finally:
+            await client.close()
+            cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 响应缓存基准测试")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟服务响应延迟（秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+基准测试：流式选品的首条推荐延迟
+
+使用 bench_llm_cache 中的模拟 chat/completions 服务，对比:
+    - 非流式：整段输出完成后才能拿到推荐
+    - 流式：每条推荐的 JSON 对象闭合即回调（首条推荐延迟）
+    - 截断：输出在第3条推荐中途被截断时，前两条照常输出，第3条由规则补齐
+
+使用方法:
+    python benchmarks/bench_llm_stream.py --chunk-delay 0.02
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import time
+
+from bench_llm_cache import CANDIDATES, MockCompletionServer
+from src.services.llm_cache import LLMResponseCache
+from src.services.llm_client import LLMClient
+from src.services.pre_ranker import select_top3
+
+DEMAND = {"product_name": "A4打印纸", "quantity": 10, "budget": 1000}
+
+
+async def timed(server: MockCompletionServer, stream: bool):
+    client = LLMClient(api_base=server.url, api_key="test", model="mock-model", system_prompt="",
+                       cache=LLMResponseCache(":memory:"), stream=stream)
+    started = time.perf_counter()
+    arrivals = []
+    try:
+        out = await select_top3(
+            DEMAND, CANDIDATES, client=client,
+            on_recommendation=lambda c: arrivals.append((time.perf_counter() - started, c)))
+    finally:
+        await client.close()
+    return time.perf_counter() - started, arrivals, out
+
+
+async def run(latency: float, chunk_delay: float):
+    with MockCompletionServer(latency, chunk_delay) as server:
+        for stream in (False, True):
+            total, arrivals, out = await timed(server, stream)
+            label = "流式" if stream else "非流式"
+            print(f"{label}: 首条推荐 {arrivals[0][0]:.3f}s, 全部完成 {total:.3f}s, 模式 {out['mode']}")
+            for t, c in arrivals:
+                print(f"    {t:.3f}s  {c.rank}. {c.product_name} — {c.reason}")
+
+    # 截断在第3条推荐中间
+    with MockCompletionServer(latency, chunk_delay, truncate_at=125) as server:
+        total, arrivals, out = await timed(server, True)
+        print(f"截断: 全部完成 {total:.3f}s, 模式 {out['mode']}, truncated={out['truncated']}")
+        for t, c in arrivals:
+            print(f"    {t:.3f}s  {c.rank}. {c.product_name} — {c.reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式选品基准测试")
+    parser.add_argument("--latency", type=float, default=0.3, help="首个片段前的延迟（秒）")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="每个片段的间隔（秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.chunk_delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+基准测试：并行下单调度
+
+用模拟执行器（按步骤 sleep，不打开浏览器）对比三种方式完成同一批订单的耗时:
+    serial    1 个账号，逐单 execute_order（每个SKU单独加购、结算）
+    grouped   1 个账号，按供应商分组，同组SKU共用一个购物车、一次结算
+    parallel  --accounts 个账号并行，按供应商分组
+
+每个账号在独立的工作进程中首次下单前模拟一次登录（--login）。
+
+使用方法:
+    python benchmarks/bench_order_dispatch.py --orders 50 --suppliers 20 --accounts 4
+    python benchmarks/bench_order_dispatch.py --scale 0.1 --fail-rate 0.05 --rate 6
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from src.services.order_dispatcher import Account, OrderDispatcher, OrderLine
+
+
+class SimulatedExecutor:
+    """模拟执行器：各步骤只 sleep；fail_rate 概率结算失败"""
+
+    def __init__(self, account: Account, latency: dict, fail_rate: float, cart: bool):
+        self.account = account
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._cart = []
+        self._orders = 0
+        time.sleep(latency["login"])
+        if cart:
+            self.add_to_cart = self._add_to_cart
+            self.checkout = self._checkout
+            self.clear_cart = self._clear_cart
+
+    def _clear_cart(self):
+        self._cart = []
+
+    def _add_to_cart(self, recommendation, quantity):
+        time.sleep(self.latency["open"] + self.latency["cart"])
+        self._cart.append((recommendation, quantity))
+
+    def _checkout(self, shipping_info, purchase_demand=None):
+        time.sleep(self.latency["checkout"])
+        amount = sum(r.unit_price * q for r, q in self._cart)
+        self._cart = []
+        if random.random() < self.fail_rate:
+            raise RuntimeError("结算页超时")
+        self._orders += 1
+        return {"order_id": f"{self.account.name}-{self._orders:04d}", "payment_amount": round(amount, 2)}
+
+    def execute_order(self, recommendation, shipping_info, quantity, purchase_demand=None):
+        self._add_to_cart(recommendation, quantity)
+        return self._checkout(shipping_info, purchase_demand)
+
+    def close(self):
+        pass
+
+
+class SimulatedFactory:
+    """可被 pickle 的执行器工厂（工作进程中调用）"""
+
+    def __init__(self, latency: dict, fail_rate: float, cart: bool):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.cart = cart
+
+    def __call__(self, account: Account):
+        return SimulatedExecutor(account, self.latency, self.fail_rate, self.cart)
+
+
+def make_lines(orders: int, suppliers: int, seed: int) -> list:
+    rng = random.Random(seed)
+    shipping = {"receiver_name": "张三", "phone": "13800138000", "province": "浙江省",
+                "city": "杭州市", "district": "西湖区", "address": "文三路100号"}
+    lines = []
+    for i in range(orders):
+        supplier = f"供应商{rng.randrange(suppliers):02d}"
+        recommendation = SimpleNamespace(product_name=f"商品{i:03d}", product_url=f"https://detail.1688.com/offer/{i}.html",
+                                         unit_price=round(rng.uniform(5, 200), 2), supplier=supplier)
+        lines.append(OrderLine(line_id=f"L{i:03d}", platform="1688", supplier=supplier,
+                               recommendation=recommendation, quantity=rng.randint(1, 50),
+                               shipping_info=shipping))
+    return lines
+
+
+def run(label: str, lines: list, accounts: int, factory: SimulatedFactory, rate: float,
+        max_lines_per_group: int) -> dict:
+    pool = [Account(name=f"acct{i + 1}", platform="1688", rate_per_minute=rate, headless=True)
+            for i in range(accounts)]
+    dispatcher = OrderDispatcher(pool, executor_factory=factory, max_lines_per_group=max_lines_per_group)
+    report = dispatcher.dispatch(lines, progress=None)
+    checkouts = len({(r.account, r.order_id) for r in report.results if r.order_id})
+    print(f"{label:<10} {accounts:>4} {report.groups:>6} {checkouts:>6} {report.count('success'):>6} "
+          f"{report.count('failed'):>6} {report.elapsed:>9.2f}")
+    return {"label": label, "elapsed": report.elapsed, "report": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行下单调度基准测试")
+    parser.add_argument("--orders", type=int, default=50, help="SKU数")
+    parser.add_argument("--suppliers", type=int, default=20, help="供应商数")
+    parser.add_argument("--accounts", type=int, default=4, help="parallel 模式的账号数")
+    parser.add_argument("--scale", type=float, default=0.02,
+                        help="延迟缩放（1 表示真实量级：登录8s、打开商品页4s、加购3s、结算10s）")
+    parser.add_argument("--rate", type=float, default=0, help="每个账号每分钟结算次数上限（0 不限）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="结算失败概率")
+    parser.add_argument("--max-lines", type=int, default=20, help="单个购物车SKU数上限")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="打印 parallel 模式的汇总报告")
+    args = parser.parse_args()
+
+    latency = {k: v * args.scale for k, v in {"login": 8.0, "open": 4.0, "cart": 3.0, "checkout": 10.0}.items()}
+    lines = make_lines(args.orders, args.suppliers, args.seed)
+    print(f"订单: {args.orders} 个SKU / {len({l.supplier for l in lines})} 个供应商, 延迟缩放 {args.scale}")
+    print(f"{'模式':<10} {'账号':>4} {'组数':>6} {'结算':>6} {'成功':>6} {'失败':>6} {'耗时(s)':>9}")
+
+    serial = run("serial", lines, 1, SimulatedFactory(latency, args.fail_rate, cart=False),
+                 args.rate, args.max_lines)
+    grouped = run("grouped", lines, 1, SimulatedFactory(latency, args.fail_rate, cart=True),
+                  args.rate, args.max_lines)
+    parallel = run("parallel", lines, args.accounts, SimulatedFactory(latency, args.fail_rate, cart=True),
+                   args.rate, args.max_lines)
+
+    print(f"\n分组提速 {serial['elapsed'] / grouped['elapsed']:.1f}x，"
+          f"分组 + {args.accounts} 账号并行提速 {serial['elapsed'] / parallel['elapsed']:.1f}x")
+    if args.verbose:
+        print(parallel["report"].format())
+
+
+if __name__ == "__main__":
+    main()
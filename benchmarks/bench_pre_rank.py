@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+基准测试：规则预排序对大模型请求体积的影响
+
+生成 N 个合成候选商品（含超预算、起订量不足、规格不符和重复商品），
+对比完整候选列表和预排序后 Top-K 精简字段的提示词长度，以及预排序本身的耗时。
+
+使用方法:
+    python benchmarks/bench_pre_rank.py --candidates 200 1000 5000 --top-k 8
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import statistics
+import time
+
+from src.services.llm_client import build_selection_messages
+from src.services.pre_ranker import EXPLAIN_INSTRUCTION, pre_rank
+
+DEMAND = {"product_name": "A4打印纸", "quantity": 10, "budget": 300, "specification": "70g"}
+
+
+def make_candidates(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        base = {
+            "platform": rng.choice(["1688", "jd", "tmall"]),
+            "product_id": str(100000 + i),
+            "product_name": f"A4打印纸 {rng.choice(['70g', '80g'])} 500张/包 型号{i % 40}",
+            "unit_price": round(rng.uniform(10, 60), 2),
+            "freight": rng.choice([0, 5, 8]),
+            "sales": rng.randint(0, 5000),
+            "min_order": rng.choice([1, 1, 1, 20]),
+            "product_url": f"https://detail.1688.com/offer/{100000 + i}.html",
+            "shop_name": f"办公用品店{i % 97}",
+            "description": "高白度 不卡纸 双面打印 " * 3,
+        }
+        out.append(base)
+        if rng.random() < 0.1:
+            # 同款重复上架
+            out.append(dict(base, product_id=base["product_id"] + "1",
+                            product_name="【包邮】" + base["product_name"]))
+    return out
+
+
+def prompt_chars(candidates: list, instruction: str = None) -> int:
+    return sum(len(m["content"]) for m in build_selection_messages(DEMAND, candidates, "", instruction))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则预排序基准测试")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'候选数':>8} {'完整提示词(字符)':>16} {'预排序后(字符)':>14} {'压缩比':>8} {'预排序耗时(ms)':>14}")
+    for n in args.candidates:
+        candidates = make_candidates(n)
+        times = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            result = pre_rank(candidates, DEMAND, top_k=args.top_k)
+            times.append((time.perf_counter() - t) * 1000)
+        full = prompt_chars(candidates)
+        compact = prompt_chars(result.compact_payload(), EXPLAIN_INSTRUCTION)
+        print(f"{len(candidates):>8} {full:>16} {compact:>14} {full / compact:>7.1f}x "
+              f"{statistics.median(times):>14.1f}")
+        print(f"         {result.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+基准测试：SKU 矩阵规格查找
+
+生成一个 颜色 × 尺码 × 包装 的多规格商品（skuModel 结构与 1688 内嵌数据一致），
+用不同写法的规格文本（"红色01 XL 5包"、"5包>XL>红色01"、全角、带多余文字）查找组合:
+    scan     逐个 SKU 规范化规格文本后比较（相当于逐个扫描页面上的选项）
+    matrix   SkuMatrix.find（规范化文本索引，不命中时按维度匹配）
+
+同时统计构建耗时和内存（对照 extract_offer 的字典列表）。
+
+使用方法:
+    python benchmarks/bench_sku_matrix.py --colors 30 --sizes 10 --packs 4 --queries 100000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from src.models.sku_matrix import SkuMatrix, normalize_spec
+from src.services.tiered_fetcher import extract_offer
+
+SIZES = ["XS", "S", "M", "L", "XL", "XXL", "3XL", "4XL", "5XL", "6XL", "均码", "加大"]
+
+
+def make_sku_model(colors: int, sizes: int, packs: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    color_values = [f"颜色{i:02d}" for i in range(colors)]
+    size_values = [SIZES[i] if i < len(SIZES) else f"{i}码" for i in range(sizes)]
+    pack_values = [f"{n}包" for n in (1, 5, 10, 20, 50, 100)[:packs]] + [f"{n}包" for n in range(200, 200 + max(0, packs - 6))]
+    info = {}
+    sku_id = 6000000
+    for c in color_values:
+        for s in size_values:
+            for p in pack_values:
+                sku_id += 1
+                key = f"{c}&gt;{s}&gt;{p}"
+                info[key] = {"specAttrs": key, "price": f"{rng.uniform(5, 500):.2f}",
+                             "canBookCount": rng.randint(0, 1000), "skuId": sku_id, "specId": f"spec{sku_id}"}
+    props = [{"prop": name, "value": [{"name": v} for v in values]}
+             for name, values in (("颜色", color_values), ("尺码", size_values), ("包装", pack_values))]
+    return {"skuModel": {"skuProps": props, "skuInfoMap": info}}
+
+
+def make_queries(offer: dict, n: int, seed: int) -> list:
+    """不同写法的规格文本"""
+    rng = random.Random(seed)
+    specs = [sku["spec_attrs"].split(">") for sku in offer["skus"]]
+    queries = []
+    for _ in range(n):
+        parts = rng.choice(specs)
+        style = rng.randrange(4)
+        if style == 0:
+            queries.append(" ".join(parts))
+        elif style == 1:
+            queries.append(">".join(reversed(parts)))
+        elif style == 2:
+            queries.append("　".join(p.translate({ord(ch): ord(ch) + 0xFEE0 for ch in "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"})
+                                     for p in parts))
+        else:
+            queries.append(f"要{parts[0]}的，{parts[1]}号，{parts[2]}装")
+    return queries
+
+
+def scan_find(offer: dict, spec: str):
+    """对照组：逐个 SKU 比较规范化后的规格文本（不考虑顺序和多余文字）"""
+    key = normalize_spec(spec)
+    for sku in offer["skus"]:
+        if normalize_spec(sku["spec_attrs"]) == key:
+            return sku
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SKU矩阵规格查找基准测试")
+    parser.add_argument("--colors", type=int, default=30)
+    parser.add_argument("--sizes", type=int, default=10)
+    parser.add_argument("--packs", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=100000, help="matrix 查找次数")
+    parser.add_argument("--scan-queries", type=int, default=500, help="scan 查找次数（逐个扫描很慢）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    payloads = make_sku_model(args.colors, args.sizes, args.packs, args.seed)
+
+    tracemalloc.start()
+    offer = extract_offer(payloads)
+    offer_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    matrix = SkuMatrix.from_sku_model(payloads["skuModel"])
+    build = time.perf_counter() - started
+    matrix_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(matrix.format())
+    print(f"构建: {build * 1000:.1f}ms, 内存 {matrix_bytes / 1024:.0f}KB（含索引）, "
+          f"extract_offer 字典列表 {offer_bytes / 1024:.0f}KB")
+
+    queries = make_queries(offer, args.queries, args.seed)
+    started = time.perf_counter()
+    found = sum(1 for q in queries if matrix.find(q) is not None)
+    matrix_elapsed = time.perf_counter() - started
+
+    scan_queries = queries[:args.scan_queries]
+    started = time.perf_counter()
+    scan_found = sum(1 for q in scan_queries if scan_find(offer, q) is not None)
+    scan_elapsed = time.perf_counter() - started
+
+    matrix_us = matrix_elapsed / len(queries) * 1e6
+    scan_us = scan_elapsed / len(scan_queries) * 1e6
+    print(f"{'方式':<8} {'查找次数':>8} {'命中':>8} {'单次(μs)':>10}")
+    print(f"{'scan':<8} {len(scan_queries):>8} {scan_found:>8} {scan_us:>10.1f}")
+    print(f"{'matrix':<8} {len(queries):>8} {found:>8} {matrix_us:>10.1f}")
+    print(f"\nmatrix 比 scan 快 {scan_us / matrix_us:.0f}x，命中率 {found / len(queries):.1%} "
+          f"（scan {scan_found / len(scan_queries):.1%}，不识别顺序变化和多余文字）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+启动耗时检查：run_purchase.py 各模式的导入开销
+
+用 `python -X importtime` 启动 run_purchase.py 的各模式，统计解释器自身启动之外的导入耗时，
+并检查是否导入了重依赖（streamlit / pandas / selenium 等）:
+    --help、--init-db --dry-run    轻量模式（空跑使用 fixtures/startup_init.sql，会实际走到 sql_runner）
+    --batch、--product              工作流模式：编排器替换为立即返回的替身，
+                                    只检查命令行这一层（进度总线、检查点、批量执行器）的导入
+命令退出码非零、超出预算或导入了禁止的模块时以非零状态退出，可直接放进 CI 或定时任务前的自检。
+临时文件（检查点、看板版本号、批量结果）写到临时目录，不影响 data/。
+
+使用方法:
+    python benchmarks/bench_startup.py                  # 默认预算 80ms / 工作流模式 150ms
+    python benchmarks/bench_startup.py --budget-ms 50 --workflow-budget-ms 120 --repeat 5
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(PROJECT_ROOT, "run_purchase.py")
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+INIT_SQL = os.path.join(FIXTURES, "startup_init.sql")
+
+# 轻量模式不应导入的模块（含其子模块）
+FORBIDDEN = ("streamlit", "pandas", "numpy", "selenium", "playwright", "dashscope", "sqlalchemy",
+             "httpx", "openpyxl", "mysql", "pymysql", "lxml", "src.services.workflow_orchestrator")
+
+# 工作流模式的启动脚本：注册编排器替身后按命令行运行 run_purchase.py
+STUB_DRIVER = """
+import runpy, sys, types
+
+class WorkflowOrchestrator:
+    def set_progress_callback(self, callback):
+        self.callback = callback
+
+    def set_checkpointer(self, checkpointer):
+        self.checkpointer = checkpointer
+
+    async def execute_full_workflow(self, demand):
+        return {"status": "completed"}
+
+stub = types.ModuleType("src.services.workflow_orchestrator")
+stub.WorkflowOrchestrator = WorkflowOrchestrator
+sys.modules[stub.__name__] = stub
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def build_modes(tmp: str) -> list:
+    """[(名称, 命令行参数, 是否使用编排器替身)]"""
+    demands = os.path.join(tmp, "demands.jsonl")
+    with open(demands, "w", encoding="utf-8") as f:
+        f.write('{"product": "A4打印纸", "quantity": 2, "platforms": "1688"}\n')
+    return [
+        ("--help", ["--help"], False),
+        ("--init-db --dry-run", ["--init-db", "--dry-run"], False),
+        ("--batch", ["--batch", demands, "--concurrency", "1", "--output", os.path.join(tmp, "out.jsonl")], True),
+        ("--product", ["--product", "A4打印纸", "--quantity", "2"], True),
+    ]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list:
+    """解析 -X importtime 输出，返回 [(模块名, 自身微秒, 累计微秒, 缩进层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def run_importtime(args: list, env: dict = None) -> tuple:
+    """运行一次，返回 (导入记录, 墙钟秒数, 退出码, 标准错误中的非导入记录)"""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True, env=env)
+    errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+    return parse_importtime(proc.stderr), time.perf_counter() - started, proc.returncode, errors
+
+
+def measure(args: list, baseline_roots: set, repeat: int, env: dict = None) -> dict:
+    """多次运行取中位数；只统计解释器空启动时没有导入的顶层模块"""
+    import_ms, wall_ms, modules = [], [], set()
+    for _ in range(repeat):
+        rows, wall, returncode, errors = run_importtime(args, env)
+        if returncode != 0:
+            return {"returncode": returncode, "errors": errors}
+        import_ms.append(sum(cum for name, _, cum, level in rows
+                             if level == 0 and name not in baseline_roots) / 1000)
+        wall_ms.append(wall * 1000)
+        modules = {name for name, _, _, _ in rows}
+    return {"returncode": 0, "import_ms": statistics.median(import_ms),
+            "wall_ms": statistics.median(wall_ms), "modules": modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run_purchase.py 启动耗时检查")
+    parser.add_argument("--budget-ms", type=float, default=80.0, help="轻量模式的导入耗时预算（毫秒）")
+    parser.add_argument("--workflow-budget-ms", type=float, default=150.0,
+                        help="--batch / --product 的导入耗时预算（毫秒，不含编排器）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模式运行次数（取中位数）")
+    args = parser.parse_args()
+
+    baseline_rows, _, _, _ = run_importtime(["-c", "pass"])
+    baseline_roots = {name for name, _, _, level in baseline_rows if level == 0}
+    baseline_wall = statistics.median(run_importtime(["-c", "pass"])[1] * 1000 for _ in range(args.repeat))
+    print(f"解释器空启动: {baseline_wall:.1f}ms")
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "INIT_SQL_PATH": INIT_SQL,
+               "WORKFLOW_CHECKPOINT_PATH": os.path.join(tmp, "checkpoints.sqlite3"),
+               "DASHBOARD_VERSION_DIR": os.path.join(tmp, "dashboard_version")}
+        print(f"{'模式':<22} {'导入耗时(ms)':>12} {'墙钟(ms)':>10} {'预算(ms)':>10}  结果")
+        for label, mode_args, stub in build_modes(tmp):
+            budget = args.workflow_budget_ms if stub else args.budget_ms
+            command = ["-c", STUB_DRIVER, SCRIPT, *mode_args] if stub else [SCRIPT, *mode_args]
+            r = measure(command, baseline_roots, args.repeat, env)
+            if r["returncode"] != 0:
+                print(f"{label:<22} {'-':>12} {'-':>10} {budget:>10.0f}  ❌")
+                detail = r["errors"][-1] if r["errors"] else ""
+                failures.append(f"{label}: 退出码 {r['returncode']} {detail}".rstrip())
+                continue
+            heavy = sorted(m for m in r["modules"]
+                           if any(m == f or m.startswith(f + ".") for f in FORBIDDEN))
+            ok = r["import_ms"] <= budget and not heavy
+            print(f"{label:<22} {r['import_ms']:>12.1f} {r['wall_ms']:>10.1f} {budget:>10.0f}  "
+                  f"{'✅' if ok else '❌'}")
+            if r["import_ms"] > budget:
+                failures.append(f"{label}: 导入耗时 {r['import_ms']:.1f}ms 超出预算 {budget:.0f}ms")
+            if heavy:
+                failures.append(f"{label}: 导入了重依赖 {', '.join(heavy[:5])}")
+
+    if failures:
+        print("\n❌ 启动耗时检查未通过:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ 启动耗时检查通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+基准测试：分级抓取（http 优先）vs 每个页面都开浏览器
+
+在本地 HTTP 服务上发布 benchmarks/fixtures/ 下保存的商品页，另外构造三种需要升级的页面:
+    /login/...     302 跳转到登录页
+    /captcha/...   验证码页
+    /render/...    去掉内嵌数据、需要 JS 渲染的页面
+
+逐个抓取并输出每个页面由哪一级返回、升级原因、解析出的SKU数和耗时。
+加 --browser 时启动无头 Chrome，对比全部走浏览器的耗时（需要本机安装 Chrome）。
+
+使用方法:
+    python benchmarks/bench_tiered_fetch.py --repeat 20
+    python benchmarks/bench_tiered_fetch.py --repeat 5 --browser
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import glob
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services.tiered_fetcher import TieredFetcher
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_SCRIPT_RE = re.compile(r"<script>window\.__INIT_DATA.*?</script>", re.S)
+
+
+class FixtureServer:
+    """在本地端口上发布样例页"""
+
+    def __init__(self, fixture_dir: str = FIXTURE_DIR):
+        pages = {}
+        for path in glob.glob(os.path.join(fixture_dir, "*.html")):
+            with open(path, "r", encoding="utf-8") as f:
+                pages[os.path.basename(path)] = f.read()
+        self.pages = pages
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: str, headers: dict = None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                kind, _, name = self.path.strip("/").partition("/")
+                html = server.pages.get(name)
+                if html is None:
+                    self._send(404, "not found")
+                elif kind == "offer":
+                    self._send(200, html)
+                elif kind == "login":
+                    self._send(302, "", {"Location": "/member/login.htm?redirect=" + name})
+                elif kind == "captcha":
+                    self._send(200, '<html><body><div id="baxia-dialog">请拖动滑块完成验证</div></body></html>')
+                elif kind == "render":
+                    self._send(200, _SCRIPT_RE.sub("", html))
+                elif kind == "member":
+                    self._send(200, "<html><body>请登录</body></html>")
+                else:
+                    self._send(404, "not found")
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def bench(fetcher: TieredFetcher, urls: list, repeat: int, require_browser: bool = False) -> list:
+    rows = []
+    for url in urls:
+        times, page = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = fetcher.fetch(url, require_browser=require_browser)
+            times.append((time.perf_counter() - started) * 1000)
+        skus = len(page.offer["skus"]) if page.offer else 0
+        rows.append((url.split("/", 3)[-1], page.tier or "-", page.escalation or "-", skus,
+                     statistics.median(times)))
+    return rows
+
+
+def print_rows(title: str, rows: list):
+    print(f"\n{title}")
+    print(f"{'页面':<36} {'级别':<8} {'升级原因':<18} {'SKU数':>6} {'中位耗时(ms)':>12}")
+    print("-" * 86)
+    for path, tier, escalation, skus, ms in rows:
+        print(f"{path:<36} {tier:<8} {escalation:<18} {skus:>6} {ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分级抓取基准测试")
+    parser.add_argument("--repeat", type=int, default=20, help="每个页面重复次数")
+    parser.add_argument("--browser", action="store_true", help="同时测试浏览器级（需要 Chrome）")
+    parser.add_argument("--fixtures", type=str, default=FIXTURE_DIR, help="样例页目录")
+    args = parser.parse_args()
+
+    with FixtureServer(args.fixtures) as server:
+        if not server.pages:
+            print(f"❌ 未找到样例页: {args.fixtures}")
+            return
+        urls = [f"{server.url}/{kind}/{name}" for name in sorted(server.pages)
+                for kind in ("offer", "login", "captcha", "render")]
+
+        pool = None
+        if args.browser:
+            from src.services.driver_pool import DriverPool
+            pool = DriverPool(size=1, headless=True)
+            pool.warm_up()
+        fetcher = TieredFetcher(pool=pool, cookie_dir=os.devnull)
+        try:
+            print_rows("分级抓取（http 优先，必要时升级）", bench(fetcher, urls, args.repeat))
+            if pool is not None:
+                offers = [u for u in urls if "/offer/" in u]
+                print_rows("全部走浏览器", bench(fetcher, offers, args.repeat, require_browser=True))
+            print("\n" + fetcher.stats.report())
+        finally:
+            fetcher.close()
+            if pool is not None:
+                pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+基准测试：固定间隔轮询 vs 自适应物流调度
+
+本地启动模拟的快递100查询接口（tests/kuaidi100_mock.py，校验签名，按模拟时钟返回已发生的轨迹），生成一批订单:
+    - 部分订单合并发货（多个订单共用一个运单）
+    - 大部分正常揽收 → 在途 → 派件 → 签收
+    - 少量中途停滞（长时间无新轨迹）、少量一直未发货
+
+用模拟时钟跑完 --days 天，对比:
+    fixed     所有运单每 --fixed-interval 小时查一次
+    adaptive  TrackingScheduler 默认的自适应间隔
+输出查询次数、签收的发现延迟，以及停滞/未发货预警是否被发现。
+
+使用方法:
+    python benchmarks/bench_tracking_poll.py --orders 200 --days 5
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import random
+import statistics
+from datetime import datetime
+
+from src.services.kuaidi100 import (
+    STATE_COLLECTED, STATE_DELIVERING, STATE_IN_TRANSIT, STATE_SIGNED, Kuaidi100Client,
+)
+from src.services.tracking_scheduler import (
+    ALERT_STALLED, ALERT_UNSHIPPED, DEFAULT_INTERVALS, HOUR, TrackingScheduler,
+)
+from tests.kuaidi100_mock import CUSTOMER, KEY, MockKuaidi100Server, SimClock
+
+START = datetime(2024, 5, 1, 8, 0).timestamp()
+
+
+def make_timeline(rng: random.Random, created_at: float, kind: str) -> list:
+    """生成一个运单的完整轨迹 [(时间, 状态, 描述)]"""
+    if kind == "unshipped":
+        return []
+    t = created_at + rng.uniform(2, 30) * HOUR
+    events = [(t, STATE_COLLECTED, "快件已揽收")]
+    hops = rng.randint(2, 5)
+    for i in range(hops):
+        t += rng.uniform(4, 14) * HOUR
+        events.append((t, STATE_IN_TRANSIT, f"快件已到达第{i + 1}个转运中心"))
+        if kind == "stalled" and i == 0:
+            return events
+    t += rng.uniform(2, 10) * HOUR
+    events.append((t, STATE_DELIVERING, "快递员正在派件"))
+    t += rng.uniform(0.5, 5) * HOUR
+    events.append((t, STATE_SIGNED, "快件已签收"))
+    return events
+
+
+def make_orders(n: int, rng: random.Random) -> tuple:
+    """返回 (订单列表 [(订单号, 单号, 下单时间)], {单号: 轨迹}, {单号: 类型})"""
+    orders, timelines, kinds = [], {}, {}
+    number = None
+    for i in range(n):
+        created_at = START + rng.uniform(0, 24) * HOUR
+        # 约15%的订单与上一个订单合并发货
+        if number is None or rng.random() > 0.15:
+            number = f"YT{9000000000 + i}"
+            r = rng.random()
+            kind = "unshipped" if r < 0.03 else "stalled" if r < 0.08 else "normal"
+            kinds[number] = kind
+            timelines[number] = make_timeline(rng, created_at, kind)
+        orders.append((f"PO{i:05d}", number, created_at))
+    return orders, timelines, kinds
+
+
+async def simulate(mode: str, orders: list, timelines: dict, kinds: dict, days: float,
+                   fixed_interval: float) -> dict:
+    clock = SimClock(START)
+    with MockKuaidi100Server(timelines, clock) as server:
+        client = Kuaidi100Client(key=KEY, customer=CUSTOMER, url=server.url)
+        if mode == "fixed":
+            kwargs = {"intervals": {s: fixed_interval * HOUR for s in DEFAULT_INTERVALS},
+                      "backoff": 1.0, "batch_window": 0}
+        else:
+            kwargs = {}
+        scheduler = TrackingScheduler(client, concurrency=20, rate=100000, clock=clock, **kwargs)
+        pending = sorted(orders, key=lambda o: o[2])
+        end = START + days * 24 * HOUR
+        signed_seen, alerts_seen = {}, {}
+        try:
+            while True:
+                due = scheduler.next_due()
+                arrival = pending[0][2] if pending else None
+                nxt = min(t for t in (due, arrival) if t is not None) if (due or arrival) else None
+                if nxt is None or nxt > end:
+                    break
+                clock.now = max(clock.now, nxt)
+                while pending and pending[0][2] <= clock.now:
+                    order_id, number, created_at = pending.pop(0)
+                    scheduler.add(order_id, "yuantong", number, created_at=created_at)
+                await scheduler.poll_due()
+                for s in scheduler.shipments.values():
+                    if s.signed and s.number not in signed_seen:
+                        signed_seen[s.number] = clock.now
+                for alert in scheduler.alerts(only_new=True):
+                    alerts_seen.setdefault((alert.number, alert.kind), clock.now)
+        finally:
+            await client.close()
+        requests = server.requests
+
+    delays = [(seen - timelines[n][-1][0]) / HOUR for n, seen in signed_seen.items()]
+    stalled = [n for n, k in kinds.items() if k == "stalled"]
+    unshipped = [n for n, k in kinds.items() if k == "unshipped"]
+    return {
+        "requests": requests,
+        "rounds": scheduler.stats["rounds"],
+        "coalesced": scheduler.stats["coalesced"],
+        "signed": len(signed_seen),
+        "sign_delay": statistics.mean(delays) if delays else 0.0,
+        "stalled": sum(1 for n in stalled if (n, ALERT_STALLED) in alerts_seen),
+        "stalled_total": len(stalled),
+        "unshipped": sum(1 for n in unshipped if (n, ALERT_UNSHIPPED) in alerts_seen),
+        "unshipped_total": len(unshipped),
+    }
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    orders, timelines, kinds = make_orders(args.orders, rng)
+    print(f"订单 {len(orders)} 个，运单 {len(timelines)} 个，模拟 {args.days} 天")
+    print(f"{'模式':<10} {'查询次数':>8} {'轮数':>6} {'签收数':>6} {'签收发现延迟(h)':>16} "
+          f"{'停滞预警':>10} {'未发货预警':>10}")
+    for mode in ("fixed", "adaptive"):
+        r = await simulate(mode, orders, timelines, kinds, args.days, args.fixed_interval)
+        print(f"{mode:<10} {r['requests']:>8} {r['rounds']:>6} {r['signed']:>6} {r['sign_delay']:>16.2f} "
+              f"{r['stalled']:>5}/{r['stalled_total']:<4} {r['unshipped']:>5}/{r['unshipped_total']:<4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="物流轮询调度基准测试")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--days", type=float, default=5)
+    parser.add_argument("--fixed-interval", type=float, default=2.0, help="固定轮询间隔（小时）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+基准测试：采购全流程（离线替身）
+
+真实流程依赖 1688、MySQL、大模型接口和快递100，无法离线重复运行。本脚本在子进程中启动本地替身服务
+（与被测进程分开，不占用其 CPU / 内存），每类服务都可注入延迟:
+    /offer/<n>.html          商品页（benchmarks/fixtures/ 样例页，按编号改写商品ID、标题和价格）
+    /v1/chat/completions     模拟 OpenAI 兼容的选品接口
+    /poll/query.do           模拟快递100实时查询（校验签名，返回已签收轨迹）
+数据库默认使用临时 SQLite，--db mysql 时使用 .env 中配置的本地 MySQL，每次写入前可注入延迟。
+
+替身编排器 StandInOrchestrator 用项目中的组件依次执行各阶段:
+    爬取      CrawlScheduler + TieredFetcher.fetch_http（http 级抓取 + 内嵌数据解析）
+    AI选品    ProductSelector（pre_rank 预排序 + LLMClient，不使用响应缓存）
+    下单      写入 bench_order_table
+    物流      Kuaidi100Client
+    入库      InventoryEngine 入库 + 低库存检查，回写订单状态
+
+入口（--entry）:
+    auto     每个需求调用 run_auto_purchase（注入替身编排器），最多 --concurrency 个同时执行
+    batch    BatchPurchaseRunner 读取需求文件（orchestrator_factory 注入替身编排器）
+    direct   直接调用替身编排器，需求为字典（不经过 build_purchase_demand，不依赖 src.models）
+
+输出吞吐（需求/分钟）、各阶段和全流程耗时的 p50/p95/p99、被测进程峰值RSS。
+结果保存到 data/benchmarks/（带 git 提交号），并与上一次（或 --compare 指定的）结果对比。
+
+使用方法:
+    python benchmarks/bench_workflow.py --demands 50 --concurrency 4
+    python benchmarks/bench_workflow.py --entry batch --page-latency 0.2 --llm-latency 1.5
+    python benchmarks/bench_workflow.py --compare data/benchmarks/workflow_20240501-120000_abc1234.json
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import re
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.crawl_scheduler import CrawlScheduler, PlatformBudget
+from src.services.inventory_engine import InventoryEngine
+from src.services.kuaidi100 import STATE_SIGNED, Kuaidi100Client, sign
+from src.services.llm_client import LLMClient
+from src.services.pre_ranker import ProductSelector
+from src.services.tiered_fetcher import TieredFetcher
+from src.services.workflow_checkpoint import STAGE_CRAWL, STAGE_ORDER, STAGE_SELECT, STAGE_STOCK, STAGE_TRACK
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(PROJECT_ROOT, "benchmarks", "fixtures", "offer_725887578825.html")
+RESULT_DIR = os.path.join(PROJECT_ROOT, "data", "benchmarks")
+
+KEY, CUSTOMER = "bench-key", "BENCHCUSTOMER"
+FIXTURE_OFFER_ID = 725887578825
+
+STAGE_TOTAL = "全流程"
+STAGES = (STAGE_CRAWL, STAGE_SELECT, STAGE_ORDER, STAGE_TRACK, STAGE_STOCK, STAGE_TOTAL)
+
+PRODUCTS = ["A4打印纸", "A4复印纸 70g", "A4复印纸 80g", "办公打印纸", "A3复印纸"]
+
+_PRICE_RE = re.compile(r'"(price|discountPrice)": "([\d.]+)"')
+
+
+# ---------- 替身服务（子进程） ----------
+
+class StandInServer:
+    """商品页 / 大模型 / 快递100 的本地替身"""
+
+    def __init__(self, page_latency: float = 0.0, llm_latency: float = 0.0,
+                 tracking_latency: float = 0.0, jitter: float = 0.0, seed: int = 42):
+        """
+        Args:
+            page_latency: 商品页响应延迟（秒）
+            llm_latency: 大模型响应延迟（秒）
+            tracking_latency: 快递100响应延迟（秒）
+            jitter: 延迟的相对抖动（0.2 表示 ±20%）
+        """
+        with open(FIXTURE, "r", encoding="utf-8") as f:
+            self.fixture = f.read()
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        server = self
+
+        def delay(seconds: float):
+            if seconds > 0:
+                time.sleep(seconds * (1 + server.rng.uniform(-server.jitter, server.jitter)))
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: str, content_type: str):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                m = re.fullmatch(r"/offer/(\d+)\.html", self.path)
+                if m is None:
+                    self._send(404, "not found", "text/plain")
+                    return
+                delay(page_latency)
+                self._send(200, server.offer_page(int(m.group(1))), "text/html; charset=utf-8")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path.endswith("/chat/completions"):
+                    delay(llm_latency)
+                    answer = server.completion(json.loads(body))
+                elif self.path.endswith("/query.do"):
+                    delay(tracking_latency)
+                    answer = server.tracking({k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()})
+                else:
+                    self._send(404, "not found", "text/plain")
+                    return
+                self._send(200, json.dumps(answer, ensure_ascii=False), "application/json; charset=utf-8")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def offer_page(self, n: int) -> str:
+        """第 n 个商品：改写商品ID、标题，价格按编号浮动，避免被预排序当作重复商品"""
+        factor = 1 + (n % 9) * 0.03
+        html = self.fixture.replace(str(FIXTURE_OFFER_ID), str(FIXTURE_OFFER_ID + n))
+        html = html.replace('"offerTitle": "', f'"offerTitle": "款{n} ')
+        return _PRICE_RE.sub(lambda m: f'"{m.group(1)}": "{float(m.group(2)) * factor:.2f}"', html)
+
+    def completion(self, body: dict) -> dict:
+        content = json.dumps({"recommendations": [
+            {"index": 1, "score": 92, "reason": "总价最低"},
+            {"index": 2, "score": 86, "reason": "价格接近且库存充足"},
+            {"index": 3, "score": 80, "reason": "可作为备选"},
+        ]}, ensure_ascii=False)
+        return {
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 300, "completion_tokens": 60},
+        }
+
+    def tracking(self, form: dict) -> dict:
+        if sign(form.get("param", ""), KEY, CUSTOMER) != form.get("sign"):
+            return {"result": False, "returnCode": "503", "message": "验证签名失败"}
+        param = json.loads(form["param"])
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        events = ["快件已签收", "快递员正在派件", "快件已到达转运中心", "快件已揽收"]
+        return {
+            "message": "ok", "status": "200", "nu": param["num"], "com": param["com"],
+            "state": STATE_SIGNED, "ischeck": "1",
+            "data": [{"time": now, "ftime": now, "context": c} for c in events],
+        }
+
+
+def serve_standins(options: dict, conn):
+    """子进程入口：启动替身服务并把地址发回父进程"""
+    server = StandInServer(**options)
+    conn.send(server.url)
+    server.httpd.serve_forever()
+
+
+# ---------- 替身编排器 ----------
+
+@dataclass
+class BenchOrder:
+    order_id: str
+    payment_amount: float
+    waybill: str
+    product_id: str
+    quantity: int
+
+
+def _field(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def offer_candidates(offer: dict, url: str, n: int) -> list:
+    """一个商品页 → 候选（取有库存的最低价SKU）"""
+    skus = [s for s in offer["skus"] if s["price"] and (s["stock"] or 0) > 0]
+    if not skus:
+        return []
+    sku = min(skus, key=lambda s: s["price"])
+    return [{
+        "platform": "1688",
+        "product_id": str(offer["offer_id"]),
+        "product_name": f"{offer['title']} {sku['spec_attrs']}",
+        "unit_price": sku["price"],
+        "freight": 0 if n % 3 == 0 else 6,
+        "min_order": offer["begin_num"],
+        "stock": sku["stock"],
+        "product_url": url,
+    }]
+
+
+class BenchEnv:
+    """替身编排器共享的客户端、数据库和阶段耗时"""
+
+    def __init__(self, base_url: str, factory: ConnectionFactory, offers: int = 4, pages: int = 2,
+                 db_latency: float = 0.0, max_connections: int = 20):
+        self.base_url = base_url
+        self.factory = factory
+        self.offers = offers
+        self.db_latency = db_latency
+        self.fetcher = TieredFetcher(timeout=60, max_connections=max_connections)
+        self.llm = LLMClient(api_base=f"{base_url}/v1/chat/completions", api_key="bench", model="mock-model",
+                             system_prompt="你是采购助手", use_cache=False, timeout=120, stream=False)
+        self.kuaidi = Kuaidi100Client(KEY, CUSTOMER, url=f"{base_url}/poll/query.do", timeout=60)
+        self.scheduler = CrawlScheduler(
+            {"1688": self.fetch_1688},
+            budgets={"1688": PlatformBudget(timeout=120, concurrency=pages, rate=1000, pages=pages)})
+        self.inventory = InventoryEngine(default_threshold=50)
+        self.durations = {}
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def record(self, step: str, seconds: float):
+        self.durations.setdefault(step, []).append(seconds)
+
+    def fetch_1688(self, query: str, page: int) -> list:
+        """一页搜索结果：逐个抓取商品页（在线程中执行）"""
+        candidates = []
+        for i in range(self.offers):
+            n = (page - 1) * self.offers + i
+            url = f"{self.base_url}/offer/{n}.html"
+            fetched = self.fetcher.fetch_http(url, "1688")
+            if fetched.offer is None:
+                raise RuntimeError(f"商品页解析失败: {url} ({fetched.escalation})")
+            candidates.extend(offer_candidates(fetched.offer, url, n))
+        return candidates
+
+    # ---------- 数据库 ----------
+
+    def setup_db(self):
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS bench_order_table ("
+                "order_id VARCHAR(32) PRIMARY KEY, workflow_id VARCHAR(32), product_id VARCHAR(64), "
+                "product_name VARCHAR(255), quantity INT, unit_price DECIMAL(10,2), "
+                "payment_amount DECIMAL(12,2), waybill VARCHAR(32), status VARCHAR(16), "
+                "created_at VARCHAR(32))")
+            cursor.execute("DELETE FROM bench_order_table")
+            cursor.close()
+            conn.commit()
+
+    def _execute(self, sql: str, params: tuple):
+        if self.db_latency > 0:
+            time.sleep(self.db_latency)
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql.replace("?", self.factory.placeholder), params)
+            cursor.close()
+            conn.commit()
+
+    def create_order(self, workflow_id: str, candidate, quantity: int) -> BenchOrder:
+        n = self.next_id()
+        order = BenchOrder(order_id=f"BO{n:08d}", payment_amount=round(candidate.unit_price * quantity
+                                                                         + candidate.freight, 2),
+                           waybill=f"YT{9000000000 + n}", product_id=candidate.product_id, quantity=quantity)
+        self._execute(
+            "INSERT INTO bench_order_table VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (order.order_id, workflow_id, candidate.product_id, candidate.product_name[:255], quantity,
+             round(candidate.unit_price, 2), order.payment_amount, order.waybill, "paid",
+             datetime.now().isoformat(timespec="seconds")))
+        return order
+
+    def mark_received(self, order: BenchOrder):
+        self._execute("UPDATE bench_order_table SET status = ? WHERE order_id = ?", ("received", order.order_id))
+
+    async def close(self):
+        self.fetcher.close()
+        await self.llm.close()
+        await self.kuaidi.close()
+
+
+class StandInOrchestrator:
+    """
+    与 WorkflowOrchestrator 接口一致的替身（set_progress_callback / set_checkpointer / execute_full_workflow）
+    """
+
+    def __init__(self, env: BenchEnv):
+        self.env = env
+        self.progress_callback = None
+        self.checkpointer = None
+        # 替身固定使用模拟大模型服务，不提供 set_product_selector，避免被注入真实客户端
+        self.product_selector = ProductSelector(client=env.llm)
+
+    def set_progress_callback(self, callback):
+        self.progress_callback = callback
+
+    def set_checkpointer(self, checkpointer):
+        self.checkpointer = checkpointer
+
+    def _progress(self, step: str, status: str, message: str):
+        if self.progress_callback is not None:
+            self.progress_callback(step, status, message)
+
+    async def _stage(self, step: str, message: str, func, *args):
+        """执行一个阶段：记录耗时、输出进度，有检查点时跳过已完成的阶段"""
+        self._progress(step, "running", message)
+        started = time.perf_counter()
+        status = "failed"
+        try:
+            if self.checkpointer is not None:
+                output = await self.checkpointer.run_stage(step, func, *args)
+            else:
+                output = await func(*args)
+            status = "completed"
+            return output
+        finally:
+            self.env.record(step, time.perf_counter() - started)
+            self._progress(step, status, f"{step}{'完成' if status == 'completed' else '失败'}")
+
+    async def _crawl(self, name: str, demand) -> list:
+        # 样例页只有 1688，需求中的优先平台不影响替身爬取
+        crawl = await self.env.scheduler.crawl(name, ["1688"], demand=demand)
+        if not crawl.candidates:
+            raise RuntimeError("未爬取到候选商品")
+        return crawl.candidates
+
+    async def _select(self, demand, candidates: list) -> list:
+        selection = await self.product_selector(demand, candidates, progress_callback=self._progress)
+        if selection["error"]:
+            raise RuntimeError(f"大模型选品失败: {selection['error']}")
+        return selection["recommendations"]
+
+    async def _order(self, workflow_id: str, best, quantity: int) -> BenchOrder:
+        return await asyncio.to_thread(self.env.create_order, workflow_id, best, quantity)
+
+    async def _track(self, order: BenchOrder) -> str:
+        tracking = await self.env.kuaidi.query("yuantong", order.waybill)
+        if tracking.state != STATE_SIGNED:
+            raise RuntimeError(f"运单未签收: {order.waybill}")
+        return tracking.state
+
+    async def _stock(self, order: BenchOrder) -> int:
+        quantity = self.env.inventory.inbound(order.product_id, order.quantity)
+        self.env.inventory.check_alerts()
+        await asyncio.to_thread(self.env.mark_received, order)
+        return quantity
+
+    async def execute_full_workflow(self, demand) -> dict:
+        if self.checkpointer is not None:
+            workflow_id = self.checkpointer.workflow_id
+        else:
+            workflow_id = f"BENCH{self.env.next_id():06d}"
+        name = _field(demand, "product_name")
+        quantity = int(_field(demand, "quantity") or 1)
+        started = time.perf_counter()
+        try:
+            candidates = await self._stage(STAGE_CRAWL, f"🔍 搜索: {name}", self._crawl, name, demand)
+            recommendations = await self._stage(STAGE_SELECT, f"🤖 {len(candidates)} 个候选",
+                                                self._select, demand, candidates)
+            best = recommendations[0]
+            order = await self._stage(STAGE_ORDER, f"🧾 {best.product_name}", self._order,
+                                      workflow_id, best, quantity)
+            await self._stage(STAGE_TRACK, f"🚚 {order.waybill}", self._track, order)
+            await self._stage(STAGE_STOCK, f"📦 {order.product_id} +{quantity}", self._stock, order)
+        except Exception as e:
+            return {"status": "failed", "workflow_id": workflow_id, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.env.record(STAGE_TOTAL, time.perf_counter() - started)
+        return {"status": "completed", "workflow_id": workflow_id, "order": order,
+                "recommendations": recommendations}
+
+
+# ---------- 执行 ----------
+
+def make_demands(n: int, rng: random.Random) -> list:
+    return [{"product_name": rng.choice(PRODUCTS), "quantity": rng.randint(1, 20),
+             "budget": rng.choice((None, 2000.0)), "specification": None, "platforms": ["1688"]}
+            for _ in range(n)]
+
+
+async def run_entry(entry: str, env: BenchEnv, demands: list, concurrency: int, tmp: str) -> dict:
+    """执行所有需求，返回 {状态: 数量}"""
+    by_status = {}
+    if entry == "batch":
+        from src.services.batch_runner import BatchPurchaseRunner
+
+        batch_path = os.path.join(tmp, "demands.jsonl")
+        with open(batch_path, "w", encoding="utf-8") as f:
+            for d in demands:
+                f.write(json.dumps({"product": d["product_name"], "quantity": d["quantity"],
+                                    "budget": d["budget"], "platforms": d["platforms"]},
+                                   ensure_ascii=False) + "\n")
+        runner = BatchPurchaseRunner(concurrency=concurrency, output_path=os.path.join(tmp, "results.jsonl"),
+                                     orchestrator_factory=lambda: StandInOrchestrator(env), verbose=False)
+        summary = await runner.run(batch_path)
+        return summary["by_status"]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(demand: dict):
+        async with semaphore:
+            try:
+                if entry == "auto":
+                    from run_purchase import run_auto_purchase
+                    result = await run_auto_purchase(**demand, orchestrator=StandInOrchestrator(env))
+                else:
+                    result = await StandInOrchestrator(env).execute_full_workflow(demand)
+                status = result.get("status")
+            except Exception:
+                status = "error"
+            by_status[status] = by_status.get(status, 0) + 1
+
+    # run_auto_purchase 每个需求都会打印进度，压测时丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(d) for d in demands))
+    return by_status
+
+
+def percentile(values: list, q: float) -> float:
+    """最近秩百分位"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                  timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+async def run_benchmark(args, base_url: str, tmp: str) -> dict:
+    # run_auto_purchase 会为每个需求写检查点、更新看板数据版本，压测时写到临时目录
+    os.environ["WORKFLOW_CHECKPOINT_PATH"] = os.path.join(tmp, "checkpoints.sqlite3")
+    os.environ["DASHBOARD_VERSION_DIR"] = os.path.join(tmp, "dashboard_version")
+    if args.db == "sqlite":
+        factory = ConnectionFactory("sqlite", sqlite_path=os.path.join(tmp, "bench.sqlite3"))
+    else:
+        factory = ConnectionFactory("mysql")
+    env = BenchEnv(base_url, factory, offers=args.offers, pages=args.pages, db_latency=args.db_latency,
+                   max_connections=args.concurrency * args.pages * 2)
+    env.setup_db()
+    demands = make_demands(args.demands, random.Random(args.seed))
+
+    # 预热：建立连接、导入 pandas 等，不计入结果
+    await StandInOrchestrator(env).execute_full_workflow(dict(demands[0]))
+    env.durations.clear()
+
+    started = time.perf_counter()
+    try:
+        by_status = await run_entry(args.entry, env, demands, args.concurrency, tmp)
+    finally:
+        await env.close()
+    elapsed = time.perf_counter() - started
+
+    stages = {}
+    for step in STAGES:
+        values = env.durations.get(step)
+        if values:
+            stages[step] = {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                            "p99": percentile(values, 99), "max": max(values)}
+    return {
+        **git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "params": {k: getattr(args, k) for k in ("entry", "demands", "concurrency", "offers", "pages", "db",
+                                                 "page_latency", "llm_latency", "tracking_latency",
+                                                 "db_latency", "jitter", "seed")},
+        "by_status": by_status,
+        "elapsed": elapsed,
+        "throughput_per_min": args.demands / elapsed * 60 if elapsed > 0 else 0.0,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# ---------- 输出 ----------
+
+def format_result(result: dict) -> str:
+    p = result["params"]
+    lines = [f"入口 {p['entry']}, {p['demands']} 个需求, 并发 {p['concurrency']}, 数据库 {p['db']}, "
+             f"延迟 页面 {p['page_latency']}s / 大模型 {p['llm_latency']}s / 快递100 {p['tracking_latency']}s"
+             f" / 数据库 {p['db_latency']}s（抖动 ±{p['jitter']:.0%}）",
+             "结果: " + ", ".join(f"{k} {v}" for k, v in sorted(result["by_status"].items(), key=str)),
+             f"吞吐: {result['throughput_per_min']:.1f} 需求/分钟（总耗时 {result['elapsed']:.2f}s）, "
+             f"峰值RSS {result['peak_rss_mb']:.1f} MB",
+             f"{'阶段':<8} {'次数':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'最长(ms)':>10}"]
+    for step, s in result["stages"].items():
+        lines.append(f"{step:<8} {s['count']:>6} {s['p50'] * 1000:>10.1f} {s['p95'] * 1000:>10.1f} "
+                     f"{s['p99'] * 1000:>10.1f} {s['max'] * 1000:>10.1f}")
+    return "\n".join(lines)
+
+
+def _change(new: float, old: float) -> str:
+    if not old:
+        return "-"
+    return f"{(new - old) / old:+.1%}"
+
+
+def format_comparison(result: dict, previous: dict, path: str) -> str:
+    lines = [f"对比 {os.path.basename(path)}（{previous['commit']}{'*' if previous.get('dirty') else ''}, "
+             f"{previous['timestamp']}）"]
+    if previous["params"] != result["params"]:
+        changed = [k for k in result["params"] if result["params"][k] != previous["params"].get(k)]
+        lines.append(f"⚠️ 参数不同: {', '.join(changed)}，对比仅供参考")
+    lines.append(f"  吞吐 {previous['throughput_per_min']:.1f} → {result['throughput_per_min']:.1f} 需求/分钟 "
+                 f"({_change(result['throughput_per_min'], previous['throughput_per_min'])}), "
+                 f"峰值RSS {previous['peak_rss_mb']:.1f} → {result['peak_rss_mb']:.1f} MB "
+                 f"({_change(result['peak_rss_mb'], previous['peak_rss_mb'])})")
+    for step, s in result["stages"].items():
+        old = previous["stages"].get(step)
+        if old:
+            lines.append(f"  {step:<8} p50 {_change(s['p50'], old['p50']):>7}  p95 {_change(s['p95'], old['p95']):>7}"
+                         f"  p99 {_change(s['p99'], old['p99']):>7}")
+    return "\n".join(lines)
+
+
+def latest_result() -> str:
+    paths = sorted(glob.glob(os.path.join(RESULT_DIR, "workflow_*.json")))
+    return paths[-1] if paths else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="采购全流程离线基准测试")
+    parser.add_argument("--entry", choices=("auto", "batch", "direct"), default="auto", help="被测入口")
+    parser.add_argument("--demands", type=int, default=40, help="需求数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时执行的需求数")
+    parser.add_argument("--offers", type=int, default=4, help="每页搜索结果的商品数")
+    parser.add_argument("--pages", type=int, default=2, help="每个需求爬取的页数")
+    parser.add_argument("--db", choices=("sqlite", "mysql"), default="sqlite",
+                        help="数据库（mysql 使用 .env 中的配置）")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="商品页延迟（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="大模型延迟（秒）")
+    parser.add_argument("--tracking-latency", type=float, default=0.1, help="快递100延迟（秒）")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="每次数据库写入前的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟的相对抖动")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="对比的历史结果文件，默认为 data/benchmarks/ 中最近一次")
+    parser.add_argument("--no-save", action="store_true", help="不保存本次结果")
+    args = parser.parse_args()
+
+    if args.db == "mysql":
+        from dotenv import load_dotenv
+        load_dotenv()
+
+    previous_path = args.compare or latest_result()
+    options = {"page_latency": args.page_latency, "llm_latency": args.llm_latency,
+               "tracking_latency": args.tracking_latency, "jitter": args.jitter, "seed": args.seed}
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_standins, args=(options, child_conn), daemon=True)
+    server.start()
+    try:
+        base_url = parent_conn.recv()
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run_benchmark(args, base_url, tmp))
+    finally:
+        server.terminate()
+        server.join()
+
+    print(format_result(result))
+    if result["by_status"].get("completed", 0) < args.demands:
+        print("⚠️ 部分需求未完成，耗时统计只反映已执行的阶段"
+              "（auto / batch 入口需要 src.models，缺少时可用 --entry direct）")
+
+    if previous_path and os.path.exists(previous_path):
+        with open(previous_path, "r", encoding="utf-8") as f:
+            print("\n" + format_comparison(result, json.load(f), previous_path))
+
+    if not args.no_save:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULT_DIR, f"workflow_{stamp}_{result['commit']}{'-dirty' if result['dirty'] else ''}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存: {os.path.relpath(path, PROJECT_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+-- 启动耗时检查用的初始化脚本（bench_startup.py 通过 INIT_SQL_PATH 指定，只空跑）
+CREATE DATABASE IF NOT EXISTS purchase_assistant DEFAULT CHARSET utf8mb4;
+USE purchase_assistant;
+
+CREATE TABLE IF NOT EXISTS supplier_table (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(128) NOT NULL,
+    platform VARCHAR(32) NOT NULL,
+    note VARCHAR(255) COMMENT '备注; 可含分号',
+    UNIQUE KEY uk_supplier (platform, name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS order_table (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    order_no VARCHAR(32) NOT NULL UNIQUE,
+    supplier_id INT,
+    total_amount DECIMAL(12, 2),
+    status VARCHAR(32) DEFAULT 'pending',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+/* 种子数据 */
+INSERT INTO supplier_table (name, platform, note) VALUES ('晨光文具', '1688', 'A4纸; 笔');
+INSERT INTO supplier_table (name, platform, note) VALUES ('得力集团', 'jd', '办公用品');
+INSERT INTO supplier_table (name, platform, note) VALUES ('齐心办公', 'tmall', "it's ok");
+
+DELIMITER //
+CREATE TRIGGER trg_order_status BEFORE UPDATE ON order_table FOR EACH ROW
+BEGIN
+    IF NEW.status = '' THEN
+        SET NEW.status = 'pending';
+    END IF;
+END//
+DELIMITER ;
@@ -0,0 +1,5 @@
+-- 看板分页和聚合用到的索引（--init-db 在 init.sql 之后执行；重复执行时索引已存在会被忽略）
+-- 订单按状态筛选后按主键游标分页
+CREATE INDEX idx_dashboard_order_status ON order_table (status, id);
+-- 低库存查询按数量排序
+CREATE INDEX idx_dashboard_inventory_qty ON inventory_table (quantity);
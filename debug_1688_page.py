@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 """
 调试脚本：分析1688商品页面的SKU结构
+
+使用方法:
+    python debug_1688_page.py                       # 打开在线页面分析
+    python debug_1688_page.py --save-snapshot       # 分析后保存离线快照
+    python debug_1688_page.py --replay              # 用最近一次快照离线回放（无需浏览器和网络）
+    python debug_1688_page.py --replay --snapshot 3fa2c1   # 回放指定快照（哈希前缀）
+    python debug_1688_page.py --urls offers.txt --workers 4 --output audit.jsonl   # 批量并行审计
+    python debug_1688_page.py --snapshots data/snapshots --workers 8              # 批量审计离线快照
 """
 import sys
 import os
@@ -9,158 +17,102 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
-def debug_page():
+from src.services.dom_extractor import DomExtractor, SKU_ANALYSIS_RULES, to_sku_analysis
+from src.models.page_analysis import PageAnalysis, write_ndjson
+from src.services.snapshot_store import SnapshotStore
+
+DEFAULT_URL = "https://detail.1688.com/offer/725887578825.html"
+
+
+def _fmt_count(entry: dict) -> str:
+    """提前结束遍历时计数只是下限，用 + 标出"""
+    return f"{entry['count']}" if entry.get('exact', True) else f"{entry['count']}+"
+
+
+def save_result(analysis: PageAnalysis, path: str):
+    """把结构化结果追加到 NDJSON 文件"""
+    with open(path, "a", encoding="utf-8") as f:
+        write_ndjson([analysis], f)
+    print(f"\n💾 结构化结果已追加到: {path}")
+
+
+def print_analysis(extraction: dict):
+    """打印SKU结构分析结果"""
+    analysis = to_sku_analysis(extraction)
+    stats = extraction['stats']
+    print(f"遍历节点: {stats['visited']}, 耗时: {stats['elapsedMs']:.1f}ms"
+          f"{'（配额已满，提前结束）' if stats['stoppedEarly'] else ''}")
+    
+    print("\n【SKU容器】")
+    for container in analysis.get('skuContainers', []):
+        print(f"  选择器: {container['selector']}, 数量: {_fmt_count(container)}")
+        print(f"  HTML片段: {container['html'][:200]}...")
+    
+    print("\n【SKU选项元素】")
+    for item in analysis.get('skuItems', []):
+        print(f"  选择器: {item['selector']}, 数量: {_fmt_count(item)}")
+        print(f"  示例文本: {item['sampleTexts']}")
+    
+    print("\n【可点击元素】")
+    for clickable in analysis.get('clickableItems', []):
+        print(f"  选择器: {clickable['selector']}, 数量: {_fmt_count(clickable)}")
+        for item in clickable['items'][:5]:
+            print(f"    - 文本: {item['text']}, 可见: {item['visible']}, 类名: {item['className'][:50]}")
+    
+    print("\n【页面信息】")
+    print(f"  标题: {analysis.get('pageInfo', {}).get('title', '未知')}")
+    print(f"  URL: {analysis.get('pageInfo', {}).get('url', '未知')}")
+
+
+def debug_page(test_url: str = DEFAULT_URL, save_snapshot: bool = False, json_out: str = None):
     """调试1688页面结构"""
+    from src.services.driver_pool import DriverPool
+    from src.services.page_readiness import wait_for_page_ready, wait_for_login, wait_stats
+    
     print("=" * 60)
     print("调试1688商品页面SKU结构")
     print("=" * 60)
     
-    # 配置Chrome
-    chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(options=chrome_options)
+    # 从会话池借出浏览器（自动恢复已保存的1688登录cookies）
+    pool = DriverPool(size=1, headless=False)
+    session = pool.acquire(platform="1688")
+    driver = session.driver
     
     try:
         # 打开商品页面
-        test_url = "https://detail.1688.com/offer/725887578825.html"
         print(f"打开: {test_url}")
-        driver.get(test_url)
-        time.sleep(5)
+        session.get(test_url)
+        print(wait_for_page_ready(driver, label="商品页"))
         
         print(f"当前URL: {driver.current_url}")
         
         # 检查是否需要登录
         if "login" in driver.current_url.lower():
-            print("需要登录，等待20秒...")
-            time.sleep(20)
-            driver.get(test_url)
-            time.sleep(5)
+            print("需要登录，请在浏览器中完成登录...")
+            print(wait_for_login(driver))
+            session.get(test_url)
+            print(wait_for_page_ready(driver, label="商品页"))
         
         # 分析页面结构
         print("\n" + "=" * 60)
         print("分析页面SKU结构...")
         print("=" * 60)
         
-        # 执行JavaScript分析
-        analysis = driver.execute_script("""
-            var result = {
-                skuContainers: [],
-                skuItems: [],
-                clickableItems: [],
-                pageInfo: {}
-            };
-            
-            // 1. 查找可能的SKU容器
-            var containerSelectors = [
-                '[class*="obj-sku"]',
-                '[class*="sku-wrapper"]',
-                '[class*="skuList"]',
-                '[class*="sku-list"]',
-                '[data-spm*="sku"]',
-                '[class*="detail-sku"]',
-                '[class*="offer-sku"]'
-            ];
-            
-            containerSelectors.forEach(function(sel) {
-                var elems = document.querySelectorAll(sel);
-                if (elems.length > 0) {
-                    result.skuContainers.push({
-                        selector: sel,
-                        count: elems.length,
-                        html: elems[0].outerHTML.substring(0, 500)
-                    });
-                }
-            });
-            
-            // 2. 查找SKU选项元素
-            var itemSelectors = [
-                '[class*="obj-content"]',
-                '[class*="obj-item"]',
-                '[class*="sku-item"]',
-                '[class*="prop-item"]'
-            ];
-            
-            itemSelectors.forEach(function(sel) {
-                var elems = document.querySelectorAll(sel);
-                if (elems.length > 0) {
-                    var texts = [];
-                    for (var i = 0; i < Math.min(elems.length, 5); i++) {
-                        texts.push(elems[i].innerText.substring(0, 100));
-                    }
-                    result.skuItems.push({
-                        selector: sel,
-                        count: elems.length,
-                        sampleTexts: texts
-                    });
-                }
-            });
-            
-            // 3. 查找可点击的规格选项
-            var clickableSelectors = [
-                '[class*="obj-item"]:not([class*="disabled"])',
-                '[class*="sku-item"]:not([class*="disabled"])',
-                'span[class*="item"]',
-                'a[class*="item"]'
-            ];
-            
-            clickableSelectors.forEach(function(sel) {
-                var elems = document.querySelectorAll(sel);
-                if (elems.length > 0) {
-                    var items = [];
-                    for (var i = 0; i < Math.min(elems.length, 10); i++) {
-                        var el = elems[i];
-                        var rect = el.getBoundingClientRect();
-                        items.push({
-                            text: el.innerText.split('\\n')[0].substring(0, 50),
-                            className: el.className.substring(0, 100),
-                            visible: rect.width > 0 && rect.height > 0,
-                            position: {top: rect.top, left: rect.left}
-                        });
-                    }
-                    result.clickableItems.push({
-                        selector: sel,
-                        count: elems.length,
-                        items: items
-                    });
-                }
-            });
-            
-            // 4. 获取页面基本信息
-            var titleElem = document.querySelector('[class*="title"], h1, .mod-detail-title');
-            result.pageInfo.title = titleElem ? titleElem.innerText.substring(0, 100) : '未找到标题';
-            result.pageInfo.url = window.location.href;
-            
-            return result;
-        """)
+        # 单次遍历提取SKU结构
+        extraction = DomExtractor(SKU_ANALYSIS_RULES).run(driver)
+        print_analysis(extraction)
+        if json_out:
+            save_result(PageAnalysis.from_extraction(test_url, extraction, "browser"), json_out)
         
-        # 打印分析结果
-        print("\n【SKU容器】")
-        for container in analysis.get('skuContainers', []):
-            print(f"  选择器: {container['selector']}, 数量: {container['count']}")
-            print(f"  HTML片段: {container['html'][:200]}...")
+        if save_snapshot:
+            store = SnapshotStore()
+            digest = store.save(store.capture(driver, url=test_url))
+            print(f"\n📸 已保存快照: {digest[:12]}")
         
-        print("\n【SKU选项元素】")
-        for item in analysis.get('skuItems', []):
-            print(f"  选择器: {item['selector']}, 数量: {item['count']}")
-            print(f"  示例文本: {item['sampleTexts']}")
-        
-        print("\n【可点击元素】")
-        for clickable in analysis.get('clickableItems', []):
-            print(f"  选择器: {clickable['selector']}, 数量: {clickable['count']}")
-            for item in clickable['items'][:5]:
-                print(f"    - 文本: {item['text']}, 可见: {item['visible']}, 类名: {item['className'][:50]}")
-        
-        print("\n【页面信息】")
-        print(f"  标题: {analysis.get('pageInfo', {}).get('title', '未知')}")
-        print(f"  URL: {analysis.get('pageInfo', {}).get('url', '未知')}")
+        print("\n" + wait_stats.report())
         
         # 等待用户查看
         print("\n" + "=" * 60)
@@ -174,9 +126,50 @@ def debug_page():
         traceback.print_exc()
     
     finally:
-        driver.quit()
+        pool.save_cookies(session, "1688")
+        pool.release(session)
+        pool.close()
         print("浏览器已关闭")
 
 
+def replay_page(test_url: str = DEFAULT_URL, digest: str = None, json_out: str = None):
+    """用离线快照回放分析（无需浏览器和网络）"""
+    print("=" * 60)
+    print("调试1688商品页面SKU结构（离线回放）")
+    print("=" * 60)
+    
+    store = SnapshotStore()
+    snapshot = store.load(digest) if digest else store.latest(test_url)
+    print(f"快照: {snapshot.digest[:12]}  抓取时间: {snapshot.captured_at}")
+    print(f"URL: {snapshot.url}")
+    
+    extraction = DomExtractor(SKU_ANALYSIS_RULES).run_html(snapshot.html, url=snapshot.final_url)
+    print_analysis(extraction)
+    if json_out:
+        save_result(PageAnalysis.from_extraction(snapshot.url, extraction, "snapshot",
+                                                 digest=snapshot.digest), json_out)
+
+
 if __name__ == "__main__":
-    debug_page()
+    parser = argparse.ArgumentParser(description="分析1688商品页面的SKU结构")
+    parser.add_argument("--url", type=str, default=DEFAULT_URL, help="商品页URL")
+    parser.add_argument("--save-snapshot", action="store_true", help="分析后保存离线快照")
+    parser.add_argument("--replay", action="store_true", help="使用离线快照回放")
+    parser.add_argument("--snapshot", type=str, help="回放指定快照（内容哈希或前缀）")
+    parser.add_argument("--json-out", type=str, help="把结构化结果追加到 NDJSON 文件")
+    parser.add_argument("--urls", type=str, help="批量审计：URL列表文件（每行一个）")
+    parser.add_argument("--snapshots", type=str, help="批量审计：快照目录")
+    parser.add_argument("--workers", type=int, default=4, help="批量审计的工作进程数")
+    parser.add_argument("--output", type=str, help="批量审计结果文件(JSONL)，默认输出到标准输出")
+    args = parser.parse_args()
+    
+    if args.urls or args.snapshots:
+        from src.services.page_audit import audit_pages
+        hit_stats = audit_pages(urls_file=args.urls, snapshot_dir=args.snapshots,
+                                workers=args.workers, output_path=args.output)
+        # 结果写到标准输出时，统计信息走标准错误，避免混入JSONL
+        print(hit_stats.report(), file=sys.stderr if not args.output else sys.stdout)
+    elif args.replay:
+        replay_page(args.url, args.snapshot, args.json_out)
+    else:
+        debug_page(args.url, args.save_snapshot, args.json_out)
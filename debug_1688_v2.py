@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 """
 调试脚本v2：更详细地分析1688商品页面
+
+使用方法:
+    python debug_1688_v2.py                    # 打开在线页面分析
+    python debug_1688_v2.py --save-snapshot    # 分析后保存离线快照
+    python debug_1688_v2.py --replay           # 用最近一次快照离线回放（无需浏览器和网络）
+    python debug_1688_v2.py --http-first       # 先直接请求页面解析内嵌数据，拿不到再开浏览器
+    python debug_1688_v2.py --http-first --spec "A4 70g 5包"   # 在SKU矩阵中查找规格组合
 """
 import sys
 import os
@@ -9,40 +16,76 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-def debug_page():
+from src.services.dom_extractor import DomExtractor, SKU_KEYWORD_RULES, to_keyword_search
+from src.models.page_analysis import PageAnalysis, write_ndjson
+from src.models.sku_matrix import SkuMatrix
+from src.services.snapshot_store import SnapshotStore
+
+DEFAULT_URL = "https://detail.1688.com/offer/725887578825.html"
+
+
+def save_result(analysis: PageAnalysis, path: str):
+    """把结构化结果追加到 NDJSON 文件"""
+    with open(path, "a", encoding="utf-8") as f:
+        write_ndjson([analysis], f)
+    print(f"\n💾 结构化结果已追加到: {path}")
+
+
+def print_keyword_search(extraction: dict, fallback_area: dict = None):
+    """打印关键词搜索和购买区域结果"""
+    sku_search = to_keyword_search(extraction)
+    stats = extraction['stats']
+    print(f"遍历节点: {stats['visited']}, 耗时: {stats['elapsedMs']:.1f}ms"
+          f"{'（配额已满，提前结束）' if stats['stoppedEarly'] else ''}")
+    
+    print("\n【按关键词搜索结果】")
+    for keyword, elements in sku_search.get('byClass', {}).items():
+        if elements:
+            print(f"\n  关键词 '{keyword}':")
+            for el in elements:
+                print(f"    - <{el['tag']}> class='{el['class'][:60]}'")
+                if el['text']:
+                    print(f"      文本: {el['text'][:80]}")
+    
+    print("\n【data属性搜索结果】")
+    for item in sku_search.get('byDataAttr', []):
+        print(f"  - <{item['tag']}> data-{item['dataKey']}='{item['dataValue']}'")
+    
+    # 获取购买区域的HTML
+    print("\n" + "=" * 60)
+    print("获取购买区域HTML...")
+    print("=" * 60)
+    
+    buy_area = sku_search.get('buyArea') or fallback_area or {}
+    print(f"找到区域: {buy_area.get('selector', '未知')}")
+    print(f"文本内容: {buy_area.get('text', '')[:300]}...")
+
+
+def debug_page(test_url: str = DEFAULT_URL, save_snapshot: bool = False, json_out: str = None):
     """调试1688页面结构"""
+    from src.services.driver_pool import DriverPool
+    from src.services.page_readiness import wait_for_page_ready, wait_stats
+    
     print("=" * 60)
     print("调试1688商品页面SKU结构 v2")
     print("=" * 60)
     
-    # 配置Chrome
-    chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36")
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-    })
+    # 从会话池借出浏览器（自动恢复已保存的1688登录cookies）
+    pool = DriverPool(size=1, headless=False)
+    session = pool.acquire(platform="1688")
+    driver = session.driver
     
     try:
         # 打开商品页面
-        test_url = "https://detail.1688.com/offer/725887578825.html"
         print(f"打开: {test_url}")
-        driver.get(test_url)
+        session.get(test_url)
         
         # 等待页面加载
         print("等待页面加载...")
-        time.sleep(8)
+        print(wait_for_page_ready(driver, label="商品页"))
         
         print(f"当前URL: {driver.current_url}")
         
@@ -86,108 +129,28 @@ def debug_page():
         print("搜索页面中的SKU相关元素...")
         print("=" * 60)
         
-        sku_search = driver.execute_script("""
-            var result = {
-                byClass: {},
-                byDataAttr: [],
-                allClasses: []
-            };
-            
-            // 搜索所有包含特定关键词的class
-            var keywords = ['sku', 'spec', 'prop', 'attr', 'option', 'select', 'color', 'size'];
-            var allElements = document.querySelectorAll('*');
-            
-            keywords.forEach(function(keyword) {
-                result.byClass[keyword] = [];
-            });
-            
-            for (var i = 0; i < allElements.length; i++) {
-                var el = allElements[i];
-                var className = el.className;
-                if (typeof className === 'string' && className.length > 0) {
-                    keywords.forEach(function(keyword) {
-                        if (className.toLowerCase().includes(keyword)) {
-                            if (result.byClass[keyword].length < 3) {
-                                result.byClass[keyword].push({
-                                    tag: el.tagName,
-                                    class: className.substring(0, 100),
-                                    text: el.innerText ? el.innerText.substring(0, 100) : ''
-                                });
-                            }
-                        }
-                    });
-                }
-                
-                // 检查data属性
-                if (el.dataset) {
-                    var dataKeys = Object.keys(el.dataset);
-                    dataKeys.forEach(function(key) {
-                        if (key.toLowerCase().includes('sku') || key.toLowerCase().includes('spec')) {
-                            if (result.byDataAttr.length < 5) {
-                                result.byDataAttr.push({
-                                    tag: el.tagName,
-                                    dataKey: key,
-                                    dataValue: el.dataset[key].substring(0, 50)
-                                });
-                            }
-                        }
-                    });
-                }
-            }
-            
-            return result;
-        """)
-        
-        print("\n【按关键词搜索结果】")
-        for keyword, elements in sku_search.get('byClass', {}).items():
-            if elements:
-                print(f"\n  关键词 '{keyword}':")
-                for el in elements:
-                    print(f"    - <{el['tag']}> class='{el['class'][:60]}'")
-                    if el['text']:
-                        print(f"      文本: {el['text'][:80]}")
+        # 关键词搜索与购买区域定位合并为一次遍历
+        extraction = DomExtractor(SKU_KEYWORD_RULES).run(driver)
+        fallback_area = None
+        if to_keyword_search(extraction)['buyArea'] is None:
+            # 如果没找到，返回body的部分内容
+            fallback_area = driver.execute_script("""
+                return {
+                    selector: 'body',
+                    html: document.body.innerHTML.substring(0, 2000),
+                    text: document.body.innerText.substring(0, 500)
+                };
+            """)
+        print_keyword_search(extraction, fallback_area)
+        if json_out:
+            save_result(PageAnalysis.from_extraction(test_url, extraction, "browser"), json_out)
         
-        print("\n【data属性搜索结果】")
-        for item in sku_search.get('byDataAttr', []):
-            print(f"  - <{item['tag']}> data-{item['dataKey']}='{item['dataValue']}'")
+        if save_snapshot:
+            store = SnapshotStore()
+            digest = store.save(store.capture(driver, url=test_url))
+            print(f"\n📸 已保存快照: {digest[:12]}")
         
-        # 获取购买区域的HTML
-        print("\n" + "=" * 60)
-        print("获取购买区域HTML...")
-        print("=" * 60)
-        
-        buy_area = driver.execute_script("""
-            // 尝试找到购买区域
-            var selectors = [
-                '[class*="detail-buy"]',
-                '[class*="buy-area"]',
-                '[class*="purchase"]',
-                '[class*="order-area"]',
-                '[class*="mod-detail"]',
-                '[class*="offer-detail"]'
-            ];
-            
-            for (var i = 0; i < selectors.length; i++) {
-                var el = document.querySelector(selectors[i]);
-                if (el) {
-                    return {
-                        selector: selectors[i],
-                        html: el.outerHTML.substring(0, 2000),
-                        text: el.innerText.substring(0, 500)
-                    };
-                }
-            }
-            
-            // 如果没找到，返回body的部分内容
-            return {
-                selector: 'body',
-                html: document.body.innerHTML.substring(0, 2000),
-                text: document.body.innerText.substring(0, 500)
-            };
-        """)
-        
-        print(f"找到区域: {buy_area.get('selector', '未知')}")
-        print(f"文本内容: {buy_area.get('text', '')[:300]}...")
+        print("\n" + wait_stats.report())
         
         # 等待用户查看
         print("\n" + "=" * 60)
@@ -201,9 +164,110 @@ def debug_page():
         traceback.print_exc()
     
     finally:
-        driver.quit()
+        pool.save_cookies(session, "1688")
+        pool.release(session)
+        pool.close()
         print("浏览器已关闭")
 
 
+def print_spec_lookup(offer: dict, spec: str):
+    """按规格文本在SKU矩阵中查找组合（不访问页面）"""
+    matrix = SkuMatrix.from_offer(offer)
+    print("\n" + matrix.format())
+    variant = matrix.find(spec)
+    if variant is None:
+        print(f"⚠️ 没有匹配「{spec}」的规格组合")
+        return
+    positions = ", ".join(f"{name}第{i + 1}项" for name, i in zip(matrix.props, variant.indices))
+    print(f"🎯 {spec} → {variant}（{positions}）")
+
+
+def fetch_http_first(test_url: str = DEFAULT_URL, json_out: str = None, spec: str = None) -> bool:
+    """
+    不启动浏览器，直接请求页面并解析内嵌的商品/SKU数据
+
+    Returns:
+        是否成功（失败时需要改用浏览器分析）
+    """
+    from src.services.tiered_fetcher import TieredFetcher
+    
+    print("=" * 60)
+    print("调试1688商品页面SKU结构 v2（http 直连）")
+    print("=" * 60)
+    
+    with TieredFetcher() as fetcher:
+        page = fetcher.fetch(test_url, platform="1688")
+    print(f"URL: {page.final_url or test_url}  状态码: {page.status_code}  耗时: {page.elapsed:.2f}s")
+    if not page.ok:
+        print(f"⚠️ 需要浏览器: {page.escalation}{f'（{page.error}）' if page.error else ''}")
+        return False
+    
+    offer = page.offer
+    print(f"内嵌数据: {', '.join(page.payloads) or '无'}")
+    print(f"商品: {offer['title']}  卖家: {offer['company']}  价格区间: {offer['price_range']}")
+    for prop in offer["sku_props"]:
+        print(f"  {prop['prop']}: {' / '.join(prop['values'])}")
+    print(f"\n【SKU】共 {len(offer['skus'])} 个")
+    for sku in offer["skus"]:
+        print(f"  - {sku['spec_attrs']}  ¥{sku['price']}  可订 {sku['stock']}")
+    if spec:
+        print_spec_lookup(offer, spec)
+    
+    print("\n" + "=" * 60)
+    print("搜索页面中的SKU相关元素...")
+    print("=" * 60)
+    extraction = DomExtractor(SKU_KEYWORD_RULES).run_html(page.html, url=page.final_url)
+    print_keyword_search(extraction)
+    if json_out:
+        save_result(PageAnalysis.from_extraction(test_url, extraction, "http",
+                                                 timings=dict(page.timings)), json_out)
+    return True
+
+
+def replay_page(test_url: str = DEFAULT_URL, digest: str = None, json_out: str = None, spec: str = None):
+    """用离线快照回放分析（无需浏览器和网络）"""
+    print("=" * 60)
+    print("调试1688商品页面SKU结构 v2（离线回放）")
+    print("=" * 60)
+    
+    store = SnapshotStore()
+    snapshot = store.load(digest) if digest else store.latest(test_url)
+    print(f"快照: {snapshot.digest[:12]}  抓取时间: {snapshot.captured_at}")
+    print(f"URL: {snapshot.url}")
+    print(f"内嵌数据: {', '.join(snapshot.payloads) or '无'}")
+    if spec:
+        from src.services.tiered_fetcher import extract_offer
+        offer = extract_offer(snapshot.payloads)
+        if offer:
+            print_spec_lookup(offer, spec)
+        else:
+            print("⚠️ 快照中没有 skuModel 数据")
+    
+    print("\n" + "=" * 60)
+    print("搜索页面中的SKU相关元素...")
+    print("=" * 60)
+    extraction = DomExtractor(SKU_KEYWORD_RULES).run_html(snapshot.html, url=snapshot.final_url)
+    print_keyword_search(extraction)
+    if json_out:
+        save_result(PageAnalysis.from_extraction(snapshot.url, extraction, "snapshot",
+                                                 digest=snapshot.digest), json_out)
+
+
 if __name__ == "__main__":
-    debug_page()
+    parser = argparse.ArgumentParser(description="详细分析1688商品页面")
+    parser.add_argument("--url", type=str, default=DEFAULT_URL, help="商品页URL")
+    parser.add_argument("--save-snapshot", action="store_true", help="分析后保存离线快照")
+    parser.add_argument("--replay", action="store_true", help="使用离线快照回放")
+    parser.add_argument("--snapshot", type=str, help="回放指定快照（内容哈希或前缀）")
+    parser.add_argument("--json-out", type=str, help="把结构化结果追加到 NDJSON 文件")
+    parser.add_argument("--http-first", action="store_true", help="先直接请求页面，拿不到数据再开浏览器")
+    parser.add_argument("--spec", type=str, help="配合 --http-first / --replay：在SKU矩阵中查找规格，如 \"A4 70g 5包\"")
+    args = parser.parse_args()
+    
+    if args.replay:
+        replay_page(args.url, args.snapshot, args.json_out, args.spec)
+    else:
+        # 保存快照需要浏览器渲染后的DOM，此时不走 http 直连
+        done = args.http_first and not args.save_snapshot and fetch_http_first(args.url, args.json_out, args.spec)
+        if not done:
+            debug_page(args.url, args.save_snapshot, args.json_out)
@@ -8,71 +8,91 @@ AI智能采购自动化助手 - 一键执行脚本
 2. 初始化数据库: python run_purchase.py --init-db
 3. 启动Web界面: python run_purchase.py --web
 4. 命令行执行: python run_purchase.py --product "商品名称" --quantity 10 --budget 1000
+5. 批量执行: python run_purchase.py --batch demands.csv --concurrency 4
+6. 增量备份: python run_purchase.py --backup
+7. 断点续跑: python run_purchase.py --resume <工作流ID>
+8. 并行下单: python run_purchase.py --dispatch-orders orders.jsonl --accounts accounts.json
+9. 只做AI选品: python run_purchase.py --select candidates.jsonl --product "商品名称"
+10. 物流跟踪: python run_purchase.py --track shipments.jsonl
 
 作者: AI采购助手
 """
 import os
 import sys
+import time
 import argparse
-import asyncio
-from decimal import Decimal
-from datetime import datetime
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from dotenv import load_dotenv
-load_dotenv()
+# 启动速度：模块顶层只导入标准库的轻量模块，.env 和各模式的依赖在选中该模式后才加载，
+# 定时任务执行 --help / --init-db / --backup 时不会导入工作流、浏览器、pandas 等重依赖。
+# 启动耗时预算见 benchmarks/bench_startup.py。
 
 
-def init_database():
-    """初始化数据库"""
+def load_env():
+    """加载 .env 配置（解析完命令行参数后再加载，--help 不需要）"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def init_database(dry_run: bool = False):
+    """
+    初始化数据库
+    
+    Args:
+        dry_run: 只分割和规划SQL语句，不连接数据库
+
+    Returns:
+        是否成功（SQL脚本路径可用 INIT_SQL_PATH 修改，默认 database/init.sql；
+        之后按文件名顺序执行迁移目录中的 *.sql，目录可用 MIGRATIONS_DIR 修改，默认 database/migrations）
+    """
     print("=" * 50)
     print("正在初始化数据库...")
     print("=" * 50)
     
-    from src.config import DatabaseConfig
-    import mysql.connector
+    from src.repositories.connection_pool import get_connection_factory
+    from src.services.sql_runner import run_sql_script
     
-    try:
-        # 先连接MySQL（不指定数据库）
-        conn = mysql.connector.connect(
-            host=DatabaseConfig.HOST,
-            port=DatabaseConfig.PORT,
-            user=DatabaseConfig.USER,
-            password=DatabaseConfig.PASSWORD
-        )
-        cursor = conn.cursor()
-        
-        # 读取并执行SQL脚本
-        sql_file = os.path.join(os.path.dirname(__file__), 'database', 'init.sql')
-        
-        if os.path.exists(sql_file):
-            with open(sql_file, 'r', encoding='utf-8') as f:
-                sql_content = f.read()
-            
-            # 分割SQL语句并执行
-            statements = sql_content.split(';')
-            for statement in statements:
-                statement = statement.strip()
-                if statement and not statement.startswith('--'):
-                    try:
-                        cursor.execute(statement)
-                        conn.commit()
-                    except mysql.connector.Error as e:
-                        if e.errno != 1065:  # 忽略空查询错误
-                            print(f"  警告: {e.msg}")
-            
-            print("✅ 数据库初始化完成！")
-        else:
-            print(f"❌ SQL文件不存在: {sql_file}")
-            return False
-        
-        cursor.close()
-        conn.close()
+    # 读取SQL脚本
+    sql_file = os.getenv("INIT_SQL_PATH") or os.path.join(os.path.dirname(__file__), 'database', 'init.sql')
+    if not os.path.exists(sql_file):
+        print(f"❌ SQL文件不存在: {sql_file}")
+        return False
+    
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        sql_content = f.read()
+    
+    # 迁移脚本（索引等），在 init.sql 建好库表之后执行
+    migrations_dir = os.getenv("MIGRATIONS_DIR") or os.path.join(os.path.dirname(__file__), 'database', 'migrations')
+    migrations = []
+    if os.path.isdir(migrations_dir):
+        for name in sorted(os.listdir(migrations_dir)):
+            if name.endswith(".sql"):
+                with open(os.path.join(migrations_dir, name), 'r', encoding='utf-8') as f:
+                    migrations.append((name, f.read()))
+    
+    if dry_run:
+        report = run_sql_script(None, sql_content, dry_run=True)
+        print("📋 空跑模式：仅分割和规划SQL语句，不执行")
+        print(report.format())
+        for name, script in migrations:
+            print(f"📋 迁移 {name}")
+            print(run_sql_script(None, script, dry_run=True).format())
         return True
-        
-    except mysql.connector.Error as e:
+    
+    try:
+        factory = get_connection_factory()
+        # 先连接MySQL（不指定数据库），连续的DML在同一事务中执行
+        with factory.connection(with_database=False) as conn:
+            report = run_sql_script(conn, sql_content)
+        migration_reports = []
+        if migrations:
+            with factory.connection() as conn:
+                for name, script in migrations:
+                    migration_reports.append((name, run_sql_script(conn, script)))
+    except Exception as e:
+        from src.config import DatabaseConfig
         print(f"❌ 数据库连接失败: {e}")
         print("\n请检查以下配置:")
         print(f"  - 主机: {DatabaseConfig.HOST}")
@@ -80,6 +100,17 @@ def init_database():
         print(f"  - 用户: {DatabaseConfig.USER}")
         print(f"  - 数据库: {DatabaseConfig.DATABASE}")
         return False
+    
+    for warning in report.warnings:
+        print(f"  警告: {warning}")
+    for name, migration in migration_reports:
+        for warning in migration.warnings:
+            print(f"  警告（{name}）: {warning}")
+    print("✅ 数据库初始化完成！")
+    print(report.format())
+    for name, migration in migration_reports:
+        print(f"迁移 {name}: 执行 {migration.executed} 条，跳过 {migration.ignored} 条")
+    return True
 
 
 def run_web_interface():
@@ -96,8 +127,10 @@ def run_web_interface():
     ], env={**os.environ, "PYTHONPATH": os.path.dirname(__file__)})
 
 
-async def run_auto_purchase(product_name: str, quantity: int, budget: float = None, 
-                           specification: str = None, platforms: list = None):
+async def run_auto_purchase(product_name: str = None, quantity: int = 1, budget: float = None, 
+                           specification: str = None, platforms: list = None,
+                           events_log: str = None, profile: str = None, orchestrator=None,
+                           resume: str = None, confirm: int = None):
     """
     执行全自动采购流程
     
@@ -107,68 +140,139 @@ async def run_auto_purchase(product_name: str, quantity: int, budget: float = No
         budget: 预算上限（可选）
         specification: 规格要求（可选）
         platforms: 优先平台列表（可选）
+        events_log: 进度事件JSONL文件路径（可选）
+        profile: 性能剖析输出前缀（可选，空字符串表示使用默认路径）
+        orchestrator: 工作流编排器（可选，默认创建 WorkflowOrchestrator；基准测试时注入替身）
+        resume: 继续执行的工作流ID（可选，跳过检查点中已完成的阶段，商品参数被忽略）
+        confirm: 配合 resume，确认第几个推荐后继续下单（可选）
     """
+    from src.services.dashboard_data import DashboardInvalidator
+    from src.services.demand_builder import build_purchase_demand
+    from src.services.progress_bus import (
+        ProgressBus, ConsoleSubscriber, MetricsSubscriber, JsonlFileSubscriber
+    )
+    from src.services.workflow_checkpoint import (
+        CheckpointStore, CheckpointError, DEFAULT_RETENTION_DAYS, STAGE_CONFIRM,
+        STATUS_FAILED, STATUS_ORDER_UNSAVED, STATUS_PENDING, STATUS_RUNNING
+    )
+    
+    if confirm is not None and not resume:
+        print("❌ --confirm 需要配合 --resume 使用")
+        return {"status": "error", "error": "--confirm 需要配合 --resume 使用"}
+    
+    # 创建工作流编排器
+    if orchestrator is None:
+        from src.services.workflow_orchestrator import WorkflowOrchestrator
+        orchestrator = WorkflowOrchestrator()
+    supports_checkpoint = hasattr(orchestrator, "set_checkpointer")
+    if resume and not supports_checkpoint:
+        # 不支持检查点时续跑会从头执行（包括重新下单），确认也不会生效
+        print("❌ 编排器不支持检查点，无法使用 --resume / --confirm")
+        return {"status": "error", "error": "编排器不支持检查点"}
+    
+    # 检查点：各阶段输出保存到 data/workflow_checkpoints.sqlite3，失败或暂停后可 --resume 继续
+    # （编排器不支持检查点时不记录，也不提示续跑）
+    store = CheckpointStore() if supports_checkpoint else None
+    checkpointer = None
+    workflow_id = None
+    run = None
+    if resume:
+        try:
+            run = store.get(resume)
+        except CheckpointError as e:
+            print(f"❌ {e}")
+            store.close()
+            return {"status": "error", "error": str(e)}
+        if run.status == STATUS_ORDER_UNSAVED:
+            print(f"❌ 工作流 {resume} 不能续跑: {run.error}")
+            store.close()
+            return {"status": "error", "error": run.error}
+        demand, workflow_id = run.demand, run.workflow_id
+    else:
+        # 构建采购需求
+        demand = build_purchase_demand(
+            product_name=product_name,
+            quantity=quantity,
+            budget=budget,
+            specification=specification,
+            platforms=platforms
+        )
+        if store is not None:
+            # 清理过期的已结束工作流
+            retention_days = float(os.getenv("WORKFLOW_CHECKPOINT_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+            purged = store.purge(older_than=retention_days * 24 * 3600)
+            if purged:
+                print(f"🧹 已清理 {purged} 个超过 {retention_days:g} 天的工作流检查点")
+            workflow_id = store.create(demand)
+    if store is not None:
+        checkpointer = store.checkpointer(workflow_id)
+    
     print("=" * 60)
     print("🛒 AI智能采购自动化助手")
     print("=" * 60)
-    print(f"📦 商品名称: {product_name}")
-    print(f"📊 采购数量: {quantity}")
-    if budget:
-        print(f"💰 预算上限: ¥{budget}")
-    if specification:
-        print(f"📐 规格要求: {specification}")
+    if run is not None:
+        print(f"♻️ 继续工作流: {workflow_id}（上次状态 {run.status}，已完成: {' → '.join(run.stages) or '无'}）")
+    print(f"📦 商品名称: {demand.product_name}")
+    print(f"📊 采购数量: {demand.quantity}")
+    if demand.budget:
+        print(f"💰 预算上限: ¥{demand.budget}")
+    if demand.specification:
+        print(f"📐 规格要求: {demand.specification}")
     print("=" * 60)
     
-    from src.models.enums import Platform
-    from src.models.demand import PurchaseDemand
-    from src.services.workflow_orchestrator import WorkflowOrchestrator
-    
-    # 构建采购需求
-    if platforms is None:
-        platforms = [Platform.ALIBABA_1688, Platform.JD_ENTERPRISE]
-    else:
-        platform_map = {
-            "1688": Platform.ALIBABA_1688,
-            "jd": Platform.JD_ENTERPRISE,
-            "tmall": Platform.TMALL_SUPERMARKET
-        }
-        platforms = [platform_map.get(p.lower(), Platform.ALIBABA_1688) for p in platforms]
-    
-    demand = PurchaseDemand(
-        product_name=product_name,
-        specification=specification,
-        quantity=quantity,
-        budget=Decimal(str(budget)) if budget else None,
-        preferred_platforms=platforms,
-        additional_requirements=None
-    )
-    
-    # 创建工作流编排器
-    orchestrator = WorkflowOrchestrator()
+    if confirm is not None:
+        checkpointer.save(STAGE_CONFIRM, {"rank": confirm, "confirmed_at": time.time()})
+        print(f"👍 已确认推荐 {confirm}")
+    if checkpointer is not None:
+        store.set_status(workflow_id, STATUS_RUNNING)
+        orchestrator.set_checkpointer(checkpointer)
+    # AI选品：编排器支持时注入预排序选品函数，只把规则评分前 K 个候选发给大模型
+    selector = None
+    if hasattr(orchestrator, "set_product_selector"):
+        from src.services.pre_ranker import ProductSelector
+        selector = ProductSelector()
+        orchestrator.set_product_selector(selector)
     
-    # 设置进度回调
-    def progress_callback(step: str, status: str, message: str):
-        status_icons = {
-            "running": "🔄",
-            "completed": "✅",
-            "failed": "❌",
-            "warning": "⚠️"
-        }
-        icon = status_icons.get(status, "📌")
-        print(f"{icon} [{step}] {message}")
+    # 进度事件总线：控制台/文件等输出端异步消费，不阻塞工作流
+    bus = ProgressBus()
+    bus.subscribe(ConsoleSubscriber())
+    metrics = bus.subscribe(MetricsSubscriber())
+    if events_log:
+        bus.subscribe(JsonlFileSubscriber(events_log))
+    # 下单/物流/入库结束后通知看板刷新缓存
+    bus.subscribe(DashboardInvalidator())
+    await bus.start()
     
-    orchestrator.set_progress_callback(progress_callback)
+    # 性能剖析：按阶段/平台记录耗时、CPU、外部调用和流量
+    profiler = None
+    if profile is not None:
+        from src.services.pipeline_profiler import PipelineProfiler
+        profiler = PipelineProfiler().install()
+        orchestrator.set_progress_callback(profiler.wrap(bus.as_callback()))
+    else:
+        orchestrator.set_progress_callback(bus.as_callback())
     
     try:
         # 执行全流程
         print("\n🚀 开始执行采购流程...\n")
         
-        result = await orchestrator.execute_full_workflow(demand)
+        try:
+            result = await orchestrator.execute_full_workflow(demand)
+        finally:
+            await bus.close()
+            if profiler:
+                profiler.uninstall()
+        
+        # 工作流ID以检查点为准
+        if workflow_id:
+            result["workflow_id"] = workflow_id
+        else:
+            workflow_id = result.get("workflow_id")
         
         print("\n" + "=" * 60)
         if result.get("status") == "completed":
             print("✅ 采购流程执行完成！")
-            print(f"📋 工作流ID: {result.get('workflow_id')}")
+            print(f"📋 工作流ID: {workflow_id}")
             
             if result.get("order"):
                 order = result["order"]
@@ -177,7 +281,7 @@ async def run_auto_purchase(product_name: str, quantity: int, budget: float = No
         
         elif result.get("status") == "pending_confirmation":
             print("⏸️ 流程暂停，等待确认")
-            print(f"📋 工作流ID: {result.get('workflow_id')}")
+            print(f"📋 工作流ID: {workflow_id}")
             
             if result.get("recommendations"):
                 print("\n🎯 AI推荐结果:")
@@ -192,26 +296,59 @@ async def run_auto_purchase(product_name: str, quantity: int, budget: float = No
             print("❌ 采购流程执行失败")
             print(f"错误信息: {result.get('error')}")
         
+        status = result.get("status") or STATUS_FAILED
+        resumable = checkpointer is not None and checkpointer.resumable
+        if resumable:
+            store.set_status(workflow_id, status, str(result["error"]) if result.get("error") else None)
+        
+        if metrics.step_durations:
+            print("\n" + metrics.report())
+        if profiler:
+            _write_profile(profiler, profile)
+        if checkpointer is not None:
+            print(checkpointer.report())
+        if resumable and status == STATUS_PENDING:
+            print(f"💡 确认后继续: python run_purchase.py --resume {workflow_id} --confirm 1")
+        elif resumable and status != "completed":
+            print(f"💡 继续执行: python run_purchase.py --resume {workflow_id}")
         print("=" * 60)
         return result
         
     except Exception as e:
         print(f"\n❌ 执行异常: {e}")
+        if checkpointer is not None and checkpointer.resumable:
+            store.set_status(workflow_id, STATUS_FAILED, str(e))
+            print(f"💡 继续执行: python run_purchase.py --resume {workflow_id}")
+        elif checkpointer is not None:
+            print(checkpointer.report())
         import traceback
         traceback.print_exc()
         return {"status": "error", "error": str(e)}
+    finally:
+        if selector is not None:
+            await selector.close()
+        if store is not None:
+            store.close()
 
 
-def main():
-    """主函数"""
-    parser = argparse.ArgumentParser(
-        description="AI智能采购自动化助手",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+def _write_profile(profiler, prefix: str):
+    """打印剖析汇总表并写出火焰图文件"""
+    from src.services.pipeline_profiler import default_profile_prefix
+    
+    print("\n" + profiler.report())
+    paths = profiler.write(prefix or default_profile_prefix())
+    print(f"🔥 火焰图: {paths['trace']}（chrome://tracing / Perfetto / speedscope）")
+    print(f"   折叠栈: {paths['folded']}（flamegraph.pl）")
+
+
+EPILOG = """
 示例:
   # 初始化数据库
   python run_purchase.py --init-db
   
+  # 查看初始化SQL的执行计划（不连接数据库）
+  python run_purchase.py --init-db --dry-run
+  
   # 启动Web界面
   python run_purchase.py --web
   
@@ -220,34 +357,205 @@ def main():
   
   # 指定平台
   python run_purchase.py --product "办公椅" --quantity 5 --platforms 1688 jd
-        """
+  
+  # 批量执行（CSV/JSONL），并发4个，1688每2秒最多开始1个需求
+  python run_purchase.py --batch demands.csv --concurrency 4 --demand-rate 1688=0.5 jd=2
+  
+  # 只做AI选品：候选商品文件预排序后交给大模型，LLM_STREAM=1 时每条推荐生成后立即输出
+  python run_purchase.py --select candidates.jsonl --product "A4打印纸" --quantity 10 --budget 500
+  
+  # 增量备份订单/库存等表（只导出上次备份后变化的行），--compact 同时合并快照
+  python run_purchase.py --backup --compact
+  
+  # 从检查点继续失败或暂停的工作流（跳过已完成的爬取、AI选品等阶段）
+  python run_purchase.py --workflows
+  python run_purchase.py --resume WF20240501120000a1b2c3 --confirm 1
+  
+  # 物流跟踪：登记运单并按状态自适应轮询快递100（--once 只查一轮，适合定时任务）
+  python run_purchase.py --track shipments.jsonl
+  
+  # 多账号并行下单（同一供应商的SKU合并结算，每个账号独立浏览器目录和限流）
+  python run_purchase.py --dispatch-orders orders.jsonl --accounts accounts.json --shipping shipping.json
+  
+  # 性能剖析：输出各阶段耗时汇总和火焰图
+  python run_purchase.py --product "A4打印纸" --quantity 10 --profile
+"""
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        description="AI智能采购自动化助手",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG
     )
     
     parser.add_argument("--init-db", action="store_true", help="初始化数据库")
+    parser.add_argument("--dry-run", action="store_true", help="配合 --init-db：只分割和规划SQL，不执行")
     parser.add_argument("--web", action="store_true", help="启动Web界面")
+    parser.add_argument("--backup", action="store_true", help="增量备份业务表（CSV变更日志 + Excel）")
+    parser.add_argument("--compact", action="store_true", help="配合 --backup：合并变更日志为快照")
+    parser.add_argument("--tables", nargs="+", help="配合 --backup：只备份指定的表")
     parser.add_argument("--product", type=str, help="商品名称")
     parser.add_argument("--quantity", type=int, default=1, help="采购数量")
     parser.add_argument("--budget", type=float, help="预算上限")
     parser.add_argument("--spec", type=str, help="规格要求")
     parser.add_argument("--platforms", nargs="+", help="优先平台: 1688 jd tmall")
-    
+    parser.add_argument("--resume", type=str, metavar="工作流ID", help="从检查点继续执行工作流")
+    parser.add_argument("--confirm", type=int, metavar="序号", help="配合 --resume：确认第几个推荐后继续下单")
+    parser.add_argument("--workflows", action="store_true", help="列出最近的工作流及已完成的阶段")
+    parser.add_argument("--select", type=str, metavar="候选商品文件",
+                        help="配合 --product：对候选商品(.jsonl/.json)预排序并AI选品")
+    parser.add_argument("--batch", type=str, help="批量需求文件(.csv/.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="批量模式并发数")
+    parser.add_argument("--demand-rate", nargs="+", metavar="平台=每秒需求数",
+                        help="批量模式按平台限制每秒开始的需求数（不限制需求内部的请求），如: 1688=0.5 jd=2")
+    parser.add_argument("--track", nargs="?", const=True, metavar="运单文件",
+                        help="物流跟踪：登记运单文件(.jsonl)中的订单并轮询快递100（省略文件时只跟踪已保存的运单）")
+    parser.add_argument("--once", action="store_true", help="配合 --track：只查询一轮已到期的运单")
+    parser.add_argument("--dispatch-orders", type=str, metavar="订单文件", help="多账号并行下单(.jsonl)")
+    parser.add_argument("--accounts", type=str, metavar="账号文件", help="配合 --dispatch-orders：下单账号列表(.json)")
+    parser.add_argument("--shipping", type=str, metavar="收货信息文件",
+                        help="配合 --dispatch-orders：默认收货信息(.json)")
+    parser.add_argument("--output", type=str, help="批量/下单结果输出文件(JSONL)，默认输出到标准输出")
+    parser.add_argument("--events-log", type=str, help="进度事件记录文件(JSONL)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="输出前缀",
+                        help="性能剖析，输出汇总表和火焰图（默认 data/profiles/profile_<时间>）")
+    return parser
+
+
+def _run_init_db(args):
+    if not init_database(dry_run=args.dry_run):
+        sys.exit(1)
+
+
+def _run_web(args):
+    run_web_interface()
+
+
+def _run_backup(args):
+    from src.services.incremental_backup import run_incremental_backup
+    run_incremental_backup(compact=True if args.compact else None, tables=args.tables)
+
+
+def _run_batch(args):
+    import asyncio
+    from src.services.batch_runner import run_batch_purchase
+    from src.services.rate_limiter import parse_rate_limits
+    asyncio.run(run_batch_purchase(
+        batch_path=args.batch,
+        concurrency=args.concurrency,
+        demand_rates=parse_rate_limits(args.demand_rate),
+        output_path=args.output,
+        events_log=args.events_log,
+        profile=args.profile
+    ))
+
+
+def _run_product(args):
+    import asyncio
+    asyncio.run(run_auto_purchase(
+        product_name=args.product,
+        quantity=args.quantity,
+        budget=args.budget,
+        specification=args.spec,
+        platforms=args.platforms,
+        events_log=args.events_log,
+        profile=args.profile
+    ))
+
+
+def _run_workflows(args):
+    from src.services.workflow_checkpoint import CheckpointStore
+    store = CheckpointStore()
+    runs = store.list()
+    store.close()
+    if not runs:
+        print("暂无工作流检查点")
+    for run in runs:
+        print(run.format())
+
+
+def _run_resume(args):
+    import asyncio
+    asyncio.run(run_auto_purchase(
+        resume=args.resume,
+        confirm=args.confirm,
+        events_log=args.events_log,
+        profile=args.profile
+    ))
+
+
+def _run_select(args):
+    if not args.product:
+        print("❌ --select 需要配合 --product 指定商品名称")
+        sys.exit(1)
+    import asyncio
+    from src.services.pre_ranker import run_product_selection
+    asyncio.run(run_product_selection(
+        candidates_path=args.select,
+        product_name=args.product,
+        quantity=args.quantity,
+        budget=args.budget,
+        specification=args.spec
+    ))
+
+
+def _run_track(args):
+    import asyncio
+    from src.services.tracking_scheduler import run_tracking
+    try:
+        asyncio.run(run_tracking(
+            shipments_path=args.track if isinstance(args.track, str) else None,
+            once=args.once
+        ))
+    except KeyboardInterrupt:
+        print("\n⏹️ 已停止物流跟踪，运单状态已保存")
+
+
+def _run_dispatch_orders(args):
+    if not args.accounts:
+        print("❌ --dispatch-orders 需要配合 --accounts 指定下单账号文件")
+        sys.exit(1)
+    from src.services.order_dispatcher import run_dispatch_orders
+    run_dispatch_orders(
+        orders_path=args.dispatch_orders,
+        accounts_path=args.accounts,
+        shipping_path=args.shipping,
+        output_path=args.output
+    )
+
+
+# (参数名, 处理函数)，按顺序取第一个被指定的模式
+MODES = (
+    ("init_db", _run_init_db),
+    ("web", _run_web),
+    ("backup", _run_backup),
+    ("workflows", _run_workflows),
+    ("resume", _run_resume),
+    ("select", _run_select),
+    ("batch", _run_batch),
+    ("track", _run_track),
+    ("dispatch_orders", _run_dispatch_orders),
+    ("product", _run_product),
+)
+
+
+def main():
+    """主函数"""
+    parser = build_parser()
     args = parser.parse_args()
+    if args.confirm is not None and not args.resume:
+        parser.error("--confirm 需要配合 --resume 使用")
     
-    if args.init_db:
-        init_database()
-    elif args.web:
-        run_web_interface()
-    elif args.product:
-        asyncio.run(run_auto_purchase(
-            product_name=args.product,
-            quantity=args.quantity,
-            budget=args.budget,
-            specification=args.spec,
-            platforms=args.platforms
-        ))
-    else:
-        parser.print_help()
-        print("\n💡 提示: 使用 --web 启动图形界面，或使用 --product 执行命令行采购")
+    for name, handler in MODES:
+        if getattr(args, name):
+            load_env()
+            handler(args)
+            return
+    
+    parser.print_help()
+    print("\n💡 提示: 使用 --web 启动图形界面，或使用 --product 执行命令行采购")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""
+页面结构分析结果模型
+============================================
+
+调试脚本和批量审计共用的结构化结果，带版本号的稳定 JSON / NDJSON 格式，
+可缓存、按时间对比、批量加载，用于检测选择器漂移。
+
+NDJSON 每行一个 PageAnalysis，字段为 None 或空时省略；
+matches 只记录命中数大于0的规则，缺失即表示 0。
+"""
+import json
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class RuleMatch:
+    """单条规则的命中情况"""
+    rule: str
+    group: str
+    count: int
+    exact: bool = True          # False 表示规则达到配额后停止计数，count 只是下限
+    items: list = field(default_factory=list)
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        d = {"rule": self.rule, "group": self.group, "count": self.count}
+        if not self.exact:
+            d["exact"] = False
+        if include_items and self.items:
+            d["items"] = self.items
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RuleMatch":
+        return cls(rule=d["rule"], group=d["group"], count=int(d["count"]),
+                   exact=d.get("exact", True), items=d.get("items", []))
+
+
+@dataclass
+class PageAnalysis:
+    """一个页面的结构分析结果"""
+    url: str
+    source: str                     # browser / snapshot / http
+    ok: bool = True
+    final_url: str = None
+    analyzed_at: str = None
+    digest: str = None              # 快照内容哈希（离线回放时）
+    visited: int = 0
+    stopped_early: bool = False
+    wait_reason: str = None
+    timings: dict = field(default_factory=dict)
+    matches: list = field(default_factory=list)
+    error: str = None
+    schema: int = SCHEMA_VERSION
+
+    def __post_init__(self):
+        if self.analyzed_at is None:
+            self.analyzed_at = datetime.now().isoformat(timespec="seconds")
+
+    @classmethod
+    def from_extraction(cls, url: str, extraction: dict, source: str,
+                        timings: dict = None, **kwargs) -> "PageAnalysis":
+        """
+        由 DomExtractor.run / run_html 的结果构建
+
+        Args:
+            url: 请求的URL
+            extraction: 提取结果
+            source: browser / snapshot / http
+            timings: 各阶段耗时（秒）
+        """
+        stats = extraction["stats"]
+        return cls(
+            url=url,
+            source=source,
+            final_url=stats.get("url") or None,
+            visited=stats.get("visited", 0),
+            stopped_early=stats.get("stoppedEarly", False),
+            timings={k: round(v, 4) for k, v in (timings or {}).items()},
+            matches=[
+                RuleMatch(rule=name, group=m["group"], count=m["count"],
+                          exact=m["exact"], items=m["items"])
+                for name, m in extraction["matches"].items() if m["count"] > 0
+            ],
+            **kwargs,
+        )
+
+    @classmethod
+    def failure(cls, url: str, source: str, error: str, timings: dict = None,
+                **kwargs) -> "PageAnalysis":
+        """构建失败结果"""
+        return cls(url=url, source=source, ok=False, error=error,
+                   timings={k: round(v, 4) for k, v in (timings or {}).items()}, **kwargs)
+
+    @property
+    def counts(self) -> dict:
+        """{规则名: 命中数}"""
+        return {m.rule: m.count for m in self.matches}
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        d = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.name == "matches":
+                value = [m.to_dict(include_items) for m in value]
+            if value is None or value == [] or value == {}:
+                continue
+            if f.name == "stopped_early" and not value:
+                continue
+            d[f.name] = value
+        return d
+
+    def to_json(self, include_items: bool = True) -> str:
+        """紧凑的单行 JSON"""
+        return json.dumps(self.to_dict(include_items), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PageAnalysis":
+        schema = d.get("schema", SCHEMA_VERSION)
+        if schema > SCHEMA_VERSION:
+            raise ValueError(f"不支持的结果版本: {schema}（当前 {SCHEMA_VERSION}）")
+        known = {f.name for f in fields(cls)}
+        data = {k: v for k, v in d.items() if k in known}
+        data["matches"] = [RuleMatch.from_dict(m) for m in d.get("matches", [])]
+        return cls(**data)
+
+
+def write_ndjson(analyses, out, include_items: bool = True) -> int:
+    """
+    写出 NDJSON
+
+    Args:
+        analyses: PageAnalysis 可迭代对象
+        out: 文件路径或已打开的文本文件对象
+
+    Returns:
+        写出的行数
+    """
+    if isinstance(out, str):
+        with open(out, "w", encoding="utf-8") as f:
+            return write_ndjson(analyses, f, include_items)
+    n = 0
+    for analysis in analyses:
+        out.write(analysis.to_json(include_items) + "\n")
+        n += 1
+    out.flush()
+    return n
+
+
+def read_ndjson(path: str):
+    """逐行读取 NDJSON，产出 PageAnalysis"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield PageAnalysis.from_dict(json.loads(line))
+
+
+def diff_counts(old: PageAnalysis, new: PageAnalysis) -> dict:
+    """
+    对比两次分析的规则命中数
+
+    Returns:
+        {规则名: (旧命中数, 新命中数)}，只包含发生变化的规则
+    """
+    old_counts, new_counts = old.counts, new.counts
+    return {
+        rule: (old_counts.get(rule, 0), new_counts.get(rule, 0))
+        for rule in sorted(set(old_counts) | set(new_counts))
+        if old_counts.get(rule, 0) != new_counts.get(rule, 0)
+    }
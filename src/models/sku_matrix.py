@@ -0,0 +1,295 @@
+"""
+SKU 矩阵模型
+============================================
+
+1688 多规格商品的 SKU 是各规格维度（颜色、尺码、包装…）取值的组合，常有几百个。
+从内嵌数据的 skuModel 一次性解析为紧凑的矩阵:
+
+    - 维度: 规格名 + 取值列表，取值顺序即页面上 obj-item / prop-item 选项的顺序
+    - 组合: 各维度取值下标按混合进制编码为一个整数，组合编码 → 槽位 的字典 + 紧凑数组
+      （array('d') 存价格、array('q') 存可订数量和 skuId），只保存实际存在的组合
+    - 索引: 规范化规格文本（全角转半角、小写、去掉空白和分隔符）→ 槽位，
+      "A4 70g 5包"、"A4 70g>5包"、"5包 A4 70g"（两个维度时）都是一次字典查找
+    - 索引不命中（写法不同、有多余文字）时按维度逐个匹配取值
+
+选择规格、查询价格和库存都在内存中完成；下单时按 variant.indices 直接点击对应位置的选项，
+不需要逐个扫描页面元素。
+
+用法:
+    matrix = SkuMatrix.from_offer(page.offer)
+    variant = matrix.find("A4 70g 5包")
+    print(variant.price, variant.stock, variant.indices)
+"""
+import html
+import itertools
+import math
+import re
+import unicodedata
+from array import array
+from dataclasses import dataclass
+
+# 规格文本中的分隔符（skuInfoMap 的键用 > 分隔各维度）
+_SEPARATOR_RE = re.compile(r"[\s>;；,，/|、+]+")
+
+# 维度数不超过该值时，为取值的所有排列建立索引；维度更多时只索引维度顺序，
+# 其他顺序由按维度匹配处理（避免索引随排列数膨胀）
+_PERMUTE_DIMS = 2
+
+_NO_STOCK = -1          # 可订数量未知
+_NO_SKU_ID = 0
+_AMBIGUOUS = -1         # 多个组合规范化后相同，需按维度匹配
+
+
+def normalize_spec(text) -> str:
+    """规格文本规范化：反转义、全角转半角、小写，去掉空白和分隔符"""
+    text = unicodedata.normalize("NFKC", html.unescape(str(text))).lower()
+    return _SEPARATOR_RE.sub("", text)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _to_int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class SkuVariant:
+    """一个规格组合"""
+    values: tuple               # 各维度的取值
+    indices: tuple              # 各维度取值的下标（页面上第几个选项）
+    price: float = None
+    stock: int = None           # 可订数量，None 表示未知
+    sku_id: int = None
+    spec_id: str = None
+
+    @property
+    def spec_attrs(self) -> str:
+        return ">".join(self.values)
+
+    def available(self, quantity: int = 1) -> bool:
+        """库存是否足够（可订数量未知时视为足够）"""
+        return self.stock is None or self.stock >= quantity
+
+    def __str__(self):
+        price = f"¥{self.price:.2f}" if self.price is not None else "价格未知"
+        stock = f"可订 {self.stock}" if self.stock is not None else "库存未知"
+        return f"{self.spec_attrs}  {price}  {stock}"
+
+
+class SkuMatrix:
+    """多规格商品的 SKU 矩阵（构建后只读）"""
+
+    def __init__(self, props: list):
+        """
+        Args:
+            props: [(规格名, [取值, ...]), ...]，按页面上维度的顺序
+        """
+        self.props = [name for name, _ in props]
+        self.values = [list(values) for _, values in props]
+        self._value_index = [{normalize_spec(v): i for i, v in enumerate(values)} for values in self.values]
+        # 混合进制：最后一个维度的权重为 1
+        self._radix = []
+        weight = 1
+        for values in reversed(self.values):
+            self._radix.append(weight)
+            weight *= max(len(values), 1)
+        self._radix.reverse()
+
+        self._slots = {}                # {组合编码: 槽位}
+        self._codes = array("q")        # 槽位 → 组合编码
+        self._price = array("d")
+        self._stock = array("q")
+        self._sku_id = array("q")
+        self._spec_id = []
+        self._index = {}                # {规范化规格文本: 槽位}
+        self.unmatched = []             # 无法对应到维度取值的规格文本
+
+    # ---------- 构建 ----------
+
+    @classmethod
+    def from_sku_model(cls, sku_model: dict) -> "SkuMatrix":
+        """从内嵌数据的 skuModel（skuProps + skuInfoMap）构建"""
+        props = [(prop.get("prop"), [v.get("name") for v in prop.get("value") or [] if isinstance(v, dict)])
+                 for prop in sku_model.get("skuProps") or []]
+        skus = [(info.get("specAttrs") or key, info.get("price") or info.get("discountPrice"),
+                 info.get("canBookCount"), info.get("skuId"), info.get("specId"))
+                for key, info in (sku_model.get("skuInfoMap") or {}).items() if isinstance(info, dict)]
+        return cls._build(props, skus)
+
+    @classmethod
+    def from_offer(cls, offer: dict) -> "SkuMatrix":
+        """从 tiered_fetcher.extract_offer 的结果构建"""
+        props = [(prop["prop"], prop["values"]) for prop in offer.get("sku_props") or []]
+        skus = [(sku["spec_attrs"], sku["price"], sku["stock"], sku["sku_id"], sku["spec_id"])
+                for sku in offer.get("skus") or []]
+        return cls._build(props, skus)
+
+    @classmethod
+    def _build(cls, props: list, skus: list) -> "SkuMatrix":
+        if not props:
+            # 没有 skuProps 时按 skuInfoMap 键中 > 分隔的位置推断维度
+            props = cls._infer_props([html.unescape(str(spec)) for spec, *_ in skus])
+        matrix = cls(props)
+        for spec, price, stock, sku_id, spec_id in skus:
+            matrix.add(spec, price, stock, sku_id, spec_id)
+        matrix._build_index()
+        return matrix
+
+    @staticmethod
+    def _infer_props(specs: list) -> list:
+        width = max((len(spec.split(">")) for spec in specs), default=0)
+        columns = [dict() for _ in range(width)]
+        for spec in specs:
+            parts = spec.split(">")
+            if len(parts) == width:
+                for column, part in zip(columns, parts):
+                    column.setdefault(part.strip(), None)
+        return [(f"规格{i + 1}", list(column)) for i, column in enumerate(columns)]
+
+    def add(self, spec, price=None, stock=None, sku_id=None, spec_id=None) -> int:
+        """
+        登记一个组合（已存在时覆盖），返回槽位；规格无法对应到维度时记入 unmatched 并返回 -1
+
+        Args:
+            spec: 规格文本（"A4 70g>5包"）或各维度取值下标的元组
+        """
+        indices = spec if isinstance(spec, tuple) else self._split(spec)
+        if indices is None:
+            self.unmatched.append(spec)
+            return -1
+        code = self._encode(indices)
+        slot = self._slots.get(code)
+        values = (_to_float(price), _to_int(stock, _NO_STOCK), _to_int(sku_id, _NO_SKU_ID))
+        if slot is None:
+            slot = len(self._codes)
+            self._slots[code] = slot
+            self._codes.append(code)
+            self._price.append(values[0])
+            self._stock.append(values[1])
+            self._sku_id.append(values[2])
+            self._spec_id.append(spec_id)
+        else:
+            self._price[slot], self._stock[slot], self._sku_id[slot] = values
+            self._spec_id[slot] = spec_id
+        return slot
+
+    def _split(self, spec) -> tuple:
+        """skuInfoMap 的规格文本 → 各维度下标"""
+        parts = html.unescape(str(spec)).split(">")
+        if len(parts) == len(self.values):
+            indices = tuple(index.get(normalize_spec(part)) for index, part in zip(self._value_index, parts))
+            if None not in indices:
+                return indices
+        return self._match_indices(normalize_spec(spec))
+
+    def _build_index(self):
+        """规范化规格文本 → 槽位（维度少时包含取值的所有排列）"""
+        index = {}
+        normalized = [[normalize_spec(v) for v in values] for values in self.values]
+        for slot, code in enumerate(self._codes):
+            parts = [normalized[dim][i] for dim, i in enumerate(self._decode(code))]
+            orders = itertools.permutations(parts) if len(parts) <= _PERMUTE_DIMS else (parts,)
+            for key in {"".join(order) for order in orders}:
+                index[key] = slot if index.get(key, slot) == slot else _AMBIGUOUS
+        self._index = index
+
+    # ---------- 编码 ----------
+
+    def _encode(self, indices: tuple) -> int:
+        return sum(i * w for i, w in zip(indices, self._radix))
+
+    def _decode(self, code: int) -> tuple:
+        indices = []
+        for weight in self._radix:
+            i, code = divmod(code, weight)
+            indices.append(i)
+        return tuple(indices)
+
+    # ---------- 查询 ----------
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __iter__(self):
+        return (self._variant(slot) for slot in range(len(self._codes)))
+
+    def _variant(self, slot: int) -> SkuVariant:
+        indices = self._decode(self._codes[slot])
+        price = self._price[slot]
+        stock = self._stock[slot]
+        sku_id = self._sku_id[slot]
+        return SkuVariant(values=tuple(self.values[dim][i] for dim, i in enumerate(indices)),
+                          indices=indices,
+                          price=None if math.isnan(price) else price,
+                          stock=None if stock == _NO_STOCK else stock,
+                          sku_id=None if sku_id == _NO_SKU_ID else sku_id,
+                          spec_id=self._spec_id[slot])
+
+    def find(self, spec: str) -> SkuVariant:
+        """
+        按规格文本查找组合，找不到时返回 None
+
+        先查规范化文本索引（O(1)），不命中时按维度逐个匹配取值（可容忍多余文字和不同顺序）。
+        只有一个取值的维度可以不写。
+        """
+        key = normalize_spec(spec)
+        slot = self._index.get(key)
+        if slot is None or slot == _AMBIGUOUS:
+            indices = self._match_indices(key)
+            slot = None if indices is None else self._slots.get(self._encode(indices))
+        return None if slot is None else self._variant(slot)
+
+    def get(self, *values) -> SkuVariant:
+        """按各维度的取值（维度顺序）查找组合"""
+        if len(values) != len(self.values):
+            return None
+        indices = tuple(index.get(normalize_spec(v)) for index, v in zip(self._value_index, values))
+        if None in indices:
+            return None
+        slot = self._slots.get(self._encode(indices))
+        return None if slot is None else self._variant(slot)
+
+    def _match_indices(self, text: str) -> tuple:
+        """在规范化文本中逐个维度匹配取值（每个维度取最长的命中），全部维度确定时返回下标"""
+        indices = []
+        for index in self._value_index:
+            if len(index) == 1:
+                indices.append(0)
+                continue
+            hit = max((v for v in index if v and v in text), key=len, default=None)
+            if hit is None:
+                return None
+            indices.append(index[hit])
+            text = text.replace(hit, "", 1)
+        return tuple(indices)
+
+    def cheapest(self, quantity: int = 1) -> SkuVariant:
+        """库存足够的组合中价格最低的一个"""
+        best = None
+        for slot in range(len(self._codes)):
+            price, stock = self._price[slot], self._stock[slot]
+            if math.isnan(price) or (stock != _NO_STOCK and stock < quantity):
+                continue
+            if best is None or price < self._price[best]:
+                best = slot
+        return None if best is None else self._variant(best)
+
+    def price_range(self) -> tuple:
+        """(最低价, 最高价)，没有价格时为 (None, None)"""
+        prices = [p for p in self._price if not math.isnan(p)]
+        return (min(prices), max(prices)) if prices else (None, None)
+
+    def format(self) -> str:
+        low, high = self.price_range()
+        dims = " × ".join(f"{name}({len(values)})" for name, values in zip(self.props, self.values))
+        price = f", ¥{low:.2f}-{high:.2f}" if low is not None else ""
+        unmatched = f", {len(self.unmatched)} 个规格无法解析" if self.unmatched else ""
+        return f"【SKU矩阵】{dims or '无规格'}: {len(self)} 个组合{price}{unmatched}"
@@ -0,0 +1,118 @@
+"""
+共享数据库连接工厂
+============================================
+
+基于 DatabaseConfig 的连接池，供初始化脚本、仓储层和看板复用。
+
+后端由环境变量 DB_BACKEND 选择:
+    mysql   （默认）mysql.connector 连接池，大小由 DB_POOL_SIZE 指定（默认5）
+    sqlite  本地 SQLite 替身，路径由 DB_SQLITE_PATH 指定，便于无 MySQL 环境下测试
+
+用法:
+    factory = get_connection_factory()
+    with factory.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM order_table WHERE status = {factory.placeholder}", ("paid",))
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SQLITE_PATH = os.path.join(_PROJECT_ROOT, "data", "purchase_automation.sqlite3")
+
+
+class ConnectionFactory:
+    """数据库连接工厂"""
+
+    def __init__(self, backend: str = None, pool_size: int = None, sqlite_path: str = None):
+        """
+        Args:
+            backend: mysql / sqlite，默认读取 DB_BACKEND
+            pool_size: MySQL 连接池大小，默认读取 DB_POOL_SIZE
+            sqlite_path: SQLite 文件路径，默认读取 DB_SQLITE_PATH
+        """
+        self.backend = (backend or os.getenv("DB_BACKEND", "mysql")).lower()
+        if self.backend not in ("mysql", "sqlite"):
+            raise ValueError(f"不支持的数据库后端: {self.backend}")
+        self.pool_size = pool_size or int(os.getenv("DB_POOL_SIZE", "5"))
+        self.sqlite_path = sqlite_path or os.getenv("DB_SQLITE_PATH", DEFAULT_SQLITE_PATH)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @property
+    def placeholder(self) -> str:
+        """SQL参数占位符"""
+        return "?" if self.backend == "sqlite" else "%s"
+
+    def _mysql_pool(self, with_database: bool):
+        with self._lock:
+            pool = self._pools.get(with_database)
+            if pool is None:
+                from mysql.connector import pooling
+                from src.config import DatabaseConfig
+
+                params = dict(
+                    host=DatabaseConfig.HOST,
+                    port=DatabaseConfig.PORT,
+                    user=DatabaseConfig.USER,
+                    password=DatabaseConfig.PASSWORD,
+                    charset="utf8mb4",
+                )
+                if with_database:
+                    params["database"] = DatabaseConfig.DATABASE
+                pool = pooling.MySQLConnectionPool(
+                    pool_name=f"purchase_{'db' if with_database else 'server'}_{id(self)}",
+                    # 不指定数据库的连接只用于初始化，一个就够
+                    pool_size=self.pool_size if with_database else 1,
+                    pool_reset_session=True,
+                    **params,
+                )
+                self._pools[with_database] = pool
+            return pool
+
+    def _sqlite_connect(self):
+        import sqlite3
+
+        if self.sqlite_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.sqlite_path)), exist_ok=True)
+        conn = sqlite3.connect(self.sqlite_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self, with_database: bool = True):
+        """
+        借出一个连接，退出时归还连接池（出错时回滚未提交的事务）
+
+        Args:
+            with_database: 是否连接到 DatabaseConfig.DATABASE（初始化建库时为 False）
+        """
+        if self.backend == "sqlite":
+            conn = self._sqlite_connect()
+        else:
+            conn = self._mysql_pool(with_database).get_connection()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+
+
+_default_factory = None
+_default_factory_lock = threading.Lock()
+
+
+def get_connection_factory() -> ConnectionFactory:
+    """获取进程内共享的连接工厂"""
+    global _default_factory
+    with _default_factory_lock:
+        if _default_factory is None:
+            _default_factory = ConnectionFactory()
+        return _default_factory
@@ -0,0 +1,389 @@
+"""
+本地商品目录
+============================================
+
+保存历次爬取到的商品，重复采购（如办公用品）时先查本地目录，只对过期或可能变动的商品重新抓取；
+重新抓取时发现已下架的商品从目录删除。
+
+    - product_catalog        每个商品一行：规范化标题/规格、内容哈希、价格变动时间、最后抓取/校验时间
+    - product_catalog_terms  标题+规格的倒排索引（英文数字按词，中文按双字切分）
+
+新鲜度:
+    - 普通商品 ttl（默认24小时）内视为有效
+    - 库存紧张（库存低于 low_stock）或最近价格变过的商品使用更短的 volatile_ttl（默认2小时）
+
+数据库通过 ConnectionFactory 获取（MySQL 或 SQLite 替身），表不存在时自动创建。
+"""
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass, field
+
+from src.repositories.connection_pool import get_connection_factory
+from src.services.llm_cache import normalize_text
+
+_DDL = {
+    "sqlite": [
+        """CREATE TABLE IF NOT EXISTS product_catalog (
+            platform VARCHAR(32) NOT NULL,
+            product_id VARCHAR(64) NOT NULL,
+            title VARCHAR(512),
+            title_norm VARCHAR(512),
+            spec_norm VARCHAR(256),
+            unit_price DECIMAL(12, 2),
+            freight DECIMAL(12, 2),
+            stock INTEGER,
+            product_url VARCHAR(1024),
+            content_hash CHAR(40) NOT NULL,
+            data TEXT,
+            first_seen DOUBLE NOT NULL,
+            last_checked DOUBLE NOT NULL,
+            price_changed_at DOUBLE,
+            PRIMARY KEY (platform, product_id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_catalog_title ON product_catalog(title_norm)",
+        """CREATE TABLE IF NOT EXISTS product_catalog_terms (
+            term VARCHAR(64) NOT NULL,
+            platform VARCHAR(32) NOT NULL,
+            product_id VARCHAR(64) NOT NULL,
+            PRIMARY KEY (term, platform, product_id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_catalog_terms_item ON product_catalog_terms(platform, product_id)",
+    ],
+    "mysql": [
+        """CREATE TABLE IF NOT EXISTS product_catalog (
+            platform VARCHAR(32) NOT NULL,
+            product_id VARCHAR(64) NOT NULL,
+            title VARCHAR(512),
+            title_norm VARCHAR(512),
+            spec_norm VARCHAR(256),
+            unit_price DECIMAL(12, 2),
+            freight DECIMAL(12, 2),
+            stock INT,
+            product_url VARCHAR(1024),
+            content_hash CHAR(40) NOT NULL,
+            data TEXT,
+            first_seen DOUBLE NOT NULL,
+            last_checked DOUBLE NOT NULL,
+            price_changed_at DOUBLE,
+            PRIMARY KEY (platform, product_id),
+            INDEX idx_catalog_title (title_norm(191))
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+        """CREATE TABLE IF NOT EXISTS product_catalog_terms (
+            term VARCHAR(64) NOT NULL,
+            platform VARCHAR(32) NOT NULL,
+            product_id VARCHAR(64) NOT NULL,
+            PRIMARY KEY (term, platform, product_id),
+            INDEX idx_catalog_terms_item (platform, product_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    ],
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?|[一-鿿]+")
+_COLUMNS = ("platform", "product_id", "title", "title_norm", "spec_norm", "unit_price", "freight",
+            "stock", "product_url", "content_hash", "data", "first_seen", "last_checked",
+            "price_changed_at")
+
+
+def index_terms(text: str, query: bool = False) -> list:
+    """
+    切分索引词：英文/数字按词，中文按相邻双字；建索引时中文另加单字，便于单字查询
+
+    "A4打印纸 70g" → ["a4", "打印", "印纸", "70g"]（查询）
+    """
+    terms = []
+    for word in _WORD_RE.findall(normalize_text(text)):
+        if word[0] < "一" or len(word) == 1:
+            terms.append(word)
+            continue
+        terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+        if not query:
+            terms.extend(word)
+    return list(dict.fromkeys(terms))
+
+
+def _field(obj, *names):
+    for name in names:
+        value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _num(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def content_hash(candidate) -> str:
+    """商品内容哈希：标题、规格、价格、运费、库存、起订量任一变化哈希即变化"""
+    payload = [
+        normalize_text(_field(candidate, "product_name", "title")),
+        normalize_text(_field(candidate, "specification")),
+        _num(_field(candidate, "unit_price", "price")),
+        _num(_field(candidate, "freight")),
+        _num(_field(candidate, "stock")),
+        _num(_field(candidate, "min_order")),
+    ]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CatalogEntry:
+    """目录中的一个商品"""
+    platform: str
+    product_id: str
+    title: str
+    unit_price: float = None
+    freight: float = None
+    stock: int = None
+    product_url: str = None
+    content_hash: str = ""
+    data: dict = field(default_factory=dict)     # 原始候选记录
+    first_seen: float = 0.0
+    last_checked: float = 0.0
+    price_changed_at: float = None
+
+    def to_candidate(self) -> dict:
+        return {**self.data, "platform": self.platform, "product_id": self.product_id,
+                "from_catalog": True}
+
+
+@dataclass
+class UpsertStats:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+class ProductCatalog:
+    """本地商品目录"""
+
+    def __init__(self, factory=None, ttl: float = 24 * 3600, volatile_ttl: float = 2 * 3600,
+                 low_stock: int = 100):
+        """
+        Args:
+            factory: ConnectionFactory，默认进程内共享的连接工厂
+            ttl: 普通商品的有效期（秒）
+            volatile_ttl: 库存紧张或最近调过价的商品的有效期（秒）
+            low_stock: 库存低于该值视为库存紧张
+        """
+        self.factory = factory or get_connection_factory()
+        self.ttl = ttl
+        self.volatile_ttl = volatile_ttl
+        self.low_stock = low_stock
+        self._schema_ready = False
+
+    @property
+    def _ph(self) -> str:
+        return self.factory.placeholder
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            for ddl in _DDL[self.factory.backend]:
+                cursor.execute(ddl)
+            conn.commit()
+            cursor.close()
+        self._schema_ready = True
+
+    # ---------- 写入 ----------
+
+    def upsert(self, candidates: list, platform: str = None, now: float = None) -> UpsertStats:
+        """
+        写入爬取结果；内容哈希未变的商品只更新校验时间
+
+        Args:
+            candidates: 候选商品（需有 product_id）
+            platform: 候选未带 platform 字段时使用
+        """
+        self.ensure_schema()
+        now = now or time.time()
+        stats = UpsertStats()
+        rows = {}
+        for c in candidates:
+            key = (str(_field(c, "platform") or platform or ""), str(_field(c, "product_id") or ""))
+            if key[0] and key[1]:
+                rows[key] = c
+        if not rows:
+            return stats
+
+        ph = self._ph
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            existing = self._fetch_hashes(cursor, list(rows))
+            inserts, updates, touches, terms, stale_terms = [], [], [], [], []
+            for (plat, pid), c in rows.items():
+                digest = content_hash(c)
+                title = str(_field(c, "product_name", "title") or "")
+                spec = str(_field(c, "specification") or "")
+                price = _num(_field(c, "unit_price", "price"))
+                old = existing.get((plat, pid))
+                if old is not None and old[0] == digest:
+                    stats.unchanged += 1
+                    touches.append((now, plat, pid))
+                    continue
+                values = {
+                    "platform": plat, "product_id": pid, "title": title[:512],
+                    "title_norm": normalize_text(title)[:512], "spec_norm": normalize_text(spec)[:256],
+                    "unit_price": price, "freight": _num(_field(c, "freight")),
+                    "stock": _num(_field(c, "stock")),
+                    "product_url": _field(c, "product_url", "url"), "content_hash": digest,
+                    "data": json.dumps(c if isinstance(c, dict) else vars(c), ensure_ascii=False,
+                                       default=str),
+                    "first_seen": now, "last_checked": now, "price_changed_at": None,
+                }
+                item_terms = [(t, plat, pid) for t in index_terms(f"{title} {spec}")[:128]]
+                if old is None:
+                    stats.new += 1
+                    inserts.append(tuple(values[k] for k in _COLUMNS))
+                else:
+                    stats.changed += 1
+                    changed_at = now if old[1] is not None and price != old[1] else old[2]
+                    updates.append((values["title"], values["title_norm"], values["spec_norm"], price,
+                                    values["freight"], values["stock"], values["product_url"], digest,
+                                    values["data"], now, changed_at, plat, pid))
+                    stale_terms.append((plat, pid))
+                terms.extend(item_terms)
+
+            if inserts:
+                cursor.executemany(
+                    f"INSERT INTO product_catalog ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join([ph] * len(_COLUMNS))})", inserts)
+            if updates:
+                cursor.executemany(
+                    f"UPDATE product_catalog SET title = {ph}, title_norm = {ph}, spec_norm = {ph}, "
+                    f"unit_price = {ph}, freight = {ph}, stock = {ph}, product_url = {ph}, "
+                    f"content_hash = {ph}, data = {ph}, last_checked = {ph}, price_changed_at = {ph} "
+                    f"WHERE platform = {ph} AND product_id = {ph}", updates)
+            if touches:
+                cursor.executemany(
+                    f"UPDATE product_catalog SET last_checked = {ph} "
+                    f"WHERE platform = {ph} AND product_id = {ph}", touches)
+            if stale_terms:
+                cursor.executemany(
+                    f"DELETE FROM product_catalog_terms WHERE platform = {ph} AND product_id = {ph}",
+                    stale_terms)
+            if terms:
+                cursor.executemany(
+                    f"INSERT INTO product_catalog_terms (term, platform, product_id) "
+                    f"VALUES ({ph}, {ph}, {ph})", terms)
+            conn.commit()
+            cursor.close()
+        return stats
+
+    def remove(self, keys: list) -> int:
+        """
+        删除商品（如已下架），返回删除数
+
+        Args:
+            keys: [(平台, 商品ID), ...]
+        """
+        self.ensure_schema()
+        keys = list(dict.fromkeys((str(plat), str(pid)) for plat, pid in keys))
+        if not keys:
+            return 0
+        ph = self._ph
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                f"DELETE FROM product_catalog_terms WHERE platform = {ph} AND product_id = {ph}", keys)
+            cursor.executemany(
+                f"DELETE FROM product_catalog WHERE platform = {ph} AND product_id = {ph}", keys)
+            removed = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return removed
+
+    def _fetch_hashes(self, cursor, keys: list) -> dict:
+        """{(平台, 商品ID): (内容哈希, 单价, 调价时间)}"""
+        out = {}
+        ph = self._ph
+        for i in range(0, len(keys), 200):
+            chunk = keys[i:i + 200]
+            where = " OR ".join([f"(platform = {ph} AND product_id = {ph})"] * len(chunk))
+            cursor.execute(
+                f"SELECT platform, product_id, content_hash, unit_price, price_changed_at "
+                f"FROM product_catalog WHERE {where}", [v for key in chunk for v in key])
+            for plat, pid, digest, price, changed_at in cursor.fetchall():
+                out[(plat, pid)] = (digest, _num(price), changed_at)
+        return out
+
+    # ---------- 查询 ----------
+
+    def search(self, query: str, specification: str = None, platforms: list = None,
+               limit: int = 500) -> list:
+        """
+        按标题/规格检索：商品需包含查询的全部索引词
+
+        Returns:
+            CatalogEntry 列表
+        """
+        self.ensure_schema()
+        terms = index_terms(f"{query} {specification or ''}", query=True)
+        if not terms:
+            return []
+        ph = self._ph
+        sql = (
+            f"SELECT c.{', c.'.join(_COLUMNS)} FROM product_catalog c JOIN ("
+            f" SELECT platform, product_id FROM product_catalog_terms"
+            f" WHERE term IN ({', '.join([ph] * len(terms))})"
+            f" GROUP BY platform, product_id HAVING COUNT(*) = {ph}"
+            f") t ON c.platform = t.platform AND c.product_id = t.product_id"
+        )
+        params = list(terms) + [len(terms)]
+        if platforms:
+            sql += f" WHERE c.platform IN ({', '.join([ph] * len(platforms))})"
+            params += list(platforms)
+        sql += f" ORDER BY c.unit_price LIMIT {int(limit)}"
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        return [self._entry(dict(zip(_COLUMNS, row))) for row in rows]
+
+    @staticmethod
+    def _entry(row: dict) -> CatalogEntry:
+        return CatalogEntry(
+            platform=row["platform"], product_id=row["product_id"], title=row["title"],
+            unit_price=_num(row["unit_price"]), freight=_num(row["freight"]),
+            stock=int(row["stock"]) if row["stock"] is not None else None,
+            product_url=row["product_url"], content_hash=row["content_hash"],
+            data=json.loads(row["data"] or "{}"), first_seen=row["first_seen"],
+            last_checked=row["last_checked"], price_changed_at=row["price_changed_at"],
+        )
+
+    def is_fresh(self, entry: CatalogEntry, now: float = None) -> bool:
+        """是否仍在有效期内（库存紧张或最近调过价的商品有效期更短）"""
+        now = now or time.time()
+        volatile = (
+            (entry.stock is not None and entry.stock < self.low_stock)
+            or (entry.price_changed_at is not None and now - entry.price_changed_at < self.ttl)
+        )
+        return now - entry.last_checked < (self.volatile_ttl if volatile else self.ttl)
+
+    def split_fresh(self, entries: list, now: float = None) -> tuple:
+        """
+        Returns:
+            (仍有效的条目, 需要重新抓取的条目)
+        """
+        now = now or time.time()
+        fresh, stale = [], []
+        for entry in entries:
+            (fresh if self.is_fresh(entry, now) else stale).append(entry)
+        return fresh, stale
+
+    def count(self) -> int:
+        self.ensure_schema()
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM product_catalog")
+            n = cursor.fetchone()[0]
+            cursor.close()
+        return n
@@ -0,0 +1,354 @@
+"""
+批量采购执行
+============================================
+
+从 CSV / JSONL 文件流式读取采购需求，在固定数量的工作协程中并发执行。
+每个工作协程持有一个复用的 WorkflowOrchestrator，每完成一个需求就立即写出一行 JSON 结果。
+编排器提供 set_product_selector 时，所有编排器共用一个预排序选品函数（pre_ranker.ProductSelector）。
+
+限流粒度是需求: 每个需求开始前为它的每个候选平台各取一个令牌，限制的是各平台每秒开始的需求数；
+需求内部（爬取、翻页、下单）对平台的请求次数由编排器自己控制，这里不做限制。
+进度事件经 ProgressBus 异步输出，慢的输出端不会拖慢工作协程。
+
+需求文件字段:
+    product (或 product_name)   商品名称，必填
+    quantity                    采购数量，默认 1
+    budget                      预算上限，可选
+    spec (或 specification)     规格要求，可选
+    platforms                   优先平台，列表或以空格/逗号/竖线分隔的字符串，可选
+"""
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from src.services.dashboard_data import DashboardInvalidator
+from src.services.demand_builder import DEFAULT_PLATFORMS, build_purchase_demand
+from src.services.progress_bus import (
+    ProgressBus, ConsoleSubscriber, MetricsSubscriber, JsonlFileSubscriber
+)
+from src.services.rate_limiter import PlatformRateLimiter
+
+
+class DemandRowError(ValueError):
+    """需求文件中的行无法解析"""
+
+
+class BatchRunError(RuntimeError):
+    """批量执行无法继续（如工作流编排器创建失败、工作协程异常退出）"""
+
+
+def _split_platforms(value) -> list:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (list, tuple)):
+        return [str(p).strip() for p in value if str(p).strip()]
+    return [p for p in re.split(r"[\s,|]+", str(value)) if p]
+
+
+def normalize_demand_row(row: dict) -> dict:
+    """
+    规范化一行需求数据
+
+    Returns:
+        {"product_name", "quantity", "budget", "specification", "platforms"}
+    """
+    if not isinstance(row, dict):
+        raise DemandRowError(f"需求必须是JSON对象，实际为 {type(row).__name__}")
+    product = str(row.get("product") or row.get("product_name") or "").strip()
+    if not product:
+        raise DemandRowError("缺少商品名称(product)")
+
+    try:
+        quantity = int(row.get("quantity") or 1)
+        budget = row.get("budget")
+        budget = float(budget) if budget not in (None, "") else None
+    except (TypeError, ValueError) as e:
+        raise DemandRowError(f"数量或预算格式错误: {e}")
+
+    return {
+        "product_name": product,
+        "quantity": quantity,
+        "budget": budget,
+        "specification": (row.get("spec") or row.get("specification") or None),
+        "platforms": _split_platforms(row.get("platforms")),
+    }
+
+
+def iter_demands(path: str):
+    """
+    流式读取需求文件，逐行产出 (行号, 需求字典或异常)
+
+    解析失败的行以 DemandRowError 形式产出，不中断后续读取。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == ".csv":
+            # 表头占第1行
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    yield line_no, normalize_demand_row(row)
+                except DemandRowError as e:
+                    yield line_no, e
+        else:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    yield line_no, normalize_demand_row(json.loads(line))
+                except json.JSONDecodeError as e:
+                    yield line_no, DemandRowError(f"JSON格式错误: {e.msg}")
+                except DemandRowError as e:
+                    yield line_no, e
+
+
+def _summarize_result(result: dict) -> dict:
+    """提取工作流结果中可序列化的关键字段"""
+    summary = {
+        "status": result.get("status"),
+        "workflow_id": result.get("workflow_id"),
+    }
+    order = result.get("order")
+    if order is not None:
+        summary["order_id"] = getattr(order, "order_id", None)
+        summary["payment_amount"] = getattr(order, "payment_amount", None)
+    if result.get("recommendations"):
+        summary["recommendations"] = [
+            {
+                "rank": getattr(rec, "rank", None),
+                "product_name": getattr(rec, "product_name", None),
+                "unit_price": getattr(rec, "unit_price", None),
+                "freight": getattr(rec, "freight", None),
+                "total_score": getattr(rec, "total_score", None),
+            }
+            for rec in result["recommendations"][:3]
+        ]
+    if result.get("error"):
+        summary["error"] = str(result["error"])
+    return summary
+
+
+class BatchPurchaseRunner:
+    """批量采购执行器"""
+
+    def __init__(self, concurrency: int = 4, demand_rates: dict = None,
+                 output_path: str = None, orchestrator_factory=None, verbose: bool = True,
+                 events_log: str = None, profiler=None):
+        """
+        Args:
+            concurrency: 同时执行的需求数（即工作流编排器数量）
+            demand_rates: 按平台限制需求开始的速率 {平台: 每秒需求数}
+            output_path: 结果输出路径（JSONL），为空时输出到标准输出
+            orchestrator_factory: 创建编排器的可调用对象，默认 WorkflowOrchestrator
+            verbose: 是否打印每个需求的进度
+            events_log: 进度事件记录文件（JSONL），可选
+            profiler: PipelineProfiler，可选
+        """
+        if concurrency < 1:
+            raise ValueError(f"并发数必须大于0: {concurrency}")
+        self.concurrency = concurrency
+        self.demand_limiter = PlatformRateLimiter(demand_rates)
+        self.output_path = output_path
+        self.orchestrator_factory = orchestrator_factory
+        self.verbose = verbose
+        self.events_log = events_log
+        self.profiler = profiler
+        self.stats = {}
+        self.bus = None
+        self.metrics = None
+
+    def _create_orchestrator(self):
+        if self.orchestrator_factory is not None:
+            return self.orchestrator_factory()
+        from src.services.workflow_orchestrator import WorkflowOrchestrator
+        return WorkflowOrchestrator()
+
+    def _write(self, out, record: dict):
+        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+        status = record.get("status") or "unknown"
+        self.stats[status] = self.stats.get(status, 0) + 1
+
+    async def _worker(self, worker_id: int, orchestrator, queue: asyncio.Queue, out):
+        current = {"label": ""}
+        bus, profiler = self.bus, self.profiler
+
+        def progress_callback(step: str, status: str, message: str):
+            if profiler is not None:
+                profiler.observe(step, status, message, workflow=current["label"])
+            bus.publish(step, status, message, workflow=current["label"])
+
+        orchestrator.set_progress_callback(progress_callback)
+
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            line_no, demand_args = item
+            current["label"] = f"#{line_no} {demand_args['product_name']}"
+            record = {"line": line_no, "product": demand_args["product_name"],
+                      "quantity": demand_args["quantity"], "worker": worker_id}
+            started = time.monotonic()
+            try:
+                # 需求级限流：每个候选平台一个令牌
+                waited = await self.demand_limiter.acquire_all(
+                    demand_args["platforms"] or DEFAULT_PLATFORMS)
+                record["demand_rate_wait"] = round(waited, 3)
+                demand = build_purchase_demand(**demand_args)
+                result = await orchestrator.execute_full_workflow(demand)
+                record.update(_summarize_result(result))
+            except Exception as e:
+                record.update({"status": "error", "error": str(e)})
+            record["elapsed"] = round(time.monotonic() - started, 3)
+            record["finished_at"] = datetime.now().isoformat(timespec="seconds")
+            self._write(out, record)
+            queue.task_done()
+
+    async def _produce(self, batch_path: str, queue: asyncio.Queue, out, workers: int):
+        """读取需求文件放入队列，结束后为每个工作协程放一个结束标记"""
+        for line_no, demand_args in iter_demands(batch_path):
+            if isinstance(demand_args, DemandRowError):
+                self._write(out, {"line": line_no, "status": "invalid", "error": str(demand_args)})
+                continue
+            await queue.put((line_no, demand_args))
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def run(self, batch_path: str) -> dict:
+        """
+        执行批量采购
+
+        Args:
+            batch_path: 需求文件路径（.csv 或 .jsonl）
+
+        Returns:
+            统计信息 {"total", "elapsed", "by_status", "steps"}
+
+        Raises:
+            BatchRunError: 编排器创建失败或工作协程异常退出
+        """
+        self.stats = {}
+        # 先创建全部编排器：创建失败时直接报错，不会出现工作协程全部退出、读取端卡在有界队列上
+        try:
+            orchestrators = [self._create_orchestrator() for _ in range(self.concurrency)]
+        except Exception as e:
+            raise BatchRunError(f"创建工作流编排器失败: {type(e).__name__}: {e}") from e
+        # 编排器支持时共用一个预排序选品函数（共用大模型客户端和响应缓存）
+        selector = None
+        if any(hasattr(o, "set_product_selector") for o in orchestrators):
+            from src.services.pre_ranker import ProductSelector
+            selector = ProductSelector()
+            for orchestrator in orchestrators:
+                if hasattr(orchestrator, "set_product_selector"):
+                    orchestrator.set_product_selector(selector)
+        self.bus = ProgressBus()
+        if self.verbose:
+            self.bus.subscribe(ConsoleSubscriber())
+        self.metrics = self.bus.subscribe(MetricsSubscriber())
+        if self.events_log:
+            self.bus.subscribe(JsonlFileSubscriber(self.events_log))
+        self.bus.subscribe(DashboardInvalidator())
+        await self.bus.start()
+        started = time.monotonic()
+        # 有界队列：文件按需读取，不会一次性载入全部需求
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        out = open(self.output_path, "a", encoding="utf-8") if self.output_path else None
+        sink = out or sys.stdout
+
+        try:
+            workers = [
+                asyncio.create_task(self._worker(i, orchestrator, queue, sink))
+                for i, orchestrator in enumerate(orchestrators)
+            ]
+            producer = asyncio.create_task(self._produce(batch_path, queue, sink, len(workers)))
+            # 任一工作协程异常退出时取消读取端和其他工作协程，避免读取端永远等待队列空位
+            tasks = [producer, *workers]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in tasks:
+                if task in done and task.exception() is not None:
+                    e = task.exception()
+                    raise BatchRunError(f"批量执行中断: {type(e).__name__}: {e}") from e
+        finally:
+            await self.bus.close()
+            if selector is not None:
+                await selector.close()
+            if out:
+                out.close()
+
+        elapsed = time.monotonic() - started
+        return {
+            "total": sum(self.stats.values()),
+            "elapsed": round(elapsed, 3),
+            "by_status": dict(self.stats),
+            "steps": self.metrics.summary(),
+        }
+
+
+async def run_batch_purchase(batch_path: str, concurrency: int = 4, demand_rates: dict = None,
+                             output_path: str = None, events_log: str = None,
+                             profile: str = None) -> dict:
+    """
+    批量执行采购需求文件
+
+    Args:
+        batch_path: 需求文件路径（.csv 或 .jsonl）
+        concurrency: 最大并发需求数
+        demand_rates: 按平台限制需求开始的速率 {平台: 每秒需求数}
+        output_path: 结果输出路径（JSONL）
+        events_log: 进度事件记录文件（JSONL）
+        profile: 性能剖析输出前缀（空字符串表示默认路径），为 None 时不剖析
+    """
+    print("=" * 60)
+    print("🛒 AI智能采购自动化助手 - 批量模式")
+    print("=" * 60)
+    print(f"📄 需求文件: {batch_path}")
+    print(f"⚙️ 并发数: {concurrency}")
+    if demand_rates:
+        print("🚦 需求限流: " + ", ".join(f"{p}={r}个需求/s" for p, r in demand_rates.items()))
+    print(f"📝 结果输出: {output_path or '标准输出'}")
+    print("=" * 60)
+
+    profiler = None
+    if profile is not None:
+        from src.services.pipeline_profiler import PipelineProfiler
+        profiler = PipelineProfiler().install()
+
+    runner = BatchPurchaseRunner(
+        concurrency=concurrency,
+        demand_rates=demand_rates,
+        output_path=output_path,
+        events_log=events_log,
+        profiler=profiler,
+    )
+    try:
+        summary = await runner.run(batch_path)
+    except BatchRunError as e:
+        print(f"\n❌ {e}")
+        return {"total": sum(runner.stats.values()), "elapsed": 0, "by_status": dict(runner.stats),
+                "steps": {}, "error": str(e)}
+    finally:
+        if profiler:
+            profiler.uninstall()
+
+    print("\n" + "=" * 60)
+    print(f"✅ 批量执行完成: 共 {summary['total']} 条, 耗时 {summary['elapsed']}s")
+    for status, count in sorted(summary["by_status"].items()):
+        print(f"  {status}: {count}")
+    if summary["steps"]:
+        print(runner.metrics.report())
+    if profiler:
+        from src.services.pipeline_profiler import default_profile_prefix
+        print(profiler.report())
+        paths = profiler.write(profile or default_profile_prefix())
+        print(f"🔥 火焰图: {paths['trace']}")
+    print("=" * 60)
+    return summary
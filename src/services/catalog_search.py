@@ -0,0 +1,174 @@
+"""
+基于本地目录的增量采集
+============================================
+
+重复采购时先查本地商品目录（ProductCatalog）:
+    1. 目录中某平台的可用商品（有效期内的 + 可重新抓取的过期商品）足够多 → 先不搜索该平台
+       - 仍在有效期内的商品直接使用
+       - 过期/可能变动的商品只按商品ID重新抓取详情（需提供该平台的 refresher）
+       - 重新抓取后有效商品仍不足（下架、抓取失败）→ 再全量搜索该平台
+    2. 目录中可用商品不足的平台 → 通过 CrawlScheduler 全量搜索（与重新抓取并发）
+    3. 抓取结果写回目录（内容未变的只更新校验时间），已下架的商品从目录删除
+
+结果中记录节省的抓取次数，用于评估目录命中情况。
+"""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+
+from src.services.crawl_scheduler import platform_key
+
+
+@dataclass
+class CatalogSearchResult:
+    """一次目录增量采集的结果"""
+    candidates: list = field(default_factory=list)
+    from_catalog: int = 0           # 直接使用的目录商品数（无需抓取）
+    refreshed: int = 0              # 重新抓取详情的商品数
+    refresh_failed: int = 0         # 详情抓取失败、沿用旧数据的商品数
+    delisted: int = 0               # 已下架的商品数
+    crawled: int = 0                # 全量搜索得到的商品数
+    searched_platforms: list = field(default_factory=list)
+    skipped_searches: int = 0       # 省掉的搜索请求数（按平台页数计）
+    elapsed: float = 0.0
+    crawl: object = None            # CrawlResult（有全量搜索时）
+
+    @property
+    def saved_fetches(self) -> int:
+        """节省的抓取次数：直接使用的目录商品 + 省掉的搜索请求"""
+        return self.from_catalog + self.skipped_searches
+
+    def summary(self) -> str:
+        searched = ", ".join(self.searched_platforms) or "无"
+        return (f"【商品目录】共 {len(self.candidates)} 个候选: 目录直接命中 {self.from_catalog}, "
+                f"重新抓取 {self.refreshed}（失败 {self.refresh_failed}, 下架 {self.delisted}）, "
+                f"全量搜索 {self.crawled}（平台: {searched}）; "
+                f"节省抓取 {self.saved_fetches} 次, 耗时 {self.elapsed:.2f}s")
+
+
+async def _call(func, *args):
+    if inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None)):
+        return await func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+def _merge_crawl(first, second):
+    """合并两次 CrawlResult（先并发搜索的平台 + 重新抓取后补搜的平台）"""
+    first.candidates = first.candidates + second.candidates
+    first.platforms = {**first.platforms, **second.platforms}
+    first.early_exit = first.early_exit or second.early_exit
+    first.elapsed += second.elapsed
+    return first
+
+
+async def search_with_catalog(catalog, query: str, platforms: list, scheduler=None,
+                              refreshers: dict = None, specification: str = None, demand=None,
+                              min_known: int = 5, refresh_concurrency: int = 4,
+                              **crawl_kwargs) -> CatalogSearchResult:
+    """
+    先查目录、再补抓
+
+    Args:
+        catalog: ProductCatalog
+        query: 搜索关键词（商品名称）
+        platforms: 平台列表（简称或 Platform 枚举）
+        scheduler: CrawlScheduler，目录不足时全量搜索用；为空时只使用目录
+        refreshers: {平台: 详情抓取函数 refresh(product_id) -> 候选商品或None(已下架)}
+        specification: 规格要求（参与目录检索）
+        demand: 采购需求（传给 scheduler.crawl 做合格判断）
+        min_known: 目录中某平台有效商品数（含重新抓取成功的）达到该值时，不再搜索该平台
+        refresh_concurrency: 同时重新抓取的详情数
+        **crawl_kwargs: 透传给 scheduler.crawl（min_candidates / grace 等）
+
+    Returns:
+        CatalogSearchResult
+    """
+    started = time.monotonic()
+    result = CatalogSearchResult()
+    keys = list(dict.fromkeys(platform_key(p) for p in platforms))
+    refreshers = {platform_key(p): f for p, f in (refreshers or {}).items()}
+
+    entries = await asyncio.to_thread(catalog.search, query, specification, keys)
+    by_platform = {}
+    for entry in entries:
+        by_platform.setdefault(entry.platform, []).append(entry)
+
+    to_search, to_refresh = [], []
+    usable = {}                     # {平台: 有效商品数}，重新抓取成功后累加
+    for key in keys:
+        fresh, stale = catalog.split_fresh(by_platform.get(key, []))
+        if key not in refreshers:
+            # 无法重新抓取，过期商品不可用
+            stale = []
+        if len(fresh) + len(stale) < min_known:
+            to_search.append(key)
+            continue
+        result.candidates.extend(e.to_candidate() for e in fresh)
+        result.from_catalog += len(fresh)
+        to_refresh.extend(stale)
+        usable[key] = len(fresh)
+
+    async def refresh_all():
+        semaphore = asyncio.Semaphore(max(1, refresh_concurrency))
+
+        async def refresh(entry):
+            async with semaphore:
+                try:
+                    return entry, await _call(refreshers[entry.platform], entry.product_id), None
+                except Exception as e:
+                    return entry, None, e
+
+        return await asyncio.gather(*(refresh(e) for e in to_refresh))
+
+    async def crawl(platforms: list):
+        if not platforms or scheduler is None:
+            return None
+        return await scheduler.crawl(query, platforms, demand=demand, **crawl_kwargs)
+
+    refreshed, crawl_result = await asyncio.gather(refresh_all(), crawl(to_search))
+
+    updated, delisted = [], []
+    for entry, candidate, error in refreshed:
+        if error is not None:
+            # 详情抓取失败，沿用目录中的旧数据（不计入有效商品数）
+            result.refresh_failed += 1
+            result.candidates.append({**entry.to_candidate(), "stale": True})
+        elif candidate is None:
+            result.delisted += 1
+            delisted.append((entry.platform, entry.product_id))
+        else:
+            candidate = dict(candidate) if isinstance(candidate, dict) else dict(vars(candidate))
+            candidate.setdefault("platform", entry.platform)
+            candidate.setdefault("product_id", entry.product_id)
+            result.refreshed += 1
+            result.candidates.append(candidate)
+            updated.append(candidate)
+            usable[entry.platform] += 1
+
+    # 重新抓取后有效商品仍不足的平台补一次全量搜索
+    short = [key for key, n in usable.items() if n < min_known]
+    searched = list(to_search) if crawl_result is not None else []
+    if short and scheduler is not None:
+        seen = {(c.get("platform"), str(c.get("product_id"))) for c in result.candidates if isinstance(c, dict)}
+        extra = await crawl(short)
+        extra.candidates = [c for c in extra.candidates
+                            if not isinstance(c, dict) or (c.get("platform"), str(c.get("product_id"))) not in seen]
+        crawl_result = extra if crawl_result is None else _merge_crawl(crawl_result, extra)
+        searched.extend(short)
+    if scheduler is not None:
+        result.skipped_searches = sum(max(1, scheduler.budget(key).pages) for key in usable if key not in short)
+
+    if crawl_result is not None:
+        result.crawl = crawl_result
+        result.searched_platforms = searched
+        result.crawled = len(crawl_result.candidates)
+        result.candidates.extend(crawl_result.candidates)
+        updated.extend(c for c in crawl_result.candidates if isinstance(c, dict))
+
+    if updated:
+        await asyncio.to_thread(catalog.upsert, updated)
+    if delisted:
+        await asyncio.to_thread(catalog.remove, delisted)
+    result.elapsed = time.monotonic() - started
+    return result
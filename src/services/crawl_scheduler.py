@@ -0,0 +1,319 @@
+"""
+多平台并发爬取调度
+============================================
+
+所选平台同时开始爬取，每个平台有独立的:
+    - 超时时间（整个平台的爬取，含翻页）
+    - 并发上限（同一平台同时在途的请求数）
+    - 令牌桶限流（每秒请求数 / 突发数）
+
+结果边到边处理：合格候选数达到 min_candidates 且至少 min_platforms 个平台返回后，
+再等 grace 秒给快平台收尾，然后取消仍在进行的慢平台，直接返回部分结果，
+不必等最慢的平台。
+
+爬取函数约定:
+    async def fetch(query: str, page: int) -> list   # 返回候选商品（字典）列表
+同步函数会放到线程中执行。
+"""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+
+from src.services.rate_limiter import TokenBucket
+
+
+@dataclass
+class PlatformBudget:
+    """单个平台的爬取预算"""
+    timeout: float = 15.0       # 整个平台的爬取超时（秒）
+    concurrency: int = 2        # 同时在途的请求数
+    rate: float = 1.0           # 每秒请求数
+    burst: float = None         # 令牌桶容量，默认 max(1, rate)
+    pages: int = 1              # 爬取页数
+
+
+DEFAULT_BUDGETS = {
+    "1688": PlatformBudget(timeout=20.0, concurrency=2, rate=0.5, pages=2),
+    "jd": PlatformBudget(timeout=10.0, concurrency=3, rate=2.0, pages=2),
+    "tmall": PlatformBudget(timeout=15.0, concurrency=2, rate=1.0, pages=1),
+    "taobao": PlatformBudget(timeout=15.0, concurrency=2, rate=1.0, pages=1),
+}
+
+# Platform 枚举成员名 → 平台简称
+_ENUM_ALIASES = {
+    "ALIBABA_1688": "1688",
+    "JD_ENTERPRISE": "jd",
+    "TMALL_SUPERMARKET": "tmall",
+}
+
+
+def platform_key(platform) -> str:
+    """平台简称或 Platform 枚举 → 调度器使用的平台键"""
+    if isinstance(platform, str):
+        return platform.lower()
+    name = getattr(platform, "name", None)
+    if name in _ENUM_ALIASES:
+        return _ENUM_ALIASES[name]
+    return str(getattr(platform, "value", platform)).lower()
+
+
+def _field(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def default_quality(demand):
+    """
+    默认的合格候选判断：价格有效且（有预算时）总价不超预算
+    """
+    quantity = int(_field(demand, "quantity") or 1) if demand is not None else 1
+    budget = _field(demand, "budget") if demand is not None else None
+    budget = float(budget) if budget else None
+
+    def is_good(candidate) -> bool:
+        try:
+            price = float(_field(candidate, "unit_price") or _field(candidate, "price") or 0)
+            freight = float(_field(candidate, "freight") or 0)
+        except (TypeError, ValueError):
+            return False
+        if price <= 0:
+            return False
+        return budget is None or price * quantity + freight <= budget
+
+    return is_good
+
+
+@dataclass
+class PlatformOutcome:
+    """单个平台的爬取情况"""
+    platform: str
+    status: str = "pending"     # ok / partial / timeout / error / cancelled / skipped
+    candidates: int = 0
+    good: int = 0
+    requests: int = 0
+    elapsed: float = 0.0
+    rate_wait: float = 0.0
+    first_result: float = None  # 首批结果到达时间（秒）
+    error: str = None
+
+
+@dataclass
+class CrawlResult:
+    """一次多平台爬取的结果"""
+    candidates: list = field(default_factory=list)
+    platforms: dict = field(default_factory=dict)       # {平台: PlatformOutcome}
+    early_exit: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def good_count(self) -> int:
+        return sum(o.good for o in self.platforms.values())
+
+    def summary(self) -> str:
+        lines = [f"【多平台爬取】{len(self.candidates)} 个候选（合格 {self.good_count}），"
+                 f"耗时 {self.elapsed:.2f}s" + ("，提前返回" if self.early_exit else "")]
+        for o in self.platforms.values():
+            extra = f", 错误: {o.error}" if o.error else ""
+            first = f", 首批 {o.first_result:.2f}s" if o.first_result is not None else ""
+            lines.append(f"  {o.platform}: {o.status}, {o.candidates} 个候选（合格 {o.good}）, "
+                         f"{o.requests} 次请求, 耗时 {o.elapsed:.2f}s{first}, "
+                         f"限流等待 {o.rate_wait:.2f}s{extra}")
+        return "\n".join(lines)
+
+
+class CrawlScheduler:
+    """多平台并发爬取调度器"""
+
+    def __init__(self, fetchers: dict, budgets: dict = None):
+        """
+        Args:
+            fetchers: {平台: 爬取函数 fetch(query, page)}
+            budgets: {平台: PlatformBudget}，未配置的平台使用 DEFAULT_BUDGETS 或默认值
+        """
+        self.fetchers = {platform_key(p): f for p, f in fetchers.items()}
+        self.budgets = {**DEFAULT_BUDGETS, **{platform_key(p): b for p, b in (budgets or {}).items()}}
+        # 令牌桶跨多次 crawl 共享，连续的需求也不会超过平台限流
+        self._buckets = {}
+
+    def budget(self, platform: str) -> PlatformBudget:
+        return self.budgets.get(platform) or PlatformBudget()
+
+    def _bucket(self, platform: str) -> TokenBucket:
+        bucket = self._buckets.get(platform)
+        if bucket is None:
+            budget = self.budget(platform)
+            bucket = self._buckets[platform] = TokenBucket(budget.rate, budget.burst)
+        return bucket
+
+    async def _fetch_page(self, platform: str, fetch, query: str, page: int,
+                          semaphore: asyncio.Semaphore, outcome: PlatformOutcome) -> list:
+        async with semaphore:
+            outcome.rate_wait += await self._bucket(platform).acquire()
+            outcome.requests += 1
+            if inspect.iscoroutinefunction(fetch) or inspect.iscoroutinefunction(
+                    getattr(fetch, "__call__", None)):
+                return list(await fetch(query, page) or [])
+            return list(await asyncio.to_thread(fetch, query, page) or [])
+
+    async def _crawl_platform(self, platform: str, query: str, queue: asyncio.Queue,
+                              outcome: PlatformOutcome, started: float):
+        """爬取一个平台的所有页，每页结果到达就放入队列"""
+        budget = self.budget(platform)
+        fetch = self.fetchers[platform]
+        semaphore = asyncio.Semaphore(max(1, budget.concurrency))
+        pending = {
+            asyncio.create_task(self._fetch_page(platform, fetch, query, page, semaphore, outcome))
+            for page in range(1, max(1, budget.pages) + 1)
+        }
+        deadline = time.monotonic() + budget.timeout
+        errors = []
+        received = 0
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(str(task.exception()) or type(task.exception()).__name__)
+                        continue
+                    items = task.result()
+                    received += len(items)
+                    if outcome.first_result is None:
+                        outcome.first_result = time.monotonic() - started
+                    await queue.put((platform, items))
+            if pending:
+                outcome.status = "timeout"
+                outcome.error = f"超过 {budget.timeout}s"
+            elif errors:
+                outcome.status = "partial" if received else "error"
+            else:
+                outcome.status = "ok"
+        except asyncio.CancelledError:
+            outcome.status = "cancelled"
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+            if errors and not outcome.error:
+                outcome.error = "; ".join(errors[:3])
+            outcome.elapsed = time.monotonic() - started
+
+    async def stream(self, query: str, platforms: list = None, result: CrawlResult = None):
+        """
+        并发爬取，按到达顺序产出 (平台, 候选列表)
+
+        调用方停止迭代（break / aclose）时，未完成的平台会被取消。
+
+        Args:
+            query: 搜索关键词
+            platforms: 平台列表，默认所有配置了爬取函数的平台
+            result: 用于记录各平台情况的 CrawlResult
+        """
+        result = result if result is not None else CrawlResult()
+        started = time.monotonic()
+        keys = [platform_key(p) for p in (platforms or list(self.fetchers))]
+        queue = asyncio.Queue()
+        workers = {}
+        for key in dict.fromkeys(keys):
+            outcome = result.platforms[key] = PlatformOutcome(platform=key)
+            if key not in self.fetchers:
+                outcome.status, outcome.error = "skipped", "未配置爬取函数"
+                continue
+            workers[key] = asyncio.create_task(
+                self._crawl_platform(key, query, queue, outcome, started))
+
+        pending = set(workers.values())
+        try:
+            while pending or not queue.empty():
+                if queue.empty():
+                    getter = asyncio.ensure_future(queue.get())
+                    done, _ = await asyncio.wait(pending | {getter}, return_when=asyncio.FIRST_COMPLETED)
+                    pending -= done
+                    if getter not in done:
+                        getter.cancel()
+                        continue
+                    item = getter.result()
+                else:
+                    item = queue.get_nowait()
+                yield item
+        finally:
+            for task in workers.values():
+                task.cancel()
+            await asyncio.gather(*workers.values(), return_exceptions=True)
+            result.elapsed = time.monotonic() - started
+
+    async def crawl(self, query: str, platforms: list = None, demand=None,
+                    min_candidates: int = None, min_platforms: int = 1, grace: float = 0.0,
+                    quality=None, on_candidates=None) -> CrawlResult:
+        """
+        并发爬取所有平台，合格候选足够时提前返回
+
+        Args:
+            query: 搜索关键词
+            platforms: 平台列表（简称或 Platform 枚举）
+            demand: 采购需求（用于默认的合格判断）
+            min_candidates: 合格候选达到该数量即可提前返回，None 表示等所有平台完成
+            min_platforms: 提前返回前至少要有结果的平台数
+            grace: 满足条件后再等待的秒数（让即将完成的平台收尾）
+            quality: 合格判断函数 quality(candidate) -> bool，默认 default_quality(demand)
+            on_candidates: 每批结果到达时的回调 on_candidates(platform, candidates)
+
+        Returns:
+            CrawlResult
+        """
+        result = CrawlResult()
+        is_good = quality or default_quality(demand)
+        responded = set()
+        deadline = None
+        stream = self.stream(query, platforms, result)
+        # 等待下一批结果的任务跨循环保留：收尾等待超时只是停止等待，不会取消进行中的 __anext__，
+        # 只有最终放弃（提前返回）时才取消它并关闭生成器
+        next_item = None
+        try:
+            while True:
+                if next_item is None:
+                    next_item = asyncio.ensure_future(stream.__anext__())
+                if deadline is not None:
+                    done, _ = await asyncio.wait({next_item}, timeout=max(0.0, deadline - time.monotonic()))
+                    if not done:
+                        result.early_exit = True
+                        break
+                try:
+                    platform, items = await next_item
+                except StopAsyncIteration:
+                    break
+                finally:
+                    if next_item.done():
+                        next_item = None
+
+                outcome = result.platforms[platform]
+                good = sum(1 for c in items if is_good(c))
+                outcome.candidates += len(items)
+                outcome.good += good
+                for c in items:
+                    if isinstance(c, dict) and "platform" not in c:
+                        c["platform"] = platform
+                result.candidates.extend(items)
+                if items:
+                    responded.add(platform)
+                if on_candidates is not None:
+                    on_candidates(platform, items)
+
+                if (deadline is None and min_candidates is not None
+                        and result.good_count >= min_candidates and len(responded) >= min_platforms):
+                    if grace <= 0:
+                        result.early_exit = True
+                        break
+                    deadline = time.monotonic() + grace
+        finally:
+            if next_item is not None:
+                next_item.cancel()
+                await asyncio.gather(next_item, return_exceptions=True)
+            await stream.aclose()
+        # 提前返回时被取消的平台之外，其余平台都已结束
+        if not result.early_exit:
+            result.early_exit = any(o.status == "cancelled" for o in result.platforms.values())
+        return result
@@ -0,0 +1,114 @@
+"""
+看板缓存（Streamlit）
+============================================
+
+在 Streamlit 页面中使用，替代每次重跑都直接查询数据库:
+
+    - 连接池和查询对象用 st.cache_resource 在整个 Streamlit 进程内共享一份
+    - 查询结果用 st.cache_data 缓存，数据域的版本号是缓存键的一部分:
+      工作流进程中的 DashboardInvalidator 更新版本号后，下一次重跑自动重新查询；
+      其他途径写库（手工修改、外部系统）由 DASHBOARD_CACHE_TTL 兜底（默认60秒）
+
+用法（src/app.py）:
+    from src.services import dashboard_cache as dc
+
+    summary = dc.order_summary()
+    page = dc.orders_page(status="paid", cursor=st.session_state.get("order_cursor"))
+    st.dataframe(page.rows)
+"""
+import os
+
+import streamlit as st
+
+from src.services.dashboard_data import (
+    DashboardQueries, DataVersion, DOMAIN_ALERTS, DOMAIN_INVENTORY, DOMAIN_ORDERS
+)
+
+CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+# 每个查询最多缓存的条目（不同筛选条件 / 页 / 版本各占一条）
+MAX_ENTRIES = 200
+
+
+@st.cache_resource
+def get_queries() -> DashboardQueries:
+    """进程内共享的查询对象（连接池随之共享；分页索引由 --init-db 的迁移脚本创建）"""
+    return DashboardQueries()
+
+
+@st.cache_resource
+def get_version() -> DataVersion:
+    return DataVersion()
+
+
+def refresh():
+    """手动刷新：清空所有查询缓存"""
+    st.cache_data.clear()
+
+
+# ---------- 订单 ----------
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _order_summary(version: str) -> dict:
+    return get_queries().order_summary()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _orders_page(version: str, status: str, keyword: str, cursor, page_size: int):
+    return get_queries().orders_page(status=status, keyword=keyword, cursor=cursor, page_size=page_size)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _count_orders(version: str, status: str, keyword: str) -> int:
+    return get_queries().count_orders(status=status, keyword=keyword)
+
+
+def order_summary() -> dict:
+    return _order_summary(get_version().get(DOMAIN_ORDERS))
+
+
+def orders_page(status: str = None, keyword: str = None, cursor=None, page_size: int = 50):
+    return _orders_page(get_version().get(DOMAIN_ORDERS), status, keyword, cursor, page_size)
+
+
+def count_orders(status: str = None, keyword: str = None) -> int:
+    return _count_orders(get_version().get(DOMAIN_ORDERS), status, keyword)
+
+
+# ---------- 库存 ----------
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _inventory_summary(version: str) -> dict:
+    return get_queries().inventory_summary()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _low_stock(version: str, limit: int):
+    return get_queries().low_stock(limit=limit)
+
+
+def inventory_summary() -> dict:
+    return _inventory_summary(get_version().get(DOMAIN_INVENTORY))
+
+
+def low_stock(limit: int = 100):
+    return _low_stock(get_version().get(DOMAIN_INVENTORY), limit)
+
+
+# ---------- 预警 ----------
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _count_alerts(version: str) -> int:
+    return get_queries().count_alerts()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def _alerts_page(version: str, cursor, page_size: int):
+    return get_queries().alerts_page(cursor=cursor, page_size=page_size)
+
+
+def count_alerts() -> int:
+    return _count_alerts(get_version().get(DOMAIN_ALERTS))
+
+
+def alerts_page(cursor=None, page_size: int = 50):
+    return _alerts_page(get_version().get(DOMAIN_ALERTS), cursor, page_size)
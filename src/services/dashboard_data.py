@@ -0,0 +1,290 @@
+"""
+看板数据层
+============================================
+
+Streamlit 每次交互都会重跑整个脚本，订单、库存、预警页面每次都全表查询 MySQL 再构建 DataFrame，
+表到十万行以上后界面明显卡顿。看板数据层把查询和缓存拆开:
+
+    - DashboardQueries  只做服务端聚合和分页查询，不依赖 streamlit:
+          汇总    一条 GROUP BY / 条件聚合语句返回计数、金额、低库存数
+          分页    按主键的游标分页（id < 上一页最后一个 id），翻到后面的页也不需要 OFFSET 扫描
+          SQL     构造时按数据库占位符生成一次，之后只传参数
+    - DataVersion       各数据域（订单 / 库存 / 预警）的版本号，每个数据域一个小文件，
+                        跨进程共享（工作流在命令行或批量进程中运行，看板在 Streamlit 进程中）
+    - DashboardInvalidator  ProgressBus 订阅者：下单、物流、入库等步骤结束时更新对应数据域的版本，
+                        看板的缓存以版本号为键，版本变化后下一次重跑自动重新查询
+
+Streamlit 端的缓存封装见 dashboard_cache.py（st.cache_resource 共享连接池，st.cache_data 缓存查询结果）。
+
+用法:
+    bus.subscribe(DashboardInvalidator())           # 工作流进程
+    queries = DashboardQueries(get_connection_factory())
+    page = queries.orders_page(status="paid", page_size=50)
+    next_page = queries.orders_page(status="paid", cursor=page.next_cursor)
+"""
+import os
+import time
+from dataclasses import dataclass, field
+
+from src.repositories.connection_pool import get_connection_factory
+from src.services.progress_bus import Subscriber, DROP_OLDEST
+from src.services.workflow_checkpoint import STAGE_ORDER, STAGE_STOCK, STAGE_TRACK
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_VERSION_DIR = os.path.join(_PROJECT_ROOT, "data", "dashboard_version")
+# 分页和聚合用到的索引由 --init-db 执行的迁移脚本创建，看板本身不执行 DDL
+INDEX_MIGRATION = os.path.join(_PROJECT_ROOT, "database", "migrations", "001_dashboard_indexes.sql")
+
+DOMAIN_ORDERS = "orders"
+DOMAIN_INVENTORY = "inventory"
+DOMAIN_ALERTS = "alerts"
+DOMAINS = (DOMAIN_ORDERS, DOMAIN_INVENTORY, DOMAIN_ALERTS)
+
+# 步骤结束后可能变化的数据域（步骤名与编排器进度回调一致）
+DEFAULT_STEP_DOMAINS = {
+    STAGE_ORDER: (DOMAIN_ORDERS,),
+    STAGE_TRACK: (DOMAIN_ORDERS, DOMAIN_ALERTS),
+    STAGE_STOCK: (DOMAIN_INVENTORY, DOMAIN_ALERTS, DOMAIN_ORDERS),
+}
+
+
+# ---------- 数据版本 ----------
+
+class DataVersion:
+    """
+    各数据域的版本号（data/dashboard_version/<数据域>，内容为纳秒时间戳）
+
+    每个数据域单独一个文件，写入用临时文件 + os.replace，多个进程同时更新不同数据域互不覆盖。
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: 版本目录，默认读取 DASHBOARD_VERSION_DIR，再默认 data/dashboard_version
+        """
+        self.path = path or os.getenv("DASHBOARD_VERSION_DIR", DEFAULT_VERSION_DIR)
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, domain: str) -> str:
+        """当前版本号（从未更新过时为 "0"）"""
+        try:
+            with open(os.path.join(self.path, domain), "r", encoding="ascii") as f:
+                return f.read().strip() or "0"
+        except FileNotFoundError:
+            return "0"
+
+    def snapshot(self) -> dict:
+        return {domain: self.get(domain) for domain in DOMAINS}
+
+    def bump(self, *domains: str):
+        """更新数据域的版本号，看板下一次重跑时重新查询"""
+        version = str(time.time_ns())
+        for domain in domains:
+            target = os.path.join(self.path, domain)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="ascii") as f:
+                f.write(version)
+            os.replace(tmp, target)
+
+
+class DashboardInvalidator(Subscriber):
+    """步骤结束时更新相关数据域的版本号（同一数据域最短间隔 min_interval 秒，关闭时补发）"""
+
+    name = "dashboard"
+    queue_size = 1000
+    policy = DROP_OLDEST
+
+    def __init__(self, version: DataVersion = None, step_domains: dict = None, min_interval: float = 1.0):
+        """
+        Args:
+            version: DataVersion，默认 data/dashboard_version
+            step_domains: {步骤名: (数据域, ...)}，默认 DEFAULT_STEP_DOMAINS
+            min_interval: 批量执行时步骤结束很频繁，同一数据域两次更新的最短间隔（秒）
+        """
+        self.version = version or DataVersion()
+        self.step_domains = step_domains or DEFAULT_STEP_DOMAINS
+        self.min_interval = min_interval
+        self._last = {}
+        self._pending = set()
+        self.bumps = 0
+
+    async def handle(self, event):
+        await self.handle_batch([event])
+
+    async def handle_batch(self, events: list):
+        for event in events:
+            if event.status in ("completed", "failed"):
+                self._pending.update(self.step_domains.get(event.step, ()))
+        self._flush(force=False)
+
+    def _flush(self, force: bool):
+        now = time.monotonic()
+        due = [d for d in self._pending if force or now - self._last.get(d, float("-inf")) >= self.min_interval]
+        if not due:
+            return
+        try:
+            self.version.bump(*due)
+        except OSError as e:
+            print(f"⚠️ 看板数据版本更新失败: {e}")
+            return
+        self.bumps += 1
+        for domain in due:
+            self._last[domain] = now
+            self._pending.discard(domain)
+
+    async def close(self):
+        self._flush(force=True)
+
+
+# ---------- 查询 ----------
+
+@dataclass
+class DashboardSchema:
+    """看板用到的表和列"""
+    order_table: str = "order_table"
+    order_key: str = "id"
+    order_status: str = "status"
+    order_amount: str = "total_amount"
+    order_search: tuple = ("order_no", "product_name")      # 关键字搜索的列
+    inventory_table: str = "inventory_table"
+    inventory_sku: str = "sku_id"
+    inventory_quantity: str = "quantity"
+    inventory_threshold: str = "alert_threshold"
+    alert_table: str = "alert_table"
+    alert_key: str = "id"
+
+
+@dataclass
+class Page:
+    """一页查询结果"""
+    rows: list = field(default_factory=list)    # [{列名: 值}]
+    columns: list = field(default_factory=list)
+    next_cursor: object = None                  # 下一页的游标，None 表示没有下一页
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+class DashboardQueries:
+    """看板的聚合与分页查询（线程安全：每次查询从连接池借一个连接）"""
+
+    def __init__(self, factory=None, schema: DashboardSchema = None):
+        """
+        Args:
+            factory: ConnectionFactory，默认进程内共享的连接工厂
+            schema: 表和列名，默认 DashboardSchema()
+        """
+        self.factory = factory or get_connection_factory()
+        self.schema = s = schema or DashboardSchema()
+        ph = self.factory.placeholder
+        self._ph = ph
+        self._sql = {
+            "order_summary": (f"SELECT {s.order_status}, COUNT(*), COALESCE(SUM({s.order_amount}), 0)"
+                              f" FROM {s.order_table} GROUP BY {s.order_status}"),
+            "inventory_summary": (
+                f"SELECT COUNT(*), COALESCE(SUM({s.inventory_quantity}), 0),"
+                f" COALESCE(SUM(CASE WHEN {s.inventory_threshold} > 0"
+                f" AND {s.inventory_quantity} < {s.inventory_threshold} THEN 1 ELSE 0 END), 0)"
+                f" FROM {s.inventory_table}"),
+            "low_stock": (f"SELECT * FROM {s.inventory_table}"
+                          f" WHERE {s.inventory_threshold} > 0 AND {s.inventory_quantity} < {s.inventory_threshold}"
+                          f" ORDER BY {s.inventory_quantity} - {s.inventory_threshold}, {s.inventory_sku} LIMIT {ph}"),
+            "alert_count": f"SELECT COUNT(*) FROM {s.alert_table}",
+        }
+
+    def _query(self, sql: str, params: tuple = ()) -> tuple:
+        """返回 (列名, 行)"""
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            columns = [d[0] for d in cursor.description]
+            cursor.close()
+        return columns, rows
+
+    def _order_filter(self, status: str = None, keyword: str = None) -> tuple:
+        """订单筛选条件 → (WHERE 子句列表, 参数)"""
+        s, ph = self.schema, self._ph
+        where, params = [], []
+        if status:
+            where.append(f"{s.order_status} = {ph}")
+            params.append(status)
+        if keyword:
+            where.append("(" + " OR ".join(f"{col} LIKE {ph}" for col in s.order_search) + ")")
+            params.extend([f"%{keyword}%"] * len(s.order_search))
+        return where, params
+
+    def _page(self, table: str, key: str, where: list, params: list, cursor, page_size: int) -> Page:
+        """按主键倒序的游标分页（多取一行判断是否还有下一页）"""
+        where = list(where)
+        params = list(params)
+        if cursor is not None:
+            where.append(f"{key} < {self._ph}")
+            params.append(cursor)
+        sql = f"SELECT * FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {key} DESC LIMIT {self._ph}"
+        columns, rows = self._query(sql, (*params, page_size + 1))
+        rows = [dict(zip(columns, row)) for row in rows]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = rows[-1][key]
+        return Page(rows=rows, columns=columns, next_cursor=next_cursor)
+
+    # ---------- 订单 ----------
+
+    def order_summary(self) -> dict:
+        """{"total", "amount", "by_status": [{"status", "count", "amount"}]}"""
+        _, rows = self._query(self._sql["order_summary"])
+        by_status = sorted(({"status": status, "count": int(count), "amount": float(amount)}
+                            for status, count, amount in rows), key=lambda r: -r["count"])
+        return {"total": sum(r["count"] for r in by_status),
+                "amount": round(sum(r["amount"] for r in by_status), 2),
+                "by_status": by_status}
+
+    def orders_page(self, status: str = None, keyword: str = None, cursor=None, page_size: int = 50) -> Page:
+        """
+        订单分页（最新的在前）
+
+        Args:
+            status: 只看该状态
+            keyword: 订单号或商品名包含的关键字
+            cursor: 上一页的 next_cursor，None 表示第一页
+            page_size: 每页行数
+        """
+        where, params = self._order_filter(status, keyword)
+        return self._page(self.schema.order_table, self.schema.order_key, where, params, cursor, page_size)
+
+    def count_orders(self, status: str = None, keyword: str = None) -> int:
+        where, params = self._order_filter(status, keyword)
+        sql = f"SELECT COUNT(*) FROM {self.schema.order_table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        _, rows = self._query(sql, tuple(params))
+        return int(rows[0][0])
+
+    # ---------- 库存 ----------
+
+    def inventory_summary(self) -> dict:
+        """{"skus", "quantity", "low_stock"}"""
+        _, rows = self._query(self._sql["inventory_summary"])
+        skus, quantity, low = rows[0]
+        return {"skus": int(skus), "quantity": int(quantity or 0), "low_stock": int(low or 0)}
+
+    def low_stock(self, limit: int = 100) -> Page:
+        """低于预警阈值的库存（缺口最大的在前）"""
+        columns, rows = self._query(self._sql["low_stock"], (limit,))
+        return Page(rows=[dict(zip(columns, row)) for row in rows], columns=columns)
+
+    # ---------- 预警 ----------
+
+    def count_alerts(self) -> int:
+        _, rows = self._query(self._sql["alert_count"])
+        return int(rows[0][0])
+
+    def alerts_page(self, cursor=None, page_size: int = 50) -> Page:
+        """预警记录分页（最新的在前）"""
+        return self._page(self.schema.alert_table, self.schema.alert_key, [], [], cursor, page_size)
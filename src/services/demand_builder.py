@@ -0,0 +1,54 @@
+"""
+采购需求构建
+============================================
+
+把命令行/批量文件中的原始参数转换为 PurchaseDemand。
+"""
+from decimal import Decimal
+
+# 命令行平台简称，顺序即默认优先级
+PLATFORM_ALIASES = ("1688", "jd", "tmall")
+DEFAULT_PLATFORMS = ["1688", "jd"]
+
+
+def resolve_platforms(platforms: list = None) -> list:
+    """
+    将平台简称列表转换为 Platform 枚举列表
+
+    Args:
+        platforms: 平台简称列表（1688 / jd / tmall），为空时使用默认平台
+    """
+    from src.models.enums import Platform
+
+    platform_map = {
+        "1688": Platform.ALIBABA_1688,
+        "jd": Platform.JD_ENTERPRISE,
+        "tmall": Platform.TMALL_SUPERMARKET
+    }
+    if platforms is None:
+        return [Platform.ALIBABA_1688, Platform.JD_ENTERPRISE]
+    return [platform_map.get(p.lower(), Platform.ALIBABA_1688) for p in platforms]
+
+
+def build_purchase_demand(product_name: str, quantity: int, budget: float = None,
+                          specification: str = None, platforms: list = None):
+    """
+    构建采购需求
+
+    Args:
+        product_name: 商品名称
+        quantity: 采购数量
+        budget: 预算上限（可选）
+        specification: 规格要求（可选）
+        platforms: 优先平台简称列表（可选）
+    """
+    from src.models.demand import PurchaseDemand
+
+    return PurchaseDemand(
+        product_name=product_name,
+        specification=specification,
+        quantity=quantity,
+        budget=Decimal(str(budget)) if budget else None,
+        preferred_platforms=resolve_platforms(platforms),
+        additional_requirements=None
+    )
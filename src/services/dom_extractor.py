@@ -0,0 +1,467 @@
+"""
+单次遍历DOM提取引擎
+============================================
+
+把声明式的选择器规则编译成一段 JavaScript，在页面中用一次 TreeWalker
+遍历完成所有规则的匹配。每条规则有自己的配额，全部规则达到配额后立即停止遍历，
+避免对 2 万+ 节点的 1688 详情页反复执行 querySelectorAll('*')。
+
+规则匹配方式（三选一）:
+    selector       CSS选择器，使用 Element.matches 判断
+    class_keyword  className 包含关键词（忽略大小写）
+    data_keyword   data-* 属性名包含关键词（忽略大小写，可用元组指定多个）；
+                   同一元素上每个命中的属性各算一条，dataKey 与 element.dataset 的键名一致（驼峰）
+
+用法:
+    extractor = DomExtractor(SKU_ANALYSIS_RULES)
+    result = extractor.run(driver)
+    analysis = to_sku_analysis(result)
+"""
+import json
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class ExtractRule:
+    """单条提取规则"""
+    name: str                   # 规则名（结果中的键，唯一）
+    group: str                  # 所属分组，如 skuContainers
+    selector: str = None
+    class_keyword: str = None
+    data_keyword: object = None     # str 或 str 元组
+    limit: int = 1              # 采集配额，达到后该规则不再参与匹配
+    fields: tuple = ("tag",)    # 采集字段: tag/className/text/firstLine/html/rect
+    count_all: bool = False     # 达到配额后继续计数（会阻止提前结束遍历）
+
+    @property
+    def pattern(self) -> str:
+        """规则的可读描述"""
+        if self.selector:
+            return self.selector
+        if self.class_keyword:
+            return f"class~{self.class_keyword}"
+        return "data-*~" + "|".join(_keywords(self.data_keyword))
+
+
+def _keywords(value) -> tuple:
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+# ========== debug_1688_page.py 使用的SKU结构分析规则 ==========
+_CONTAINER_SELECTORS = (
+    '[class*="obj-sku"]',
+    '[class*="sku-wrapper"]',
+    '[class*="skuList"]',
+    '[class*="sku-list"]',
+    '[data-spm*="sku"]',
+    '[class*="detail-sku"]',
+    '[class*="offer-sku"]',
+)
+_ITEM_SELECTORS = (
+    '[class*="obj-content"]',
+    '[class*="obj-item"]',
+    '[class*="sku-item"]',
+    '[class*="prop-item"]',
+)
+_CLICKABLE_SELECTORS = (
+    '[class*="obj-item"]:not([class*="disabled"])',
+    '[class*="sku-item"]:not([class*="disabled"])',
+    'span[class*="item"]',
+    'a[class*="item"]',
+)
+
+SKU_ANALYSIS_RULES = tuple(
+    [ExtractRule(f"container:{s}", "skuContainers", selector=s, limit=1, fields=("html",))
+     for s in _CONTAINER_SELECTORS]
+    + [ExtractRule(f"item:{s}", "skuItems", selector=s, limit=5, fields=("text",))
+       for s in _ITEM_SELECTORS]
+    + [ExtractRule(f"clickable:{s}", "clickableItems", selector=s, limit=10,
+                   fields=("firstLine", "className", "rect"))
+       for s in _CLICKABLE_SELECTORS]
+    + [ExtractRule("title", "pageInfo", selector='[class*="title"], h1, .mod-detail-title',
+                   limit=1, fields=("text",))]
+)
+
+# ========== debug_1688_v2.py 使用的关键词搜索规则 ==========
+SKU_KEYWORDS = ("sku", "spec", "prop", "attr", "option", "select", "color", "size")
+
+# 购买区域按优先级排列，取第一个命中的
+BUY_AREA_SELECTORS = (
+    '[class*="detail-buy"]',
+    '[class*="buy-area"]',
+    '[class*="purchase"]',
+    '[class*="order-area"]',
+    '[class*="mod-detail"]',
+    '[class*="offer-detail"]',
+)
+
+SKU_KEYWORD_RULES = tuple(
+    [ExtractRule(f"class:{k}", "byClass", class_keyword=k, limit=3,
+                 fields=("tag", "className", "text"))
+     for k in SKU_KEYWORDS]
+    # 与原脚本一致：两个关键词共用 5 条配额，按文档顺序采集
+    + [ExtractRule("data:sku-spec", "byDataAttr", data_keyword=("sku", "spec"), limit=5, fields=("tag",))]
+    + [ExtractRule(f"buy:{s}", "buyArea", selector=s, limit=1, fields=("html", "text"))
+       for s in BUY_AREA_SELECTORS]
+)
+
+
+_EXTRACT_SCRIPT_TEMPLATE = r"""
+var rules = %s;
+var root = document.documentElement;
+var t0 = performance.now();
+var out = [];
+var done = [];
+for (var i = 0; i < rules.length; i++) {
+    out.push({count: 0, items: []});
+    done.push(false);
+}
+var pending = rules.length;
+
+function pick(el, fields, extra) {
+    var o = {};
+    for (var j = 0; j < fields.length; j++) {
+        switch (fields[j]) {
+            case 'tag': o.tag = el.tagName; break;
+            case 'className':
+                o.className = (typeof el.className === 'string' ? el.className : '').substring(0, 100);
+                break;
+            case 'text': o.text = (el.innerText || '').substring(0, 500); break;
+            case 'firstLine': o.text = (el.innerText || '').split('\n')[0].substring(0, 50); break;
+            case 'html': o.html = el.outerHTML.substring(0, 2000); break;
+            case 'rect':
+                var r = el.getBoundingClientRect();
+                o.visible = r.width > 0 && r.height > 0;
+                o.position = {top: r.top, left: r.left};
+                break;
+        }
+    }
+    if (extra) {
+        o.dataKey = extra.key;
+        o.dataValue = extra.value.substring(0, 50);
+    }
+    return o;
+}
+
+var walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT);
+var node = root;
+var visited = 0;
+while (node && pending > 0) {
+    visited++;
+    var cls = null;
+    for (var i = 0; i < rules.length; i++) {
+        if (done[i]) continue;
+        var r = rules[i];
+        var hit = false;
+        if (r.d) {
+            if (!node.attributes.length) continue;
+            var o = out[i];
+            var attrs = node.attributes;
+            for (var a = 0; a < attrs.length; a++) {
+                var an = attrs[a].name;
+                if (an.lastIndexOf('data-', 0) !== 0) continue;
+                var key = an.substring(5).replace(/-([a-z])/g, function(m, ch) { return ch.toUpperCase(); });
+                var lower = key.toLowerCase();
+                for (var d = 0; d < r.d.length; d++) {
+                    if (lower.indexOf(r.d[d]) !== -1) {
+                        o.count++;
+                        if (o.items.length < r.n) {
+                            o.items.push(pick(node, r.f, {key: key, value: attrs[a].value}));
+                        }
+                        break;
+                    }
+                }
+            }
+            if (o.count >= r.n && !r.c) {
+                done[i] = true;
+                pending--;
+            }
+            continue;
+        }
+        if (r.s) {
+            hit = node.matches(r.s);
+        } else if (r.k) {
+            if (cls === null) {
+                cls = typeof node.className === 'string' ? node.className.toLowerCase() : '';
+            }
+            hit = cls.length > 0 && cls.indexOf(r.k) !== -1;
+        }
+        if (!hit) continue;
+        var o = out[i];
+        o.count++;
+        if (o.items.length < r.n) o.items.push(pick(node, r.f, null));
+        if (o.count >= r.n && !r.c) {
+            done[i] = true;
+            pending--;
+        }
+    }
+    node = walker.nextNode();
+}
+
+return {
+    rules: out,
+    visited: visited,
+    stoppedEarly: pending === 0 && node !== null,
+    elapsedMs: performance.now() - t0,
+    url: window.location.href
+};
+"""
+
+
+@lru_cache(maxsize=32)
+def compile_rules(rules: tuple) -> str:
+    """
+    把规则编译成可直接传给 driver.execute_script 的脚本
+
+    Args:
+        rules: ExtractRule 元组（元组可哈希，编译结果会被缓存）
+    """
+    names = [r.name for r in rules]
+    if len(names) != len(set(names)):
+        raise ValueError("提取规则名称必须唯一")
+    compact = []
+    for r in rules:
+        if sum(bool(x) for x in (r.selector, r.class_keyword, r.data_keyword)) != 1:
+            raise ValueError(f"规则 {r.name} 必须且只能指定一种匹配方式")
+        compact.append({
+            "s": r.selector,
+            "k": r.class_keyword.lower() if r.class_keyword else None,
+            "d": [k.lower() for k in _keywords(r.data_keyword)] if r.data_keyword else None,
+            "n": r.limit,
+            "f": list(r.fields),
+            "c": r.count_all,
+        })
+    return _EXTRACT_SCRIPT_TEMPLATE % json.dumps(compact, ensure_ascii=False)
+
+
+class DomExtractor:
+    """DOM提取器：一次遍历执行一组规则"""
+
+    def __init__(self, rules: tuple):
+        self.rules = tuple(rules)
+        self.script = compile_rules(self.rules)
+
+    def run(self, driver) -> dict:
+        """
+        在当前页面执行提取
+
+        Returns:
+            {
+                "matches": {规则名: {"group", "pattern", "count", "exact", "items"}},
+                "stats": {"visited", "stoppedEarly", "elapsedMs", "url"}
+            }
+        """
+        raw = driver.execute_script(self.script)
+        return self._wrap(raw)
+
+    def run_html(self, html: str, url: str = "") -> dict:
+        """
+        在静态 HTML 上执行同一组规则（离线回放用，基于 lxml，无需浏览器）
+
+        与浏览器中的结果相比: 没有布局信息（visible/position 为 None），
+        文本按文本节点拼接近似 innerText。
+        """
+        import lxml.html
+
+        started = time.perf_counter()
+        root = lxml.html.document_fromstring(html)
+        raw_rules = [{"count": 0, "items": []} for _ in self.rules]
+
+        # CSS选择器规则：编译后整体查询，结果按文档顺序排列
+        scan = []
+        for i, rule in enumerate(self.rules):
+            if rule.selector:
+                elems = _css(rule.selector)(root)
+                raw_rules[i] = {"count": len(elems),
+                                "items": [_pick_lxml(el, rule.fields) for el in elems[:rule.limit]]}
+            else:
+                scan.append(i)
+
+        # 关键词/data属性规则：单次遍历，配额满后提前结束
+        visited = 0
+        pending = len(scan)
+        stopped_early = False
+        if scan:
+            for el in root.iter():
+                if not isinstance(el.tag, str):
+                    continue
+                if pending == 0:
+                    stopped_early = True
+                    break
+                visited += 1
+                cls = None
+                for i in scan:
+                    rule = self.rules[i]
+                    res = raw_rules[i]
+                    if res["count"] >= rule.limit and not rule.count_all:
+                        continue
+                    if rule.class_keyword:
+                        if cls is None:
+                            cls = (el.get("class") or "").lower()
+                        if rule.class_keyword.lower() not in cls:
+                            continue
+                        res["count"] += 1
+                        if len(res["items"]) < rule.limit:
+                            res["items"].append(_pick_lxml(el, rule.fields))
+                    else:
+                        keywords = [k.lower() for k in _keywords(rule.data_keyword)]
+                        for name, value in el.attrib.items():
+                            if not name.startswith("data-"):
+                                continue
+                            key = _DATASET_KEY_RE.sub(lambda m: m.group(1).upper(), name[5:])
+                            if not any(k in key.lower() for k in keywords):
+                                continue
+                            res["count"] += 1
+                            if len(res["items"]) < rule.limit:
+                                res["items"].append(_pick_lxml(el, rule.fields, (key, value)))
+                    if res["count"] >= rule.limit and not rule.count_all:
+                        pending -= 1
+
+        wrapped = self._wrap({
+            "rules": raw_rules,
+            "visited": visited,
+            "stoppedEarly": False,
+            "elapsedMs": (time.perf_counter() - started) * 1000,
+            "url": url,
+        })
+        # 选择器规则整体查询，计数总是精确的；扫描类规则满配额后不再计数，由 _wrap 标记
+        wrapped["stats"]["stoppedEarly"] = stopped_early
+        for i, rule in enumerate(self.rules):
+            if rule.selector:
+                wrapped["matches"][rule.name]["exact"] = True
+        return wrapped
+
+    def _wrap(self, raw: dict) -> dict:
+        stopped_early = bool(raw.get("stoppedEarly"))
+        matches = {}
+        for rule, res in zip(self.rules, raw.get("rules", [])):
+            matches[rule.name] = {
+                "group": rule.group,
+                "pattern": rule.pattern,
+                "count": res["count"],
+                # 规则满配额后不再计数（无论遍历是否提前结束），此时计数只是下限
+                "exact": rule.count_all or res["count"] < rule.limit,
+                "items": res["items"],
+            }
+        return {
+            "matches": matches,
+            "stats": {
+                "visited": raw.get("visited", 0),
+                "stoppedEarly": stopped_early,
+                "elapsedMs": raw.get("elapsedMs", 0.0),
+                "url": raw.get("url", ""),
+            },
+        }
+
+
+# data-sku-id → skuId（与 element.dataset 的键名转换一致）
+_DATASET_KEY_RE = re.compile(r"-([a-z])")
+
+
+@lru_cache(maxsize=128)
+def _css(selector: str):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(selector)
+
+
+def _inner_text(el) -> str:
+    """近似 innerText：跳过脚本/样式/注释，按文本节点换行拼接"""
+    parts = []
+
+    def walk(node):
+        if node.text and node.tag not in ("script", "style"):
+            parts.append(node.text.strip())
+        for child in node:
+            if isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    walk(el)
+    return "\n".join(p for p in parts if p)
+
+
+def _pick_lxml(el, fields: tuple, extra: tuple = None) -> dict:
+    """lxml 版本的字段采集，与页面内 pick() 保持相同的字段和截断长度"""
+    import lxml.html
+
+    o = {}
+    for name in fields:
+        if name == "tag":
+            o["tag"] = el.tag.upper()
+        elif name == "className":
+            o["className"] = (el.get("class") or "")[:100]
+        elif name == "text":
+            o["text"] = _inner_text(el)[:500]
+        elif name == "firstLine":
+            o["text"] = _inner_text(el).split("\n")[0][:50]
+        elif name == "html":
+            o["html"] = lxml.html.tostring(el, encoding="unicode", with_tail=False)[:2000]
+        elif name == "rect":
+            o["visible"] = None
+            o["position"] = None
+    if extra:
+        o["dataKey"], o["dataValue"] = extra[0], extra[1][:50]
+    return o
+
+
+def _group(result: dict, group: str) -> list:
+    return [m for m in result["matches"].values() if m["group"] == group and m["count"] > 0]
+
+
+def to_sku_analysis(result: dict) -> dict:
+    """把 SKU_ANALYSIS_RULES 的提取结果转换为 debug_1688_page.py 的 analysis 结构"""
+    title = _group(result, "pageInfo")
+    return {
+        "skuContainers": [
+            {"selector": m["pattern"], "count": m["count"], "exact": m["exact"],
+             "html": m["items"][0].get("html", "")}
+            for m in _group(result, "skuContainers")
+        ],
+        "skuItems": [
+            {"selector": m["pattern"], "count": m["count"], "exact": m["exact"],
+             "sampleTexts": [it.get("text", "")[:100] for it in m["items"]]}
+            for m in _group(result, "skuItems")
+        ],
+        "clickableItems": [
+            {"selector": m["pattern"], "count": m["count"], "exact": m["exact"],
+             "items": m["items"]}
+            for m in _group(result, "clickableItems")
+        ],
+        "pageInfo": {
+            "title": title[0]["items"][0].get("text", "")[:100] if title else "未找到标题",
+            "url": result["stats"]["url"],
+        },
+    }
+
+
+def to_keyword_search(result: dict) -> dict:
+    """把 SKU_KEYWORD_RULES 的提取结果转换为 debug_1688_v2.py 的结构"""
+    by_class = {k: [] for k in SKU_KEYWORDS}
+    for m in _group(result, "byClass"):
+        keyword = m["pattern"].split("~", 1)[1]
+        by_class[keyword] = [
+            {"tag": it.get("tag"), "class": it.get("className", ""), "text": it.get("text", "")[:100]}
+            for it in m["items"]
+        ]
+
+    by_data = []
+    for m in _group(result, "byDataAttr"):
+        for it in m["items"]:
+            if len(by_data) < 5:
+                by_data.append(it)
+
+    buy_area = None
+    for selector in BUY_AREA_SELECTORS:
+        match = result["matches"].get(f"buy:{selector}")
+        if match and match["count"] > 0:
+            item = match["items"][0]
+            buy_area = {"selector": selector, "html": item.get("html", ""),
+                        "text": item.get("text", "")}
+            break
+
+    return {"byClass": by_class, "byDataAttr": by_data, "buyArea": buy_area}
+
@@ -0,0 +1,356 @@
+"""
+Chrome 浏览器会话池
+============================================
+
+调试脚本和 Selenium 下单流程共用的浏览器会话池:
+    - 统一的反自动化检测配置（启动参数 + CDP 注入脚本）
+    - 预热 N 个会话，借出时做健康检查，失效会话自动重建
+    - 按平台保存/恢复登录 cookies，避免每次重新登录
+    - 会话加载页面数达到上限后回收重建，防止内存持续增长
+
+用法:
+    pool = DriverPool(size=2, headless=True)
+    with pool.session(platform="1688") as session:
+        session.get("https://detail.1688.com/offer/725887578825.html")
+        html = session.driver.page_source
+    pool.close()
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36")
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+COOKIE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "data", "cookies")
+
+# 恢复cookies前需要先打开对应域名
+PLATFORM_HOME = {
+    "1688": "https://www.1688.com/",
+    "jd": "https://b.jd.com/",
+    "tmall": "https://chaoshi.tmall.com/",
+}
+
+
+def build_chrome_options(headless: bool = True, user_agent: str = DEFAULT_USER_AGENT,
+                         profile_dir: str = None) -> Options:
+    """
+    构建统一的Chrome启动参数
+
+    Args:
+        headless: 是否无头模式
+        user_agent: 浏览器UA
+        profile_dir: 用户数据目录（隔离不同账号时使用）
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1440,900")
+    else:
+        chrome_options.add_argument("--start-maximized")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_argument(f"user-agent={user_agent}")
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    return chrome_options
+
+
+def create_driver(headless: bool = True, user_agent: str = DEFAULT_USER_AGENT,
+                  profile_dir: str = None) -> webdriver.Chrome:
+    """创建已注入反检测脚本的Chrome实例"""
+    driver = webdriver.Chrome(options=build_chrome_options(headless, user_agent, profile_dir))
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_SCRIPT})
+    return driver
+
+
+class PooledDriver:
+    """池中的一个浏览器会话"""
+
+    _ids = count(1)
+
+    def __init__(self, driver):
+        self.id = next(self._ids)
+        self.driver = driver
+        self.page_loads = 0
+        self.created_at = time.monotonic()
+        self.cookie_platforms = set()   # 已恢复过cookies的平台
+
+    def get(self, url: str):
+        """打开页面并计数"""
+        self.page_loads += 1
+        self.driver.get(url)
+
+    def on_login_page(self) -> bool:
+        """当前是否停在登录页（此时的cookies属于登录域，不应覆盖已保存的平台cookies）"""
+        try:
+            return "login" in (self.driver.current_url or "").lower()
+        except Exception:
+            return True
+
+    def is_healthy(self) -> bool:
+        """会话是否仍可用"""
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """浏览器会话池（线程安全）"""
+
+    def __init__(self, size: int = 2, headless: bool = True, max_page_loads: int = 50,
+                 cookie_dir: str = COOKIE_DIR, user_agent: str = DEFAULT_USER_AGENT,
+                 driver_factory=None):
+        """
+        Args:
+            size: 会话数量上限
+            headless: 是否无头模式
+            max_page_loads: 单个会话最多加载的页面数，超过后回收重建
+            cookie_dir: cookies保存目录
+            user_agent: 浏览器UA
+            driver_factory: 自定义创建WebDriver的无参可调用对象
+        """
+        if size < 1:
+            raise ValueError(f"会话池大小必须大于0: {size}")
+        self.size = size
+        self.max_page_loads = max_page_loads
+        self.cookie_dir = cookie_dir
+        self._factory = driver_factory or (lambda: create_driver(headless, user_agent))
+        self._idle = []                 # 后进先出，优先复用最近用过的热会话
+        self._lock = threading.Lock()
+        # 有空闲会话或空出名额时唤醒等待者（归还、丢弃、关闭都会通知）
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._closed = False
+        self.stats = {"created": 0, "recycled": 0, "unhealthy": 0, "checkouts": 0}
+
+    # ---------- 会话生命周期 ----------
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _new_session(self) -> PooledDriver:
+        session = PooledDriver(self._factory())
+        self._count("created")
+        return session
+
+    def _release_slot(self):
+        """归还一个名额，唤醒一个等待者去创建新会话"""
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _discard(self, session: PooledDriver):
+        session.quit()
+        self._release_slot()
+
+    def warm_up(self, n: int = None):
+        """预先创建 n 个会话（默认填满会话池）"""
+        for _ in range(min(n or self.size, self.size)):
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                session = self._new_session()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._available:
+                self._idle.append(session)
+                self._available.notify()
+
+    def acquire(self, platform: str = None, timeout: float = None) -> PooledDriver:
+        """
+        借出一个健康的会话
+
+        Args:
+            platform: 平台简称（1688/jd/tmall），指定时自动恢复该平台cookies
+            timeout: 池满时的最长等待秒数，None 表示一直等待
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._available:
+                # 等到有空闲会话或空出名额（其他线程归还/丢弃会话时唤醒）
+                while True:
+                    if self._closed:
+                        raise RuntimeError("会话池已关闭")
+                    if self._idle or self._created < self.size:
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"等待浏览器会话超时（{timeout}s）")
+                    self._available.wait(remaining)
+                session = self._idle.pop() if self._idle else None
+                if session is None:
+                    self._created += 1
+
+            if session is None:
+                try:
+                    session = self._new_session()
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if session.is_healthy():
+                break
+            self._count("unhealthy")
+            self._discard(session)
+
+        self._count("checkouts")
+        if platform and platform not in session.cookie_platforms:
+            self.restore_cookies(session, platform)
+        return session
+
+    def release(self, session: PooledDriver, discard: bool = False):
+        """
+        归还会话
+
+        Args:
+            discard: 直接丢弃（如会话出错）
+        """
+        if self._closed or discard:
+            self._discard(session)
+            return
+        if session.page_loads >= self.max_page_loads:
+            self._count("recycled")
+            self._discard(session)
+            return
+        with self._available:
+            if not self._closed:
+                self._idle.append(session)
+                self._available.notify()
+                return
+        self._discard(session)
+
+    @contextmanager
+    def session(self, platform: str = None, timeout: float = None, save_cookies: bool = True):
+        """
+        借出会话的上下文管理器，退出时保存cookies并归还
+
+        Args:
+            platform: 平台简称，指定时自动恢复/保存该平台cookies
+            timeout: 等待会话的最长秒数
+            save_cookies: 退出时是否保存cookies（停在登录页时不保存）
+        """
+        session = self.acquire(platform=platform, timeout=timeout)
+        failed = False
+        try:
+            yield session
+        except Exception:
+            failed = True
+            raise
+        finally:
+            try:
+                if platform and save_cookies and not failed and not session.on_login_page():
+                    self.save_cookies(session, platform)
+            finally:
+                # cookies写入失败也要归还会话，否则会占住名额
+                self.release(session, discard=failed and not session.is_healthy())
+
+    def close(self):
+        """关闭所有空闲会话，正在等待的借出请求抛出 RuntimeError"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for session in idle:
+            self._discard(session)
+
+    # ---------- cookies 持久化 ----------
+
+    def _cookie_path(self, platform: str) -> str:
+        return os.path.join(self.cookie_dir, f"{platform.lower()}.json")
+
+    def save_cookies(self, session: PooledDriver, platform: str) -> int:
+        """保存当前会话的cookies，返回保存条数"""
+        try:
+            cookies = session.driver.get_cookies()
+        except Exception:
+            return 0
+        if not cookies:
+            return 0
+        os.makedirs(self.cookie_dir, exist_ok=True)
+        path = self._cookie_path(platform)
+        # 每次写入使用独立的临时文件，多个进程/线程同时保存时互不影响
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{platform.lower()}.", suffix=".tmp", dir=self.cookie_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cookies, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        session.cookie_platforms.add(platform)
+        return len(cookies)
+
+    def restore_cookies(self, session: PooledDriver, platform: str) -> int:
+        """恢复指定平台的cookies，返回恢复条数"""
+        path = self._cookie_path(platform)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cookies = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        home = PLATFORM_HOME.get(platform.lower())
+        if home:
+            session.get(home)
+        restored = 0
+        now = time.time()
+        for cookie in cookies:
+            if cookie.get("expiry") and cookie["expiry"] < now:
+                continue
+            # sameSite 取值不合法时 add_cookie 会报错
+            if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+                cookie.pop("sameSite", None)
+            try:
+                session.driver.add_cookie(cookie)
+                restored += 1
+            except Exception:
+                continue
+        session.cookie_platforms.add(platform)
+        return restored
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool(**kwargs) -> DriverPool:
+    """
+    获取进程内共享的会话池（首次调用时按参数创建）
+
+    Args:
+        **kwargs: 传给 DriverPool 的参数，仅首次调用生效
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool(**kwargs)
+            atexit.register(_default_pool.close)
+        return _default_pool
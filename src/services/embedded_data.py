@@ -0,0 +1,53 @@
+"""
+页面内嵌数据提取
+============================================
+
+1688 商品详情页把商品/SKU数据以 `window.__INIT_DATA = {...}` 等形式直接写在 HTML 中。
+这里用正则定位赋值语句，再用 json.JSONDecoder.raw_decode 从该位置解析出对象，
+无需解析整个 DOM。
+"""
+import json
+import re
+
+# 常见的内嵌数据全局变量
+EMBEDDED_DATA_KEYS = ("__INIT_DATA", "__GLOBAL_DATA", "iDetailData", "__STORE_DATA")
+
+_ASSIGN_RE = re.compile(
+    r"(?:window\.)?(" + "|".join(re.escape(k) for k in EMBEDDED_DATA_KEYS) + r")\s*=\s*"
+)
+_decoder = json.JSONDecoder()
+
+# 浏览器中读取同名全局变量的脚本
+COLLECT_EMBEDDED_JS = """
+var keys = %s;
+var out = {};
+keys.forEach(function(k) {
+    try {
+        if (window[k] !== undefined) out[k] = JSON.parse(JSON.stringify(window[k]));
+    } catch (e) {}
+});
+return out;
+""" % json.dumps(list(EMBEDDED_DATA_KEYS))
+
+
+def extract_embedded_data(html: str) -> dict:
+    """
+    从 HTML 中提取内嵌的 JSON 数据
+
+    Returns:
+        {变量名: 解析后的对象}，解析失败的变量会被跳过
+    """
+    data = {}
+    for match in _ASSIGN_RE.finditer(html):
+        key = match.group(1)
+        if key in data:
+            continue
+        start = match.end()
+        if start >= len(html) or html[start] not in "{[":
+            continue
+        try:
+            value, _ = _decoder.raw_decode(html, start)
+        except ValueError:
+            continue
+        data[key] = value
+    return data
@@ -0,0 +1,374 @@
+"""
+增量备份
+============================================
+
+替代每次全量重写订单/库存工作簿的备份方式。每张表记录高水位（updated_at + 主键），
+每次只导出高水位之后变化的行:
+
+    data/backup/<表名>/
+        changes-YYYYMMDD.csv           变更日志（只追加，MySQL 侧的增量备份）
+        snapshot-YYYYMMDD-HHMMSS.parquet / .csv.gz   合并后的快照
+    data/excel/<表名>/
+        <表名>_YYYYMMDD-HHMMSS.xlsx    本次变化的行（openpyxl write_only 流式写入）
+    data/backup/backup_state.json      各表高水位、行数、上次合并时间
+
+合并（compact）: 上一个快照 + 全部变更日志按主键去重（保留最新），写出新快照后删除已合并的日志。
+默认每 compact_every 次备份或变更日志超过 compact_bytes 时自动合并，也可手动执行。
+
+只追加的方式无法感知物理删除的行；业务表使用状态字段（如 cancelled）标记删除即可被增量捕获。
+"""
+import csv
+import decimal
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from src.repositories.connection_pool import get_connection_factory
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKUP_DIR = os.path.join(_PROJECT_ROOT, "data", "backup")
+EXCEL_DIR = os.path.join(_PROJECT_ROOT, "data", "excel")
+
+
+@dataclass
+class BackupTable:
+    """一张需要备份的表"""
+    name: str
+    key: str = "id"                 # 主键列（单调递增或唯一）
+    watermark: str = "updated_at"   # 更新时间列，为空时只按主键递增（只插入不更新的表）
+
+
+DEFAULT_TABLES = [
+    BackupTable("order_table"),
+    BackupTable("inventory_table"),
+    BackupTable("inbound_table"),
+    BackupTable("alert_table", watermark=None),
+]
+
+
+@dataclass
+class TableReport:
+    """一张表一次备份的结果"""
+    table: str
+    rows: int = 0
+    bytes_written: int = 0
+    elapsed: float = 0.0
+    excel_path: str = None
+    snapshot_path: str = None
+    snapshot_rows: int = None
+    compact_seconds: float = 0.0
+    error: str = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class BackupReport:
+    """一次增量备份的汇总"""
+    tables: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(t.rows for t in self.tables)
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(t.bytes_written for t in self.tables)
+
+    def format(self) -> str:
+        lines = [f"【增量备份】{self.rows} 行, 写入 {self.bytes_written / 1024:.1f} KB, "
+                 f"耗时 {self.elapsed:.2f}s（{self.rows / self.elapsed if self.elapsed > 0 else 0:.0f} 行/秒）"]
+        for t in self.tables:
+            if t.error:
+                lines.append(f"  ❌ {t.table}: {t.error}")
+                continue
+            line = (f"  {t.table}: {t.rows} 行, {t.bytes_written / 1024:.1f} KB, "
+                    f"{t.elapsed:.2f}s（{t.rows_per_sec:.0f} 行/秒）")
+            if t.snapshot_path:
+                line += (f", 已合并快照 {os.path.basename(t.snapshot_path)}"
+                         f"（{t.snapshot_rows} 行, {t.compact_seconds:.2f}s）")
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def _cell(value):
+    """数据库值 → 可写入 Excel / CSV 的值"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _mark(value):
+    """高水位值的保存形式（datetime 转字符串，MySQL/SQLite 均可直接比较）"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ")
+    return _cell(value)
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class IncrementalBackup:
+    """按高水位增量导出业务表"""
+
+    def __init__(self, factory=None, tables: list = None, backup_dir: str = BACKUP_DIR,
+                 excel_dir: str = EXCEL_DIR, batch_size: int = 5000, excel: bool = True,
+                 compact_every: int = 24, compact_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            factory: ConnectionFactory，默认进程内共享的连接工厂
+            tables: BackupTable 列表，默认 DEFAULT_TABLES
+            backup_dir: 变更日志与快照目录
+            excel_dir: Excel 增量工作簿目录
+            batch_size: 每次从数据库读取的行数
+            excel: 是否同时写出 Excel 增量工作簿
+            compact_every: 每备份多少次自动合并一次（0 表示不按次数合并）
+            compact_bytes: 变更日志超过该字节数时自动合并（0 表示不按大小合并）
+        """
+        self.factory = factory or get_connection_factory()
+        self.tables = tables or DEFAULT_TABLES
+        self.backup_dir = backup_dir
+        self.excel_dir = excel_dir
+        self.batch_size = batch_size
+        self.excel = excel
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        self.state_path = os.path.join(backup_dir, "backup_state.json")
+        self.state = self._load_state()
+
+    # ---------- 状态 ----------
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _table_dir(self, table: BackupTable) -> str:
+        path = os.path.join(self.backup_dir, table.name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    # ---------- 读取变化的行 ----------
+
+    def _query(self, table: BackupTable, state: dict) -> tuple:
+        """生成按 (水位列, 主键) 排序、从高水位之后开始的查询"""
+        ph = self.factory.placeholder
+        order = f"{table.watermark}, {table.key}" if table.watermark else table.key
+        sql = f"SELECT * FROM {table.name}"
+        params = ()
+        if table.watermark and state.get("watermark") is not None:
+            sql += (f" WHERE {table.watermark} > {ph} OR "
+                    f"({table.watermark} = {ph} AND {table.key} > {ph})")
+            params = (state["watermark"], state["watermark"], state["last_key"])
+        elif not table.watermark and state.get("last_key") is not None:
+            sql += f" WHERE {table.key} > {ph}"
+            params = (state["last_key"],)
+        return sql + f" ORDER BY {order}", params
+
+    def _changed_rows(self, table: BackupTable, state: dict):
+        """逐批产出 (列名, 行列表)"""
+        sql, params = self._query(table, state)
+        with self.factory.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield columns, rows
+            cursor.close()
+
+    # ---------- 导出 ----------
+
+    def backup_table(self, table: BackupTable) -> TableReport:
+        """
+        导出一张表高水位之后变化的行
+
+        在状态副本上推进高水位，整张表导出成功（含 Excel 保存）后才写回 self.state；
+        中途失败时高水位不变，下次重新导出（变更日志中的重复行在合并时按主键去重）。
+        """
+        report = TableReport(table=table.name)
+        started = time.perf_counter()
+        state = {"watermark": None, "last_key": None, "rows_total": 0, "runs": 0,
+                 **self.state.get(table.name, {})}
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        log_path = os.path.join(self._table_dir(table), f"changes-{stamp[:8]}.csv")
+        excel_path = os.path.join(self.excel_dir, table.name, f"{table.name}_{stamp}.xlsx")
+
+        if self.excel:
+            # 先导入，避免写了一半变更日志才发现缺少 openpyxl
+            from openpyxl import Workbook
+
+        log_file = writer = workbook = sheet = None
+        log_size = _size(log_path)
+        try:
+            for columns, rows in self._changed_rows(table, state):
+                if log_file is None:
+                    new_log = not os.path.exists(log_path)
+                    log_file = open(log_path, "a", encoding="utf-8", newline="")
+                    writer = csv.writer(log_file)
+                    if new_log:
+                        writer.writerow(columns)
+                    if self.excel:
+                        workbook = Workbook(write_only=True)
+                        sheet = workbook.create_sheet(table.name)
+                        sheet.append(columns)
+                    key_index = columns.index(table.key)
+                    mark_index = columns.index(table.watermark) if table.watermark else None
+                for row in rows:
+                    values = [_cell(v) for v in row]
+                    writer.writerow(values)
+                    if sheet is not None:
+                        sheet.append(values)
+                last = rows[-1]
+                state["last_key"] = _mark(last[key_index])
+                if mark_index is not None:
+                    state["watermark"] = _mark(last[mark_index])
+                report.rows += len(rows)
+        finally:
+            if log_file is not None:
+                log_file.close()
+        if workbook is not None:
+            os.makedirs(os.path.dirname(excel_path), exist_ok=True)
+            workbook.save(excel_path)
+            report.excel_path = excel_path
+            report.bytes_written += _size(excel_path)
+        report.bytes_written += _size(log_path) - log_size
+
+        state["rows_total"] += report.rows
+        state["runs"] += 1
+        state["last_backup"] = datetime.now().isoformat(timespec="seconds")
+        self.state[table.name] = state
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def run(self, compact: bool = None) -> BackupReport:
+        """
+        备份所有表
+
+        Args:
+            compact: True 强制合并快照，False 不合并，None 按 compact_every / compact_bytes 自动判断
+        """
+        result = BackupReport()
+        started = time.perf_counter()
+        for table in self.tables:
+            try:
+                report = self.backup_table(table)
+            except Exception as e:
+                report = TableReport(table=table.name, error=f"{type(e).__name__}: {e}")
+            else:
+                if compact or (compact is None and self._should_compact(table)):
+                    try:
+                        self.compact(table, report)
+                    except Exception as e:
+                        report.error = f"合并快照失败: {type(e).__name__}: {e}"
+            # 每张表完成后保存高水位，中途失败不会重复导出已完成的表
+            self._save_state()
+            result.tables.append(report)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    # ---------- 合并快照 ----------
+
+    def _change_logs(self, table: BackupTable) -> list:
+        return sorted(glob.glob(os.path.join(self.backup_dir, table.name, "changes-*.csv")))
+
+    def _should_compact(self, table: BackupTable) -> bool:
+        logs = self._change_logs(table)
+        if not logs:
+            return False
+        state = self.state.get(table.name, {})
+        runs_since = state.get("runs", 0) - state.get("compacted_at_run", 0)
+        if self.compact_every and runs_since >= self.compact_every:
+            return True
+        return bool(self.compact_bytes) and sum(_size(p) for p in logs) >= self.compact_bytes
+
+    def compact(self, table: BackupTable, report: TableReport = None) -> str:
+        """
+        上一个快照 + 变更日志 → 新快照（按主键保留最新），返回快照路径
+
+        优先写 Parquet（需要 pyarrow），否则写 csv.gz。
+        """
+        import pandas as pd
+
+        report = report or TableReport(table=table.name)
+        logs = self._change_logs(table)
+        if not logs:
+            return None
+        started = time.perf_counter()
+        state = self.state.setdefault(table.name, {})
+        table_dir = self._table_dir(table)
+
+        frames = []
+        previous = state.get("snapshot")
+        if previous and os.path.exists(previous):
+            if previous.endswith(".parquet"):
+                frames.append(pd.read_parquet(previous).astype(str))
+            else:
+                frames.append(pd.read_csv(previous, dtype=str, keep_default_na=False))
+        # 全部按字符串读取，避免不同批次类型推断不一致
+        frames.extend(pd.read_csv(p, dtype=str, keep_default_na=False) for p in logs)
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(subset=[table.key], keep="last")
+
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        try:
+            path = os.path.join(table_dir, f"snapshot-{stamp}.parquet")
+            merged.to_parquet(path, index=False)
+        except ImportError:
+            path = os.path.join(table_dir, f"snapshot-{stamp}.csv.gz")
+            merged.to_csv(path, index=False, compression="gzip")
+
+        for p in logs:
+            os.remove(p)
+        if previous and os.path.exists(previous) and previous != path:
+            os.remove(previous)
+        state["snapshot"] = path
+        state["snapshot_rows"] = len(merged)
+        state["compacted_at_run"] = state.get("runs", 0)
+        state["last_compact"] = datetime.now().isoformat(timespec="seconds")
+
+        report.snapshot_path = path
+        report.snapshot_rows = len(merged)
+        report.compact_seconds = time.perf_counter() - started
+        report.bytes_written += _size(path)
+        return path
+
+
+def run_incremental_backup(compact: bool = None, tables: list = None, excel: bool = True) -> BackupReport:
+    """
+    执行一次增量备份并打印报告
+
+    Args:
+        compact: True 强制合并快照，None 自动判断
+        tables: 只备份指定的表名，默认 DEFAULT_TABLES
+        excel: 是否写出 Excel 增量工作簿
+    """
+    selected = [t for t in DEFAULT_TABLES if not tables or t.name in tables]
+    selected += [BackupTable(name) for name in (tables or []) if name not in {t.name for t in selected}]
+    report = IncrementalBackup(tables=selected, excel=excel).run(compact=compact)
+    print(report.format())
+    return report
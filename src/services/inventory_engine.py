@@ -0,0 +1,287 @@
+"""
+库存引擎
+============================================
+
+按 SKU 维护库存数量和预警阈值，面向几十万到上百万 SKU:
+
+    - 存储: SKU → 槽位 的字典 + 紧凑数组（array('q') 存数量/阈值，bytearray 存状态位），
+      每个 SKU 除字典项外只占约 25 字节
+    - 入库/出库: 按槽位 O(1) 更新，同时把槽位记入变更列表
+    - 预警: check_alerts 只检查上次检查之后变更过的 SKU，低于阈值时报一次（边沿触发），
+      回到阈值以上时报恢复
+    - 对账: 按块流式读取 inventory_table（fetchmany），逐块与内存中的数量比较，
+      内存占用与表大小无关（只多一个每 SKU 1 字节的已见标记）
+
+用法:
+    engine = InventoryEngine()
+    engine.reconcile(iter_inventory_rows(get_connection_factory()), fix=True)   # 从数据库加载
+    engine.inbound("SKU001", 100)
+    engine.outbound("SKU001", 95)
+    for alert in engine.check_alerts():
+        print(alert)
+"""
+import time
+from array import array
+from dataclasses import dataclass, field
+
+# 状态位
+_LOW = 1            # 当前处于低库存（已报过预警）
+_DIRTY = 2          # 上次检查后有变更
+
+
+@dataclass
+class StockAlert:
+    """库存预警"""
+    sku: object
+    quantity: int
+    threshold: int
+    kind: str = "low"           # low: 低于阈值 / recovered: 恢复到阈值以上
+
+    def __str__(self):
+        if self.kind == "recovered":
+            return f"✅ 库存恢复: {self.sku} 当前 {self.quantity}（阈值 {self.threshold}）"
+        return f"⚠️ 库存低于阈值: {self.sku} 当前 {self.quantity}（阈值 {self.threshold}）"
+
+
+@dataclass
+class ReconcileReport:
+    """一次对账的结果"""
+    rows: int = 0                   # 读取的数据库行数
+    chunks: int = 0
+    matched: int = 0
+    mismatched: int = 0             # 数量不一致的 SKU 数
+    added: int = 0                  # 数据库有、内存中没有的 SKU 数
+    missing: int = 0                # 内存中有、数据库没有的 SKU 数
+    fixed: bool = False             # 是否已按数据库修正内存数量
+    samples: list = field(default_factory=list)     # 部分不一致明细 (sku, 内存数量, 数据库数量)
+    elapsed: float = 0.0
+
+    def format(self) -> str:
+        rate = self.rows / self.elapsed if self.elapsed > 0 else 0
+        return (f"【库存对账】{self.rows} 行 / {self.chunks} 块, 一致 {self.matched}, "
+                f"不一致 {self.mismatched}, 新增 {self.added}, 数据库缺失 {self.missing}"
+                f"{'（已修正）' if self.fixed else ''}, 耗时 {self.elapsed:.2f}s（{rate:.0f} 行/秒）")
+
+
+class InventoryEngine:
+    """数组存储的库存引擎（非线程安全，多线程使用时由调用方加锁）"""
+
+    def __init__(self, default_threshold: int = 0):
+        """
+        Args:
+            default_threshold: 未指定阈值的 SKU 使用的预警阈值（0 表示不预警）
+        """
+        self.default_threshold = default_threshold
+        self._index = {}                # {sku: 槽位}
+        self._skus = []                 # 槽位 → sku
+        self._qty = array("q")
+        self._threshold = array("q")
+        self._flags = bytearray()
+        self._dirty = []                # 变更过的槽位（每个槽位只记一次）
+        self.events = 0
+
+    def __len__(self) -> int:
+        return len(self._skus)
+
+    def __contains__(self, sku) -> bool:
+        return sku in self._index
+
+    def _mark(self, slot: int):
+        flags = self._flags[slot]
+        if not flags & _DIRTY:
+            self._flags[slot] = flags | _DIRTY
+            self._dirty.append(slot)
+
+    # ---------- 登记 ----------
+
+    def register(self, sku, quantity: int = 0, threshold: int = None) -> int:
+        """登记 SKU（已存在时更新数量和阈值），返回槽位"""
+        slot = self._index.get(sku)
+        if slot is None:
+            slot = len(self._skus)
+            self._index[sku] = slot
+            self._skus.append(sku)
+            self._qty.append(quantity)
+            self._threshold.append(self.default_threshold if threshold is None else threshold)
+            self._flags.append(0)
+        else:
+            self._qty[slot] = quantity
+            if threshold is not None:
+                self._threshold[slot] = threshold
+        self._mark(slot)
+        return slot
+
+    def bulk_register(self, skus: list, quantities, thresholds=None):
+        """
+        批量登记新 SKU（初始化时使用，比逐个 register 快）
+
+        Args:
+            skus: SKU 列表（不能与已登记的重复）
+            quantities: 数量序列
+            thresholds: 阈值序列，默认全部使用 default_threshold
+        """
+        start = len(self._skus)
+        slots = dict(zip(skus, range(start, start + len(skus))))
+        if len(slots) != len(skus) or not slots.keys().isdisjoint(self._index):
+            raise ValueError("批量登记的 SKU 有重复或已存在")
+        self._index.update(slots)
+        self._skus.extend(skus)
+        self._qty.extend(quantities)
+        if thresholds is None:
+            self._threshold.extend(array("q", [self.default_threshold]) * len(skus))
+        else:
+            self._threshold.extend(thresholds)
+        self._flags.extend(bytes([_DIRTY]) * len(skus))
+        self._dirty.extend(range(start, start + len(skus)))
+
+    def set_threshold(self, sku, threshold: int):
+        slot = self._index[sku]
+        self._threshold[slot] = threshold
+        self._mark(slot)
+
+    # ---------- 查询 ----------
+
+    def quantity(self, sku) -> int:
+        return self._qty[self._index[sku]]
+
+    def threshold(self, sku) -> int:
+        return self._threshold[self._index[sku]]
+
+    # ---------- 出入库 ----------
+
+    def apply(self, sku, delta: int) -> int:
+        """
+        数量变更（入库为正、出库为负），未登记的 SKU 自动登记，返回变更后的数量
+        """
+        slot = self._index.get(sku)
+        if slot is None:
+            slot = self.register(sku, 0)
+        qty = self._qty[slot] + delta
+        self._qty[slot] = qty
+        self._mark(slot)
+        self.events += 1
+        return qty
+
+    def inbound(self, sku, quantity: int) -> int:
+        """入库"""
+        return self.apply(sku, quantity)
+
+    def outbound(self, sku, quantity: int) -> int:
+        """出库（允许出现负数，由对账或预警发现超卖）"""
+        return self.apply(sku, -quantity)
+
+    def apply_events(self, events) -> int:
+        """批量应用 (sku, delta) 事件，返回事件数"""
+        index, qty, flags, dirty = self._index, self._qty, self._flags, self._dirty
+        n = 0
+        for sku, delta in events:
+            slot = index.get(sku)
+            if slot is None:
+                slot = self.register(sku, 0)
+            qty[slot] += delta
+            if not flags[slot] & _DIRTY:
+                flags[slot] |= _DIRTY
+                dirty.append(slot)
+            n += 1
+        self.events += n
+        return n
+
+    # ---------- 预警 ----------
+
+    def check_alerts(self, include_recovered: bool = True) -> list:
+        """
+        检查上次检查之后变更过的 SKU
+
+        低于阈值时只在首次跌破时报警，恢复到阈值及以上时报恢复（include_recovered 为真时）。
+        """
+        alerts = []
+        qty, threshold, flags, skus = self._qty, self._threshold, self._flags, self._skus
+        for slot in self._dirty:
+            f = flags[slot] & ~_DIRTY
+            limit = threshold[slot]
+            q = qty[slot]
+            if limit > 0 and q < limit:
+                if not f & _LOW:
+                    f |= _LOW
+                    alerts.append(StockAlert(skus[slot], q, limit))
+            elif f & _LOW:
+                f &= ~_LOW
+                if include_recovered:
+                    alerts.append(StockAlert(skus[slot], q, limit, "recovered"))
+            flags[slot] = f
+        self._dirty = []
+        return alerts
+
+    def low_stock(self) -> list:
+        """当前所有处于低库存的 SKU（全量扫描，供看板展示）"""
+        return [StockAlert(self._skus[i], self._qty[i], self._threshold[i])
+                for i in range(len(self._skus))
+                if 0 < self._threshold[i] and self._qty[i] < self._threshold[i]]
+
+    # ---------- 对账 ----------
+
+    def reconcile(self, chunks, fix: bool = True, sample_limit: int = 20) -> ReconcileReport:
+        """
+        与数据库库存逐块对账
+
+        Args:
+            chunks: 可迭代的行块，每块为 [(sku, 数量, 阈值或None), ...]（见 iter_inventory_rows）
+            fix: 以数据库为准修正内存数量/阈值，并登记内存中没有的 SKU
+            sample_limit: 记录的不一致明细条数
+        """
+        report = ReconcileReport(fixed=fix)
+        started = time.perf_counter()
+        seen = bytearray(len(self._skus))
+        index, qty, threshold = self._index, self._qty, self._threshold
+        for chunk in chunks:
+            report.chunks += 1
+            for sku, db_qty, db_threshold in chunk:
+                report.rows += 1
+                db_qty = int(db_qty or 0)
+                slot = index.get(sku)
+                if slot is None:
+                    report.added += 1
+                    if fix:
+                        self.register(sku, db_qty, None if db_threshold is None else int(db_threshold))
+                        seen.append(1)
+                    continue
+                seen[slot] = 1
+                if qty[slot] == db_qty:
+                    report.matched += 1
+                else:
+                    report.mismatched += 1
+                    if len(report.samples) < sample_limit:
+                        report.samples.append((sku, qty[slot], db_qty))
+                    if fix:
+                        qty[slot] = db_qty
+                        self._mark(slot)
+                if fix and db_threshold is not None and threshold[slot] != int(db_threshold):
+                    threshold[slot] = int(db_threshold)
+                    self._mark(slot)
+        report.missing = seen.count(0)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+
+def iter_inventory_rows(factory, chunk_size: int = 10000, table: str = "inventory_table",
+                        sku_column: str = "sku_id", quantity_column: str = "quantity",
+                        threshold_column: str = "alert_threshold"):
+    """
+    按块流式读取库存表，产出 [(sku, 数量, 阈值), ...]
+
+    Args:
+        factory: ConnectionFactory
+        chunk_size: 每块行数
+        threshold_column: 阈值列，为空时阈值全部为 None
+    """
+    threshold = threshold_column or "NULL"
+    sql = f"SELECT {sku_column}, {quantity_column}, {threshold} FROM {table}"
+    with factory.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
@@ -0,0 +1,165 @@
+"""
+增量JSON解析
+============================================
+
+流式输出时模型一边生成一边返回文本片段。IncrementalJSONParser 逐段喂入文本，
+每当指定数组（默认 "recommendations"）中的一个对象闭合，就立即解析并回调，
+不必等整段 JSON 生成完毕。
+
+输出被截断（max_tokens 用尽、连接中断）时:
+    - 已闭合的对象照常可用
+    - repair_truncated_json() 回退到最后一个完整的值，补齐未闭合的括号后解析
+"""
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """增量解析模型输出中的 JSON"""
+
+    def __init__(self, array_keys=("recommendations",), on_item=None):
+        """
+        Args:
+            array_keys: 需要逐个输出元素的数组键名
+            on_item: 元素闭合时的回调 on_item(key, obj)
+        """
+        self.array_keys = set(array_keys)
+        self.on_item = on_item
+        self.items = []                 # [(key, obj)]
+        self.errors = []                # 无法解析的元素片段
+        self._text = ""
+        self._pos = 0
+        self._started = False           # 是否已遇到第一个 '{'（跳过 ```json 等前缀）
+        self._root_start = 0
+        self._stack = []                # [(括号, 键名)]
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        self._item_start = None
+        self._safe = None               # (结束位置, 需要补齐的闭合括号)
+        self.done = False               # 顶层对象已闭合
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> list:
+        """
+        喂入一段文本
+
+        Returns:
+            本次新闭合的元素 [(key, obj)]
+        """
+        if not chunk:
+            return []
+        self._text += chunk
+        text = self._text
+        emitted = []
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if not self._started or self.done:
+                if c == "{" and not self.done:
+                    self._started = True
+                    self._stack.append(("{", None))
+                    self._root_start = i
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":":
+                if self._stack and self._stack[-1][0] == "{":
+                    self._pending_key = self._last_string
+            elif c in "{[":
+                key = self._pending_key if self._stack[-1][0] == "{" else None
+                parent = self._stack[-1]
+                if c == "{" and parent[0] == "[" and parent[1] in self.array_keys \
+                        and self._item_start is None:
+                    self._item_start = i
+                self._stack.append((c, key))
+                self._pending_key = None
+            elif c in "}]":
+                opened, _ = self._stack.pop()
+                if _CLOSERS[opened] != c:
+                    # 括号不匹配，放弃增量解析，交给 finish() 处理
+                    self.done = True
+                    break
+                if (c == "}" and self._item_start is not None and self._stack
+                        and self._stack[-1][0] == "[" and self._stack[-1][1] in self.array_keys):
+                    key = self._stack[-1][1]
+                    fragment = text[self._item_start:i + 1]
+                    self._item_start = None
+                    try:
+                        obj = json.loads(fragment)
+                    except ValueError:
+                        self.errors.append(fragment)
+                    else:
+                        self.items.append((key, obj))
+                        emitted.append((key, obj))
+                        if self.on_item is not None:
+                            self.on_item(key, obj)
+                if not self._stack:
+                    self.done = True
+                self._mark_safe(i + 1)
+            elif c == ",":
+                self._mark_safe(i)
+                self._pending_key = None
+            i += 1
+        self._pos = i
+        return emitted
+
+    def _mark_safe(self, end: int):
+        self._safe = (end, "".join(_CLOSERS[b] for b, _ in reversed(self._stack)))
+
+    def finish(self):
+        """
+        结束输入，解析完整 JSON
+
+        Returns:
+            (解析结果, 是否经过截断修复)；无法解析时结果为 None
+        """
+        text = self.text
+        if self.done and self._started:
+            try:
+                return json.loads(text[self._root_start:text.rfind("}") + 1]), False
+            except ValueError:
+                pass
+        if not self._started:
+            return None, False
+        if self._safe is None:
+            return None, True
+        end, closers = self._safe
+        try:
+            return json.loads(text[self._root_start:end] + closers), True
+        except ValueError:
+            return None, True
+
+
+def repair_truncated_json(text: str):
+    """
+    修复被截断的 JSON：回退到最后一个完整的值并补齐括号
+
+    Returns:
+        解析结果，无法修复时返回 None
+    """
+    parser = IncrementalJSONParser(array_keys=())
+    parser.feed(text)
+    result, _ = parser.finish()
+    return result
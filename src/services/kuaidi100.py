@@ -0,0 +1,182 @@
+"""
+快递100 实时查询接口
+============================================
+
+接口: POST https://poll.kuaidi100.com/poll/query.do
+    customer  授权码（KUAIDI100_CUSTOMER）
+    param     JSON 字符串 {"com", "num", "phone", "resultv2"}
+    sign      MD5(param + key + customer) 转大写（key 即 KUAIDI100_API_KEY）
+
+返回的轨迹按时间倒序，state 为快递状态码（见 STATE_NAMES）。
+实时查询接口每次只能查一个单号，批量与合并由 tracking_scheduler 负责。
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+QUERY_URL = "https://poll.kuaidi100.com/poll/query.do"
+
+# 快递状态码
+STATE_IN_TRANSIT = "0"
+STATE_COLLECTED = "1"
+STATE_TROUBLE = "2"
+STATE_SIGNED = "3"
+STATE_REFUSED = "4"
+STATE_DELIVERING = "5"
+STATE_RETURNING = "6"
+STATE_FORWARDED = "7"
+STATE_CUSTOMS = "8"
+STATE_REJECTED = "14"
+
+STATE_NAMES = {
+    STATE_IN_TRANSIT: "在途",
+    STATE_COLLECTED: "揽收",
+    STATE_TROUBLE: "疑难",
+    STATE_SIGNED: "签收",
+    STATE_REFUSED: "退签",
+    STATE_DELIVERING: "派件",
+    STATE_RETURNING: "退回",
+    STATE_FORWARDED: "转投",
+    STATE_CUSTOMS: "清关",
+    STATE_REJECTED: "拒签",
+}
+
+# 不会再变化的状态
+FINAL_STATES = {STATE_SIGNED, STATE_REFUSED, STATE_REJECTED}
+
+# returnCode: 500 查询无结果（多为刚发货、尚无轨迹），其余视为错误
+NO_RESULT_CODE = "500"
+# 签名错误 / 密钥过期或余额不足，需要整体暂停查询
+FATAL_CODES = {"503", "601"}
+
+
+class KuaidiError(RuntimeError):
+    """快递100 查询失败"""
+
+    def __init__(self, message: str, code: str = None):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def fatal(self) -> bool:
+        return self.code in FATAL_CODES
+
+
+def sign(param: str, key: str, customer: str) -> str:
+    """请求签名: MD5(param + key + customer) 转大写"""
+    return hashlib.md5((param + key + customer).encode("utf-8")).hexdigest().upper()
+
+
+def parse_event_time(value: str) -> float:
+    """轨迹时间 "2024-05-01 12:30:00" → 时间戳，无法解析时返回 None"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+@dataclass
+class TrackingResult:
+    """一次查询的结果"""
+    company: str
+    number: str
+    state: str = None                       # 快递状态码，无轨迹时为 None
+    signed: bool = False
+    events: list = field(default_factory=list)     # [(时间戳, 描述)]，按时间正序
+    message: str = ""
+
+    @property
+    def state_name(self) -> str:
+        return STATE_NAMES.get(self.state, "未发货" if not self.events else "未知")
+
+
+def parse_response(company: str, number: str, data: dict) -> TrackingResult:
+    """解析查询接口的返回"""
+    if data.get("result") is False:
+        code = str(data.get("returnCode") or "")
+        if code == NO_RESULT_CODE:
+            return TrackingResult(company, number, message=data.get("message", ""))
+        raise KuaidiError(f"快递100查询失败: {data.get('message')}", code)
+
+    events = []
+    for item in data.get("data") or []:
+        ts = parse_event_time(item.get("ftime") or item.get("time"))
+        if ts is not None:
+            events.append((ts, item.get("context", "")))
+    events.sort()
+    state = str(data["state"]) if data.get("state") not in (None, "") else None
+    return TrackingResult(company, number, state=state, signed=str(data.get("ischeck")) == "1",
+                          events=events, message=data.get("message", ""))
+
+
+class Kuaidi100Client:
+    """快递100 实时查询客户端（asyncio）"""
+
+    def __init__(self, key: str = None, customer: str = None, url: str = QUERY_URL,
+                 timeout: float = 10):
+        """
+        Args:
+            key: 授权key，默认读取 KUAIDI100_API_KEY
+            customer: 授权码，默认读取 KUAIDI100_CUSTOMER
+            url: 查询接口地址（测试时指向本地模拟服务）
+            timeout: 请求超时（秒）
+
+        Raises:
+            ValueError: 未配置授权key或授权码
+        """
+        self.key = key or os.getenv("KUAIDI100_API_KEY", "")
+        self.customer = customer or os.getenv("KUAIDI100_CUSTOMER", "")
+        missing = [name for name, value in (("KUAIDI100_API_KEY", self.key), ("KUAIDI100_CUSTOMER", self.customer))
+                   if not value]
+        if missing:
+            # 缺少授权信息时每次查询都会签名失败，提前报错而不是等到第一轮查询
+            raise ValueError(f"快递100授权信息未配置: {', '.join(missing)}")
+        self.url = url
+        self.timeout = timeout
+        self.requests = 0
+        self.seconds = 0.0
+        self._client = None
+
+    async def _http(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def query(self, company: str, number: str, phone: str = None) -> TrackingResult:
+        """
+        查询一个运单
+
+        Args:
+            company: 快递公司编码（如 shunfeng / yuantong）
+            number: 运单号
+            phone: 收/寄件人手机号（顺丰等公司必填）
+        """
+        param = {"com": company, "num": number, "resultv2": "0"}
+        if phone:
+            param["phone"] = phone
+        param = json.dumps(param, ensure_ascii=False, separators=(",", ":"))
+        form = {"customer": self.customer, "param": param, "sign": sign(param, self.key, self.customer)}
+
+        client = await self._http()
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            response = await client.post(self.url, data=form)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            raise KuaidiError(f"快递100请求失败: {e}") from e
+        finally:
+            self.seconds += time.perf_counter() - started
+        return parse_response(company, number, data)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
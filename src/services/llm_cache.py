@@ -0,0 +1,278 @@
+"""
+大模型响应缓存
+============================================
+
+"A4打印纸"这类常购商品反复走 AI 选品，候选商品列表在两次运行之间几乎不变，
+同样的请求没必要每次都调用大模型。
+
+    - 缓存键: 规范化后的需求 + 候选集指纹 + 模型 + 调用参数 + 系统提示词哈希
+    - 持久化到 SQLite，按 TTL 过期，超过容量时按最近访问时间淘汰（LRU）
+    - SingleFlight: 相同请求同时在途时只调用一次上游，其余等待结果
+    - CacheMetrics: 命中/未命中/合并/过期/淘汰计数
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_PATH = os.path.join(_PROJECT_ROOT, "data", "llm_cache.sqlite3")
+
+# 缓存键格式版本，键的构造方式变化时加1，旧缓存自然失效
+CACHE_KEY_VERSION = 1
+
+# 候选商品参与指纹计算的字段（其他字段如销量、评价数变化不影响选品结果）
+CANDIDATE_KEY_FIELDS = ("platform", "product_id", "product_url", "product_name", "title",
+                        "unit_price", "price", "freight", "min_order", "stock")
+
+# 不影响模型输出的参数
+_IGNORED_PARAMS = {"stream", "user"}
+
+
+def normalize_text(text) -> str:
+    """全半角统一、小写、合并空白"""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return " ".join(text.split())
+
+
+def _field(obj, name):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _canonical(value):
+    """Decimal/float 统一成两位小数的字符串，其余值规范化为文本"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) or type(value).__name__ == "Decimal":
+        return f"{float(value):.2f}"
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return normalize_text(value)
+
+
+def normalize_demand(demand) -> dict:
+    """
+    规范化采购需求
+
+    Args:
+        demand: 需求文本、字典或 PurchaseDemand 对象
+    """
+    if isinstance(demand, str):
+        return {"product_name": normalize_text(demand)}
+    out = {}
+    for name in ("product_name", "quantity", "budget", "specification", "platforms"):
+        value = _field(demand, name)
+        if name == "platforms" and value:
+            value = sorted(normalize_text(getattr(p, "value", p)) for p in value)
+        elif name == "quantity" and value is not None:
+            value = int(value)
+        else:
+            value = _canonical(value)
+        if value not in (None, "", []):
+            out[name] = value
+    return out
+
+
+def candidate_fingerprint(candidates) -> str:
+    """
+    候选集指纹：与顺序无关，只取影响选品的字段
+
+    Args:
+        candidates: 候选商品列表（字典或对象）
+    """
+    rows = []
+    for c in candidates or []:
+        row = {name: _canonical(_field(c, name)) for name in CANDIDATE_KEY_FIELDS}
+        rows.append(json.dumps({k: v for k, v in row.items() if v is not None},
+                               ensure_ascii=False, sort_keys=True))
+    rows.sort()
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()
+
+
+def make_cache_key(demand, candidates, model: str, params: dict = None,
+                   system_prompt: str = "") -> str:
+    """构建缓存键"""
+    payload = {
+        "v": CACHE_KEY_VERSION,
+        "demand": normalize_demand(demand),
+        "candidates": candidate_fingerprint(candidates),
+        "model": model,
+        "params": {k: v for k, v in sorted((params or {}).items()) if k not in _IGNORED_PARAMS},
+        "system": hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()[:16],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheMetrics:
+    """缓存统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0      # 合并到在途请求的次数
+        self.expired = 0
+        self.evicted = 0
+        self.stored = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_seconds = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        d = dict(vars(self))
+        d["hit_rate"] = round(self.hit_rate, 4)
+        d["upstream_seconds"] = round(self.upstream_seconds, 3)
+        return d
+
+    def report(self) -> str:
+        return (f"【LLM缓存】命中 {self.hits}, 合并 {self.coalesced}, 未命中 {self.misses}, "
+                f"命中率 {self.hit_rate:.1%}; 上游调用 {self.upstream_calls} 次"
+                f"（失败 {self.upstream_errors}），耗时 {self.upstream_seconds:.2f}s; "
+                f"写入 {self.stored}, 过期 {self.expired}, 淘汰 {self.evicted}")
+
+
+class LLMResponseCache:
+    """SQLite 持久化的 TTL + LRU 缓存"""
+
+    def __init__(self, path: str = None, ttl: float = 7 * 24 * 3600, max_entries: int = 5000,
+                 metrics: CacheMetrics = None):
+        """
+        Args:
+            path: 缓存文件路径，默认 data/llm_cache.sqlite3；":memory:" 为内存缓存
+            ttl: 过期时间（秒），None 表示永不过期
+            max_entries: 最大条目数，超过后淘汰最久未访问的条目
+        """
+        self.path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metrics = metrics or CacheMetrics()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Returns:
+            缓存的响应（JSON 反序列化后），未命中或已过期返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.metrics.expired += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(response)
+
+    def set(self, key: str, response, model: str = None):
+        now = time.time()
+        data = json.dumps(response, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_access, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)", (key, model, data, now, now))
+            self.metrics.stored += 1
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                cursor = self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,))
+                self.metrics.evicted += cursor.rowcount
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """删除所有过期条目，返回删除数"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        self.metrics.expired += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class SingleFlight:
+    """相同键的并发调用只执行一次，其余调用等待同一个结果"""
+
+    def __init__(self):
+        self._inflight = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, func):
+        """
+        Args:
+            key: 去重键
+            func: 无参协程函数
+
+        Returns:
+            (结果, 是否合并到已有请求)
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,381 @@
+"""
+大模型选品客户端
+============================================
+
+调用 chat/completions 接口（火山方舟 / OpenAI 兼容）做 AI 选品，
+带持久化响应缓存和相同请求合并（见 llm_cache）。
+流式模式下每条推荐在其 JSON 对象闭合时立即回调（见 json_stream）。
+
+配置优先级: 构造参数 > 环境变量（LLM_API_BASE_URL / LLM_API_KEY / LLM_MODEL_NAME）> config.py
+
+本地测试时把 api_base 指向模拟服务即可，例如:
+    client = LLMClient(api_base="http://127.0.0.1:8765/v1/chat/completions", api_key="test")
+"""
+import asyncio
+import json
+import os
+import time
+
+from src.services.json_stream import IncrementalJSONParser
+from src.services.llm_cache import (
+    CacheMetrics, LLMResponseCache, SingleFlight, make_cache_key, normalize_demand
+)
+
+DEFAULT_API_BASE = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+DEFAULT_MODEL = "Doubao-Seed-1.8"
+DEFAULT_PARAMS = {"temperature": 0.1, "max_tokens": 8192, "top_p": 0.9}
+
+
+class LLMError(RuntimeError):
+    """大模型调用失败"""
+
+
+def load_llm_settings() -> dict:
+    """读取大模型配置（环境变量优先，其次项目根目录的 config.py）"""
+    settings = {
+        "api_base": DEFAULT_API_BASE,
+        "api_key": None,
+        "model": DEFAULT_MODEL,
+        "params": dict(DEFAULT_PARAMS),
+        "system_prompt": "",
+        "stream": False,
+    }
+    try:
+        import config
+        settings["api_base"] = getattr(config, "LLM_API_BASE_URL", settings["api_base"])
+        settings["api_key"] = getattr(config, "LLM_API_KEY", None)
+        settings["model"] = getattr(config, "LLM_MODEL_NAME", settings["model"])
+        settings["params"].update(getattr(config, "LLM_CONFIG", {}))
+        settings["system_prompt"] = getattr(config, "SYSTEM_PROMPT", "")
+    except ImportError:
+        pass
+    settings["api_base"] = os.getenv("LLM_API_BASE_URL", settings["api_base"])
+    settings["api_key"] = os.getenv("LLM_API_KEY", settings["api_key"])
+    settings["model"] = os.getenv("LLM_MODEL_NAME", settings["model"])
+    # 是否流式由 stream 开关决定，不作为普通参数透传
+    settings["stream"] = bool(settings["params"].pop("stream", False))
+    if os.getenv("LLM_STREAM"):
+        settings["stream"] = os.getenv("LLM_STREAM").lower() in ("1", "true", "yes")
+    return settings
+
+
+SELECTION_INSTRUCTION = (
+    "请按综合性价比选出最优的3个商品，以JSON返回: "
+    '{"recommendations": [{"index": 序号, "score": 评分, "reason": 理由}]}'
+)
+
+
+def build_selection_messages(demand, candidates, system_prompt: str, instruction: str = None) -> list:
+    """构造选品请求消息"""
+    rows = []
+    for i, c in enumerate(candidates, 1):
+        item = c if isinstance(c, dict) else {k: v for k, v in vars(c).items() if not k.startswith("_")}
+        rows.append({"index": i, **item})
+    instruction = instruction or SELECTION_INSTRUCTION
+    user = (
+        "采购需求:\n" + json.dumps(normalize_demand(demand), ensure_ascii=False) +
+        "\n\n候选商品:\n" + json.dumps(rows, ensure_ascii=False, default=str, separators=(",", ":")) +
+        "\n\n" + instruction
+    )
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": user})
+    return messages
+
+
+def parse_json_content(content: str):
+    """从模型回复中取出 JSON（兼容 ```json 代码块包裹），解析失败返回 None"""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    try:
+        return json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except ValueError:
+                pass
+    return None
+
+
+def validate_recommendation(rec, candidate_count: int):
+    """
+    校验一条推荐，返回规范化后的 {"index", "score", "reason"}，无效时返回 None
+
+    Args:
+        rec: 模型输出的推荐对象
+        candidate_count: 候选商品数（index 从1开始）
+    """
+    if not isinstance(rec, dict):
+        return None
+    try:
+        index = int(rec.get("index"))
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= index <= candidate_count:
+        return None
+    try:
+        score = float(rec["score"]) if rec.get("score") is not None else None
+    except (TypeError, ValueError):
+        score = None
+    return {"index": index, "score": score, "reason": str(rec.get("reason") or "").strip()}
+
+
+async def _maybe_await(result):
+    if asyncio.iscoroutine(result):
+        await result
+
+
+class LLMClient:
+    """带缓存的大模型客户端"""
+
+    def __init__(self, api_base: str = None, api_key: str = None, model: str = None,
+                 params: dict = None, system_prompt: str = None, cache: LLMResponseCache = None,
+                 use_cache: bool = True, timeout: float = 120, stream: bool = None):
+        """
+        Args:
+            api_base: chat/completions 完整地址
+            api_key: API密钥
+            model: 模型名
+            params: 调用参数（temperature / max_tokens / top_p）
+            system_prompt: 系统提示词
+            cache: 响应缓存，默认 data/llm_cache.sqlite3
+            use_cache: 是否启用缓存
+            timeout: 请求超时（秒）
+            stream: 默认是否使用流式选品，默认读取 LLM_CONFIG["stream"] / LLM_STREAM
+        """
+        settings = load_llm_settings()
+        self.api_base = api_base or settings["api_base"]
+        self.api_key = api_key or settings["api_key"]
+        self.model = model or settings["model"]
+        self.params = dict(settings["params"])
+        self.params.update(params or {})
+        self.system_prompt = settings["system_prompt"] if system_prompt is None else system_prompt
+        self.use_cache = use_cache
+        self.cache = cache if cache is not None else (LLMResponseCache() if use_cache else None)
+        self.metrics = self.cache.metrics if self.cache is not None else CacheMetrics()
+        self.timeout = timeout
+        self.stream = settings["stream"] if stream is None else stream
+        self._flight = SingleFlight()
+        self._client = None
+
+    async def _cache_get(self, key: str):
+        """读缓存（sqlite3 是阻塞调用，放到线程中执行）"""
+        if not self.use_cache or self.cache is None:
+            return None
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _cache_set(self, key: str, response):
+        if self.use_cache and self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, response, self.model)
+
+    async def _http(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def chat(self, messages: list, **params) -> dict:
+        """
+        直接调用 chat/completions（不走缓存）
+
+        Returns:
+            {"content", "usage", "finish_reason", "model"}
+        """
+        body = {"model": self.model, "messages": messages, **self.params, **params}
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        client = await self._http()
+        started = time.perf_counter()
+        self.metrics.upstream_calls += 1
+        try:
+            response = await client.post(self.api_base, json=body, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+            choice = data["choices"][0]
+        except Exception as e:
+            self.metrics.upstream_errors += 1
+            raise LLMError(f"大模型调用失败: {e}") from e
+        finally:
+            self.metrics.upstream_seconds += time.perf_counter() - started
+        return {
+            "content": choice["message"]["content"],
+            "finish_reason": choice.get("finish_reason"),
+            "usage": data.get("usage", {}),
+            "model": data.get("model", self.model),
+        }
+
+    async def select_products(self, demand, candidates: list, instruction: str = None,
+                              **params) -> dict:
+        """
+        AI选品（带缓存）
+
+        Args:
+            demand: 采购需求（文本、字典或 PurchaseDemand）
+            candidates: 候选商品列表
+            instruction: 替换默认的选品要求（如预排序后只需解释推荐）
+            **params: 覆盖默认调用参数
+
+        Returns:
+            {"content", "parsed", "usage", "finish_reason", "model", "cached", "cache_key"}
+        """
+        call_params = {**self.params, **params}
+        key = make_cache_key(demand, candidates, self.model, call_params,
+                             self.system_prompt + (instruction or ""))
+
+        cached = await self._cache_get(key)
+        if cached is not None:
+            self.metrics.hits += 1
+            return {**cached, "cached": True, "cache_key": key}
+
+        async def fetch():
+            messages = build_selection_messages(demand, candidates, self.system_prompt, instruction)
+            result = await self.chat(messages, **params)
+            result["parsed"] = parse_json_content(result["content"])
+            # 只缓存完整且可解析的回复，被截断或格式错误的回复下次重新请求
+            if result["parsed"] is not None and result.get("finish_reason") != "length":
+                await self._cache_set(key, result)
+            return result
+
+        result, shared = await self._flight.do(key, fetch)
+        if shared:
+            self.metrics.coalesced += 1
+        else:
+            self.metrics.misses += 1
+        return {**result, "cached": shared, "cache_key": key}
+
+    async def stream_chat(self, messages: list, **params):
+        """
+        流式调用 chat/completions（SSE），逐段产出
+
+        Yields:
+            {"content": 增量文本, "finish_reason": 结束原因或None, "usage": 用量或None}
+        """
+        body = {"model": self.model, "messages": messages, **self.params, **params, "stream": True}
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        client = await self._http()
+        started = time.perf_counter()
+        self.metrics.upstream_calls += 1
+        try:
+            async with client.stream("POST", self.api_base, json=body, headers=headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    choices = event.get("choices") or [{}]
+                    delta = choices[0].get("delta") or {}
+                    yield {
+                        "content": delta.get("content") or "",
+                        "finish_reason": choices[0].get("finish_reason"),
+                        "usage": event.get("usage"),
+                    }
+        except Exception as e:
+            self.metrics.upstream_errors += 1
+            raise LLMError(f"大模型流式调用失败: {e}") from e
+        finally:
+            self.metrics.upstream_seconds += time.perf_counter() - started
+
+    async def select_products_stream(self, demand, candidates: list, on_recommendation=None,
+                                     instruction: str = None, **params) -> dict:
+        """
+        流式AI选品：每条推荐的 JSON 对象一闭合就校验并回调，不等整段输出结束
+
+        Args:
+            demand: 采购需求
+            candidates: 候选商品列表
+            on_recommendation: 回调 on_recommendation(rec)，rec 为 validate_recommendation 的结果，
+                               可以是同步函数或协程函数；命中缓存时按顺序立即回放
+            instruction: 替换默认的选品要求
+
+        Returns:
+            与 select_products 相同，另含 "recommendations"（已校验）、"truncated"（是否截断修复）、
+            "first_item_seconds"（首条推荐耗时）
+        """
+        call_params = {**self.params, **params}
+        call_params.pop("stream", None)
+        key = make_cache_key(demand, candidates, self.model, call_params,
+                             self.system_prompt + (instruction or ""))
+        started = time.perf_counter()
+
+        async def replay(result: dict) -> dict:
+            recs = []
+            for rec in (result.get("parsed") or {}).get("recommendations") or []:
+                rec = validate_recommendation(rec, len(candidates))
+                if rec is not None:
+                    recs.append(rec)
+                    if on_recommendation is not None:
+                        await _maybe_await(on_recommendation(rec))
+            return {**result, "recommendations": recs, "truncated": False,
+                    "first_item_seconds": time.perf_counter() - started if recs else None}
+
+        cached = await self._cache_get(key)
+        if cached is not None:
+            self.metrics.hits += 1
+            return {**(await replay(cached)), "cached": True, "cache_key": key}
+
+        async def fetch():
+            messages = build_selection_messages(demand, candidates, self.system_prompt, instruction)
+            parser = IncrementalJSONParser(array_keys=("recommendations",))
+            recs, seen = [], set()
+            first_item = None
+            finish_reason, usage = None, {}
+            async for chunk in self.stream_chat(messages, **params):
+                finish_reason = chunk["finish_reason"] or finish_reason
+                usage = chunk["usage"] or usage
+                for _, item in parser.feed(chunk["content"]):
+                    rec = validate_recommendation(item, len(candidates))
+                    if rec is None or rec["index"] in seen:
+                        continue
+                    seen.add(rec["index"])
+                    recs.append(rec)
+                    if first_item is None:
+                        first_item = time.perf_counter() - started
+                    if on_recommendation is not None:
+                        await _maybe_await(on_recommendation(rec))
+
+            parsed, repaired = parser.finish()
+            truncated = repaired or finish_reason == "length"
+            if parsed is None:
+                parsed = {"recommendations": recs}
+            result = {
+                "content": parser.text,
+                "parsed": parsed,
+                "finish_reason": finish_reason,
+                "usage": usage,
+                "model": self.model,
+                "recommendations": recs,
+                "truncated": truncated,
+                "first_item_seconds": first_item,
+            }
+            # 截断修复过的结果不写缓存
+            if not truncated and recs:
+                await self._cache_set(key, {k: result[k] for k in ("content", "parsed", "finish_reason",
+                                                                   "usage", "model")})
+            return result
+
+        result, shared = await self._flight.do(key, fetch)
+        if shared:
+            # 合并到在途请求的调用方拿到的是完整结果，按顺序回放回调
+            self.metrics.coalesced += 1
+            result = {**(await replay(result)), "truncated": result.get("truncated", False)}
+        else:
+            self.metrics.misses += 1
+        return {**result, "cached": shared, "cache_key": key}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,510 @@
+"""
+并行下单调度
+============================================
+
+批量确认的订单逐个用 SeleniumOrderExecutor 下单（登录 → 选SKU → 加购 → 结算 → 选地址），
+几十个订单要串行跑很久。调度器把订单分给多个相互隔离的下单账号并行执行:
+
+    - 按 (平台, 供应商, 收货地址) 分组：同一店铺的多个SKU加入同一个购物车，一次结算
+    - 每个账号一个工作进程，浏览器使用独立的用户目录（登录状态、cookies 互不干扰）
+    - 同一平台的账号从共享队列中取下一组，先空闲的先取
+    - 每个账号单独限流（每分钟结算次数），避免触发平台风控
+    - 失败的组不自动重试（结算可能已生成订单），在汇总报告中列出由人工处理
+
+执行器约定（executor_factory(account) 在工作进程中调用，需可被 pickle，如模块级函数）:
+    add_to_cart(recommendation, quantity) + checkout(shipping_info, purchase_demand) -> 订单 + clear_cart()
+        执行器支持时同组订单共用一个购物车、一次结算；每组开始前清空购物车，
+        失败后再清空一次（清空失败时关闭执行器，下一组重新创建），避免残留商品被下一组一起结算
+    否则逐行调用 execute_order(recommendation=, shipping_info=, quantity=, purchase_demand=) -> 订单
+    close()  工作进程退出前调用
+
+    默认的 SeleniumOrderExecutor 目前只提供 execute_order，同组的SKU仍逐个下单、分别结算；
+    它实现购物车三个方法后自动改为一次结算。它必须接受 profile_dir 参数，否则无法隔离账号，直接报错。
+
+订单文件（JSONL，每行一个SKU）:
+    platform, supplier（店铺/公司名）, product_url, product_name, product_id, spec, unit_price,
+    quantity, purchase_demand, shipping（收货信息字典，可选，缺省使用 --shipping 文件）
+
+账号文件（JSON 列表）:
+    [{"name": "1688-采购1", "platform": "1688", "rate_per_minute": 2, "headless": false}]
+"""
+import inspect
+import json
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILE_ROOT = os.path.join(_PROJECT_ROOT, "data", "browser_profiles")
+
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+@dataclass
+class OrderLine:
+    """待下单的一个SKU"""
+    line_id: str
+    platform: str
+    supplier: str
+    recommendation: object          # 执行器使用的推荐商品（需可被 pickle）
+    quantity: int
+    shipping_info: object = None
+    purchase_demand: str = None
+
+
+@dataclass
+class SupplierGroup:
+    """同一平台、同一供应商、同一收货地址的订单（一个购物车、一次结算）"""
+    group_id: str
+    platform: str
+    supplier: str
+    lines: list
+
+
+@dataclass
+class Account:
+    """下单账号"""
+    name: str
+    platform: str
+    profile_dir: str = None         # 浏览器用户目录，默认 data/browser_profiles/<name>
+    rate_per_minute: float = 2.0    # 每分钟最多结算次数，0 表示不限
+    headless: bool = False          # 首次使用需要扫码登录时设为 False
+    options: dict = field(default_factory=dict)     # 传给执行器的其他参数
+
+    def __post_init__(self):
+        if not self.profile_dir:
+            self.profile_dir = os.path.join(PROFILE_ROOT, self.name)
+
+
+@dataclass
+class OrderResult:
+    """一个SKU的下单结果"""
+    line_id: str
+    group_id: str
+    platform: str
+    supplier: str
+    account: str = None
+    status: str = STATUS_FAILED
+    order_id: str = None
+    payment_amount: float = None
+    error: str = None
+    elapsed: float = 0.0            # 所在组的执行耗时
+
+
+@dataclass
+class AccountStats:
+    groups: int = 0
+    lines: int = 0
+    success: int = 0
+    failed: int = 0
+    busy: float = 0.0               # 执行下单的时间
+    rate_wait: float = 0.0          # 限流等待的时间
+
+
+@dataclass
+class DispatchReport:
+    """一次调度的汇总"""
+    results: list = field(default_factory=list)
+    accounts: dict = field(default_factory=dict)    # {账号: AccountStats}
+    groups: int = 0
+    elapsed: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    def format(self) -> str:
+        lines = [f"【并行下单】{len(self.results)} 个SKU / {self.groups} 个供应商组, "
+                 f"成功 {self.count(STATUS_SUCCESS)}, 失败 {self.count(STATUS_FAILED)}, "
+                 f"跳过 {self.count(STATUS_SKIPPED)}, 耗时 {self.elapsed:.1f}s",
+                 f"  {'账号':<16} {'组数':>4} {'SKU':>4} {'成功':>4} {'失败':>4} {'下单(s)':>8} {'限流等待(s)':>11}"]
+        for name, s in self.accounts.items():
+            lines.append(f"  {name:<16} {s.groups:>4} {s.lines:>4} {s.success:>4} {s.failed:>4} "
+                         f"{s.busy:>8.1f} {s.rate_wait:>11.1f}")
+        problems = [r for r in self.results if r.status != STATUS_SUCCESS]
+        if problems:
+            lines.append("  需人工处理:")
+            for r in problems:
+                lines.append(f"    {r.line_id} [{r.platform}/{r.supplier}] {r.status}: {r.error}")
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """逐行写出结果（JSONL）"""
+        with open(path, "w", encoding="utf-8") as f:
+            for r in self.results:
+                f.write(json.dumps(asdict(r), ensure_ascii=False, default=str) + "\n")
+
+
+def _shipping_key(info) -> str:
+    if info is None:
+        return ""
+    data = info if isinstance(info, dict) else vars(info)
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def group_orders(lines: list, max_lines_per_group: int = 20) -> list:
+    """按 (平台, 供应商, 收货地址) 分组，单组SKU数超过上限时拆分（购物车一次结算的数量有限）"""
+    buckets = {}
+    for line in lines:
+        key = (line.platform, line.supplier, _shipping_key(line.shipping_info))
+        buckets.setdefault(key, []).append(line)
+    groups = []
+    for (platform, supplier, _), items in buckets.items():
+        for start in range(0, len(items), max_lines_per_group):
+            groups.append(SupplierGroup(group_id=f"G{len(groups) + 1:04d}", platform=platform,
+                                        supplier=supplier, lines=items[start:start + max_lines_per_group]))
+    return groups
+
+
+# ---------- 工作进程 ----------
+
+def _order_summary(order) -> dict:
+    """订单对象 → 可跨进程传递的字段"""
+    if isinstance(order, dict):
+        return {"order_id": order.get("order_id"), "payment_amount": order.get("payment_amount")}
+    amount = getattr(order, "payment_amount", None)
+    return {"order_id": getattr(order, "order_id", None),
+            "payment_amount": float(amount) if amount is not None else None}
+
+
+def _supports_cart(executor) -> bool:
+    return all(hasattr(executor, name) for name in ("add_to_cart", "checkout", "clear_cart"))
+
+
+def _reset_cart(executor) -> bool:
+    """失败后清空购物车；执行器不使用购物车时直接返回 True，清空失败返回 False"""
+    if not _supports_cart(executor):
+        return True
+    try:
+        executor.clear_cart()
+        return True
+    except Exception:
+        return False
+
+
+def _close_executor(executor):
+    if hasattr(executor, "close"):
+        try:
+            executor.close()
+        except Exception:
+            pass
+
+
+def _execute_group(executor, group: SupplierGroup) -> list:
+    """执行一组订单，返回 [(line_id, 订单摘要或None, 错误或None)]"""
+    if _supports_cart(executor):
+        # 购物车按账号持久保存，先清掉之前残留的商品
+        executor.clear_cart()
+        for line in group.lines:
+            executor.add_to_cart(line.recommendation, line.quantity)
+        demand = "; ".join(line.purchase_demand for line in group.lines if line.purchase_demand) or None
+        order = executor.checkout(group.lines[0].shipping_info, purchase_demand=demand)
+        if order is None:
+            executor.clear_cart()
+            return [(line.line_id, None, "结算未返回订单") for line in group.lines]
+        summary = _order_summary(order)
+        return [(line.line_id, summary, None) for line in group.lines]
+
+    outcomes = []
+    for line in group.lines:
+        try:
+            order = executor.execute_order(recommendation=line.recommendation, shipping_info=line.shipping_info,
+                                           quantity=line.quantity, purchase_demand=line.purchase_demand)
+            if order is None:
+                outcomes.append((line.line_id, None, "执行器未返回订单"))
+            else:
+                outcomes.append((line.line_id, _order_summary(order), None))
+        except Exception as e:
+            outcomes.append((line.line_id, None, f"{type(e).__name__}: {e}"))
+    return outcomes
+
+
+def _account_worker(account: Account, executor_factory, tasks, results):
+    """
+    一个账号的工作进程：从平台队列取组、按账号限流、执行并回报结果
+
+    消息: ("start", 账号, 组ID, None) / ("done", 账号, 组ID, 详情) / ("exit", 账号, None, None)
+    """
+    interval = 60.0 / account.rate_per_minute if account.rate_per_minute else 0.0
+    executor = None
+    last_checkout = None
+    try:
+        while True:
+            group = tasks.get()
+            if group is None:
+                break
+            results.put(("start", account.name, group.group_id, None))
+            wait = 0.0
+            if last_checkout is not None and interval:
+                wait = max(0.0, last_checkout + interval - time.monotonic())
+                time.sleep(wait)
+            started = time.monotonic()
+            try:
+                if executor is None:
+                    executor = executor_factory(account)
+            except Exception as e:
+                # 执行器创建失败（如登录失败）没有访问下单页，不计入限流，下一组重新创建
+                outcomes = [(line.line_id, None, f"{type(e).__name__}: {e}") for line in group.lines]
+            else:
+                try:
+                    outcomes = _execute_group(executor, group)
+                except Exception as e:
+                    outcomes = [(line.line_id, None, f"{type(e).__name__}: {e}") for line in group.lines]
+                    if not _reset_cart(executor):
+                        # 购物车状态未知，不再复用该执行器
+                        _close_executor(executor)
+                        executor = None
+                last_checkout = time.monotonic()
+            results.put(("done", account.name, group.group_id,
+                         {"outcomes": outcomes, "elapsed": time.monotonic() - started, "rate_wait": wait}))
+    finally:
+        if executor is not None:
+            _close_executor(executor)
+        results.put(("exit", account.name, None, None))
+
+
+def _selenium_executor_class():
+    """导入 SeleniumOrderExecutor 并确认它支持独立的浏览器用户目录"""
+    from src.services.selenium_order_executor import SeleniumOrderExecutor
+
+    if "profile_dir" not in inspect.signature(SeleniumOrderExecutor).parameters:
+        # 不传用户目录时所有账号共用同一个浏览器配置，登录状态和购物车会互相覆盖
+        raise TypeError("SeleniumOrderExecutor 不支持 profile_dir 参数，无法按账号隔离浏览器用户目录")
+    return SeleniumOrderExecutor
+
+
+def selenium_executor_factory(account: Account):
+    """默认执行器：每个账号一个 SeleniumOrderExecutor，使用账号自己的浏览器用户目录"""
+    executor_class = _selenium_executor_class()
+    os.makedirs(account.profile_dir, exist_ok=True)
+    return executor_class(headless=account.headless, profile_dir=account.profile_dir, **account.options)
+
+
+# ---------- 调度 ----------
+
+class OrderDispatcher:
+    """多账号并行下单调度器"""
+
+    def __init__(self, accounts: list, executor_factory=None, max_lines_per_group: int = 20,
+                 group_timeout: float = 900, start_method: str = "spawn"):
+        """
+        Args:
+            accounts: Account 列表（同一平台可有多个账号）
+            executor_factory: executor_factory(account) -> 执行器，默认 selenium_executor_factory
+            max_lines_per_group: 单个购物车的SKU数上限
+            group_timeout: 单组最长执行秒数，超时后结束该账号的工作进程，组记为失败
+            start_method: 工作进程启动方式（spawn 不继承父进程的线程和浏览器句柄）
+        """
+        names = [a.name for a in accounts]
+        if len(set(names)) != len(names):
+            raise ValueError("账号名称重复")
+        self.accounts = list(accounts)
+        if executor_factory is None:
+            # 启动工作进程前检查，避免每个组都因同一个原因失败
+            _selenium_executor_class()
+        self.executor_factory = executor_factory or selenium_executor_factory
+        self.max_lines_per_group = max_lines_per_group
+        self.group_timeout = group_timeout
+        self.start_method = start_method
+
+    def dispatch(self, lines: list, progress=print) -> DispatchReport:
+        """
+        执行所有订单
+
+        Args:
+            lines: OrderLine 列表
+            progress: 进度输出函数，None 表示不输出
+        """
+        started = time.monotonic()
+        say = progress or (lambda message: None)
+        groups = group_orders(lines, self.max_lines_per_group)
+        report = DispatchReport(groups=len(groups), accounts={a.name: AccountStats() for a in self.accounts})
+        platforms = {a.platform for a in self.accounts}
+
+        unfinished = {}
+        for group in groups:
+            if group.platform in platforms:
+                unfinished[group.group_id] = group
+            else:
+                report.results.extend(self._results(group, None, STATUS_SKIPPED, error="没有该平台的下单账号"))
+        if not unfinished:
+            report.elapsed = time.monotonic() - started
+            return report
+
+        ctx = multiprocessing.get_context(self.start_method)
+        results = ctx.Queue()
+        tasks = {platform: ctx.Queue() for platform in platforms}
+        for group in unfinished.values():
+            tasks[group.platform].put(group)
+        workers = {}
+        for account in self.accounts:
+            tasks[account.platform].put(None)
+            process = ctx.Process(target=_account_worker, name=f"order-{account.name}",
+                                  args=(account, self.executor_factory, tasks[account.platform], results),
+                                  daemon=True)
+            process.start()
+            workers[account.name] = process
+        say(f"🛒 {len(unfinished)} 个供应商组 / {len(lines)} 个SKU，{len(workers)} 个账号并行下单")
+
+        in_flight = {}          # 账号 → (组ID, 开始时间)
+        exited = set()
+        try:
+            while unfinished and len(exited) < len(workers):
+                try:
+                    kind, name, group_id, detail = results.get(timeout=1.0)
+                except queue.Empty:
+                    self._check_workers(workers, in_flight, exited, unfinished, report, say)
+                    continue
+                if kind == "start":
+                    in_flight[name] = (group_id, time.monotonic())
+                elif kind == "done":
+                    in_flight.pop(name, None)
+                    group = unfinished.pop(group_id, None)
+                    if group is not None:
+                        self._record(report, group, name, detail, say)
+                elif kind == "exit":
+                    exited.add(name)
+        finally:
+            for name, process in workers.items():
+                process.join(timeout=30 if name not in in_flight else 1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+        # 平台的账号全部退出后剩下的组
+        for group in unfinished.values():
+            report.results.extend(self._results(group, None, STATUS_FAILED, error="没有可用账号完成该组"))
+        report.elapsed = time.monotonic() - started
+        return report
+
+    def _check_workers(self, workers: dict, in_flight: dict, exited: set, unfinished: dict,
+                       report: DispatchReport, say):
+        """处理异常退出和超时的工作进程"""
+        now = time.monotonic()
+        for name, process in workers.items():
+            if name in exited:
+                continue
+            flight = in_flight.get(name)
+            timed_out = flight is not None and now - flight[1] > self.group_timeout
+            if process.is_alive() and not timed_out:
+                continue
+            if timed_out:
+                process.terminate()
+                process.join()
+            exited.add(name)
+            if flight is None:
+                continue
+            in_flight.pop(name)
+            group = unfinished.pop(flight[0], None)
+            if group is not None:
+                reason = f"超过 {self.group_timeout:.0f}s 未完成" if timed_out else "工作进程异常退出"
+                say(f"❌ [{name}] {group.supplier}: {reason}")
+                report.results.extend(self._results(group, name, STATUS_FAILED, error=reason,
+                                                    elapsed=now - flight[1]))
+                report.accounts[name].groups += 1
+                report.accounts[name].lines += len(group.lines)
+                report.accounts[name].failed += len(group.lines)
+
+    def _record(self, report: DispatchReport, group: SupplierGroup, name: str, detail: dict, say):
+        stats = report.accounts[name]
+        stats.groups += 1
+        stats.lines += len(group.lines)
+        stats.busy += detail["elapsed"]
+        stats.rate_wait += detail["rate_wait"]
+        for line_id, summary, error in detail["outcomes"]:
+            result = OrderResult(line_id=line_id, group_id=group.group_id, platform=group.platform,
+                                 supplier=group.supplier, account=name, elapsed=detail["elapsed"])
+            if summary is not None:
+                result.status = STATUS_SUCCESS
+                result.order_id = summary["order_id"]
+                result.payment_amount = summary["payment_amount"]
+                stats.success += 1
+            else:
+                result.error = error
+                stats.failed += 1
+            report.results.append(result)
+        ok = sum(1 for _, summary, _ in detail["outcomes"] if summary is not None)
+        icon = "✅" if ok == len(group.lines) else "❌" if ok == 0 else "⚠️"
+        say(f"{icon} [{name}] {group.supplier}: {ok}/{len(group.lines)} 个SKU下单成功，"
+            f"耗时 {detail['elapsed']:.1f}s")
+
+    def _results(self, group: SupplierGroup, account: str, status: str, error: str = None,
+                 elapsed: float = 0.0) -> list:
+        return [OrderResult(line_id=line.line_id, group_id=group.group_id, platform=group.platform,
+                            supplier=group.supplier, account=account, status=status, error=error,
+                            elapsed=elapsed)
+                for line in group.lines]
+
+
+# ---------- 文件读取 ----------
+
+def load_accounts(path: str) -> list:
+    """读取账号文件（JSON 列表）"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Account(**item) for item in json.load(f)]
+
+
+def load_order_lines(path: str, default_shipping: dict = None) -> list:
+    """
+    读取订单文件（JSONL）
+
+    收货信息转换为 ShippingInfo；推荐商品以属性对象传给执行器（字段即订单文件中的字段）。
+
+    Args:
+        path: 订单文件
+        default_shipping: 行内没有 shipping 时使用的收货信息
+    """
+    from src.models.order import ShippingInfo
+
+    lines = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_no, raw in enumerate(f, start=1):
+            raw = raw.strip()
+            if not raw or raw.startswith("#"):
+                continue
+            row = json.loads(raw)
+            shipping = row.pop("shipping", None) or default_shipping
+            platform = str(row.get("platform") or "1688").lower()
+            lines.append(OrderLine(
+                line_id=str(row.get("line_id") or line_no),
+                platform=platform,
+                supplier=row.get("supplier") or row.get("product_url") or row.get("product_id") or "",
+                recommendation=SimpleNamespace(**{**row, "platform": platform}),
+                quantity=int(row.get("quantity") or 1),
+                shipping_info=ShippingInfo(**shipping) if shipping else None,
+                purchase_demand=row.get("purchase_demand"),
+            ))
+    return lines
+
+
+def run_dispatch_orders(orders_path: str, accounts_path: str, shipping_path: str = None,
+                        output_path: str = None) -> DispatchReport:
+    """
+    命令行入口：读取订单和账号文件，并行下单并打印汇总
+
+    Args:
+        orders_path: 订单文件（JSONL）
+        accounts_path: 账号文件（JSON）
+        shipping_path: 默认收货信息（JSON 对象），订单行没有 shipping 时使用
+        output_path: 逐行结果输出文件（JSONL）
+    """
+    default_shipping = None
+    if shipping_path:
+        with open(shipping_path, "r", encoding="utf-8") as f:
+            default_shipping = json.load(f)
+    accounts = load_accounts(accounts_path)
+    lines = load_order_lines(orders_path, default_shipping)
+    if not lines:
+        print(f"⚠️ 订单文件为空: {orders_path}")
+        return DispatchReport()
+
+    report = OrderDispatcher(accounts).dispatch(lines)
+    print("\n" + report.format())
+    if output_path:
+        report.write(output_path)
+        print(f"📄 下单结果已写入: {output_path}")
+    return report
@@ -0,0 +1,202 @@
+"""
+批量页面结构审计
+============================================
+
+对大量商品页并行执行SKU结构提取，逐页输出一行 PageAnalysis（NDJSON），结束时汇总各选择器的命中情况，
+用于在 1688 改版后快速发现哪些选择器失效。
+
+两种数据源:
+    - URL列表：每个工作进程持有一个无头浏览器（DriverPool(size=1)）
+    - 快照目录：工作进程用 lxml 解析离线快照，无需浏览器和网络
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from src.models.page_analysis import PageAnalysis
+from src.services.dom_extractor import DomExtractor, SKU_ANALYSIS_RULES, SKU_KEYWORD_RULES
+
+AUDIT_RULES = SKU_ANALYSIS_RULES + SKU_KEYWORD_RULES
+
+# 工作进程内的全局状态（由 initializer 创建）
+_worker = {}
+
+
+def iter_url_list(path: str):
+    """读取URL列表文件，每行一个URL，忽略空行和 # 注释"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def iter_snapshot_refs(root: str, all_versions: bool = False):
+    """
+    列出快照目录中的快照
+
+    Returns:
+        (url, digest) 迭代器，默认每个URL只取最近一次快照
+    """
+    from src.services.snapshot_store import SnapshotStore
+
+    latest, seen = {}, set()
+    for url, digest, _ in SnapshotStore(root).list():
+        if all_versions:
+            # 同一URL重复抓取到相同内容时只分析一次
+            if (url, digest) not in seen:
+                seen.add((url, digest))
+                yield url, digest
+        else:
+            latest[url] = digest
+    yield from latest.items()
+
+
+# ---------- 工作进程 ----------
+
+def _init_browser_worker(headless: bool):
+    from multiprocessing.util import Finalize
+    from src.services.driver_pool import DriverPool
+
+    pool = DriverPool(size=1, headless=headless)
+    # 工作进程退出时不会执行 atexit，用 multiprocessing 的 Finalize 关闭浏览器
+    Finalize(pool, pool.close, exitpriority=10)
+    _worker["pool"] = pool
+    _worker["extractor"] = DomExtractor(AUDIT_RULES)
+
+
+def _init_snapshot_worker(root: str):
+    from src.services.snapshot_store import SnapshotStore
+
+    _worker["store"] = SnapshotStore(root)
+    _worker["extractor"] = DomExtractor(AUDIT_RULES)
+
+
+def _analyze_url(url: str) -> PageAnalysis:
+    from src.services.page_readiness import wait_for_page_ready
+
+    started = time.perf_counter()
+    timings = {}
+    try:
+        # 只恢复cookies：多个工作进程同时写同一个cookies文件会互相覆盖
+        with _worker["pool"].session(platform="1688", save_cookies=False) as session:
+            session.get(url)
+            timings["load"] = time.perf_counter() - started
+            ready = wait_for_page_ready(session.driver, label="audit")
+            timings["wait"] = ready.elapsed
+            t = time.perf_counter()
+            extraction = _worker["extractor"].run(session.driver)
+            timings["extract"] = time.perf_counter() - t
+            timings["total"] = time.perf_counter() - started
+            return PageAnalysis.from_extraction(url, extraction, "browser", timings,
+                                                wait_reason=ready.reason)
+    except Exception as e:
+        timings["total"] = time.perf_counter() - started
+        return PageAnalysis.failure(url, "browser", str(e), timings)
+
+
+def _analyze_snapshot(ref: tuple) -> PageAnalysis:
+    url, digest = ref
+    started = time.perf_counter()
+    timings = {}
+    try:
+        snapshot = _worker["store"].load(digest, url=url)
+        timings["load"] = time.perf_counter() - started
+        t = time.perf_counter()
+        extraction = _worker["extractor"].run_html(snapshot.html, url=snapshot.final_url)
+        timings["extract"] = time.perf_counter() - t
+        timings["total"] = time.perf_counter() - started
+        return PageAnalysis.from_extraction(url, extraction, "snapshot", timings, digest=digest)
+    except Exception as e:
+        timings["total"] = time.perf_counter() - started
+        return PageAnalysis.failure(url, "snapshot", str(e), timings, digest=digest)
+
+
+# ---------- 汇总 ----------
+
+class SelectorHitStats:
+    """统计各规则在多少页面上命中"""
+
+    def __init__(self, rules: tuple = AUDIT_RULES):
+        self.rules = rules
+        self.pages = 0
+        self.failed = 0
+        self.hit_pages = {r.name: 0 for r in rules}
+        self.hit_total = {r.name: 0 for r in rules}
+        self.total_seconds = 0.0
+
+    def add(self, analysis: PageAnalysis):
+        if not analysis.ok:
+            self.failed += 1
+            return
+        self.pages += 1
+        self.total_seconds += analysis.timings.get("total", 0.0)
+        for name, count in analysis.counts.items():
+            if name in self.hit_pages:
+                self.hit_pages[name] += 1
+                self.hit_total[name] += count
+
+    def report(self) -> str:
+        lines = [f"【选择器命中统计】成功 {self.pages} 页，失败 {self.failed} 页"]
+        if self.pages:
+            lines.append(f"  平均每页耗时: {self.total_seconds / self.pages:.3f}s")
+        lines.append(f"  {'规则':<60} {'命中页数':>8} {'命中率':>8} {'累计数量':>8}")
+        for rule in self.rules:
+            hits = self.hit_pages[rule.name]
+            rate = hits / self.pages if self.pages else 0.0
+            lines.append(f"  {rule.name:<60} {hits:>8} {rate:>8.1%} {self.hit_total[rule.name]:>8}")
+        return "\n".join(lines)
+
+
+def audit_pages(urls_file: str = None, snapshot_dir: str = None, workers: int = 4,
+                output_path: str = None, headless: bool = True) -> SelectorHitStats:
+    """
+    并行审计商品页结构
+
+    Args:
+        urls_file: URL列表文件（与 snapshot_dir 二选一）
+        snapshot_dir: 快照目录
+        workers: 工作进程数
+        output_path: 结果输出路径（JSONL），为空时输出到标准输出
+        headless: 浏览器模式下是否无头
+
+    Returns:
+        选择器命中统计
+    """
+    if bool(urls_file) == bool(snapshot_dir):
+        raise ValueError("必须且只能指定 URL 列表或快照目录之一")
+
+    if urls_file:
+        tasks = iter_url_list(urls_file)
+        func, initializer, initargs = _analyze_url, _init_browser_worker, (headless,)
+    else:
+        tasks = iter_snapshot_refs(snapshot_dir)
+        func, initializer, initargs = _analyze_snapshot, _init_snapshot_worker, (snapshot_dir,)
+
+    stats = SelectorHitStats()
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    # 控制在途任务数，避免一次性提交上千个任务
+    max_in_flight = workers * 2
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                 initargs=initargs) as executor:
+            in_flight = set()
+            for task in tasks:
+                in_flight.add(executor.submit(func, task))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _emit(out, stats, future.result())
+            for future in as_completed(in_flight):
+                _emit(out, stats, future.result())
+    finally:
+        if output_path:
+            out.close()
+    return stats
+
+
+def _emit(out, stats: SelectorHitStats, analysis: PageAnalysis):
+    # 批量审计只保留命中数，不输出样例元素，便于大规模对比
+    out.write(analysis.to_json(include_items=False) + "\n")
+    out.flush()
+    stats.add(analysis)
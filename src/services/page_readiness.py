@@ -0,0 +1,200 @@
+"""
+页面就绪检测
+============================================
+
+替代 driver.get 之后固定的 time.sleep：在页面内安装 MutationObserver 和
+PerformanceObserver，轮询 readyState、目标元素是否出现、DOM 与网络是否已静默，
+条件满足立即返回，超时则放弃等待。每次等待的实际耗时都会记录下来，便于调参。
+
+用法:
+    driver.get(url)
+    result = wait_for_page_ready(driver, label="商品页")
+    print(result)
+    print(wait_stats.report())
+"""
+import time
+from dataclasses import dataclass, field
+
+# 1688 商品页的SKU/购买区域
+SKU_READY_SELECTOR = ('[class*="obj-sku"], [class*="sku-wrapper"], [class*="detail-sku"], '
+                      '[class*="detail-buy"], [class*="order-area"]')
+
+_PROBE_JS = """
+var st = window.__caigouReady;
+if (!st) {
+    st = window.__caigouReady = {lastMutation: performance.now(), lastResource: 0, mutations: 0};
+    try {
+        new MutationObserver(function(records) {
+            st.lastMutation = performance.now();
+            st.mutations += records.length;
+        }).observe(document.documentElement, {childList: true, subtree: true});
+    } catch (e) {}
+    try {
+        new PerformanceObserver(function(list) {
+            list.getEntries().forEach(function(e) {
+                if (e.responseEnd > st.lastResource) st.lastResource = e.responseEnd;
+            });
+        }).observe({type: 'resource', buffered: true});
+    } catch (e) {}
+}
+var now = performance.now();
+return {
+    readyState: document.readyState,
+    found: arguments[0] ? !!document.querySelector(arguments[0]) : true,
+    sinceMutation: now - st.lastMutation,
+    sinceResource: now - st.lastResource,
+    mutations: st.mutations,
+    url: window.location.href
+};
+"""
+
+
+@dataclass
+class WaitResult:
+    """一次等待的结果"""
+    label: str
+    ready: bool
+    reason: str             # ready / timeout / login
+    elapsed: float          # 实际等待秒数
+    polls: int
+    detail: dict = field(default_factory=dict)
+
+    def __str__(self):
+        icon = "✅" if self.ready else "⚠️"
+        return f"{icon} 等待[{self.label}] {self.reason}，耗时 {self.elapsed:.2f}s（轮询 {self.polls} 次）"
+
+
+class WaitStats:
+    """按标签汇总等待耗时"""
+
+    def __init__(self):
+        self._samples = {}
+
+    def record(self, result: WaitResult):
+        self._samples.setdefault(result.label, []).append(result)
+
+    def summary(self) -> dict:
+        """返回 {标签: {"count", "avg", "max", "timeouts"}}"""
+        out = {}
+        for label, results in self._samples.items():
+            elapsed = [r.elapsed for r in results]
+            out[label] = {
+                "count": len(results),
+                "avg": sum(elapsed) / len(elapsed),
+                "max": max(elapsed),
+                "timeouts": sum(1 for r in results if r.reason == "timeout"),
+            }
+        return out
+
+    def report(self) -> str:
+        lines = ["【页面等待耗时】"]
+        for label, s in self.summary().items():
+            lines.append(f"  {label}: {s['count']}次, 平均 {s['avg']:.2f}s, "
+                         f"最长 {s['max']:.2f}s, 超时 {s['timeouts']}次")
+        return "\n".join(lines)
+
+
+# 进程内共享的等待统计
+wait_stats = WaitStats()
+
+
+def _is_login_url(url: str) -> bool:
+    return "login" in (url or "").lower()
+
+
+def wait_for_page_ready(driver, ready_selector: str = SKU_READY_SELECTOR, quiet_ms: int = 500,
+                        timeout: float = 15, poll_interval: float = 0.1,
+                        label: str = "page") -> WaitResult:
+    """
+    等待页面可用
+
+    满足以下全部条件即返回:
+        1. document.readyState 为 interactive 或 complete
+        2. ready_selector 对应的元素已出现（为空则不检查）
+        3. 最近 quiet_ms 毫秒内没有 DOM 变动和新的网络资源完成
+
+    若跳转到了登录页，立即返回 reason="login"。
+
+    Args:
+        driver: Selenium WebDriver
+        ready_selector: 目标区域选择器
+        quiet_ms: DOM/网络静默时长（毫秒）
+        timeout: 最长等待秒数
+        poll_interval: 轮询间隔秒数
+        label: 统计标签
+    """
+    started = time.monotonic()
+    polls = 0
+    state = {}
+    reason = "timeout"
+
+    while True:
+        polls += 1
+        try:
+            state = driver.execute_script(_PROBE_JS, ready_selector) or {}
+        except Exception as e:
+            # 页面跳转过程中脚本可能执行失败，下一轮重试
+            state = {"error": str(e)}
+
+        if _is_login_url(state.get("url")):
+            reason = "login"
+            break
+        if (state.get("readyState") in ("interactive", "complete")
+                and state.get("found")
+                and state.get("sinceMutation", 0) >= quiet_ms
+                and state.get("sinceResource", 0) >= quiet_ms):
+            reason = "ready"
+            break
+        if time.monotonic() - started >= timeout:
+            break
+        time.sleep(poll_interval)
+
+    result = WaitResult(
+        label=label,
+        ready=reason == "ready",
+        reason=reason,
+        elapsed=time.monotonic() - started,
+        polls=polls,
+        detail=state,
+    )
+    wait_stats.record(result)
+    return result
+
+
+def wait_for_login(driver, timeout: float = 120, poll_interval: float = 1.0,
+                   label: str = "login") -> WaitResult:
+    """
+    等待用户完成登录（当前URL不再是登录页）
+
+    Args:
+        driver: Selenium WebDriver
+        timeout: 最长等待秒数
+        poll_interval: 轮询间隔秒数
+    """
+    started = time.monotonic()
+    polls = 0
+    url = ""
+    while True:
+        polls += 1
+        try:
+            url = driver.current_url
+        except Exception:
+            url = ""
+        if url and not _is_login_url(url):
+            reason = "ready"
+            break
+        if time.monotonic() - started >= timeout:
+            reason = "timeout"
+            break
+        time.sleep(poll_interval)
+
+    result = WaitResult(
+        label=label,
+        ready=reason == "ready",
+        reason=reason,
+        elapsed=time.monotonic() - started,
+        polls=polls,
+        detail={"url": url},
+    )
+    wait_stats.record(result)
+    return result
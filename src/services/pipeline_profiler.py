@@ -0,0 +1,500 @@
+"""
+采购流水线性能剖析
+============================================
+
+按阶段（爬取 → AI选品 → Top3 → 确认 → 下单 → 物流 → 入库 → 库存/备份）和平台记录:
+    - 墙钟时间、CPU时间（进程级，并发执行时各阶段会重叠）
+    - 外部调用次数、耗时、收发字节数（requests / httpx / Selenium WebDriver 命令）
+
+阶段边界来自编排器的进度回调（running → completed/failed），
+外部调用通过 install() 给 HTTP 客户端打补丁自动记录，也可以用 profiler.call() 手动记录。
+
+输出:
+    - Chrome Trace JSON（chrome://tracing、Perfetto、speedscope 可直接打开，火焰图视图）
+    - 折叠栈文本（flamegraph.pl / speedscope 可用，权重为微秒）
+    - 汇总表
+
+用法:
+    profiler = PipelineProfiler()
+    profiler.install()
+    orchestrator.set_progress_callback(profiler.wrap(bus.as_callback()))
+    ...
+    profiler.uninstall()
+    print(profiler.report())
+    profiler.write("data/profiles/run")
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILE_DIR = os.path.join(_PROJECT_ROOT, "data", "profiles")
+
+# 域名关键字 → 平台
+HOST_PLATFORMS = [
+    ("1688.com", "1688"),
+    ("jd.com", "jd"),
+    ("tmall.com", "tmall"),
+    ("taobao.com", "taobao"),
+    ("yangkeduo.com", "pdd"),
+    ("pinduoduo.com", "pdd"),
+    ("volces.com", "llm"),
+    ("kuaidi100.com", "kuaidi100"),
+]
+
+# 未处于任何阶段时的调用归到这里
+UNATTRIBUTED = "(阶段外)"
+
+_current_stage = contextvars.ContextVar("pipeline_stage", default=None)
+
+
+def platform_of(url: str) -> str:
+    """由URL推断平台，未知域名返回主机名"""
+    host = (urlparse(url).hostname or "").lower()
+    for keyword, platform in HOST_PLATFORMS:
+        if host == keyword or host.endswith("." + keyword):
+            return platform
+    return host or "unknown"
+
+
+@dataclass
+class CallRecord:
+    """一次外部调用"""
+    kind: str               # http / browser / llm ...
+    platform: str
+    start: float
+    duration: float
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    ok: bool = True
+    name: str = ""
+
+
+@dataclass
+class StageSpan:
+    """一个阶段的执行区间"""
+    step: str
+    workflow: str = None
+    start: float = 0.0
+    end: float = None
+    cpu_start: float = 0.0
+    cpu: float = 0.0
+    status: str = "running"
+    parent: tuple = None
+    calls: list = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple:
+        return (self.workflow, self.step)
+
+    @property
+    def wall(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class PipelineProfiler:
+    """流水线剖析器"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []             # 已结束的阶段
+        self._open = {}             # (workflow, step) → StageSpan
+        self._last_open = None
+        self._unattributed = StageSpan(step=UNATTRIBUTED, start=self.origin, cpu_start=time.process_time())
+        self._lock = threading.Lock()
+        self._patches = []
+
+    # ---------- 阶段 ----------
+
+    def observe(self, step: str, status: str, message: str = "", workflow: str = None):
+        """处理一条进度回调（需在产生该进度的协程/线程中同步调用）"""
+        key = (workflow, step)
+        now, cpu = time.perf_counter(), time.process_time()
+        with self._lock:
+            if status == "running":
+                if key in self._open:
+                    return
+                span = StageSpan(step=step, workflow=workflow, start=now, cpu_start=cpu,
+                                 parent=_current_stage.get())
+                self._open[key] = span
+                self._last_open = key
+                _current_stage.set(key)
+            elif key in self._open:
+                span = self._open.pop(key)
+                span.end, span.cpu, span.status = now, cpu - span.cpu_start, status
+                self.spans.append(span)
+                if _current_stage.get() == key:
+                    _current_stage.set(span.parent)
+                if self._last_open == key:
+                    self._last_open = next(reversed(self._open), None)
+
+    def wrap(self, callback=None, workflow: str = None):
+        """
+        包装进度回调：先记录阶段边界，再转交给原回调
+
+        Args:
+            callback: 原进度回调 (step, status, message)，可为空
+            workflow: 工作流标签
+        """
+        def progress_callback(step: str, status: str, message: str):
+            self.observe(step, status, message, workflow=workflow)
+            if callback is not None:
+                callback(step, status, message)
+        return progress_callback
+
+    @contextmanager
+    def stage(self, step: str, workflow: str = None):
+        """不经过进度回调的代码段（如初始化、备份）手动标记为一个阶段"""
+        self.observe(step, "running", workflow=workflow)
+        status = "completed"
+        try:
+            yield
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            self.observe(step, status, workflow=workflow)
+
+    # ---------- 外部调用 ----------
+
+    def _target_span(self) -> StageSpan:
+        key = _current_stage.get()
+        span = self._open.get(key) if key else None
+        if span is None and self._last_open is not None:
+            # 线程池中执行的同步代码拿不到协程上下文，归到最近开始的阶段
+            span = self._open.get(self._last_open)
+        return span or self._unattributed
+
+    def record_call(self, kind: str, platform: str, start: float, duration: float,
+                    bytes_sent: int = 0, bytes_received: int = 0, ok: bool = True, name: str = ""):
+        """记录一次外部调用"""
+        record = CallRecord(kind=kind, platform=platform, start=start, duration=duration,
+                            bytes_sent=bytes_sent, bytes_received=bytes_received, ok=ok, name=name)
+        with self._lock:
+            self._target_span().calls.append(record)
+        return record
+
+    @contextmanager
+    def call(self, kind: str, platform: str, name: str = ""):
+        """
+        手动记录一次外部调用，yield 的字典可填写 bytes_sent / bytes_received
+
+        用法:
+            with profiler.call("llm", "llm", "chat") as c:
+                resp = ...
+                c["bytes_received"] = len(resp.content)
+        """
+        info = {"bytes_sent": 0, "bytes_received": 0}
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield info
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record_call(kind, platform, start, time.perf_counter() - start,
+                             info["bytes_sent"], info["bytes_received"], ok, name)
+
+    # ---------- 自动埋点 ----------
+
+    def install(self):
+        """给 requests / httpx / Selenium 打补丁，自动记录外部调用（未安装的库跳过）"""
+        global _active
+        if _active is not None and _active is not self:
+            raise RuntimeError("已有剖析器在运行")
+        _active = self
+        if not self._patches:
+            for patcher in (_patch_requests, _patch_httpx, _patch_selenium):
+                try:
+                    self._patches.extend(patcher())
+                except ImportError:
+                    pass
+        return self
+
+    def uninstall(self):
+        """撤销补丁"""
+        global _active
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+        if _active is self:
+            _active = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    # ---------- 汇总 ----------
+
+    def _all_spans(self) -> list:
+        with self._lock:
+            spans = list(self.spans) + list(self._open.values())
+            if self._unattributed.calls:
+                spans.append(self._unattributed)
+        return spans
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            {"stages": {阶段: 统计}, "platforms": {(阶段, 平台): 统计}, "wall": 总墙钟, "cpu": 总CPU}
+            统计包含 count / wall / cpu / calls / call_seconds / bytes_sent / bytes_received / errors
+        """
+        def empty():
+            return {"count": 0, "wall": 0.0, "cpu": 0.0, "calls": 0, "call_seconds": 0.0,
+                    "bytes_sent": 0, "bytes_received": 0, "errors": 0}
+
+        stages, platforms = {}, {}
+        for span in self._all_spans():
+            s = stages.setdefault(span.step, empty())
+            if span is not self._unattributed:
+                s["count"] += 1
+                s["wall"] += span.wall
+                s["cpu"] += span.cpu
+            for c in span.calls:
+                p = platforms.setdefault((span.step, f"{c.kind}:{c.platform}"), empty())
+                p["count"] += 1
+                for d in (s, p):
+                    d["calls"] += 1
+                    d["call_seconds"] += c.duration
+                    d["bytes_sent"] += c.bytes_sent
+                    d["bytes_received"] += c.bytes_received
+                    d["errors"] += 0 if c.ok else 1
+        return {
+            "stages": stages,
+            "platforms": platforms,
+            "wall": time.perf_counter() - self.origin,
+            "cpu": time.process_time() - self._unattributed.cpu_start,
+        }
+
+    def report(self) -> str:
+        """汇总表（占比为阶段墙钟/总耗时，批量并发时各阶段重叠，合计可超过100%）"""
+        data = self.summary()
+        total_wall = data["wall"] or 1e-9
+        lines = [f"【性能剖析】总耗时 {data['wall']:.2f}s, CPU {data['cpu']:.2f}s",
+                 f"  {'阶段':<16} {'次数':>4} {'墙钟(s)':>9} {'占比':>7} {'CPU(s)':>8} "
+                 f"{'外部调用':>8} {'调用耗时(s)':>11} {'发送':>9} {'接收':>9}"]
+        ordered = sorted(data["stages"].items(), key=lambda kv: -kv[1]["wall"])
+        for step, s in ordered:
+            lines.append(f"  {step:<16} {s['count']:>4} {s['wall']:>9.2f} {s['wall'] / total_wall:>7.1%} "
+                         f"{s['cpu']:>8.2f} {s['calls']:>8} {s['call_seconds']:>11.2f} "
+                         f"{_fmt_bytes(s['bytes_sent']):>9} {_fmt_bytes(s['bytes_received']):>9}")
+        if data["platforms"]:
+            lines.append("  按平台:")
+            for (step, platform), p in sorted(data["platforms"].items(),
+                                              key=lambda kv: -kv[1]["call_seconds"]):
+                errors = f", 失败 {p['errors']}" if p["errors"] else ""
+                lines.append(f"    {step} / {platform}: {p['calls']}次, {p['call_seconds']:.2f}s, "
+                             f"发送 {_fmt_bytes(p['bytes_sent'])}, 接收 {_fmt_bytes(p['bytes_received'])}"
+                             f"{errors}")
+        return "\n".join(lines)
+
+    # ---------- 导出 ----------
+
+    def _us(self, t: float) -> int:
+        return int((t - self.origin) * 1e6)
+
+    def chrome_trace(self) -> dict:
+        """Chrome Trace Event 格式，每个工作流一条线程轨道，外部调用嵌套在阶段下"""
+        events = []
+        tids = {}
+        for span in self._all_spans():
+            tid = tids.setdefault(span.workflow or "", len(tids) + 1)
+            if span is not self._unattributed:
+                events.append({
+                    "name": span.step, "cat": "stage", "ph": "X", "pid": 1, "tid": tid,
+                    "ts": self._us(span.start), "dur": max(int(span.wall * 1e6), 1),
+                    "args": {"status": span.status, "cpu_s": round(span.cpu, 4),
+                             "calls": len(span.calls)},
+                })
+            for c in span.calls:
+                events.append({
+                    "name": f"{c.kind}:{c.platform}" + (f" {c.name}" if c.name else ""),
+                    "cat": c.kind, "ph": "X", "pid": 1, "tid": tid,
+                    "ts": self._us(c.start), "dur": max(int(c.duration * 1e6), 1),
+                    "args": {"bytes_sent": c.bytes_sent, "bytes_received": c.bytes_received,
+                             "ok": c.ok, "stage": span.step},
+                })
+        for workflow, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                           "args": {"name": workflow or "workflow"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def collapsed_stacks(self) -> str:
+        """折叠栈格式: 阶段;调用 权重(微秒)，阶段自身时间扣除外部调用耗时"""
+        weights = {}
+        for span in self._all_spans():
+            call_total = 0.0
+            for c in span.calls:
+                stack = f"{span.step};{c.kind}:{c.platform}"
+                weights[stack] = weights.get(stack, 0) + int(c.duration * 1e6)
+                call_total += c.duration
+            if span is not self._unattributed:
+                self_time = max(span.wall - call_total, 0.0)
+                weights[span.step] = weights.get(span.step, 0) + int(self_time * 1e6)
+        return "".join(f"{stack.replace(' ', '_')} {w}\n" for stack, w in weights.items() if w > 0)
+
+    def write(self, path_prefix: str) -> dict:
+        """
+        写出 <前缀>.trace.json 和 <前缀>.folded
+
+        Returns:
+            {"trace": 路径, "folded": 路径}
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path_prefix)), exist_ok=True)
+        paths = {"trace": path_prefix + ".trace.json", "folded": path_prefix + ".folded"}
+        with open(paths["trace"], "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            f.write(self.collapsed_stacks())
+        return paths
+
+
+def default_profile_prefix() -> str:
+    """data/profiles/profile_<时间戳>"""
+    return os.path.join(PROFILE_DIR, time.strftime("profile_%Y%m%d_%H%M%S"))
+
+
+def _fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return 0
+
+
+# ---------- 补丁 ----------
+
+# 当前生效的剖析器（补丁函数通过它记录调用）
+_active = None
+
+
+def _patch_requests() -> list:
+    import requests
+
+    original = requests.Session.send
+
+    def send(session, request, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return original(session, request, **kwargs)
+        start = time.perf_counter()
+        ok, received = True, 0
+        try:
+            response = original(session, request, **kwargs)
+            ok = response.status_code < 400
+            if kwargs.get("stream"):
+                received = int(response.headers.get("Content-Length") or 0)
+            else:
+                received = len(response.content or b"")
+            return response
+        except Exception:
+            ok = False
+            raise
+        finally:
+            profiler.record_call("http", platform_of(request.url), start, time.perf_counter() - start,
+                                 _body_size(request.body), received, ok, request.method)
+
+    requests.Session.send = send
+    return [(requests.Session, "send", original)]
+
+
+def _httpx_received(response) -> int:
+    try:
+        return len(response.content)
+    except Exception:
+        # 流式响应尚未读取
+        return int(response.headers.get("Content-Length") or 0)
+
+
+def _patch_httpx() -> list:
+    import httpx
+
+    sync_original = httpx.Client.send
+    async_original = httpx.AsyncClient.send
+
+    def send(client, request, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return sync_original(client, request, **kwargs)
+        start = time.perf_counter()
+        ok, received = True, 0
+        try:
+            response = sync_original(client, request, **kwargs)
+            ok, received = response.status_code < 400, _httpx_received(response)
+            return response
+        except Exception:
+            ok = False
+            raise
+        finally:
+            profiler.record_call("http", platform_of(str(request.url)), start,
+                                 time.perf_counter() - start,
+                                 int(request.headers.get("Content-Length") or 0), received, ok,
+                                 request.method)
+
+    async def asend(client, request, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return await async_original(client, request, **kwargs)
+        start = time.perf_counter()
+        ok, received = True, 0
+        try:
+            response = await async_original(client, request, **kwargs)
+            ok, received = response.status_code < 400, _httpx_received(response)
+            return response
+        except Exception:
+            ok = False
+            raise
+        finally:
+            profiler.record_call("http", platform_of(str(request.url)), start,
+                                 time.perf_counter() - start,
+                                 int(request.headers.get("Content-Length") or 0), received, ok,
+                                 request.method)
+
+    httpx.Client.send = send
+    httpx.AsyncClient.send = asend
+    return [(httpx.Client, "send", sync_original), (httpx.AsyncClient, "send", async_original)]
+
+
+def _patch_selenium() -> list:
+    from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+    original = RemoteConnection.execute
+
+    def execute(connection, command, params):
+        profiler = _active
+        if profiler is None:
+            return original(connection, command, params)
+        start = time.perf_counter()
+        ok, received = True, 0
+        try:
+            response = original(connection, command, params)
+            value = response.get("value") if isinstance(response, dict) else None
+            received = len(value) if isinstance(value, str) else 0
+            return response
+        except Exception:
+            ok = False
+            raise
+        finally:
+            # 浏览器命令的目标平台取当前页面不可得，统一记为 browser
+            profiler.record_call("browser", "chromedriver", start, time.perf_counter() - start,
+                                 len(json.dumps(params, default=str)) if params else 0,
+                                 received, ok, command)
+
+    RemoteConnection.execute = execute
+    return [(RemoteConnection, "execute", original)]
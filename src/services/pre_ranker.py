@@ -0,0 +1,415 @@
+"""
+AI选品前的规则预排序
+============================================
+
+爬取到的候选商品全部发给大模型，token 数和延迟随候选数线性增长。
+在调用大模型之前先用 pandas 向量化处理:
+
+    1. 过滤：超预算、起订量/库存不满足、不符合规格要求的商品
+    2. 去重：同平台标题规范化后相同、单价相差 1% 以内的商品只保留总价最低的一个
+    3. 评分：总价、运费、销量加权打分（0~100）
+    4. 只把前 K 个商品的精简字段发给大模型，由大模型确定最终推荐并给出理由
+
+不调用大模型时（fallback），直接按规则评分返回 Top3 推荐。
+
+工作流的AI选品阶段通过 ProductSelector 接入：编排器提供 set_product_selector(selector) 时，
+run_auto_purchase 和批量模式会注入选品函数，编排器在选品阶段 await selector(demand, candidates, progress_callback)，
+由它先预排序再调用大模型。
+"""
+import json
+import math
+import re
+import time
+from dataclasses import dataclass, field
+
+from src.services.llm_cache import normalize_text
+
+# 评分权重（列缺失时该项不参与，权重按比例归一）
+DEFAULT_WEIGHTS = {"price": 0.7, "freight": 0.15, "sales": 0.15}
+
+# 标题中不影响商品本身的营销词
+_TITLE_NOISE_RE = re.compile(r"【[^】]*】|\[[^\]]*\]|包邮|现货|批发|厂家直销|热卖|特价|正品|新款|促销|爆款")
+_TITLE_PUNCT_RE = re.compile(r"[\s\W_]+")
+
+# 发给大模型时的说明：候选已经排好序，只需确认并解释
+EXPLAIN_INSTRUCTION = (
+    "候选商品已按总价、运费、销量规则评分并排序（score 越高越好），均满足预算和规格要求。"
+    "请从中确定最终的3个推荐，并用一句话说明理由，以JSON返回: "
+    '{"recommendations": [{"index": 序号, "score": 评分, "reason": 理由}]}'
+)
+
+
+def _field(obj, *names):
+    for name in names:
+        value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def title_key(title: str) -> str:
+    """标题去重键：去掉营销词、标点和空白"""
+    text = _TITLE_NOISE_RE.sub("", normalize_text(title))
+    return _TITLE_PUNCT_RE.sub("", text)
+
+
+@dataclass
+class RankedCandidate:
+    """预排序后的候选商品"""
+    rank: int
+    platform: str
+    product_id: str
+    product_name: str
+    unit_price: float
+    freight: float
+    total_cost: float
+    total_score: float
+    reason: str = ""
+    product_url: str = None
+    source: object = None       # 原始候选记录
+
+    def compact(self, index: int) -> dict:
+        """发给大模型的精简字段"""
+        return {
+            "index": index,
+            "platform": self.platform,
+            "product_id": self.product_id,
+            "product_name": self.product_name[:40],
+            "unit_price": round(self.unit_price, 2),
+            "freight": round(self.freight, 2),
+            "total": round(self.total_cost, 2),
+            "score": round(self.total_score, 1),
+        }
+
+
+@dataclass
+class PreRankResult:
+    """预排序结果"""
+    candidates: list                                    # RankedCandidate，按评分降序
+    total: int = 0
+    dropped: dict = field(default_factory=dict)         # {原因: 数量}
+    elapsed: float = 0.0
+
+    def compact_payload(self) -> list:
+        return [c.compact(i) for i, c in enumerate(self.candidates, 1)]
+
+    def summary(self) -> str:
+        dropped = ", ".join(f"{k} {v}" for k, v in self.dropped.items() if v) or "无"
+        return (f"预排序: {self.total} → {len(self.candidates)} 个候选"
+                f"（剔除: {dropped}），耗时 {self.elapsed * 1000:.1f}ms")
+
+
+def _demand_value(demand, name):
+    if demand is None or isinstance(demand, str):
+        return None
+    return _field(demand, name)
+
+
+def _spec_tokens(specification: str) -> list:
+    return [t for t in re.split(r"[\s,，/|;；]+", normalize_text(specification)) if t]
+
+
+def pre_rank(candidates: list, demand=None, top_k: int = 8, weights: dict = None,
+             price_tolerance: float = 0.01) -> PreRankResult:
+    """
+    过滤、去重、评分并取前K个候选
+
+    Args:
+        candidates: 候选商品（字典或对象），字段: platform, product_id, product_name/title,
+                    unit_price/price, freight, min_order, stock, sales, specification, product_url
+        demand: 采购需求（取 quantity / budget / specification）
+        top_k: 保留的候选数
+        weights: 评分权重，默认 DEFAULT_WEIGHTS
+        price_tolerance: 去重时视为同价的相对价差
+
+    Returns:
+        PreRankResult
+    """
+    import numpy as np
+    import pandas as pd
+
+    started = time.perf_counter()
+    quantity = int(_demand_value(demand, "quantity") or 1)
+    budget = _to_float(_demand_value(demand, "budget"))
+    spec = _demand_value(demand, "specification") or ""
+
+    df = pd.DataFrame({
+        "platform": [str(getattr(_field(c, "platform"), "value", _field(c, "platform")) or "")
+                     for c in candidates],
+        "product_id": [str(_field(c, "product_id", "offer_id", "sku_id") or "") for c in candidates],
+        "product_name": [str(_field(c, "product_name", "title") or "") for c in candidates],
+        "unit_price": [_to_float(_field(c, "unit_price", "price")) for c in candidates],
+        "freight": [_to_float(_field(c, "freight")) for c in candidates],
+        "min_order": [_to_float(_field(c, "min_order")) for c in candidates],
+        "stock": [_to_float(_field(c, "stock")) for c in candidates],
+        "sales": [_to_float(_field(c, "sales")) for c in candidates],
+        "spec_text": [str(_field(c, "specification") or "") for c in candidates],
+        "product_url": [_field(c, "product_url", "url") for c in candidates],
+    })
+    df["pos"] = np.arange(len(df))
+    dropped = {"价格无效": 0, "超预算": 0, "起订量/库存不足": 0, "规格不符": 0, "重复": 0}
+
+    def drop(mask, reason):
+        nonlocal df
+        dropped[reason] += int(mask.sum())
+        df = df[~mask]
+
+    drop(~(df["unit_price"] > 0), "价格无效")
+    df = df.assign(freight=df["freight"].fillna(0.0))
+    df = df.assign(total_cost=df["unit_price"] * quantity + df["freight"])
+    if not math.isnan(budget):
+        drop(df["total_cost"] > budget, "超预算")
+    drop((df["min_order"] > quantity) | (df["stock"] < quantity), "起订量/库存不足")
+
+    tokens = _spec_tokens(spec)
+    if tokens and len(df):
+        text = (df["product_name"] + " " + df["spec_text"]).map(normalize_text)
+        matched = np.ones(len(df), dtype=bool)
+        for token in tokens:
+            matched &= text.str.contains(token, regex=False).to_numpy()
+        drop(pd.Series(~matched, index=df.index), "规格不符")
+
+    if len(df):
+        # 同平台、标题相同、单价在容差内视为同一商品，保留总价最低的
+        df = df.assign(
+            title_key=df["product_name"].map(title_key),
+            price_bucket=np.round(np.log(df["unit_price"]) / math.log1p(price_tolerance)),
+        ).sort_values(["total_cost", "pos"])
+        dup = df.duplicated(subset=["platform", "title_key", "price_bucket"], keep="first")
+        drop(dup, "重复")
+
+    if len(df):
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        parts = {
+            "price": df["total_cost"].min() / df["total_cost"],
+            "freight": 1.0 - df["freight"] / df["total_cost"],
+        }
+        if df["sales"].notna().any():
+            sales = np.log1p(df["sales"].fillna(0).clip(lower=0))
+            parts["sales"] = sales / sales.max() if sales.max() > 0 else sales * 0
+        used = {k: w for k, w in weights.items() if k in parts and w > 0}
+        weight_sum = sum(used.values()) or 1.0
+        score = sum(parts[k] * (w / weight_sum) for k, w in used.items())
+        df = df.assign(total_score=(score * 100).round(2))
+        df = df.sort_values(["total_score", "total_cost", "pos"], ascending=[False, True, True])
+        df = df.head(top_k)
+
+    originals = list(candidates)
+    ranked = [
+        RankedCandidate(
+            rank=i,
+            platform=row.platform,
+            product_id=row.product_id,
+            product_name=row.product_name,
+            unit_price=float(row.unit_price),
+            freight=float(row.freight),
+            total_cost=float(row.total_cost),
+            total_score=float(row.total_score),
+            product_url=row.product_url,
+            source=originals[row.pos],
+        )
+        for i, row in enumerate(df.itertuples(index=False), 1)
+    ] if len(df) else []
+
+    return PreRankResult(candidates=ranked, total=len(originals), dropped=dropped,
+                         elapsed=time.perf_counter() - started)
+
+
+def rule_reason(candidate: RankedCandidate, best: RankedCandidate) -> str:
+    """规则推荐的理由"""
+    diff = candidate.total_cost - best.total_cost
+    if candidate is best:
+        head = "综合评分最高"
+    elif diff > 0:
+        head = f"比首选贵 ¥{diff:.2f}"
+    elif diff < 0:
+        head = f"比首选便宜 ¥{-diff:.2f}"
+    else:
+        head = "与首选同价"
+    freight = "包邮" if candidate.freight == 0 else f"运费¥{candidate.freight:.2f}"
+    return f"{head}，合计 ¥{candidate.total_cost:.2f}（{freight}），评分 {candidate.total_score:.1f}"
+
+
+def recommend_without_llm(result: PreRankResult, top_n: int = 3) -> list:
+    """不调用大模型，直接按规则评分给出推荐"""
+    picks = result.candidates[:top_n]
+    for i, c in enumerate(picks, 1):
+        c.rank = i
+        c.reason = rule_reason(c, picks[0])
+    return picks
+
+
+def _fill_with_rules(picks: list, result: PreRankResult, top_n: int = 3) -> list:
+    """大模型给出的推荐不足 top_n 条（截断/失败）时，按规则评分补齐"""
+    for c in result.candidates:
+        if len(picks) >= top_n:
+            break
+        if not any(p is c for p in picks):
+            c.reason = rule_reason(c, picks[0] if picks else c) + "（规则补充）"
+            picks.append(c)
+    for i, c in enumerate(picks, 1):
+        c.rank = i
+    return picks
+
+
+async def select_top3(demand, candidates: list, client=None, top_k: int = 8,
+                      use_llm: bool = True, stream: bool = None, on_recommendation=None,
+                      progress_callback=None) -> dict:
+    """
+    预排序后再交给大模型确定推荐；大模型不可用或调用失败时退回规则推荐
+
+    Args:
+        demand: 采购需求
+        candidates: 爬取到的候选商品
+        client: LLMClient，为空时不调用大模型
+        top_k: 发给大模型的候选数
+        use_llm: False 时直接返回规则推荐
+        stream: 流式调用，每条推荐生成后立即回调；默认跟随 client.stream
+        on_recommendation: 每确定一条推荐时回调 on_recommendation(RankedCandidate)
+        progress_callback: 编排器风格的进度回调 (step, status, message)，每条推荐输出一行进度
+
+    Returns:
+        {"recommendations": [RankedCandidate], "mode": "llm"/"rules"/"llm+rules",
+         "pre_rank": PreRankResult, "error": 大模型失败原因, "truncated": 输出是否被截断}
+    """
+    result = pre_rank(candidates, demand, top_k=top_k)
+    out = {"pre_rank": result, "mode": "rules", "error": None, "truncated": False}
+    picks = []
+
+    def emit(c: RankedCandidate):
+        if progress_callback is not None:
+            progress_callback("AI选品", "running",
+                              f"🎯 推荐{c.rank}: {c.product_name} 合计¥{c.total_cost:.2f} — {c.reason}")
+        if on_recommendation is not None:
+            on_recommendation(c)
+
+    def accept(rec: dict):
+        if len(picks) >= 3:
+            return
+        c = result.candidates[rec["index"] - 1]
+        if any(p is c for p in picks):
+            return
+        c.reason = rec["reason"]
+        c.rank = len(picks) + 1
+        picks.append(c)
+        emit(c)
+
+    if result.candidates and use_llm and client is not None:
+        try:
+            if stream if stream is not None else getattr(client, "stream", False):
+                reply = await client.select_products_stream(
+                    demand, result.compact_payload(), on_recommendation=accept,
+                    instruction=EXPLAIN_INSTRUCTION)
+                out["truncated"] = reply["truncated"]
+            else:
+                from src.services.llm_client import validate_recommendation
+                reply = await client.select_products(demand, result.compact_payload(),
+                                                     instruction=EXPLAIN_INSTRUCTION)
+                for rec in (reply.get("parsed") or {}).get("recommendations") or []:
+                    rec = validate_recommendation(rec, len(result.candidates))
+                    if rec is not None:
+                        accept(rec)
+            if not picks:
+                raise ValueError("大模型未返回有效推荐")
+        except Exception as e:
+            out["error"] = str(e)
+
+    if not picks:
+        out["recommendations"] = recommend_without_llm(result)
+        for c in out["recommendations"]:
+            emit(c)
+        return out
+
+    out["mode"] = "llm"
+    if len(picks) < min(3, len(result.candidates)):
+        # 已输出的推荐保持不变，只补齐剩余名次
+        emitted = len(picks)
+        _fill_with_rules(picks, result)
+        for c in picks[emitted:]:
+            emit(c)
+        out["mode"] = "llm+rules"
+    out["recommendations"] = picks
+    return out
+
+
+class ProductSelector:
+    """
+    注入编排器的AI选品函数：先规则预排序，只把前 top_k 个候选发给大模型
+
+    编排器在选品阶段调用 await selector(demand, candidates, progress_callback)，
+    返回值与 select_top3 相同。大模型客户端在第一次调用时创建，多个编排器可共用一个实例。
+    """
+
+    def __init__(self, client=None, top_k: int = 8, use_llm: bool = True):
+        self.client = client
+        self.top_k = top_k
+        self.use_llm = use_llm
+        self._owns_client = False
+
+    async def __call__(self, demand, candidates: list, progress_callback=None) -> dict:
+        if self.use_llm and self.client is None:
+            from src.services.llm_client import LLMClient
+            self.client = LLMClient()
+            self._owns_client = True
+        return await select_top3(demand, candidates, client=self.client, top_k=self.top_k,
+                                 use_llm=self.use_llm, progress_callback=progress_callback)
+
+    async def close(self):
+        """关闭自己创建的大模型客户端"""
+        if self._owns_client and self.client is not None:
+            await self.client.close()
+        if self._owns_client:
+            self.client = None
+            self._owns_client = False
+
+
+def load_candidates(path: str) -> list:
+    """读取候选商品文件（JSONL 每行一个商品，或 JSON 数组）"""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+
+async def run_product_selection(candidates_path: str, product_name: str, quantity: int = 1,
+                                budget: float = None, specification: str = None, top_k: int = 8,
+                                use_llm: bool = True) -> dict:
+    """
+    命令行入口：对候选商品文件预排序后调用大模型选品，每确定一条推荐立即输出
+
+    是否流式跟随 LLM_CONFIG["stream"] / LLM_STREAM；大模型不可用时退回规则推荐。
+    """
+    candidates = load_candidates(candidates_path)
+    demand = {"product_name": product_name, "quantity": quantity, "budget": budget,
+              "specification": specification}
+    client = None
+    if use_llm:
+        from src.services.llm_client import LLMClient
+        client = LLMClient()
+    print(f"🤖 AI选品: {product_name} × {quantity}，{len(candidates)} 个候选"
+          f"（{'流式' if client is not None and client.stream else '非流式'}）")
+    try:
+        out = await select_top3(demand, candidates, client=client, top_k=top_k,
+                                progress_callback=lambda step, status, message: print(f"  {message}"))
+    finally:
+        if client is not None:
+            await client.close()
+
+    print(out["pre_rank"].summary())
+    if out["error"]:
+        print(f"⚠️ 大模型选品失败，已按规则评分推荐: {out['error']}")
+    elif out["truncated"]:
+        print("⚠️ 大模型输出被截断，缺少的名次已按规则评分补齐")
+    if client is not None:
+        print(client.metrics.report())
+    return out
@@ -0,0 +1,370 @@
+"""
+工作流进度事件总线
+============================================
+
+WorkflowOrchestrator 的进度回调是同步调用的，慢的输出端（Streamlit、日志文件、微信推送）
+会直接阻塞工作流所在的事件循环。事件总线把回调变成非阻塞的投递:
+
+    - 每个订阅者有自己的有界队列和消费协程，互不影响
+    - 队列满时按策略处理: drop_oldest（丢弃最旧）/ drop_new（丢弃新事件）/ block（等待）
+      同步的 publish() 永远不会阻塞: block 策略的订阅者队列满时，事件按顺序暂存到溢出队列，
+      消费协程腾出空间后再补进队列（不丢弃，但溢出队列不限长）；需要背压时使用 await apublish()
+    - 控制台输出和同步回调在线程中执行，慢的终端或回调不会阻塞事件循环
+    - 用单调时钟记录事件时间，running → completed/failed 自动计算步骤耗时
+
+用法:
+    bus = ProgressBus()
+    bus.subscribe(ConsoleSubscriber())
+    bus.subscribe(JsonlFileSubscriber("data/logs/progress.jsonl"))
+    await bus.start()
+    orchestrator.set_progress_callback(bus.as_callback())
+    ...
+    await bus.close()
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEW = "drop_new"
+BLOCK = "block"
+
+# 表示一个步骤结束的状态
+_FINISHED_STATUSES = {"completed", "failed"}
+
+STATUS_ICONS = {
+    "running": "🔄",
+    "completed": "✅",
+    "failed": "❌",
+    "warning": "⚠️"
+}
+
+
+@dataclass
+class ProgressEvent:
+    """一条进度事件"""
+    step: str
+    status: str
+    message: str
+    workflow: str = None            # 工作流标签（批量模式下区分需求）
+    ts: float = field(default_factory=time.monotonic)   # 单调时钟，用于计算耗时
+    wall: float = field(default_factory=time.time)      # 墙上时间，用于展示
+    duration: float = None          # 步骤结束事件上的步骤耗时（秒）
+    data: dict = None               # 附加数据
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class Subscriber:
+    """订阅者基类"""
+
+    name = "subscriber"
+    queue_size = 1000
+    policy = DROP_OLDEST
+
+    async def handle(self, event: ProgressEvent):
+        raise NotImplementedError
+
+    async def handle_batch(self, events: list):
+        """批量处理，默认逐条调用 handle；写文件等场景可覆盖以减少IO次数"""
+        for event in events:
+            await self.handle(event)
+
+    async def close(self):
+        pass
+
+
+class ConsoleSubscriber(Subscriber):
+    """控制台输出，在线程中批量写，终端或管道写满时不占用事件循环"""
+
+    name = "console"
+
+    def __init__(self, show_duration: bool = True):
+        self.show_duration = show_duration
+
+    def format(self, event: ProgressEvent) -> str:
+        icon = STATUS_ICONS.get(event.status, "📌")
+        prefix = f"[{event.workflow}] " if event.workflow else ""
+        suffix = f" ({event.duration:.2f}s)" if self.show_duration and event.duration is not None else ""
+        return f"{icon} {prefix}[{event.step}] {event.message}{suffix}"
+
+    @staticmethod
+    def _write(text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    async def handle(self, event: ProgressEvent):
+        await self.handle_batch([event])
+
+    async def handle_batch(self, events: list):
+        text = "".join(self.format(e) + "\n" for e in events)
+        await asyncio.to_thread(self._write, text)
+
+
+class JsonlFileSubscriber(Subscriber):
+    """追加写入 JSONL 文件，在线程中批量写，不占用事件循环"""
+
+    name = "jsonl"
+    queue_size = 10000
+    policy = BLOCK
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, lines: list):
+        self._file.write("".join(lines))
+        self._file.flush()
+
+    async def handle(self, event: ProgressEvent):
+        await self.handle_batch([event])
+
+    async def handle_batch(self, events: list):
+        lines = [json.dumps(e.to_dict(), ensure_ascii=False, default=str) + "\n" for e in events]
+        await asyncio.to_thread(self._write, lines)
+
+    async def close(self):
+        self._file.close()
+
+
+class MetricsSubscriber(Subscriber):
+    """统计各步骤的次数和耗时"""
+
+    name = "metrics"
+    queue_size = 10000
+
+    def __init__(self):
+        self.status_counts = {}
+        self.step_durations = {}
+
+    async def handle(self, event: ProgressEvent):
+        key = (event.step, event.status)
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        if event.duration is not None:
+            self.step_durations.setdefault(event.step, []).append(event.duration)
+
+    def summary(self) -> dict:
+        """返回 {步骤: {"count", "total", "avg", "max"}}"""
+        out = {}
+        for step, durations in self.step_durations.items():
+            out[step] = {
+                "count": len(durations),
+                "total": sum(durations),
+                "avg": sum(durations) / len(durations),
+                "max": max(durations),
+            }
+        return out
+
+    def report(self) -> str:
+        lines = ["【步骤耗时】"]
+        for step, s in self.summary().items():
+            lines.append(f"  {step}: {s['count']}次, 合计 {s['total']:.2f}s, "
+                         f"平均 {s['avg']:.2f}s, 最长 {s['max']:.2f}s")
+        return "\n".join(lines)
+
+
+class CallbackSubscriber(Subscriber):
+    """把事件转交给普通函数（同步或异步），同步函数默认在线程中调用"""
+
+    def __init__(self, func, name: str = "callback", queue_size: int = 1000, policy: str = DROP_OLDEST,
+                 in_thread: bool = True):
+        """
+        Args:
+            func: 回调函数，参数为 ProgressEvent
+            in_thread: 同步函数是否在线程中调用（只做内存操作、必须在事件循环线程执行的回调可设为 False）
+        """
+        self.func = func
+        self.name = name
+        self.queue_size = queue_size
+        self.policy = policy
+        self.in_thread = in_thread
+
+    async def handle(self, event: ProgressEvent):
+        if asyncio.iscoroutinefunction(self.func):
+            await self.func(event)
+            return
+        if self.in_thread:
+            result = await asyncio.to_thread(self.func, event)
+        else:
+            result = self.func(event)
+        if asyncio.iscoroutine(result):
+            await result
+
+
+class _Channel:
+    """订阅者的队列和消费协程"""
+
+    def __init__(self, subscriber: Subscriber, maxsize: int, policy: str):
+        self.subscriber = subscriber
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.overflow = deque()     # block 策略下同步投递时队列已满的事件
+        self.task = None
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, event: ProgressEvent):
+        """非阻塞投递（block 策略队列满时暂存到溢出队列，保持顺序）"""
+        if self.policy == BLOCK:
+            if self.overflow or self.queue.full():
+                self.overflow.append(event)
+            else:
+                self.queue.put_nowait(event)
+            return
+        if self.queue.full():
+            if self.policy == DROP_OLDEST:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return
+        self.queue.put_nowait(event)
+
+    async def put(self, event: ProgressEvent):
+        if self.policy == BLOCK and not self.overflow:
+            await self.queue.put(event)
+        else:
+            # 溢出队列里还有更早的事件时排在它们后面
+            self.offer(event)
+
+    def _refill(self):
+        while self.overflow and not self.queue.full():
+            self.queue.put_nowait(self.overflow.popleft())
+
+    async def run(self, max_batch: int = 100):
+        while True:
+            event = await self.queue.get()
+            batch = [event]
+            while len(batch) < max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            closing = batch[-1] is None
+            events = [e for e in batch if e is not None]
+            try:
+                if events:
+                    await self.subscriber.handle_batch(events)
+                    self.delivered += len(events)
+            except Exception:
+                # 订阅者出错不影响工作流
+                self.errors += len(events)
+            for _ in batch:
+                self.queue.task_done()
+            self._refill()
+            if closing:
+                return
+
+
+class ProgressBus:
+    """进度事件总线"""
+
+    def __init__(self):
+        self._channels = []
+        self._step_started = {}
+        self._started = False
+
+    def subscribe(self, subscriber: Subscriber, maxsize: int = None, policy: str = None):
+        """
+        添加订阅者
+
+        Args:
+            subscriber: 订阅者
+            maxsize: 队列长度，默认使用订阅者的 queue_size
+            policy: 队列满时的策略，默认使用订阅者的 policy
+        """
+        channel = _Channel(subscriber, maxsize or subscriber.queue_size, policy or subscriber.policy)
+        self._channels.append(channel)
+        if self._started:
+            channel.task = asyncio.create_task(channel.run())
+        return subscriber
+
+    async def start(self):
+        """启动各订阅者的消费协程（需在事件循环中调用）"""
+        self._started = True
+        for channel in self._channels:
+            if channel.task is None:
+                channel.task = asyncio.create_task(channel.run())
+
+    def _make_event(self, step: str, status: str, message: str, workflow: str = None,
+                    data: dict = None) -> ProgressEvent:
+        event = ProgressEvent(step=step, status=status, message=message, workflow=workflow, data=data)
+        key = (workflow, step)
+        if status == "running":
+            self._step_started.setdefault(key, event.ts)
+        elif status in _FINISHED_STATUSES and key in self._step_started:
+            event.duration = event.ts - self._step_started.pop(key)
+        return event
+
+    def publish(self, step: str, status: str, message: str, workflow: str = None,
+                data: dict = None) -> ProgressEvent:
+        """同步、非阻塞地发布事件"""
+        event = self._make_event(step, status, message, workflow, data)
+        for channel in self._channels:
+            channel.offer(event)
+        return event
+
+    async def apublish(self, step: str, status: str, message: str, workflow: str = None,
+                       data: dict = None) -> ProgressEvent:
+        """异步发布事件，block 策略的订阅者队列满时会等待（背压）"""
+        event = self._make_event(step, status, message, workflow, data)
+        for channel in self._channels:
+            await channel.put(event)
+        return event
+
+    def as_callback(self, workflow: str = None):
+        """
+        返回可传给 orchestrator.set_progress_callback 的同步回调
+
+        Args:
+            workflow: 事件上附带的工作流标签
+        """
+        def progress_callback(step: str, status: str, message: str):
+            self.publish(step, status, message, workflow=workflow)
+        return progress_callback
+
+    def stats(self) -> dict:
+        """{订阅者名: {"delivered", "dropped", "errors", "pending"}}"""
+        return {
+            c.subscriber.name: {
+                "delivered": c.delivered,
+                "dropped": c.dropped,
+                "errors": c.errors,
+                "pending": c.queue.qsize() + len(c.overflow),
+            }
+            for c in self._channels
+        }
+
+    async def close(self, timeout: float = 5.0):
+        """投递结束标记，等待各订阅者处理完剩余事件后关闭"""
+        for channel in self._channels:
+            if channel.task is None:
+                continue
+            if channel.policy == BLOCK:
+                await channel.put(None)
+            else:
+                self._force_put(channel)
+        tasks = [c.task for c in self._channels if c.task is not None]
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        for channel in self._channels:
+            try:
+                await channel.subscriber.close()
+            except Exception:
+                pass
+        self._started = False
+
+    @staticmethod
+    def _force_put(channel: _Channel):
+        if channel.queue.full():
+            channel.queue.get_nowait()
+            channel.queue.task_done()
+            channel.dropped += 1
+        channel.queue.put_nowait(None)
@@ -0,0 +1,99 @@
+"""
+限流工具
+============================================
+
+提供基于令牌桶的异步限流器，以及按平台区分的限流器集合。
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """令牌桶限流器（asyncio）"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数），默认 max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError(f"限流速率必须大于0: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        获取令牌，不足时等待
+
+        Returns:
+            本次等待的秒数
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class PlatformRateLimiter:
+    """按平台区分的限流器集合，未配置的平台不限流"""
+
+    def __init__(self, limits: dict = None):
+        """
+        Args:
+            limits: {平台: 每秒请求数}，如 {"1688": 0.5, "jd": 2}
+        """
+        self._buckets = {
+            platform.lower(): TokenBucket(rate)
+            for platform, rate in (limits or {}).items()
+        }
+
+    def __contains__(self, platform: str) -> bool:
+        return platform.lower() in self._buckets
+
+    async def acquire(self, platform: str) -> float:
+        """获取指定平台的令牌，返回等待秒数"""
+        bucket = self._buckets.get(platform.lower())
+        if bucket is None:
+            return 0.0
+        return await bucket.acquire()
+
+    async def acquire_all(self, platforms: list) -> float:
+        """依次获取多个平台的令牌，返回总等待秒数"""
+        waited = 0.0
+        for platform in platforms:
+            waited += await self.acquire(platform)
+        return waited
+
+
+def parse_rate_limits(specs: list) -> dict:
+    """
+    解析命令行限流配置
+
+    Args:
+        specs: 形如 ["1688=0.5", "jd=2"] 的列表，值为每秒请求数
+
+    Returns:
+        {平台: 每秒请求数}
+    """
+    limits = {}
+    for spec in specs or []:
+        platform, sep, rate = spec.partition("=")
+        if not sep or not platform.strip():
+            raise ValueError(f"限流配置格式应为 平台=每秒请求数: {spec}")
+        limits[platform.strip().lower()] = float(rate)
+    return limits
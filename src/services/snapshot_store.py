@@ -0,0 +1,194 @@
+"""
+商品页离线快照
+============================================
+
+保存渲染后的 DOM 和页面内嵌数据（__INIT_DATA 等），按内容哈希寻址、gzip 压缩存储，
+供调试脚本 --replay 模式离线回放分析，也可在无外网的 CI 中运行提取逻辑。
+
+目录结构:
+    data/snapshots/
+        index.jsonl                    每次抓取追加一行 {"url", "digest", "captured_at", "final_url"}
+        objects/ab/abcdef....json.gz   快照内容（html、payloads、title）
+
+内容相同的页面（如不同URL跳转到同一商品页）共用一个对象，URL、跳转后地址和抓取时间
+这些每次抓取不同的信息只记录在索引中。
+
+索引只追加不改写：每条记录用一次 O_APPEND 写入，多个进程同时保存快照不会互相覆盖；
+SnapshotStore 在内存中缓存索引，之后只读取文件末尾新追加的记录。
+"""
+import gzip
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+from src.services.embedded_data import COLLECT_EMBEDDED_JS, extract_embedded_data
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            "data", "snapshots")
+
+# 写入对象文件的字段（其余字段记录在索引中）
+_CONTENT_FIELDS = ("html", "payloads", "title")
+
+
+@dataclass
+class Snapshot:
+    """一个页面快照"""
+    url: str
+    html: str
+    payloads: dict = field(default_factory=dict)
+    final_url: str = ""
+    title: str = ""
+    captured_at: str = ""
+
+    @property
+    def digest(self) -> str:
+        """内容哈希（只取决于页面内容，与抓取时间无关）"""
+        h = hashlib.sha256()
+        h.update(self.html.encode("utf-8"))
+        h.update(json.dumps(self.payloads, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+
+class SnapshotStore:
+    """内容寻址的快照存储"""
+
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = root
+        self._index_path = os.path.join(root, "index.jsonl")
+        self._index = {}        # {url: [{"digest", "captured_at", "final_url"}, ...]}
+        self._index_offset = 0  # 已读入缓存的索引文件字节数
+
+    # ---------- 索引 ----------
+
+    def _load_index(self) -> dict:
+        """返回缓存的索引，先读入其他进程（或其他实例）新追加的记录"""
+        try:
+            size = os.path.getsize(self._index_path)
+        except FileNotFoundError:
+            return self._index
+        if size <= self._index_offset:
+            return self._index
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read(size - self._index_offset)
+        # 只处理完整的行，正在写入的最后一行留到下次
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            ref = json.loads(line)
+            self._index.setdefault(ref.pop("url"), []).append(ref)
+        self._index_offset += end
+        return self._index
+
+    def _append_index(self, url: str, ref: dict):
+        os.makedirs(self.root, exist_ok=True)
+        line = json.dumps({"url": url, **ref}, ensure_ascii=False) + "\n"
+        fd = os.open(self._index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+    # ---------- 读写 ----------
+
+    def save(self, snapshot: Snapshot) -> str:
+        """保存快照，内容相同时复用已有对象（本次抓取的URL和时间记入索引），返回内容哈希"""
+        if not snapshot.captured_at:
+            snapshot.captured_at = datetime.now().isoformat(timespec="seconds")
+        digest = snapshot.digest
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            content = {k: v for k, v in asdict(snapshot).items() if k in _CONTENT_FIELDS}
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+
+        self._append_index(snapshot.url, {"digest": digest, "captured_at": snapshot.captured_at,
+                                          "final_url": snapshot.final_url})
+        return digest
+
+    def _read_object(self, digest: str) -> dict:
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"快照不存在: {digest}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _snapshot(content: dict, url: str, ref: dict) -> Snapshot:
+        """对象内容 + 索引记录 → Snapshot"""
+        return Snapshot(url=url or "", html=content["html"], payloads=content.get("payloads") or {},
+                        title=content.get("title", ""), final_url=ref.get("final_url") or url or "",
+                        captured_at=ref.get("captured_at", ""))
+
+    def load(self, digest: str, url: str = None) -> Snapshot:
+        """
+        按内容哈希（可用前缀）读取快照
+
+        Args:
+            url: 指定时取该URL下这份内容最近一次的抓取记录，否则取任意URL中最近的一次
+        """
+        if len(digest) < 64:
+            digest = self._resolve_prefix(digest)
+        content = self._read_object(digest)
+        found_url, found_ref = url, {}
+        for ref_url, refs in self._load_index().items():
+            if url is not None and ref_url != url:
+                continue
+            for ref in refs:
+                if ref["digest"] == digest and ref["captured_at"] >= found_ref.get("captured_at", ""):
+                    found_url, found_ref = ref_url, ref
+        return self._snapshot(content, found_url, found_ref)
+
+    def latest(self, url: str) -> Snapshot:
+        """读取指定URL最近一次的快照"""
+        refs = self._load_index().get(url)
+        if not refs:
+            raise FileNotFoundError(f"没有该URL的快照: {url}")
+        return self._snapshot(self._read_object(refs[-1]["digest"]), url, refs[-1])
+
+    def list(self) -> list:
+        """列出所有抓取记录 [(url, digest, captured_at)]（同一内容多次抓取各占一条）"""
+        return [
+            (url, ref["digest"], ref["captured_at"])
+            for url, refs in self._load_index().items()
+            for ref in refs
+        ]
+
+    def _resolve_prefix(self, prefix: str) -> str:
+        matches = {d for _, d, _ in self.list() if d.startswith(prefix)}
+        if len(matches) != 1:
+            raise FileNotFoundError(f"快照哈希前缀不存在或不唯一: {prefix}")
+        return matches.pop()
+
+    # ---------- 采集 ----------
+
+    def capture(self, driver, url: str = None) -> Snapshot:
+        """从当前浏览器页面采集快照（渲染后的DOM + 内嵌数据）"""
+        html = driver.execute_script("return document.documentElement.outerHTML")
+        try:
+            payloads = driver.execute_script(COLLECT_EMBEDDED_JS) or {}
+        except Exception:
+            payloads = extract_embedded_data(html)
+        return Snapshot(
+            url=url or driver.current_url,
+            html="<!DOCTYPE html>\n" + html,
+            payloads=payloads,
+            final_url=driver.current_url,
+            title=driver.title,
+        )
+
+    def import_html(self, path: str, url: str) -> str:
+        """把保存的 HTML 文件导入为快照，返回内容哈希"""
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        return self.save(Snapshot(url=url, html=html, payloads=extract_embedded_data(html),
+                                  final_url=url))
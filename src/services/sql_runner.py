@@ -0,0 +1,314 @@
+"""
+SQL脚本执行器
+============================================
+
+替代按 ';' 直接分割 init.sql 的做法:
+    - 词法分割：正确处理字符串/反引号中的分号、注释、DELIMITER 指令（存储过程）
+    - 批量执行：连续的 DML 语句放在同一个事务中，只提交一次；
+      每条语句前设保存点，失败时只回滚这一条并记录警告，其余语句照常提交；
+      DDL 在 MySQL 中会隐式提交，单独执行
+    - 重复执行：主键/唯一键冲突（种子数据已存在）、索引已存在与空语句一样忽略
+    - 空跑模式：只分割和分类，输出执行计划和耗时
+"""
+import re
+import time
+from dataclasses import dataclass, field
+
+# MySQL 中会隐式提交事务的语句
+_DDL_KEYWORDS = {"CREATE", "ALTER", "DROP", "TRUNCATE", "RENAME", "GRANT", "REVOKE"}
+_DML_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+_DELIMITER_RE = re.compile(r"[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+_FIRST_WORD_RE = re.compile(r"\s*(?:/\*!\d*\s*)?([A-Za-z]+)")
+
+# 忽略的错误码：1065 空语句，1062 主键/唯一键冲突（重复执行脚本时种子数据已存在），1061 索引名已存在
+IGNORED_ERRNOS = {1065, 1062, 1061}
+# SQLite 扩展错误码：1555 主键冲突，2067 唯一键冲突
+IGNORED_SQLITE_CODES = {1555, 2067}
+
+_SAVEPOINT = "sql_runner_stmt"
+
+
+@dataclass
+class SqlStatement:
+    """分割出的一条语句"""
+    sql: str
+    line: int
+
+    @property
+    def keyword(self) -> str:
+        m = _FIRST_WORD_RE.match(self.sql)
+        return m.group(1).upper() if m else ""
+
+    @property
+    def kind(self) -> str:
+        """ddl / dml / other"""
+        keyword = self.keyword
+        if keyword in _DDL_KEYWORDS:
+            return "ddl"
+        if keyword in _DML_KEYWORDS:
+            return "dml"
+        return "other"
+
+    def preview(self, width: int = 60) -> str:
+        text = " ".join(self.sql.split())
+        return text if len(text) <= width else text[:width] + "..."
+
+
+def split_sql(script: str) -> list:
+    """
+    把SQL脚本分割成语句列表
+
+    支持:
+        - '...' "..." `...` 中的分号（含反斜杠转义和双写引号）
+        - -- 行注释、# 行注释、/* */ 块注释（/*! */ 可执行注释会保留）
+        - DELIMITER 指令切换分隔符（定义存储过程/触发器时使用）
+    """
+    statements = []
+    delimiter = ";"
+    buf = []
+    start = None
+    i = 0
+    n = len(script)
+
+    def plain_re(delim: str):
+        return re.compile(r"[^'\"`\-#/\n" + re.escape(delim[0]) + r"]+")
+
+    plain = plain_re(delimiter)
+    # 行号增量计算：只统计上一条语句起点到本条起点之间的换行
+    line_no, line_pos = 1, 0
+
+    def flush():
+        nonlocal buf, start, line_no, line_pos
+        sql = "".join(buf).strip()
+        if sql:
+            line_no += script.count("\n", line_pos, start)
+            line_pos = start
+            statements.append(SqlStatement(sql=sql, line=line_no))
+        buf = []
+        start = None
+
+    while i < n:
+        # DELIMITER 指令只在行首、且不在语句中间时生效
+        if (i == 0 or script[i - 1] == "\n") and start is None:
+            m = _DELIMITER_RE.match(script, i)
+            if m:
+                flush()
+                delimiter = m.group(1)
+                plain = plain_re(delimiter)
+                i = m.end()
+                continue
+
+        m = plain.match(script, i)
+        if m:
+            if start is None and m.group().strip():
+                start = i + len(m.group()) - len(m.group().lstrip())
+            buf.append(m.group())
+            i = m.end()
+            continue
+
+        c = script[i]
+        if script.startswith(delimiter, i):
+            flush()
+            i += len(delimiter)
+            continue
+
+        if c in "'\"`":
+            j = i + 1
+            while j < n:
+                if script[j] == "\\" and c != "`":
+                    j += 2
+                    continue
+                if script[j] == c:
+                    if j + 1 < n and script[j + 1] == c:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            if start is None:
+                start = i
+            buf.append(script[i:j + 1])
+            i = j + 1
+            continue
+
+        if (c == "#" or (script.startswith("--", i) and (i + 2 >= n or script[i + 2] in " \t\r\n"))):
+            end = script.find("\n", i)
+            i = n if end == -1 else end
+            continue
+
+        if script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            if script.startswith("/*!", i):
+                if start is None:
+                    start = i
+                buf.append(script[i:end])
+            i = end
+            continue
+
+        if start is None and not c.isspace():
+            start = i
+        buf.append(c)
+        i += 1
+
+    flush()
+    return statements
+
+
+@dataclass
+class SqlRunReport:
+    """执行报告"""
+    statements: int = 0
+    executed: int = 0
+    failed: int = 0
+    ignored: int = 0
+    transactions: int = 0
+    commits: int = 0
+    by_kind: dict = field(default_factory=dict)
+    split_seconds: float = 0.0
+    execute_seconds: float = 0.0
+    slowest: list = field(default_factory=list)     # [(耗时, 行号, 预览)]
+    warnings: list = field(default_factory=list)
+    dry_run: bool = False
+
+    def format(self) -> str:
+        lines = [
+            f"  语句数: {self.statements}（" + ", ".join(f"{k}: {v}" for k, v in sorted(self.by_kind.items())) + "）",
+            f"  分割耗时: {self.split_seconds * 1000:.1f}ms",
+        ]
+        if self.dry_run:
+            lines.append(f"  计划事务数: {self.transactions}，计划提交次数: {self.commits}（空跑，未执行）")
+        else:
+            ignored = f", {self.ignored} 忽略（已存在）" if self.ignored else ""
+            lines.append(f"  执行: {self.executed} 成功, {self.failed} 失败{ignored}, "
+                         f"{self.transactions} 个事务, {self.commits} 次提交, "
+                         f"耗时 {self.execute_seconds:.3f}s")
+            for seconds, line, preview in self.slowest:
+                lines.append(f"    {seconds * 1000:8.1f}ms  第{line}行  {preview}")
+        return "\n".join(lines)
+
+
+def plan_batches(statements: list) -> list:
+    """
+    按事务边界分组：连续的 DML 合为一批，DDL/其他语句（USE/SET等）各自一批
+
+    Returns:
+        [(kind, [SqlStatement, ...]), ...]
+    """
+    batches = []
+    for stmt in statements:
+        kind = stmt.kind
+        if kind == "dml" and batches and batches[-1][0] == "dml":
+            batches[-1][1].append(stmt)
+        else:
+            batches.append((kind, [stmt]))
+    return batches
+
+
+def _errno(e: Exception):
+    return getattr(e, "errno", None)
+
+
+def _ignored(e: Exception) -> bool:
+    """空语句、主键/唯一键冲突、索引已存在：重复执行脚本时的正常情况"""
+    return _errno(e) in IGNORED_ERRNOS or getattr(e, "sqlite_errorcode", None) in IGNORED_SQLITE_CODES
+
+
+def _run_dml_batch(conn, cursor, batch: list, report: SqlRunReport, timings: list):
+    """
+    在一个事务中执行连续的 DML，每条语句前设保存点:
+    失败的语句回滚到保存点（冲突时忽略，否则记录警告），其余语句最后一起提交
+    """
+    pending = 0
+    for stmt in batch:
+        t = time.perf_counter()
+        if getattr(conn, "in_transaction", True) is False:
+            # sqlite3 不会为 SAVEPOINT 自动开启事务，最外层保存点释放时会直接提交
+            cursor.execute("BEGIN")
+        try:
+            cursor.execute(f"SAVEPOINT {_SAVEPOINT}")
+            cursor.execute(stmt.sql)
+            cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+            pending += 1
+        except Exception as e:
+            try:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+                cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+            except Exception:
+                # 事务已被数据库回滚（如死锁），之前未提交的语句也一并失效
+                conn.rollback()
+                report.failed += pending + 1
+                report.warnings.append(f"第{stmt.line}行: {getattr(e, 'msg', None) or e}（事务已回滚）")
+                pending = 0
+                continue
+            if _ignored(e):
+                report.ignored += 1
+            else:
+                report.failed += 1
+                report.warnings.append(f"第{stmt.line}行: {getattr(e, 'msg', None) or e}")
+            continue
+        timings.append((time.perf_counter() - t, stmt.line, stmt.preview()))
+    conn.commit()
+    report.commits += 1
+    report.executed += pending
+
+
+def run_sql_script(conn, script: str, dry_run: bool = False, slowest: int = 5) -> SqlRunReport:
+    """
+    执行SQL脚本
+
+    Args:
+        conn: DB-API 连接（mysql.connector / pymysql / sqlite3）
+        script: SQL脚本内容
+        dry_run: 只分割和规划，不执行
+        slowest: 报告中列出最慢的语句数
+
+    Returns:
+        SqlRunReport
+    """
+    report = SqlRunReport(dry_run=dry_run)
+    started = time.perf_counter()
+    statements = split_sql(script)
+    report.split_seconds = time.perf_counter() - started
+    report.statements = len(statements)
+    for stmt in statements:
+        report.by_kind[stmt.kind] = report.by_kind.get(stmt.kind, 0) + 1
+
+    batches = plan_batches(statements)
+    report.transactions = sum(1 for kind, _ in batches if kind == "dml")
+    report.commits = sum(1 for kind, _ in batches if kind in ("dml", "ddl"))
+    if dry_run or conn is None:
+        report.dry_run = True
+        return report
+
+    timings = []
+    cursor = conn.cursor()
+    exec_started = time.perf_counter()
+    report.commits = 0
+    try:
+        for kind, batch in batches:
+            if kind == "dml":
+                _run_dml_batch(conn, cursor, batch, report, timings)
+                continue
+
+            stmt = batch[0]
+            t = time.perf_counter()
+            try:
+                cursor.execute(stmt.sql)
+                if kind == "ddl":
+                    conn.commit()
+                    report.commits += 1
+                report.executed += 1
+            except Exception as e:
+                if _ignored(e):
+                    report.ignored += 1
+                    continue
+                report.failed += 1
+                report.warnings.append(f"第{stmt.line}行: {getattr(e, 'msg', None) or e}")
+            timings.append((time.perf_counter() - t, stmt.line, stmt.preview()))
+    finally:
+        cursor.close()
+
+    report.execute_seconds = time.perf_counter() - exec_started
+    report.slowest = sorted(timings, reverse=True)[:slowest]
+    return report
@@ -0,0 +1,377 @@
+"""
+分级页面抓取
+============================================
+
+商品详情页的商品/SKU数据大多直接写在首屏 HTML 的内嵌 JSON 中（window.__INIT_DATA 等），
+不需要启动 Chrome 渲染。抓取分两级:
+
+    1. http     共享连接池的 httpx 客户端直接请求页面（带上浏览器保存的登录 cookies），
+                用 embedded_data 定位并解析内嵌 JSON，只要拿到 SKU 数据就直接返回
+    2. browser  以下情况才升级到浏览器会话池（DriverPool）:
+                    - 请求失败 / HTTP 状态码异常
+                    - 跳转到登录页或验证码（滑块）页
+                    - 页面没有内嵌的商品/SKU数据（需要 JS 渲染）
+                    - 调用方明确要求浏览器（如需要点击交互）
+
+每个页面记录由哪一级返回、为什么升级，汇总在 TierStats 中。
+
+用法:
+    fetcher = TieredFetcher(pool=DriverPool(size=1))
+    page = fetcher.fetch("https://detail.1688.com/offer/725887578825.html", platform="1688")
+    print(page.tier, page.offer["skus"][:3])
+    print(fetcher.stats.report())
+    fetcher.close()
+"""
+import html as html_lib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.services.embedded_data import COLLECT_EMBEDDED_JS, extract_embedded_data
+
+# 与 driver_pool 一致（http 级不依赖 selenium，这里不直接导入 driver_pool）
+COOKIE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "data", "cookies")
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36")
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+# 升级原因
+ESCALATE_HTTP_ERROR = "http_error"
+ESCALATE_LOGIN = "login"
+ESCALATE_CAPTCHA = "captcha"
+ESCALATE_NO_DATA = "no_embedded_data"
+ESCALATE_FORCED = "forced"
+
+# 验证码/风控页特征
+_CAPTCHA_MARKERS = ("punish", "_____tmd_____", "x5secdata", "nocaptcha", "baxia-dialog")
+
+DEFAULT_HEADERS = {
+    "User-Agent": DEFAULT_USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9",
+}
+
+
+def _find_key(obj, key: str, depth: int = 6):
+    """在嵌套的 dict/list 中查找第一个名为 key 的值"""
+    if depth < 0:
+        return None
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = _find_key(child, key, depth - 1)
+            if found is not None:
+                return found
+    return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_offer(payloads: dict) -> dict:
+    """
+    从内嵌数据中取出商品和SKU信息，没有 skuModel 时返回 None
+
+    Returns:
+        {"offer_id", "title", "company", "unit", "begin_num", "price_range",
+         "sku_props": [{"prop", "values"}], "skus": [{"spec_attrs", "price", "stock", "sku_id", "spec_id"}]}
+    """
+    sku_model = _find_key(payloads, "skuModel")
+    if not isinstance(sku_model, dict):
+        return None
+    temp = _find_key(payloads, "tempModel") or {}
+    order_param = _find_key(payloads, "orderParam") or {}
+
+    sku_props = []
+    for prop in sku_model.get("skuProps") or []:
+        values = [v.get("name") for v in prop.get("value") or [] if isinstance(v, dict)]
+        sku_props.append({"prop": prop.get("prop"), "values": values})
+
+    skus = []
+    for key, info in (sku_model.get("skuInfoMap") or {}).items():
+        if not isinstance(info, dict):
+            continue
+        skus.append({
+            # 写在 HTML 中的规格分隔符可能被转义成 &gt;
+            "spec_attrs": html_lib.unescape(info.get("specAttrs") or key),
+            "price": _to_float(info.get("price") or info.get("discountPrice")),
+            "stock": info.get("canBookCount"),
+            "sku_id": info.get("skuId"),
+            "spec_id": info.get("specId"),
+        })
+
+    return {
+        "offer_id": temp.get("offerId"),
+        "title": temp.get("offerTitle"),
+        "company": temp.get("companyName"),
+        "unit": order_param.get("unit"),
+        "begin_num": order_param.get("beginNum"),
+        "price_range": sku_model.get("skuPriceScale"),
+        "sku_props": sku_props,
+        "skus": skus,
+    }
+
+
+def _is_login_url(url: str) -> bool:
+    return "login" in (url or "").lower()
+
+
+def _is_captcha(url: str, html: str) -> bool:
+    text = (url or "").lower() + (html or "")[:5000].lower()
+    return any(marker in text for marker in _CAPTCHA_MARKERS)
+
+
+@dataclass
+class FetchedPage:
+    """一次分级抓取的结果"""
+    url: str
+    tier: str = None                # http / browser，None 表示两级都没有拿到数据
+    html: str = ""
+    payloads: dict = field(default_factory=dict)
+    offer: dict = None              # extract_offer 的结果
+    final_url: str = ""
+    status_code: int = None         # http 级的状态码
+    escalation: str = None          # 升级到浏览器的原因
+    error: str = None
+    login_required: bool = False
+    timings: dict = field(default_factory=dict)     # {级别: 秒}
+
+    @property
+    def ok(self) -> bool:
+        return self.tier is not None
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+
+class TierStats:
+    """按级别汇总抓取情况（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = []
+
+    def record(self, page: FetchedPage):
+        with self._lock:
+            self._pages.append(page)
+
+    def summary(self) -> dict:
+        """返回 {"pages", "tiers": {级别: {"count", "avg"}}, "escalations": {原因: 次数}}"""
+        with self._lock:
+            pages = list(self._pages)
+        tiers, escalations = {}, {}
+        for page in pages:
+            tier = page.tier or "failed"
+            tiers.setdefault(tier, []).append(page.elapsed)
+            if page.escalation:
+                escalations[page.escalation] = escalations.get(page.escalation, 0) + 1
+        return {
+            "pages": len(pages),
+            "tiers": {t: {"count": len(v), "avg": sum(v) / len(v)} for t, v in tiers.items()},
+            "escalations": escalations,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        lines = [f"【分级抓取】共 {s['pages']} 个页面"]
+        for tier, t in s["tiers"].items():
+            lines.append(f"  {tier}: {t['count']}个, 平均 {t['avg']:.2f}s")
+        if s["escalations"]:
+            reasons = ", ".join(f"{k} {v}次" for k, v in s["escalations"].items())
+            lines.append(f"  需升级到浏览器: {reasons}")
+        return "\n".join(lines)
+
+
+class TieredFetcher:
+    """先 HTTP 后浏览器的分级抓取器（线程安全）"""
+
+    def __init__(self, pool=None, timeout: float = 10.0, max_connections: int = 10,
+                 cookie_dir: str = COOKIE_DIR, headers: dict = None, client=None,
+                 wait_timeout: float = 15):
+        """
+        Args:
+            pool: DriverPool，为空时不升级到浏览器（只返回 http 级结果）
+            timeout: http 请求超时（秒）
+            max_connections: http 连接池大小
+            cookie_dir: 浏览器会话池保存的 cookies 目录，http 请求复用其中的登录状态
+            headers: 额外的请求头
+            client: 自定义 httpx.Client（测试时可注入 MockTransport）
+            wait_timeout: 浏览器页面就绪的最长等待秒数
+        """
+        self.pool = pool
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cookie_dir = cookie_dir
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.wait_timeout = wait_timeout
+        self.stats = TierStats()
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._cookie_platforms = set()
+
+    # ---------- http 级 ----------
+
+    def _http_client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.Client(
+                        headers=self.headers, timeout=self.timeout, follow_redirects=True,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections))
+        return self._client
+
+    def _load_cookies(self, client, platform: str):
+        """把浏览器保存的平台 cookies 装入 http 客户端（每个平台只装一次，失效后重新装入）"""
+        if not platform:
+            return
+        with self._client_lock:
+            if platform in self._cookie_platforms:
+                return
+            self._cookie_platforms.add(platform)
+            path = os.path.join(self.cookie_dir, f"{platform.lower()}.json")
+            if not os.path.exists(path):
+                return
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cookies = json.load(f)
+            except (OSError, ValueError):
+                return
+            now = time.time()
+            for cookie in cookies:
+                if cookie.get("expiry") and cookie["expiry"] < now:
+                    continue
+                client.cookies.set(cookie["name"], cookie["value"],
+                                   domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    def _reset_cookies(self):
+        """
+        登录失效（跳转登录页）或浏览器重新登录后调用：清空 http 客户端的 cookies，
+        下次请求时重新从 cookies 目录装入浏览器保存的最新登录状态
+        （服务端下发的 cookies 和文件中的混在同一个 jar 里，无法只清某个平台，全部重新装入）
+        """
+        with self._client_lock:
+            if self._client is not None:
+                self._client.cookies.clear()
+            self._cookie_platforms.clear()
+
+    def fetch_http(self, url: str, platform: str = None) -> FetchedPage:
+        """
+        只用 http 级抓取；拿不到 SKU 数据时 page.escalation 记录原因
+        """
+        page = FetchedPage(url=url)
+        started = time.monotonic()
+        try:
+            client = self._http_client()
+            self._load_cookies(client, platform)
+            response = client.get(url)
+            page.status_code = response.status_code
+            page.final_url = str(response.url)
+            page.html = response.text
+        except Exception as e:
+            page.escalation, page.error = ESCALATE_HTTP_ERROR, f"{type(e).__name__}: {e}"
+            page.timings[TIER_HTTP] = time.monotonic() - started
+            return page
+
+        if _is_login_url(page.final_url):
+            page.escalation, page.login_required = ESCALATE_LOGIN, True
+            self._reset_cookies()
+        elif _is_captcha(page.final_url, page.html):
+            page.escalation = ESCALATE_CAPTCHA
+        elif page.status_code >= 400:
+            page.escalation, page.error = ESCALATE_HTTP_ERROR, f"HTTP {page.status_code}"
+        else:
+            page.payloads = extract_embedded_data(page.html)
+            page.offer = extract_offer(page.payloads)
+            if page.offer is None:
+                page.escalation = ESCALATE_NO_DATA
+            else:
+                page.tier = TIER_HTTP
+        page.timings[TIER_HTTP] = time.monotonic() - started
+        return page
+
+    # ---------- browser 级 ----------
+
+    def fetch_browser(self, url: str, platform: str = None, page: FetchedPage = None) -> FetchedPage:
+        """用浏览器会话池抓取（渲染后的 DOM + 页面内的全局变量）"""
+        from src.services.page_readiness import wait_for_page_ready
+
+        page = page or FetchedPage(url=url, escalation=ESCALATE_FORCED)
+        started = time.monotonic()
+        try:
+            with self.pool.session(platform=platform) as session:
+                session.get(url)
+                wait = wait_for_page_ready(session.driver, timeout=self.wait_timeout, label="分级抓取")
+                driver = session.driver
+                page.final_url = driver.current_url
+                if wait.reason == "login":
+                    page.login_required = True
+                    page.error = "需要登录"
+                else:
+                    page.html = "<!DOCTYPE html>\n" + driver.execute_script(
+                        "return document.documentElement.outerHTML")
+                    try:
+                        page.payloads = driver.execute_script(COLLECT_EMBEDDED_JS) or {}
+                    except Exception:
+                        page.payloads = extract_embedded_data(page.html)
+                    page.offer = extract_offer(page.payloads)
+                    page.tier = TIER_BROWSER
+                    page.error = None
+        except Exception as e:
+            page.error = f"{type(e).__name__}: {e}"
+        page.timings[TIER_BROWSER] = time.monotonic() - started
+        return page
+
+    # ---------- 入口 ----------
+
+    def fetch(self, url: str, platform: str = None, require_browser: bool = False) -> FetchedPage:
+        """
+        分级抓取一个页面
+
+        Args:
+            url: 页面地址
+            platform: 平台简称（1688/jd/tmall），用于复用/恢复登录 cookies
+            require_browser: 直接使用浏览器（页面需要点击等交互时）
+        """
+        if require_browser and self.pool is not None:
+            page = self.fetch_browser(url, platform)
+        else:
+            page = self.fetch_http(url, platform)
+            if page.tier is None and self.pool is not None:
+                page = self.fetch_browser(url, platform, page)
+        if page.tier == TIER_BROWSER and page.escalation == ESCALATE_LOGIN:
+            # http 级跳转登录页、浏览器会话正常：会话归还时已保存浏览器的登录状态，http 级下次重新装入
+            self._reset_cookies()
+        self.stats.record(page)
+        return page
+
+    def close(self):
+        """关闭 http 连接池（浏览器会话池由调用方管理）"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,481 @@
+"""
+物流轮询调度
+============================================
+
+几百个在途订单按固定间隔逐个查询快递100，既浪费查询额度也浪费时间。这里:
+
+    - 按下次查询时间建小顶堆，只查已到期的运单
+    - 查询间隔随物流状态自适应：派件中30分钟、在途6小时；
+      查询后没有新轨迹则按 backoff 逐步拉长间隔，出现新轨迹恢复基础间隔
+    - 同一运单（多个订单合并发货）只查一次；batch_window 内即将到期的运单并入本轮一起查，
+      本轮请求按并发上限和令牌桶限流同时发出
+    - 签收/退签/拒签后不再查询
+    - 预警（物流停滞超48小时、未发货超72小时、疑难件）只根据已保存的轨迹时间线判断，
+      不为预警额外查询
+
+用法:
+    scheduler = TrackingScheduler(Kuaidi100Client(), state_path=TRACKING_STATE_PATH)
+    scheduler.add("PO20240501001", "yuantong", "YT1234567890", created_at=order_time)
+    await scheduler.run(on_alert=print)
+
+命令行: python run_purchase.py --track shipments.jsonl [--once]
+"""
+import asyncio
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass, field, asdict
+from itertools import count
+
+from src.services.kuaidi100 import (
+    FINAL_STATES, STATE_COLLECTED, STATE_CUSTOMS, STATE_DELIVERING, STATE_FORWARDED,
+    STATE_IN_TRANSIT, STATE_NAMES, STATE_RETURNING, STATE_TROUBLE, Kuaidi100Client, KuaidiError,
+    parse_event_time,
+)
+from src.services.rate_limiter import TokenBucket
+
+TRACKING_STATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "tracking_state.json")
+
+HOUR = 3600
+
+# 各状态的基础查询间隔（秒），None 表示尚无轨迹（未发货或刚发货）
+DEFAULT_INTERVALS = {
+    None: 2 * HOUR,
+    STATE_COLLECTED: 4 * HOUR,
+    STATE_IN_TRANSIT: 6 * HOUR,
+    STATE_CUSTOMS: 12 * HOUR,
+    STATE_FORWARDED: 4 * HOUR,
+    STATE_RETURNING: 6 * HOUR,
+    STATE_TROUBLE: 2 * HOUR,
+    STATE_DELIVERING: HOUR / 2,
+}
+
+ALERT_STALLED = "stalled"
+ALERT_UNSHIPPED = "unshipped"
+ALERT_TROUBLE = "trouble"
+
+
+@dataclass
+class Shipment:
+    """一个运单（可能对应多个订单）"""
+    company: str
+    number: str
+    phone: str = None
+    order_ids: list = field(default_factory=list)
+    created_at: float = 0.0             # 下单/发货时间，用于未发货判断
+    state: str = None
+    signed: bool = False
+    events: list = field(default_factory=list)      # [(时间戳, 描述)]，按时间正序
+    polls: int = 0
+    errors: int = 0
+    last_polled: float = None
+    next_due: float = 0.0
+    interval: float = 0.0
+    alerted: list = field(default_factory=list)     # 已发出的预警类型
+
+    @property
+    def key(self) -> tuple:
+        return self.company, self.number
+
+    @property
+    def done(self) -> bool:
+        return self.signed or self.state in FINAL_STATES
+
+    @property
+    def last_event_at(self) -> float:
+        return self.events[-1][0] if self.events else None
+
+    def merge_events(self, events: list) -> int:
+        """合并新查到的轨迹，返回新增条数"""
+        known = {(t, c) for t, c in self.events}
+        new = [(t, c) for t, c in events if (t, c) not in known]
+        if new:
+            self.events = sorted(self.events + new)
+        return len(new)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Shipment":
+        d = dict(d)
+        d["events"] = [tuple(e) for e in d.get("events", [])]
+        return cls(**d)
+
+
+@dataclass
+class Alert:
+    """物流预警"""
+    kind: str                   # stalled / unshipped / trouble
+    company: str
+    number: str
+    order_ids: list
+    since: float                # 最后一条轨迹时间（停滞）或下单时间（未发货）
+    message: str
+
+    def __str__(self):
+        return f"⚠️ {self.message}（运单 {self.company}:{self.number}，订单 {', '.join(self.order_ids)}）"
+
+
+@dataclass
+class PollRound:
+    """一轮查询的统计"""
+    polled: int = 0             # 实际发出的查询数
+    orders: int = 0             # 覆盖的订单数（合并后）
+    updated: int = 0            # 有新轨迹的运单数
+    finished: int = 0           # 本轮签收/退签的运单数
+    errors: int = 0
+    paused: bool = False        # 遇到额度/签名错误，整体暂停
+    elapsed: float = 0.0
+
+
+class TrackingScheduler:
+    """按到期时间调度的物流轮询器"""
+
+    def __init__(self, client, intervals: dict = None, backoff: float = 1.5,
+                 max_interval: float = 12 * HOUR, batch_window: float = 10 * 60,
+                 concurrency: int = 5, rate: float = 5.0, stall_hours: float = 48,
+                 unshipped_hours: float = 72, pause_seconds: float = HOUR,
+                 state_path: str = None, clock=time.time):
+        """
+        Args:
+            client: Kuaidi100Client（或同样提供 async query(company, number, phone) 的对象）
+            intervals: {状态码: 基础查询间隔秒数}，覆盖 DEFAULT_INTERVALS
+            backoff: 查询无新轨迹时间隔的放大倍数（1 表示固定间隔）
+            max_interval: 查询间隔上限（秒）
+            batch_window: 该时间内将到期的运单并入本轮查询（秒）
+            concurrency: 同时在途的查询数
+            rate: 每秒查询数上限
+            stall_hours: 最后一条轨迹超过该小时数未更新视为停滞
+            unshipped_hours: 下单后超过该小时数仍无轨迹视为未发货
+            pause_seconds: 额度用尽/签名错误时的整体暂停秒数
+            state_path: 运单与轨迹的保存文件，为空时不落盘
+            clock: 当前时间函数（基准测试中用模拟时钟）
+        """
+        self.client = client
+        self.intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.batch_window = batch_window
+        self.concurrency = concurrency
+        self.rate = rate
+        self.stall_seconds = stall_hours * HOUR
+        self.unshipped_seconds = unshipped_hours * HOUR
+        self.pause_seconds = pause_seconds
+        self.state_path = state_path
+        self.clock = clock
+        self.shipments = {}             # {(公司, 单号): Shipment}
+        self.paused_until = 0.0
+        self.stats = {"rounds": 0, "polls": 0, "errors": 0, "coalesced": 0}
+        self._heap = []
+        self._seq = count()
+        self._bucket = None
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    # ---------- 运单管理 ----------
+
+    def _push(self, shipment: Shipment):
+        heapq.heappush(self._heap, (shipment.next_due, next(self._seq), shipment.key))
+
+    def add(self, order_id: str, company: str, number: str, phone: str = None,
+            created_at: float = None) -> Shipment:
+        """
+        登记需要跟踪的订单；同一运单的多个订单合并为一次查询
+        """
+        key = (company, number)
+        shipment = self.shipments.get(key)
+        if shipment is not None:
+            if order_id not in shipment.order_ids:
+                shipment.order_ids.append(order_id)
+                self.stats["coalesced"] += 1
+            shipment.phone = shipment.phone or phone
+            return shipment
+        now = self.clock()
+        shipment = Shipment(company=company, number=number, phone=phone, order_ids=[order_id],
+                            created_at=created_at or now, next_due=now)
+        self.shipments[key] = shipment
+        self._push(shipment)
+        return shipment
+
+    def remove(self, company: str, number: str):
+        """不再跟踪某个运单（堆中的旧条目出队时跳过）"""
+        self.shipments.pop((company, number), None)
+
+    @property
+    def active(self) -> list:
+        return [s for s in self.shipments.values() if not s.done]
+
+    def next_due(self) -> float:
+        """最近一个到期时间，没有待查运单时返回 None"""
+        while self._heap:
+            due, _, key = self._heap[0]
+            shipment = self.shipments.get(key)
+            if shipment is None or shipment.done or shipment.next_due != due:
+                heapq.heappop(self._heap)   # 已删除或已重新排期的旧条目
+                continue
+            return max(due, self.paused_until)
+        return None
+
+    def pop_due(self, now: float = None) -> list:
+        """取出本轮要查询的运单（已到期 + batch_window 内将到期的）"""
+        now = self.clock() if now is None else now
+        if now < self.paused_until:
+            return []
+        batch = []
+        horizon = now + self.batch_window
+        while self.next_due() is not None and self._heap[0][0] <= horizon:
+            _, _, key = heapq.heappop(self._heap)
+            batch.append(self.shipments[key])
+        return batch
+
+    # ---------- 查询 ----------
+
+    def _interval(self, shipment: Shipment, new_events: int, state_changed: bool) -> float:
+        base = self.intervals.get(shipment.state, self.intervals[None])
+        if new_events or state_changed or not shipment.interval:
+            return base
+        # 没有新轨迹：逐步拉长，最多放大到基础间隔的4倍
+        return min(self.max_interval, base * 4, max(base, shipment.interval * self.backoff))
+
+    async def _poll(self, shipment: Shipment, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            await self._bucket.acquire()
+            try:
+                return shipment, await self.client.query(shipment.company, shipment.number,
+                                                         shipment.phone), None
+            except KuaidiError as e:
+                # 只有查询失败按退避重试处理，其他异常（程序错误）向上抛出
+                return shipment, None, e
+
+    async def poll_due(self, now: float = None) -> PollRound:
+        """查询本轮到期的运单并重新排期"""
+        started = time.monotonic()
+        batch = self.pop_due(now)
+        round_ = PollRound(polled=len(batch), orders=sum(len(s.order_ids) for s in batch))
+        if not batch:
+            return round_
+        if self._bucket is None:
+            self._bucket = TokenBucket(self.rate)
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        tasks = [asyncio.ensure_future(self._poll(s, semaphore)) for s in batch]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # 本轮取出的运单放回队列（到期时间不变），避免异常后丢失跟踪
+            for task in tasks:
+                task.cancel()
+            for shipment in batch:
+                self._push(shipment)
+            raise
+
+        now = self.clock()
+        for shipment, result, error in results:
+            shipment.polls += 1
+            shipment.last_polled = now
+            if error is not None:
+                round_.errors += 1
+                shipment.errors += 1
+                if isinstance(error, KuaidiError) and error.fatal:
+                    round_.paused = True
+                    shipment.next_due = now + self.pause_seconds
+                else:
+                    # 网络等临时错误：指数退避重试
+                    shipment.next_due = now + min(self.max_interval, 300 * 2 ** min(shipment.errors, 8))
+                self._push(shipment)
+                continue
+
+            shipment.errors = 0
+            new_events = shipment.merge_events(result.events)
+            state_changed = result.state is not None and result.state != shipment.state
+            if result.state is not None:
+                shipment.state = result.state
+            shipment.signed = shipment.signed or result.signed
+            if new_events:
+                round_.updated += 1
+                # 恢复更新后，再次停滞时重新预警
+                if ALERT_STALLED in shipment.alerted:
+                    shipment.alerted.remove(ALERT_STALLED)
+            if shipment.done:
+                round_.finished += 1
+                continue
+            shipment.interval = self._interval(shipment, new_events, state_changed)
+            shipment.next_due = now + shipment.interval
+            self._push(shipment)
+
+        if round_.paused:
+            self.paused_until = now + self.pause_seconds
+        self.stats["rounds"] += 1
+        self.stats["polls"] += round_.polled
+        self.stats["errors"] += round_.errors
+        round_.elapsed = time.monotonic() - started
+        if self.state_path:
+            self.save()
+        return round_
+
+    # ---------- 预警 ----------
+
+    def alerts(self, now: float = None, only_new: bool = False) -> list:
+        """
+        根据已保存的轨迹时间线检查预警（不发起查询）
+
+        Args:
+            only_new: 只返回之前未报过的预警，并记为已报
+        """
+        now = self.clock() if now is None else now
+        out = []
+        for s in self.shipments.values():
+            if s.done:
+                continue
+            found = []
+            if not s.events:
+                if now - s.created_at > self.unshipped_seconds:
+                    hours = (now - s.created_at) / HOUR
+                    found.append((ALERT_UNSHIPPED, s.created_at, f"未发货超{hours:.0f}小时"))
+            elif now - s.last_event_at > self.stall_seconds:
+                hours = (now - s.last_event_at) / HOUR
+                found.append((ALERT_STALLED, s.last_event_at,
+                              f"物流停滞超{hours:.0f}小时（{STATE_NAMES.get(s.state, '未知')}）"))
+            if s.state == STATE_TROUBLE:
+                found.append((ALERT_TROUBLE, s.last_event_at, "疑难件，需要联系快递公司"))
+            for kind, since, message in found:
+                if only_new:
+                    if kind in s.alerted:
+                        continue
+                    s.alerted.append(kind)
+                out.append(Alert(kind, s.company, s.number, list(s.order_ids), since, message))
+        return out
+
+    # ---------- 运行 ----------
+
+    async def run(self, stop_event: asyncio.Event = None, on_alert=None, on_round=None,
+                  idle_sleep: float = 60):
+        """
+        持续调度，直到所有运单结束或 stop_event 被设置
+
+        Args:
+            stop_event: 停止信号
+            on_alert: 新预警回调 on_alert(Alert)
+            on_round: 每轮查询后的回调 on_round(PollRound)
+            idle_sleep: 暂无运单时的检查间隔（秒）
+        """
+        stop_event = stop_event or asyncio.Event()
+        while not stop_event.is_set():
+            due = self.next_due()
+            if due is None and not self.active:
+                break
+            delay = idle_sleep if due is None else max(0.0, due - self.clock())
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+            round_ = await self.poll_due()
+            if on_round is not None:
+                on_round(round_)
+            if on_alert is not None:
+                for alert in self.alerts(only_new=True):
+                    on_alert(alert)
+
+    # ---------- 持久化 ----------
+
+    def save(self, path: str = None):
+        """保存运单与轨迹（先写临时文件再替换）"""
+        path = path or self.state_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"paused_until": self.paused_until,
+                       "shipments": [asdict(s) for s in self.shipments.values()]},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None):
+        """恢复保存的运单，未结束的运单按原到期时间重新入堆"""
+        with open(path or self.state_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.paused_until = data.get("paused_until", 0.0)
+        for d in data.get("shipments", []):
+            shipment = Shipment.from_dict(d)
+            self.shipments[shipment.key] = shipment
+            if not shipment.done:
+                self._push(shipment)
+
+    def report(self) -> str:
+        active = self.active
+        by_state = {}
+        for s in active:
+            name = STATE_NAMES.get(s.state, "未发货")
+            by_state[name] = by_state.get(name, 0) + 1
+        states = ", ".join(f"{k} {v}" for k, v in by_state.items()) or "无"
+        orders = sum(len(s.order_ids) for s in self.shipments.values())
+        return (f"【物流跟踪】{len(self.shipments)} 个运单（{orders} 个订单，合并 {self.stats['coalesced']}），"
+                f"跟踪中 {len(active)}: {states}; 共查询 {self.stats['polls']} 次 / "
+                f"{self.stats['rounds']} 轮, 失败 {self.stats['errors']} 次")
+
+
+# ---------- 命令行 ----------
+
+def load_shipments(path: str) -> list:
+    """
+    读取运单文件（JSONL），每行 {"order_id", "company", "number", "phone", "created_at"}
+
+    created_at 为下单时间（时间戳或 "2024-05-01 12:30:00"），缺省为登记时间。
+    """
+    rows = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_no, raw in enumerate(f, start=1):
+            raw = raw.strip()
+            if not raw or raw.startswith("#"):
+                continue
+            row = json.loads(raw)
+            created_at = row.get("created_at")
+            if isinstance(created_at, str):
+                created_at = parse_event_time(created_at)
+            rows.append({"order_id": str(row.get("order_id") or line_no), "company": row["company"],
+                         "number": str(row["number"]), "phone": row.get("phone"), "created_at": created_at})
+    return rows
+
+
+def _print_round(round_: PollRound):
+    if not round_.polled:
+        return
+    line = (f"🔄 查询 {round_.polled} 个运单（{round_.orders} 个订单）: 有更新 {round_.updated}, "
+            f"已结束 {round_.finished}, 失败 {round_.errors}")
+    if round_.paused:
+        line += "；额度用尽或签名错误，暂停查询"
+    print(line)
+
+
+async def run_tracking(shipments_path: str = None, once: bool = False, client=None,
+                       state_path: str = None) -> TrackingScheduler:
+    """
+    命令行入口：登记运单文件中的订单，与已保存的运单一起轮询，直到全部结束（Ctrl+C 停止）
+
+    Args:
+        shipments_path: 运单文件（JSONL），为空时只跟踪已保存的运单
+        once: 只查询一轮已到期的运单（放进定时任务时使用）
+        client: 查询客户端，默认 Kuaidi100Client
+        state_path: 运单与轨迹的保存文件，默认读取 TRACKING_STATE_PATH，再默认 data/tracking_state.json
+    """
+    state_path = state_path or os.getenv("TRACKING_STATE_PATH") or TRACKING_STATE_PATH
+    own_client = client is None
+    client = client or Kuaidi100Client()
+    scheduler = TrackingScheduler(client, state_path=state_path)
+    for row in load_shipments(shipments_path) if shipments_path else []:
+        scheduler.add(**row)
+    print(f"🚚 跟踪中的运单: {len(scheduler.active)} 个")
+    try:
+        if once:
+            _print_round(await scheduler.poll_due())
+            for alert in scheduler.alerts(only_new=True):
+                print(alert)
+        else:
+            await scheduler.run(on_alert=print, on_round=_print_round)
+    finally:
+        scheduler.save()
+        if own_client:
+            await client.close()
+    print(scheduler.report())
+    return scheduler
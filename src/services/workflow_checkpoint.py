@@ -0,0 +1,298 @@
+"""
+工作流检查点
+============================================
+
+采购流程在下单或物流阶段失败、或在确认环节暂停后，重新运行会从爬取和 AI 选品开始，
+重复最慢、最贵的两步。检查点把每个阶段的输出（候选商品、推荐结果、订单）保存到 SQLite，
+用 --resume <工作流ID> 继续时跳过已完成的阶段。
+
+    - 工作流: 需求、状态（running / pending_confirmation / completed / failed）、错误信息
+    - 阶段输出: pickle + zlib 压缩后存为 BLOB，只读取本机 data/ 目录下自己写入的检查点；
+      保存失败只记录原因，不影响流程
+    - 编排器通过 set_checkpointer(checkpointer) 接入，每个阶段用 checkpointer.run_stage 包一层，
+      并以 checkpointer.workflow_id 作为工作流ID（订单、结果中的ID与检查点一致）
+    - 下单阶段已执行但输出保存失败时，工作流标记为 order_unsaved，不能再续跑
+      （续跑会重新下单），需要人工核对订单
+
+用法:
+    store = CheckpointStore()
+    workflow_id = store.create(demand)
+    orchestrator.set_checkpointer(store.checkpointer(workflow_id))
+
+    # 编排器内部
+    candidates = await self.checkpointer.run_stage(STAGE_CRAWL, self._crawl, demand)
+"""
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CHECKPOINT_PATH = os.path.join(_PROJECT_ROOT, "data", "workflow_checkpoints.sqlite3")
+
+# 阶段名与编排器进度回调的步骤名一致
+STAGE_CRAWL = "爬取"
+STAGE_SELECT = "AI选品"
+STAGE_CONFIRM = "确认"
+STAGE_ORDER = "下单"
+STAGE_TRACK = "物流"
+STAGE_STOCK = "入库"
+
+STATUS_RUNNING = "running"
+STATUS_PENDING = "pending_confirmation"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_ORDER_UNSAVED = "order_unsaved"
+
+# 有外部副作用的阶段：输出保存失败后不能续跑
+SIDE_EFFECT_STAGES = (STAGE_ORDER,)
+
+# 已结束的工作流保留天数（超过后由 purge 清理）
+DEFAULT_RETENTION_DAYS = 30
+
+
+class CheckpointError(RuntimeError):
+    """工作流或检查点不存在、无法读取"""
+
+
+def encode(value) -> bytes:
+    """阶段输出 → 压缩后的字节"""
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def decode(data: bytes):
+    return pickle.loads(zlib.decompress(data))
+
+
+@dataclass
+class WorkflowRun:
+    """一个带检查点的工作流"""
+    workflow_id: str
+    demand: object
+    product_name: str = ""
+    status: str = STATUS_RUNNING
+    error: str = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    stages: list = field(default_factory=list)      # 已完成的阶段（按完成顺序）
+
+    def format(self) -> str:
+        updated = datetime.fromtimestamp(self.updated_at).strftime("%Y-%m-%d %H:%M:%S")
+        stages = " → ".join(self.stages) or "无"
+        error = f", 错误: {self.error}" if self.error else ""
+        return f"{self.workflow_id}  {self.status:<20} {updated}  {self.product_name}  已完成: {stages}{error}"
+
+
+class CheckpointStore:
+    """SQLite 持久化的工作流检查点（线程安全）"""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: 检查点文件路径，默认读取 WORKFLOW_CHECKPOINT_PATH，再默认 data/workflow_checkpoints.sqlite3
+        """
+        self.path = path or os.getenv("WORKFLOW_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workflow_run ("
+            " workflow_id TEXT PRIMARY KEY, product_name TEXT, demand BLOB NOT NULL,"
+            " status TEXT NOT NULL, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workflow_checkpoint ("
+            " workflow_id TEXT NOT NULL, stage TEXT NOT NULL, output BLOB NOT NULL,"
+            " size INTEGER NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (workflow_id, stage))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_workflow_run_updated ON workflow_run(updated_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    # ---------- 工作流 ----------
+
+    def create(self, demand, workflow_id: str = None) -> str:
+        """登记新工作流，返回工作流ID"""
+        workflow_id = workflow_id or f"WF{datetime.now():%Y%m%d%H%M%S}{uuid.uuid4().hex[:6]}"
+        name = demand.get("product_name") if isinstance(demand, dict) else getattr(demand, "product_name", "")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO workflow_run (workflow_id, product_name, demand, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", (workflow_id, name or "", encode(demand), STATUS_RUNNING, now, now))
+            self._conn.commit()
+        return workflow_id
+
+    def get(self, workflow_id: str) -> WorkflowRun:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT workflow_id, product_name, demand, status, error, created_at, updated_at"
+                " FROM workflow_run WHERE workflow_id = ?", (workflow_id,)).fetchone()
+            if row is None:
+                raise CheckpointError(f"工作流不存在: {workflow_id}")
+            stages = [r[0] for r in self._conn.execute(
+                "SELECT stage FROM workflow_checkpoint WHERE workflow_id = ? ORDER BY created_at",
+                (workflow_id,))]
+        try:
+            demand = decode(row[2])
+        except Exception as e:
+            raise CheckpointError(f"工作流需求无法读取: {workflow_id} ({e})") from e
+        return WorkflowRun(workflow_id=row[0], product_name=row[1], demand=demand, status=row[3],
+                           error=row[4], created_at=row[5], updated_at=row[6], stages=stages)
+
+    def set_status(self, workflow_id: str, status: str, error: str = None):
+        with self._lock:
+            self._conn.execute("UPDATE workflow_run SET status = ?, error = ?, updated_at = ? WHERE workflow_id = ?",
+                               (status, error, time.time(), workflow_id))
+            self._conn.commit()
+
+    def list(self, limit: int = 20, status: str = None) -> list:
+        """最近更新的工作流（不含需求和阶段输出）"""
+        sql = "SELECT workflow_id FROM workflow_run"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(sql + " ORDER BY updated_at DESC LIMIT ?", (*params, limit))]
+        return [self.get(workflow_id) for workflow_id in ids]
+
+    def delete(self, workflow_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM workflow_checkpoint WHERE workflow_id = ?", (workflow_id,))
+            self._conn.execute("DELETE FROM workflow_run WHERE workflow_id = ?", (workflow_id,))
+            self._conn.commit()
+
+    def purge(self, older_than: float = 30 * 24 * 3600, keep_unfinished: bool = True) -> int:
+        """删除超过 older_than 秒未更新的工作流，返回删除数"""
+        sql = "SELECT workflow_id FROM workflow_run WHERE updated_at < ?"
+        if keep_unfinished:
+            sql += f" AND status IN ('{STATUS_COMPLETED}', '{STATUS_FAILED}', '{STATUS_ORDER_UNSAVED}')"
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(sql, (time.time() - older_than,))]
+            for workflow_id in ids:
+                self._conn.execute("DELETE FROM workflow_checkpoint WHERE workflow_id = ?", (workflow_id,))
+                self._conn.execute("DELETE FROM workflow_run WHERE workflow_id = ?", (workflow_id,))
+            self._conn.commit()
+        return len(ids)
+
+    # ---------- 阶段输出 ----------
+
+    def save_stage(self, workflow_id: str, stage: str, output) -> int:
+        """保存阶段输出，返回压缩后的字节数"""
+        data = encode(output)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workflow_checkpoint (workflow_id, stage, output, size, created_at)"
+                " VALUES (?, ?, ?, ?, ?)", (workflow_id, stage, data, len(data), now))
+            self._conn.execute("UPDATE workflow_run SET updated_at = ? WHERE workflow_id = ?", (now, workflow_id))
+            self._conn.commit()
+        return len(data)
+
+    def load_stage(self, workflow_id: str, stage: str):
+        """
+        Returns:
+            (是否存在, 阶段输出)；输出无法反序列化（如类定义已变化）时视为不存在
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT output FROM workflow_checkpoint WHERE workflow_id = ? AND stage = ?",
+                                     (workflow_id, stage)).fetchone()
+        if row is None:
+            return False, None
+        try:
+            return True, decode(row[0])
+        except Exception:
+            return False, None
+
+    def clear_stages(self, workflow_id: str, stages: list = None):
+        """删除阶段输出（stages 为空时删除全部），用于强制重跑"""
+        with self._lock:
+            if stages is None:
+                self._conn.execute("DELETE FROM workflow_checkpoint WHERE workflow_id = ?", (workflow_id,))
+            else:
+                self._conn.executemany("DELETE FROM workflow_checkpoint WHERE workflow_id = ? AND stage = ?",
+                                       [(workflow_id, s) for s in stages])
+            self._conn.commit()
+
+    def checkpointer(self, workflow_id: str) -> "WorkflowCheckpointer":
+        return WorkflowCheckpointer(self, workflow_id)
+
+    def close(self):
+        self._conn.close()
+
+
+class WorkflowCheckpointer:
+    """绑定到单个工作流的检查点，编排器用它跳过已完成的阶段"""
+
+    def __init__(self, store: CheckpointStore, workflow_id: str):
+        self.store = store
+        self.workflow_id = workflow_id
+        self.skipped = []           # 本次从检查点恢复的阶段
+        self.saved = {}             # 本次保存的阶段 → 压缩后字节数
+        self.errors = {}            # 保存失败的阶段 → 原因
+        self.resumable = True       # 有副作用的阶段保存失败后为 False
+
+    def load(self, stage: str):
+        """(是否存在, 阶段输出)"""
+        return self.store.load_stage(self.workflow_id, stage)
+
+    def save(self, stage: str, output) -> bool:
+        """
+        保存阶段输出；无法序列化或写入失败时只记录原因，不影响流程
+        （下单等阶段已产生外部副作用，不能因为检查点失败而判定阶段失败）
+        """
+        try:
+            self.saved[stage] = self.store.save_stage(self.workflow_id, stage, output)
+            return True
+        except Exception as e:
+            self.errors[stage] = f"{type(e).__name__}: {e}"
+            if stage in SIDE_EFFECT_STAGES:
+                self.mark_unresumable(stage)
+            return False
+
+    def mark_unresumable(self, stage: str):
+        """有副作用的阶段已执行但输出未保存：续跑会重复执行，标记后拒绝续跑"""
+        self.resumable = False
+        try:
+            self.store.set_status(self.workflow_id, STATUS_ORDER_UNSAVED,
+                                  f"{stage}已执行但检查点保存失败（{self.errors.get(stage)}），请人工核对")
+        except Exception:
+            pass
+
+    async def run_stage(self, stage: str, func, *args, **kwargs):
+        """
+        阶段已完成时直接返回保存的输出，否则执行 func 并保存输出
+
+        Args:
+            stage: 阶段名
+            func: 同步函数或协程函数；抛出异常时不保存，下次继续从该阶段执行
+        """
+        found, output = self.load(stage)
+        if found:
+            self.skipped.append(stage)
+            return output
+        output = func(*args, **kwargs)
+        if inspect.isawaitable(output):
+            output = await output
+        self.save(stage, output)
+        return output
+
+    def report(self) -> str:
+        parts = []
+        if self.skipped:
+            parts.append(f"跳过已完成阶段: {' → '.join(self.skipped)}")
+        if self.saved:
+            parts.append("已保存: " + ", ".join(f"{s} {n / 1024:.1f}KB" for s, n in self.saved.items()))
+        if self.errors:
+            parts.append("⚠️ 保存失败: " + ", ".join(f"{s}（{e}）" for s, e in self.errors.items()))
+        if not self.resumable:
+            parts.append("❌ 下单结果未保存，不能续跑，请人工核对订单")
+        return f"【检查点】{self.workflow_id} " + ("; ".join(parts) or "无")
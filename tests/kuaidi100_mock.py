@@ -0,0 +1,77 @@
+"""测试和基准测试共用的快递100模拟接口（校验签名，按模拟时钟返回已发生的轨迹）"""
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from src.services.kuaidi100 import STATE_SIGNED, sign
+
+KEY, CUSTOMER = "bench-key", "BENCHCUSTOMER"
+
+
+class SimClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class MockKuaidi100Server:
+    """模拟的快递100实时查询接口"""
+
+    def __init__(self, timelines: dict, clock: SimClock):
+        """
+        Args:
+            timelines: {单号: [(时间, 状态, 描述)]}，按时间正序
+            clock: 模拟时钟，只返回不晚于当前时间的轨迹
+        """
+        self.timelines = timelines
+        self.clock = clock
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                server.requests += 1
+                body = server.answer(form)
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/poll/query.do"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def answer(self, form: dict) -> dict:
+        if sign(form.get("param", ""), KEY, CUSTOMER) != form.get("sign"):
+            return {"result": False, "returnCode": "503", "message": "验证签名失败"}
+        param = json.loads(form["param"])
+        now = self.clock.now
+        events = [e for e in self.timelines.get(param["num"], []) if e[0] <= now]
+        if not events:
+            return {"result": False, "returnCode": "500", "message": "查询无结果，请隔段时间再查"}
+        fmt = lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+        state = events[-1][1]
+        return {
+            "message": "ok", "status": "200", "nu": param["num"], "com": param["com"],
+            "state": state, "ischeck": "1" if state == STATE_SIGNED else "0",
+            "data": [{"time": fmt(t), "ftime": fmt(t), "context": c} for t, _, c in reversed(events)],
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
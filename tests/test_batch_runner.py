@@ -0,0 +1,155 @@
+"""批量采购执行：需求解析与失败路径"""
+import asyncio
+import json
+
+import pytest
+
+from src.services import batch_runner
+from src.services.batch_runner import (
+    BatchPurchaseRunner, BatchRunError, DemandRowError, iter_demands, normalize_demand_row
+)
+
+
+class FakeOrchestrator:
+    def __init__(self, fail_on: str = None):
+        self.fail_on = fail_on
+        self.callback = None
+
+    def set_progress_callback(self, callback):
+        self.callback = callback
+
+    async def execute_full_workflow(self, demand):
+        await asyncio.sleep(0)
+        if demand["product_name"] == self.fail_on:
+            raise RuntimeError("下单失败")
+        return {"status": "completed", "workflow_id": f"wf-{demand['product_name']}"}
+
+
+@pytest.fixture(autouse=True)
+def _isolate(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHBOARD_VERSION_DIR", str(tmp_path / "version"))
+    # 不依赖 src.models：直接把规范化后的参数当作需求
+    monkeypatch.setattr(batch_runner, "build_purchase_demand", lambda **kwargs: kwargs)
+
+
+def write_jsonl(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("row", [[], "x", 5, None])
+def test_normalize_rejects_non_object(row):
+    with pytest.raises(DemandRowError):
+        normalize_demand_row(row)
+
+
+def test_iter_demands_reports_invalid_rows(tmp_path):
+    path = write_jsonl(tmp_path / "demands.jsonl", [
+        '{"product": "A4纸", "quantity": 2}',
+        '[]',
+        '"x"',
+        '{"product": ',
+        '{"quantity": 3}',
+    ])
+    rows = list(iter_demands(path))
+    assert rows[0] == (1, normalize_demand_row({"product": "A4纸", "quantity": 2}))
+    assert [line for line, row in rows if isinstance(row, DemandRowError)] == [2, 3, 4, 5]
+
+
+def test_run_writes_one_record_per_row(tmp_path):
+    path = write_jsonl(tmp_path / "demands.jsonl", [
+        json.dumps({"product": f"商品{i}"}, ensure_ascii=False) for i in range(10)
+    ] + ["5"])
+    out = tmp_path / "results.jsonl"
+    runner = BatchPurchaseRunner(concurrency=3, output_path=str(out), verbose=False,
+                                 orchestrator_factory=lambda: FakeOrchestrator(fail_on="商品4"))
+    summary = asyncio.run(asyncio.wait_for(runner.run(path), timeout=10))
+    assert summary["total"] == 11
+    assert summary["by_status"] == {"completed": 9, "error": 1, "invalid": 1}
+    records = read_records(out)
+    assert sorted(r["line"] for r in records) == list(range(1, 12))
+
+
+def test_orchestrator_factory_failure_does_not_hang(tmp_path):
+    # 需求数远大于队列容量：旧实现中工作协程全部退出后读取端会永远等待
+    path = write_jsonl(tmp_path / "demands.jsonl", [
+        json.dumps({"product": f"商品{i}"}, ensure_ascii=False) for i in range(50)
+    ])
+
+    def factory():
+        raise RuntimeError("浏览器启动失败")
+
+    runner = BatchPurchaseRunner(concurrency=2, output_path=str(tmp_path / "results.jsonl"),
+                                 verbose=False, orchestrator_factory=factory)
+    with pytest.raises(BatchRunError, match="浏览器启动失败"):
+        asyncio.run(asyncio.wait_for(runner.run(path), timeout=10))
+
+
+def test_worker_crash_stops_producer(tmp_path):
+    path = write_jsonl(tmp_path / "demands.jsonl", [
+        json.dumps({"product": f"商品{i}"}, ensure_ascii=False) for i in range(50)
+    ])
+
+    class BrokenOrchestrator(FakeOrchestrator):
+        def set_progress_callback(self, callback):
+            raise AttributeError("set_progress_callback")
+
+    runner = BatchPurchaseRunner(concurrency=2, output_path=str(tmp_path / "results.jsonl"),
+                                 verbose=False, orchestrator_factory=BrokenOrchestrator)
+    with pytest.raises(BatchRunError, match="批量执行中断"):
+        asyncio.run(asyncio.wait_for(runner.run(path), timeout=10))
+
+
+def test_run_batch_purchase_reports_setup_error(tmp_path, monkeypatch, capsys):
+    path = write_jsonl(tmp_path / "demands.jsonl", ['{"product": "A4纸"}'])
+
+    def fail(self):
+        raise RuntimeError("缺少配置")
+
+    monkeypatch.setattr(BatchPurchaseRunner, "_create_orchestrator", fail)
+    summary = asyncio.run(batch_runner.run_batch_purchase(path, output_path=str(tmp_path / "out.jsonl")))
+    assert "缺少配置" in summary["error"]
+    assert "❌" in capsys.readouterr().out
+
+
+def test_demand_rate_limits_demand_starts(tmp_path):
+    # 1688 每秒最多开始 20 个需求（桶容量 20）：第 21 个起开始等待，其他平台不受限
+    path = write_jsonl(tmp_path / "demands.jsonl", [
+        json.dumps({"product": f"商品{i}", "platforms": "1688" if i < 22 else "jd"}, ensure_ascii=False)
+        for i in range(24)
+    ])
+    out = tmp_path / "results.jsonl"
+    runner = BatchPurchaseRunner(concurrency=1, demand_rates={"1688": 20}, output_path=str(out),
+                                 verbose=False, orchestrator_factory=FakeOrchestrator)
+    asyncio.run(asyncio.wait_for(runner.run(path), timeout=10))
+    waits = {r["product"]: r["demand_rate_wait"] for r in read_records(out)}
+    assert all(waits[f"商品{i}"] == 0 for i in range(20))
+    assert waits["商品21"] > 0
+    assert waits["商品22"] == 0 and waits["商品23"] == 0
+
+
+def test_run_injects_one_shared_product_selector(tmp_path):
+    from src.services.pre_ranker import ProductSelector
+
+    class SelectingOrchestrator(FakeOrchestrator):
+        def set_product_selector(self, selector):
+            self.selector = selector
+
+    created = []
+
+    def factory():
+        created.append(SelectingOrchestrator())
+        return created[-1]
+
+    path = write_jsonl(tmp_path / "demands.jsonl", ['{"product": "A4纸"}'])
+    runner = BatchPurchaseRunner(concurrency=3, output_path=str(tmp_path / "results.jsonl"),
+                                 verbose=False, orchestrator_factory=factory)
+    asyncio.run(asyncio.wait_for(runner.run(path), timeout=10))
+    assert len(created) == 3
+    assert isinstance(created[0].selector, ProductSelector)
+    assert all(o.selector is created[0].selector for o in created)
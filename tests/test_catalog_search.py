@@ -0,0 +1,85 @@
+"""目录增量采集：下架处理与补搜判断"""
+import asyncio
+import time
+
+import pytest
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.repositories.product_catalog import ProductCatalog
+from src.services.catalog_search import search_with_catalog
+from src.services.crawl_scheduler import CrawlResult
+
+
+def candidate(pid, price=10.0, platform="1688"):
+    return {"platform": platform, "product_id": pid, "product_name": f"A4打印纸 70g {pid}",
+            "unit_price": price, "stock": 1000}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ProductCatalog(ConnectionFactory("sqlite", sqlite_path=str(tmp_path / "catalog.sqlite3")))
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def budget(self, platform):
+        class Budget:
+            pages = 2
+        return Budget()
+
+    async def crawl(self, query, platforms, demand=None, **kwargs):
+        self.calls.append(list(platforms))
+        return CrawlResult(candidates=[candidate(f"new-{p}", platform=p) for p in platforms])
+
+
+def search(catalog, scheduler, refreshers, min_known=3):
+    return asyncio.run(search_with_catalog(catalog, "A4打印纸", ["1688"], scheduler=scheduler,
+                                           refreshers=refreshers, min_known=min_known))
+
+
+def test_fresh_entries_skip_search(catalog):
+    catalog.upsert([candidate(str(i)) for i in range(3)])
+    scheduler = FakeScheduler()
+    result = search(catalog, scheduler, {})
+    assert scheduler.calls == []
+    assert result.from_catalog == 3
+    assert result.skipped_searches == 2
+
+
+def test_delisted_entries_are_removed(catalog):
+    catalog.upsert([candidate(str(i)) for i in range(4)], now=time.time() - 3 * 24 * 3600)
+    scheduler = FakeScheduler()
+    result = search(catalog, scheduler, {"1688": lambda pid: None if pid in ("0", "1") else candidate(pid)})
+    assert result.delisted == 2
+    assert result.refreshed == 2
+    assert catalog.count() == 3             # 2 个下架已删除，补搜得到 1 个新商品
+    assert {e.product_id for e in catalog.search("A4打印纸")} == {"2", "3", "new-1688"}
+
+
+def test_search_when_refresh_leaves_too_few(catalog):
+    catalog.upsert([candidate(str(i)) for i in range(3)], now=time.time() - 3 * 24 * 3600)
+    scheduler = FakeScheduler()
+
+    def refresh(pid):
+        if pid == "0":
+            raise TimeoutError("详情页超时")
+        return candidate(pid)
+
+    result = search(catalog, scheduler, {"1688": refresh})
+    # 重新抓取成功 2 个 < 3，补搜该平台
+    assert scheduler.calls == [["1688"]]
+    assert result.searched_platforms == ["1688"]
+    assert result.refresh_failed == 1
+    assert result.skipped_searches == 0
+    assert sum(1 for c in result.candidates if c["product_id"] == "new-1688") == 1
+
+
+def test_stale_without_refresher_is_not_counted(catalog):
+    catalog.upsert([candidate(str(i)) for i in range(3)], now=time.time() - 3 * 24 * 3600)
+    catalog.upsert([candidate("fresh")])
+    scheduler = FakeScheduler()
+    result = search(catalog, scheduler, {})
+    assert scheduler.calls == [["1688"]]
+    assert result.from_catalog == 0
@@ -0,0 +1,96 @@
+"""多平台爬取调度：提前返回、收尾等待、超时与失败状态"""
+import asyncio
+import threading
+
+from src.services.crawl_scheduler import CrawlScheduler, PlatformBudget
+
+
+def fetcher(delays: list, per_page: int = 5, fail: bool = False):
+    """按页返回固定延迟的候选商品，delays[页码-1] 为该页延迟（秒）"""
+    async def fetch(query: str, page: int) -> list:
+        await asyncio.sleep(delays[page - 1])
+        if fail:
+            raise RuntimeError("返回验证码页面")
+        return [{"product_id": f"{page}-{i}", "unit_price": 10.0} for i in range(per_page)]
+    return fetch
+
+
+def budgets(**overrides):
+    base = {name: PlatformBudget(timeout=2.0, concurrency=2, rate=1000, pages=1)
+            for name in ("1688", "jd", "tmall")}
+    base.update(overrides)
+    return base
+
+
+def test_waits_for_all_platforms_by_default():
+    scheduler = CrawlScheduler({"1688": fetcher([0.02]), "jd": fetcher([0.01])}, budgets())
+    result = asyncio.run(scheduler.crawl("A4打印纸"))
+    assert not result.early_exit
+    assert len(result.candidates) == 10
+    assert {o.status for o in result.platforms.values()} == {"ok"}
+    assert {c["platform"] for c in result.candidates} == {"1688", "jd"}
+
+
+def test_early_exit_cancels_slow_platform():
+    scheduler = CrawlScheduler({"jd": fetcher([0.01]), "1688": fetcher([1.0])}, budgets())
+    result = asyncio.run(asyncio.wait_for(scheduler.crawl("A4打印纸", min_candidates=5), timeout=1))
+    assert result.early_exit
+    assert result.platforms["jd"].status == "ok"
+    assert result.platforms["1688"].status == "cancelled"
+    assert result.elapsed < 0.5
+
+
+def test_grace_keeps_pending_result_and_stops_at_budget():
+    # jd 先到满足条件；tmall 在收尾等待内到达，仍计入结果；1688 超出收尾时间被取消
+    scheduler = CrawlScheduler({
+        "jd": fetcher([0.01]),
+        "tmall": fetcher([0.12]),
+        "1688": fetcher([1.0]),
+    }, budgets())
+    batches = []
+    result = asyncio.run(scheduler.crawl("A4打印纸", min_candidates=5, grace=0.3,
+                                         on_candidates=lambda p, items: batches.append(p)))
+    assert batches == ["jd", "tmall"]
+    assert result.early_exit
+    assert result.platforms["tmall"].status == "ok"
+    assert result.platforms["1688"].status == "cancelled"
+    assert len(result.candidates) == 10
+
+
+def test_timeout_error_and_partial_status():
+    scheduler = CrawlScheduler({
+        "1688": fetcher([0.5]),
+        "jd": fetcher([0.01], fail=True),
+        "tmall": fetcher([0.01, 0.01]),
+    }, budgets(**{"1688": PlatformBudget(timeout=0.05, rate=1000, pages=1),
+                  "tmall": PlatformBudget(timeout=1.0, rate=1000, pages=2)}))
+    calls = {"n": 0}
+    original = scheduler.fetchers["tmall"]
+
+    async def second_page_fails(query, page):
+        calls["n"] += 1
+        if page == 2:
+            raise RuntimeError("第2页超时")
+        return await original(query, page)
+
+    scheduler.fetchers["tmall"] = second_page_fails
+    result = asyncio.run(scheduler.crawl("A4打印纸", platforms=["1688", "jd", "tmall", "taobao"]))
+    assert result.platforms["1688"].status == "timeout"
+    assert result.platforms["jd"].status == "error"
+    assert "验证码" in result.platforms["jd"].error
+    assert result.platforms["tmall"].status == "partial"
+    assert result.platforms["taobao"].status == "skipped"
+    assert calls["n"] == 2 and len(result.candidates) == 5
+
+
+def test_sync_fetcher_runs_in_thread():
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def fetch(query, page):
+        threads.append(threading.get_ident())
+        return [{"product_id": "1", "unit_price": 10.0}]
+
+    result = asyncio.run(CrawlScheduler({"jd": fetch}, budgets()).crawl("A4打印纸"))
+    assert len(result.candidates) == 1
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,149 @@
+"""看板数据层：迁移脚本建索引、以数据版本号为键的缓存失效"""
+import asyncio
+
+import pytest
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.dashboard_data import (
+    DashboardInvalidator, DashboardQueries, DataVersion, DOMAIN_ALERTS, DOMAIN_INVENTORY, DOMAIN_ORDERS,
+    INDEX_MIGRATION
+)
+from src.services.progress_bus import ProgressBus, ProgressEvent
+from src.services.sql_runner import run_sql_script
+from src.services.workflow_checkpoint import STAGE_ORDER, STAGE_STOCK
+
+
+@pytest.fixture
+def factory(tmp_path):
+    factory = ConnectionFactory("sqlite", sqlite_path=str(tmp_path / "dashboard.sqlite3"))
+    with factory.connection() as conn:
+        conn.execute("CREATE TABLE order_table (id INTEGER PRIMARY KEY, order_no TEXT, product_name TEXT, "
+                     "total_amount REAL, status TEXT)")
+        conn.executemany("INSERT INTO order_table VALUES (?, ?, ?, ?, ?)",
+                         [(1, "PO001", "A4打印纸", 100.0, "paid"), (2, "PO002", "中性笔", 20.0, "pending")])
+        conn.execute("CREATE TABLE inventory_table (id INTEGER PRIMARY KEY, sku_id TEXT, quantity INTEGER, "
+                     "alert_threshold INTEGER)")
+        conn.execute("INSERT INTO inventory_table VALUES (1, 'SKU1', 5, 10)")
+        conn.execute("CREATE TABLE alert_table (id INTEGER PRIMARY KEY, message TEXT)")
+        conn.commit()
+    return factory
+
+
+class VersionedMemo:
+    """与 dashboard_cache 相同的缓存键：(查询, 数据域版本号, 参数)"""
+
+    def __init__(self, queries: DashboardQueries, version: DataVersion):
+        self.queries = queries
+        self.version = version
+        self.memo = {}
+        self.misses = 0
+
+    def get(self, name: str, domain: str, *args):
+        key = (name, self.version.get(domain), args)
+        if key not in self.memo:
+            self.misses += 1
+            self.memo[key] = getattr(self.queries, name)(*args)
+        return self.memo[key]
+
+
+def test_index_migration_creates_dashboard_indexes(factory):
+    with factory.connection() as conn, open(INDEX_MIGRATION, encoding="utf-8") as f:
+        report = run_sql_script(conn, f.read())
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert report.failed == 0 and report.executed == 2
+    assert {"idx_dashboard_order_status", "idx_dashboard_inventory_qty"} <= names
+
+
+def test_migration_rerun_ignores_existing_index():
+    class DuplicateKey(Exception):
+        errno = 1061
+
+    class Cursor:
+        def execute(self, sql):
+            raise DuplicateKey("Duplicate key name 'idx_dashboard_order_status'")
+
+        def close(self):
+            pass
+
+    class Conn:
+        def cursor(self):
+            return Cursor()
+
+        def commit(self):
+            pass
+
+    with open(INDEX_MIGRATION, encoding="utf-8") as f:
+        report = run_sql_script(Conn(), f.read())
+    assert report.ignored == 2 and report.failed == 0 and not report.warnings
+
+
+def test_version_bump_invalidates_cached_result(factory, tmp_path):
+    version = DataVersion(str(tmp_path / "version"))
+    cache = VersionedMemo(DashboardQueries(factory), version)
+    assert cache.get("count_orders", DOMAIN_ORDERS) == 2
+
+    with factory.connection() as conn:
+        conn.execute("INSERT INTO order_table VALUES (3, 'PO003', '订书机', 35.0, 'paid')")
+        conn.commit()
+    # 版本号未变：命中缓存，仍是旧结果
+    assert cache.get("count_orders", DOMAIN_ORDERS) == 2
+    assert cache.misses == 1
+
+    version.bump(DOMAIN_INVENTORY)
+    assert cache.get("count_orders", DOMAIN_ORDERS) == 2      # 其他数据域的版本不影响订单缓存
+    version.bump(DOMAIN_ORDERS)
+    assert cache.get("count_orders", DOMAIN_ORDERS) == 3
+    assert cache.misses == 2
+
+
+def test_version_shared_across_instances(tmp_path):
+    writer = DataVersion(str(tmp_path / "version"))
+    reader = DataVersion(str(tmp_path / "version"))
+    assert reader.snapshot() == {DOMAIN_ORDERS: "0", DOMAIN_INVENTORY: "0", DOMAIN_ALERTS: "0"}
+    writer.bump(DOMAIN_ALERTS)
+    snapshot = reader.snapshot()
+    assert snapshot[DOMAIN_ALERTS] != "0"
+    assert snapshot[DOMAIN_ORDERS] == "0"
+
+
+def test_invalidator_bumps_domains_of_finished_steps(tmp_path):
+    version = DataVersion(str(tmp_path / "version"))
+
+    async def run():
+        bus = ProgressBus()
+        invalidator = bus.subscribe(DashboardInvalidator(version))
+        await bus.start()
+        bus.publish(STAGE_ORDER, "running", "提交订单")
+        await asyncio.sleep(0.05)
+        before = version.snapshot()
+        bus.publish(STAGE_ORDER, "completed", "下单成功")
+        await bus.close()
+        return invalidator, before
+
+    invalidator, before = asyncio.run(run())
+    assert before[DOMAIN_ORDERS] == "0"        # running 不更新版本
+    assert invalidator.bumps == 1
+    after = version.snapshot()
+    assert after[DOMAIN_ORDERS] != "0"
+    assert after[DOMAIN_INVENTORY] == "0" and after[DOMAIN_ALERTS] == "0"
+
+
+def test_invalidator_coalesces_and_flushes_on_close(tmp_path):
+    version = DataVersion(str(tmp_path / "version"))
+    invalidator = DashboardInvalidator(version, min_interval=60)
+
+    async def run():
+        await invalidator.handle(ProgressEvent(STAGE_ORDER, "completed", "下单成功"))
+        first = version.get(DOMAIN_ORDERS)
+        # 间隔内的第二次结束事件只记为待更新
+        await invalidator.handle(ProgressEvent(STAGE_STOCK, "completed", "入库完成"))
+        pending = version.snapshot()
+        await invalidator.close()
+        return first, pending
+
+    first, pending = asyncio.run(run())
+    assert first != "0"
+    assert pending[DOMAIN_ORDERS] == first
+    assert pending[DOMAIN_INVENTORY] != "0"       # 库存第一次更新不受间隔限制
+    assert invalidator.bumps == 3
+    assert version.get(DOMAIN_ORDERS) != first     # 关闭时补发订单域
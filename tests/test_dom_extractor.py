@@ -0,0 +1,45 @@
+"""单次遍历DOM提取：离线回放与原关键词扫描脚本结构一致"""
+import pytest
+
+pytest.importorskip("lxml")
+
+from src.services.dom_extractor import DomExtractor, ExtractRule, SKU_KEYWORD_RULES, to_keyword_search
+
+HTML = """<html><body>
+<div data-spec-group="颜色" data-sku-id="1001">颜色</div>
+<div class="sku-item" data-sku-price="12.5">红色</div>
+<div data-spm="a" data-spec="x" data-sku="y" data-sku-stock="9">蓝色</div>
+</body></html>"""
+
+
+def test_data_attrs_use_dataset_keys_in_document_order():
+    search = to_keyword_search(DomExtractor(SKU_KEYWORD_RULES).run_html(HTML))
+    assert search["byDataAttr"] == [
+        {"tag": "DIV", "dataKey": "specGroup", "dataValue": "颜色"},
+        {"tag": "DIV", "dataKey": "skuId", "dataValue": "1001"},
+        {"tag": "DIV", "dataKey": "skuPrice", "dataValue": "12.5"},
+        {"tag": "DIV", "dataKey": "spec", "dataValue": "x"},
+        {"tag": "DIV", "dataKey": "sku", "dataValue": "y"},
+    ]
+    assert [it["text"] for it in search["byClass"]["sku"]] == ["红色"]
+
+
+def test_counts_capped_at_quota_are_not_exact():
+    rules = (ExtractRule("cls:sku", "g", class_keyword="sku", limit=1),
+             ExtractRule("sel:sku", "g", selector='[class*="sku"]', limit=1),
+             ExtractRule("cls:none", "g", class_keyword="absent", limit=1))
+    extractor = DomExtractor(rules)
+    offline = extractor.run_html(HTML)["matches"]
+    assert (offline["cls:sku"]["count"], offline["cls:sku"]["exact"]) == (1, False)
+    assert (offline["sel:sku"]["count"], offline["sel:sku"]["exact"]) == (1, True)
+    assert offline["cls:none"]["exact"]
+
+    class FakeDriver:
+        def execute_script(self, script):
+            # 页面内脚本遍历完整棵树，但满配额的规则已停止计数
+            return {"rules": [{"count": 1, "items": [{}]}, {"count": 1, "items": [{}]},
+                              {"count": 0, "items": []}],
+                    "visited": 10, "stoppedEarly": False}
+
+    online = extractor.run(FakeDriver())["matches"]
+    assert [online[r.name]["exact"] for r in rules] == [False, False, True]
@@ -0,0 +1,130 @@
+"""浏览器会话池：丢弃会话后唤醒等待者"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from src.services.driver_pool import DriverPool  # noqa: E402
+
+
+class FakeDriver:
+    def __init__(self):
+        self.healthy = True
+        self.quit_called = False
+        self.current_url = "https://detail.1688.com/offer/1.html"
+        self.cookies = [{"name": "cookie2", "value": "abc", "domain": ".1688.com"}]
+
+    def get_cookies(self):
+        return self.cookies
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise RuntimeError("会话已断开")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def make_pool(size=1, cookie_dir="/nonexistent", **kwargs):
+    return DriverPool(size=size, driver_factory=FakeDriver, cookie_dir=cookie_dir, **kwargs)
+
+
+def test_discard_wakes_waiter():
+    pool = make_pool(size=1)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    pool.release(held, discard=True)
+    waiter.join(timeout=2)
+    assert not waiter.is_alive()
+    assert got and got[0] is not held
+    assert held.driver.quit_called
+    assert pool.stats["created"] == 2
+
+
+def test_release_wakes_waiter_with_same_session():
+    pool = make_pool(size=1)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    pool.release(held)
+    waiter.join(timeout=2)
+    assert got == [held]
+
+
+def test_unhealthy_idle_session_is_replaced():
+    pool = make_pool(size=1)
+    session = pool.acquire()
+    pool.release(session)
+    session.driver.healthy = False
+    replacement = pool.acquire(timeout=1)
+    assert replacement is not session
+    assert pool.stats["unhealthy"] == 1
+
+
+def test_acquire_times_out_when_full():
+    pool = make_pool(size=1)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.2)
+    assert time.monotonic() - started < 1
+
+
+def test_close_wakes_waiters():
+    pool = make_pool(size=1)
+    held = pool.acquire()
+    errors = []
+
+    def wait():
+        try:
+            pool.acquire(timeout=5)
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.1)
+    pool.close()
+    waiter.join(timeout=2)
+    assert len(errors) == 1
+    pool.release(held)
+    assert held.driver.quit_called
+
+
+def test_recycle_after_max_page_loads():
+    pool = make_pool(size=2, max_page_loads=1)
+    session = pool.acquire()
+    session.page_loads = 1
+    pool.release(session)
+    assert pool.stats["recycled"] == 1
+    assert pool.acquire() is not session
+
+
+def test_cookie_write_failure_still_releases(tmp_path):
+    blocker = tmp_path / "cookies"
+    blocker.write_text("不是目录")
+    pool = make_pool(size=1, cookie_dir=str(blocker))
+    with pytest.raises(OSError):
+        with pool.session(platform="1688"):
+            pass
+    assert pool.acquire(timeout=0.5) is not None
+
+
+def test_login_page_cookies_not_saved(tmp_path):
+    pool = make_pool(size=1, cookie_dir=str(tmp_path))
+    with pool.session(platform="1688") as session:
+        session.driver.current_url = "https://login.1688.com/member/signin.htm"
+    assert not (tmp_path / "1688.json").exists()
+
+    with pool.session(platform="1688") as session:
+        session.driver.current_url = "https://detail.1688.com/offer/1.html"
+    assert (tmp_path / "1688.json").exists()
+    assert [p.name for p in tmp_path.iterdir()] == ["1688.json"]
@@ -0,0 +1,90 @@
+"""增量备份：高水位查询、失败不推进高水位、合并去重"""
+import csv
+import glob
+import os
+
+import pytest
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.incremental_backup import BackupTable, IncrementalBackup
+
+TABLES = [BackupTable("order_table")]
+
+
+@pytest.fixture
+def factory(tmp_path):
+    factory = ConnectionFactory("sqlite", sqlite_path=str(tmp_path / "db.sqlite3"))
+    with factory.connection() as conn:
+        conn.execute("CREATE TABLE order_table (id INTEGER PRIMARY KEY, status TEXT, updated_at TEXT)")
+        conn.executemany("INSERT INTO order_table VALUES (?, ?, ?)",
+                         [(1, "pending", "2024-05-01 10:00:00"), (2, "pending", "2024-05-01 10:00:00"),
+                          (3, "pending", "2024-05-01 11:00:00")])
+        conn.commit()
+    return factory
+
+
+def make_backup(factory, tmp_path, **kwargs):
+    return IncrementalBackup(factory=factory, tables=TABLES, backup_dir=str(tmp_path / "backup"),
+                             excel_dir=str(tmp_path / "excel"), excel=False, compact_every=0,
+                             compact_bytes=0, **kwargs)
+
+
+def logged_ids(tmp_path) -> list:
+    ids = []
+    for path in sorted(glob.glob(str(tmp_path / "backup" / "order_table" / "changes-*.csv"))):
+        with open(path, encoding="utf-8") as f:
+            ids += [row["id"] for row in csv.DictReader(f)]
+    return ids
+
+
+def test_watermark_exports_only_changed_rows(factory, tmp_path):
+    assert make_backup(factory, tmp_path).run().rows == 3
+    with factory.connection() as conn:
+        # 与高水位同一时间但主键更大的行、以及更新过的旧行都要被捕获
+        conn.execute("INSERT INTO order_table VALUES (4, 'pending', '2024-05-01 11:00:00')")
+        conn.execute("UPDATE order_table SET status = 'paid', updated_at = '2024-05-02 09:00:00' WHERE id = 1")
+        conn.commit()
+
+    backup = make_backup(factory, tmp_path)
+    assert backup.run().rows == 2
+    assert backup.state["order_table"]["watermark"] == "2024-05-02 09:00:00"
+    assert backup.state["order_table"]["last_key"] == 1
+    assert make_backup(factory, tmp_path).run().rows == 0
+    assert logged_ids(tmp_path) == ["1", "2", "3", "4", "1"]
+
+
+def test_failed_table_keeps_watermark(factory, tmp_path):
+    backup = make_backup(factory, tmp_path, batch_size=1)
+    real = backup._changed_rows
+
+    def broken(table, state):
+        for i, batch in enumerate(real(table, state)):
+            if i == 1:
+                raise ConnectionError("连接中断")
+            yield batch
+
+    backup._changed_rows = broken
+    report = backup.run()
+    assert "连接中断" in report.tables[0].error
+    assert make_backup(factory, tmp_path).state.get("order_table") is None
+
+    # 重新导出全部行，变更日志中的重复行留给合并去重
+    assert make_backup(factory, tmp_path).run().rows == 3
+
+
+def test_compact_keeps_latest_row_per_key(factory, tmp_path):
+    pd = pytest.importorskip("pandas")
+    make_backup(factory, tmp_path).run()
+    with factory.connection() as conn:
+        conn.execute("UPDATE order_table SET status = 'shipped', updated_at = '2024-05-03 08:00:00' WHERE id = 2")
+        conn.commit()
+    backup = make_backup(factory, tmp_path)
+    report = backup.run(compact=True).tables[0]
+    assert report.snapshot_rows == 3
+    assert logged_ids(tmp_path) == []
+
+    path = report.snapshot_path
+    snapshot = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, dtype=str)
+    statuses = dict(zip(snapshot["id"].astype(str), snapshot["status"]))
+    assert statuses == {"1": "pending", "2": "shipped", "3": "pending"}
+    assert os.path.exists(path)
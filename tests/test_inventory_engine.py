@@ -0,0 +1,96 @@
+"""库存引擎：边沿触发预警与恢复、分块对账的缺失/新增/不一致统计"""
+import pytest
+
+from src.repositories.connection_pool import ConnectionFactory
+from src.services.inventory_engine import InventoryEngine, iter_inventory_rows
+
+
+def kinds(alerts: list) -> list:
+    return [(a.sku, a.kind, a.quantity) for a in alerts]
+
+
+def test_alert_fires_once_and_recovers():
+    engine = InventoryEngine(default_threshold=10)
+    engine.register("SKU1", 50)
+    engine.register("SKU2", 50, threshold=0)           # 阈值 0 不预警
+    assert engine.check_alerts() == []
+
+    engine.outbound("SKU1", 45)
+    engine.outbound("SKU2", 60)
+    assert kinds(engine.check_alerts()) == [("SKU1", "low", 5)]
+
+    # 仍在阈值以下：继续出库、没有变更都不再报警
+    engine.outbound("SKU1", 2)
+    assert engine.check_alerts() == []
+    assert engine.check_alerts() == []
+    assert kinds(engine.low_stock()) == [("SKU1", "low", 3)]
+
+    engine.inbound("SKU1", 7)                           # 回到阈值即恢复
+    assert kinds(engine.check_alerts()) == [("SKU1", "recovered", 10)]
+    assert engine.low_stock() == []
+
+    engine.outbound("SKU1", 1)
+    assert kinds(engine.check_alerts()) == [("SKU1", "low", 9)]
+
+
+def test_recovery_can_be_suppressed_and_threshold_change_rechecks():
+    engine = InventoryEngine()
+    engine.register("SKU1", 5, threshold=3)
+    engine.check_alerts()
+    engine.set_threshold("SKU1", 8)
+    assert kinds(engine.check_alerts()) == [("SKU1", "low", 5)]
+    engine.set_threshold("SKU1", 2)
+    assert engine.check_alerts(include_recovered=False) == []
+    # 恢复已经记下，阈值再次调高时重新报警
+    engine.set_threshold("SKU1", 8)
+    assert kinds(engine.check_alerts()) == [("SKU1", "low", 5)]
+
+
+def test_apply_events_registers_unknown_skus():
+    engine = InventoryEngine(default_threshold=5)
+    engine.bulk_register(["A", "B"], [10, 10])
+    assert engine.apply_events([("A", -8), ("C", 3), ("A", 1)]) == 3
+    assert engine.quantity("A") == 3 and engine.quantity("C") == 3
+    assert engine.events == 3
+    assert sorted(kinds(engine.check_alerts())) == [("A", "low", 3), ("C", "low", 3)]
+    with pytest.raises(ValueError):
+        engine.bulk_register(["B"], [1])
+
+
+def test_reconcile_counts_missing_added_and_mismatched():
+    engine = InventoryEngine()
+    engine.bulk_register(["A", "B", "C", "D"], [10, 20, 30, 40])
+    chunks = [
+        [("A", 10, None), ("B", 25, 5)],
+        [("E", 7, 3), ("C", 30, None)],
+    ]
+    report = engine.reconcile(iter(chunks), fix=False)
+    assert (report.rows, report.chunks) == (4, 2)
+    assert (report.matched, report.mismatched, report.added, report.missing) == (2, 1, 1, 1)
+    assert report.samples == [("B", 20, 25)]
+    assert engine.quantity("B") == 20 and "E" not in engine
+
+    report = engine.reconcile(iter(chunks), fix=True)
+    assert report.fixed and (report.added, report.missing) == (1, 1)
+    assert engine.quantity("B") == 25 and engine.threshold("B") == 5
+    assert engine.quantity("E") == 7 and engine.threshold("E") == 3
+    assert "新增 1, 数据库缺失 1（已修正）" in report.format()
+
+    # 修正后再对账：只剩数据库中没有的 D
+    again = engine.reconcile(iter(chunks), fix=False)
+    assert (again.mismatched, again.added, again.missing) == (0, 0, 1)
+
+
+def test_reconcile_reads_table_in_chunks(tmp_path):
+    factory = ConnectionFactory("sqlite", sqlite_path=str(tmp_path / "inventory.sqlite3"))
+    with factory.connection() as conn:
+        conn.execute("CREATE TABLE inventory_table (sku_id TEXT, quantity INTEGER, alert_threshold INTEGER)")
+        conn.executemany("INSERT INTO inventory_table VALUES (?, ?, ?)",
+                         [(f"SKU{i}", i, 5) for i in range(25)])
+        conn.commit()
+
+    engine = InventoryEngine()
+    report = engine.reconcile(iter_inventory_rows(factory, chunk_size=10))
+    assert (report.rows, report.chunks, report.added) == (25, 3, 25)
+    assert len(engine) == 25
+    assert kinds(engine.check_alerts()) == [(f"SKU{i}", "low", i) for i in range(5)]
@@ -0,0 +1,42 @@
+"""增量JSON解析：逐元素回调与截断修复"""
+from src.services.json_stream import IncrementalJSONParser, repair_truncated_json
+
+FULL = ('```json\n{"recommendations": [{"sku": "A1", "reason": "含 } 和 \\" 的理由"}, '
+        '{"sku": "B2", "tags": ["a", "b"]}], "summary": "ok"}\n```')
+
+
+def feed_in_chunks(parser, text, size):
+    emitted = []
+    for i in range(0, len(text), size):
+        emitted.extend(parser.feed(text[i:i + size]))
+    return emitted
+
+
+def test_items_emitted_across_chunk_boundaries():
+    for size in (1, 3, 7, len(FULL)):
+        seen = []
+        parser = IncrementalJSONParser(on_item=lambda key, obj: seen.append(obj["sku"]))
+        emitted = feed_in_chunks(parser, FULL, size)
+        assert [obj["sku"] for _, obj in emitted] == seen == ["A1", "B2"]
+        result, repaired = parser.finish()
+        assert not repaired
+        assert result["summary"] == "ok"
+        assert result["recommendations"][0]["reason"] == '含 } 和 " 的理由'
+
+
+def test_truncated_output_keeps_closed_items():
+    cut = FULL.index('"tags"') + 8           # 截断在第二个元素的数组中间
+    parser = IncrementalJSONParser()
+    emitted = feed_in_chunks(parser, FULL[:cut], 5)
+    assert [obj["sku"] for _, obj in emitted] == ["A1"]
+    result, repaired = parser.finish()
+    assert repaired
+    assert result["recommendations"][0]["sku"] == "A1"
+    assert result["recommendations"][1]["sku"] == "B2"
+
+
+def test_truncated_inside_string_falls_back_to_last_complete_value():
+    text = '{"recommendations": [{"sku": "A1"}], "summary": "未写完'
+    assert repair_truncated_json(text) == {"recommendations": [{"sku": "A1"}]}
+    assert repair_truncated_json('{"summary": "未写完') is None
+    assert repair_truncated_json("模型没有输出JSON") is None
@@ -0,0 +1,117 @@
+"""LLM 响应缓存：TTL 过期、LRU 淘汰、相同请求合并（本地替身客户端，不访问网络）"""
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import llm_cache
+from src.services.llm_cache import LLMResponseCache, make_cache_key
+from src.services.llm_client import LLMClient
+
+CANDIDATES = [
+    {"platform": "1688", "product_id": "1", "product_name": "A4打印纸 70g", "unit_price": 18.5},
+    {"platform": "jd", "product_id": "2", "product_name": "A4复印纸 80g", "unit_price": 22.0},
+]
+CONTENT = json.dumps({"recommendations": [{"index": 1, "score": 90, "reason": "单价低"}]}, ensure_ascii=False)
+
+
+class StubClient(LLMClient):
+    """替换 chat 的本地客户端：固定延迟后返回同一条回复，记录上游调用次数"""
+
+    def __init__(self, cache: LLMResponseCache, latency: float = 0.05):
+        super().__init__(api_base="http://127.0.0.1:9/stub", api_key="test", model="stub-model",
+                         system_prompt="", cache=cache, stream=False)
+        self.latency = latency
+        self.calls = 0
+
+    async def chat(self, messages: list, **params) -> dict:
+        self.calls += 1
+        self.metrics.upstream_calls += 1
+        await asyncio.sleep(self.latency)
+        return {"content": CONTENT, "finish_reason": "stop", "usage": {}, "model": self.model}
+
+
+class ThreadRecordingCache(LLMResponseCache):
+    """记录 get/set 在哪个线程执行"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, response, model=None):
+        self.threads.append(threading.get_ident())
+        return super().set(key, response, model)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_ttl_expiry(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.set("k", {"content": "x"})
+    clock[0] += 59
+    assert cache.get("k") == {"content": "x"}
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.metrics.expired == 1
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_lru_evicts_least_recently_accessed(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttl=None, max_entries=2)
+    cache.set("a", 1)
+    clock[0] += 1
+    cache.set("b", 2)
+    clock[0] += 1
+    assert cache.get("a") == 1          # a 被访问过，b 成为最久未访问
+    clock[0] += 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.metrics.evicted == 1
+    cache.close()
+
+
+def test_single_flight_dedups_concurrent_requests(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / "cache.sqlite3"))
+    client = StubClient(cache)
+
+    async def run():
+        return await asyncio.gather(*(client.select_products("A4打印纸", CANDIDATES) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert client.calls == 1
+    assert client.metrics.misses == 1 and client.metrics.coalesced == 4
+    assert {r["cache_key"] for r in results} == {make_cache_key("A4打印纸", CANDIDATES, "stub-model",
+                                                                client.params, "")}
+    assert all(r["parsed"]["recommendations"][0]["index"] == 1 for r in results)
+
+    # 再次请求命中持久化缓存，不调用上游
+    again = asyncio.run(client.select_products("A4打印纸", CANDIDATES))
+    assert again["cached"] is True and client.calls == 1 and client.metrics.hits == 1
+    # sqlite3 读写都在线程中执行，不占用事件循环
+    assert cache.threads and threading.get_ident() not in cache.threads
+    cache.close()
+
+
+def test_changed_candidates_miss(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    client = StubClient(cache, latency=0)
+    asyncio.run(client.select_products("A4打印纸", CANDIDATES))
+    changed = [dict(CANDIDATES[0], unit_price=17.0), CANDIDATES[1]]
+    asyncio.run(client.select_products("A4打印纸", changed))
+    # 候选顺序变化不影响指纹
+    asyncio.run(client.select_products("A4打印纸", list(reversed(CANDIDATES))))
+    assert client.calls == 2 and client.metrics.hits == 1
+    cache.close()
@@ -0,0 +1,123 @@
+"""并行下单调度：购物车残留、账号浏览器目录隔离"""
+import queue
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.order_dispatcher import (
+    Account, OrderDispatcher, OrderLine, SupplierGroup, _account_worker, selenium_executor_factory
+)
+
+
+class CartExecutor:
+    """账号级购物车：实例之间共享（模拟平台端持久保存的购物车）"""
+    carts = {}
+
+    def __init__(self, account, fail_on=None, clear_fails=False):
+        self.account = account
+        self.fail_on = fail_on
+        self.clear_fails = clear_fails
+        self.closed = False
+        self.carts.setdefault(account.name, [])
+
+    @property
+    def cart(self):
+        return self.carts[self.account.name]
+
+    def clear_cart(self):
+        if self.clear_fails:
+            raise RuntimeError("购物车页面打不开")
+        self.cart.clear()
+
+    def add_to_cart(self, recommendation, quantity):
+        if recommendation.product_name == self.fail_on:
+            raise RuntimeError("规格已下架")
+        self.cart.append(recommendation.product_name)
+
+    def checkout(self, shipping_info, purchase_demand=None):
+        items = list(self.cart)
+        self.cart.clear()
+        return {"order_id": "+".join(items), "payment_amount": 1.0}
+
+    def close(self):
+        self.closed = True
+
+
+def make_group(group_id, *names):
+    lines = [OrderLine(line_id=f"{group_id}-{n}", platform="1688", supplier="晨光",
+                       recommendation=SimpleNamespace(product_name=n), quantity=1) for n in names]
+    return SupplierGroup(group_id=group_id, platform="1688", supplier="晨光", lines=lines)
+
+
+def run_worker(groups, factory):
+    tasks, results = queue.Queue(), queue.Queue()
+    for group in groups:
+        tasks.put(group)
+    tasks.put(None)
+    account = Account(name="acct", platform="1688", rate_per_minute=0, profile_dir="/tmp/unused")
+    _account_worker(account, factory, tasks, results)
+    done = {}
+    while not results.empty():
+        kind, _, group_id, detail = results.get()
+        if kind == "done":
+            done[group_id] = detail["outcomes"]
+    return done
+
+
+def test_partial_add_failure_does_not_leak_into_next_group():
+    CartExecutor.carts.clear()
+    done = run_worker([make_group("G1", "A", "B", "C"), make_group("G2", "D")],
+                      lambda account: CartExecutor(account, fail_on="B"))
+    assert all(summary is None for _, summary, _ in done["G1"])
+    assert done["G2"][0][1]["order_id"] == "D"
+
+
+def test_leftover_cart_is_cleared_before_group():
+    CartExecutor.carts.clear()
+    CartExecutor.carts["acct"] = ["上次残留"]
+    done = run_worker([make_group("G1", "A")], lambda account: CartExecutor(account))
+    assert done["G1"][0][1]["order_id"] == "A"
+
+
+def test_executor_dropped_when_cart_cannot_be_cleared():
+    CartExecutor.carts.clear()
+    created = []
+
+    def factory(account):
+        executor = CartExecutor(account, fail_on="B", clear_fails=not created)
+        created.append(executor)
+        return executor
+
+    done = run_worker([make_group("G1", "B"), make_group("G2", "D")], factory)
+    assert all(summary is None for _, summary, _ in done["G1"])
+    assert len(created) == 2 and created[0].closed
+    assert done["G2"][0][1]["order_id"] == "D"
+
+
+def _install_executor(monkeypatch, executor_class):
+    module = SimpleNamespace(SeleniumOrderExecutor=executor_class)
+    monkeypatch.setitem(sys.modules, "src.services.selenium_order_executor", module)
+
+
+def test_default_executor_requires_profile_dir(monkeypatch):
+    class SharedProfileExecutor:
+        def __init__(self, headless=False):
+            pass
+
+    _install_executor(monkeypatch, SharedProfileExecutor)
+    with pytest.raises(TypeError, match="profile_dir"):
+        OrderDispatcher([Account(name="acct", platform="1688")])
+
+
+def test_default_executor_gets_account_profile(monkeypatch, tmp_path):
+    class ProfileExecutor:
+        def __init__(self, headless=False, profile_dir=None):
+            self.headless, self.profile_dir = headless, profile_dir
+
+    _install_executor(monkeypatch, ProfileExecutor)
+    account = Account(name="acct", platform="1688", profile_dir=str(tmp_path / "acct"))
+    OrderDispatcher([account])
+    executor = selenium_executor_factory(account)
+    assert executor.profile_dir == account.profile_dir
+    assert (tmp_path / "acct").is_dir()
@@ -0,0 +1,80 @@
+"""页面结构分析结果：NDJSON 往返、省略空字段、命中数对比"""
+import io
+import json
+
+import pytest
+
+from src.models.page_analysis import (
+    SCHEMA_VERSION, PageAnalysis, RuleMatch, diff_counts, read_ndjson, write_ndjson
+)
+
+EXTRACTION = {
+    "stats": {"url": "https://detail.1688.com/offer/1.html", "visited": 812, "stoppedEarly": True},
+    "matches": {
+        "title": {"group": "商品", "count": 1, "exact": True, "items": [{"text": "A4打印纸"}]},
+        "price": {"group": "价格", "count": 5, "exact": False, "items": []},
+        "sku": {"group": "规格", "count": 0, "exact": True, "items": []},
+    },
+}
+
+
+def analysis(**overrides) -> PageAnalysis:
+    a = PageAnalysis.from_extraction("https://detail.1688.com/offer/1.html", EXTRACTION, "snapshot",
+                                     timings={"load": 0.123456}, analyzed_at="2024-01-01T00:00:00")
+    for name, value in overrides.items():
+        setattr(a, name, value)
+    return a
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = str(tmp_path / "audit.ndjson")
+    failed = PageAnalysis.failure("https://jd.com/x", "http", "连接超时", analyzed_at="2024-01-01T00:00:01")
+    assert write_ndjson([analysis(), failed], path) == 2
+
+    loaded = list(read_ndjson(path))
+    assert loaded == [analysis(), failed]
+    assert loaded[0].counts == {"title": 1, "price": 5}
+    assert loaded[0].matches[1].exact is False
+    assert loaded[0].timings == {"load": 0.1235}
+    assert not loaded[1].ok and loaded[1].error == "连接超时"
+
+
+def test_empty_fields_are_omitted():
+    line = analysis().to_json(include_items=False)
+    d = json.loads(line)
+    assert "\n" not in line
+    assert d["schema"] == SCHEMA_VERSION and d["stopped_early"] is True
+    assert "error" not in d and "digest" not in d
+    assert [m["rule"] for m in d["matches"]] == ["title", "price"]     # 命中数为0的规则不记录
+    assert all("items" not in m for m in d["matches"])
+    assert "exact" not in d["matches"][0] and d["matches"][1]["exact"] is False
+
+    ok = json.loads(PageAnalysis("u", "http", analyzed_at="t").to_json())
+    assert set(ok) == {"url", "source", "ok", "analyzed_at", "visited", "schema"}
+
+
+def test_write_to_open_file_and_skip_blank_lines(tmp_path):
+    buf = io.StringIO()
+    write_ndjson([analysis()], buf)
+    path = tmp_path / "audit.ndjson"
+    path.write_text("\n" + buf.getvalue() + "\n\n", encoding="utf-8")
+    assert list(read_ndjson(str(path))) == [analysis()]
+
+
+def test_newer_schema_is_rejected_and_unknown_fields_ignored():
+    d = analysis().to_dict()
+    with pytest.raises(ValueError):
+        PageAnalysis.from_dict({**d, "schema": SCHEMA_VERSION + 1})
+    assert PageAnalysis.from_dict({**d, "added_later": 1}) == analysis()
+
+
+def test_diff_counts_reports_only_changed_rules():
+    old = analysis()
+    new = analysis(matches=[
+        RuleMatch("title", "商品", 1),
+        RuleMatch("price", "价格", 3),
+        RuleMatch("sku", "规格", 2),
+    ])
+    assert diff_counts(old, new) == {"price": (5, 3), "sku": (0, 2)}
+    assert diff_counts(new, analysis(matches=[])) == {"price": (3, 0), "sku": (2, 0), "title": (1, 0)}
+    assert diff_counts(old, analysis()) == {}
@@ -0,0 +1,93 @@
+"""页面就绪检测：条件满足立即返回、等待静默、登录页、超时与脚本异常（模拟浏览器）"""
+import pytest
+
+from src.services import page_readiness
+from src.services.page_readiness import WaitStats, wait_for_login, wait_for_page_ready
+
+READY = {"readyState": "complete", "found": True, "sinceMutation": 800, "sinceResource": 900,
+         "url": "https://detail.1688.com/offer/1.html"}
+
+
+class ScriptedDriver:
+    """按顺序返回探测结果，最后一个结果重复使用；结果为异常时抛出"""
+
+    def __init__(self, states: list, urls: list = None):
+        self.states = list(states)
+        self.urls = list(urls or [])
+        self.probes = []
+
+    def execute_script(self, script, *args):
+        self.probes.append(args)
+        state = self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        if isinstance(state, Exception):
+            raise state
+        return state
+
+    @property
+    def current_url(self):
+        url = self.urls.pop(0) if len(self.urls) > 1 else self.urls[0]
+        if isinstance(url, Exception):
+            raise url
+        return url
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    stats = WaitStats()
+    monkeypatch.setattr(page_readiness, "wait_stats", stats)
+    return stats
+
+
+def test_returns_on_first_ready_poll(stats):
+    driver = ScriptedDriver([READY])
+    result = wait_for_page_ready(driver, label="商品页", poll_interval=0.01)
+    assert result.ready and result.reason == "ready" and result.polls == 1
+    assert result.elapsed < 0.5
+    assert driver.probes == [(page_readiness.SKU_READY_SELECTOR,)]
+    assert stats.summary()["商品页"]["count"] == 1
+
+
+@pytest.mark.parametrize("pending", [
+    {**READY, "readyState": "loading"},
+    {**READY, "found": False},
+    {**READY, "sinceMutation": 100},
+    {**READY, "sinceResource": 499},
+])
+def test_waits_until_every_condition_holds(pending):
+    driver = ScriptedDriver([pending, pending, READY])
+    result = wait_for_page_ready(driver, poll_interval=0.001)
+    assert result.reason == "ready" and result.polls == 3
+
+
+def test_interactive_state_and_custom_selector_are_enough():
+    driver = ScriptedDriver([{**READY, "readyState": "interactive", "sinceMutation": 60, "sinceResource": 60}])
+    assert wait_for_page_ready(driver, ready_selector="#app", quiet_ms=50).ready
+    assert driver.probes == [("#app",)]
+
+
+def test_login_redirect_returns_immediately():
+    driver = ScriptedDriver([{**READY, "found": False, "url": "https://login.1688.com/member/signin.htm"}])
+    result = wait_for_page_ready(driver, timeout=5)
+    assert result.reason == "login" and not result.ready and result.polls == 1
+
+
+def test_script_errors_are_retried_until_timeout(stats):
+    driver = ScriptedDriver([RuntimeError("javascript error: document unloaded"), {**READY, "found": False}])
+    result = wait_for_page_ready(driver, label="下单页", timeout=0.05, poll_interval=0.01)
+    assert result.reason == "timeout" and not result.ready
+    assert result.polls >= 2 and result.elapsed >= 0.05
+    assert result.detail["found"] is False
+    assert stats.summary()["下单页"]["timeouts"] == 1
+    assert "超时 1次" in stats.report()
+    assert str(result).startswith("⚠️ 等待[下单页] timeout")
+
+
+def test_wait_for_login():
+    driver = ScriptedDriver([READY], urls=["https://login.1688.com/", Exception("no such window"),
+                                           "https://www.1688.com/"])
+    result = wait_for_login(driver, timeout=1, poll_interval=0.001)
+    assert result.ready and result.polls == 3 and result.detail == {"url": "https://www.1688.com/"}
+
+    stuck = wait_for_login(ScriptedDriver([READY], urls=["https://login.1688.com/"]), timeout=0.02,
+                           poll_interval=0.005)
+    assert stuck.reason == "timeout"
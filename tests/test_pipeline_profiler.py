@@ -0,0 +1,127 @@
+"""流水线剖析：阶段区间、外部调用归属、Chrome Trace 与折叠栈输出"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.services.pipeline_profiler import UNATTRIBUTED, PipelineProfiler, platform_of
+
+
+def events_by_name(trace: dict) -> dict:
+    return {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+
+
+def test_platform_of():
+    assert platform_of("https://detail.1688.com/offer/1.html") == "1688"
+    assert platform_of("https://item.jd.com/1.html") == "jd"
+    assert platform_of("https://poll.kuaidi100.com/poll/query.do") == "kuaidi100"
+    assert platform_of("http://127.0.0.1:8000/x") == "127.0.0.1"
+    assert platform_of("not a url") == "unknown"
+
+
+def test_calls_nest_under_stages_in_trace():
+    profiler = PipelineProfiler()
+    callback_calls = []
+    progress = profiler.wrap(lambda *args: callback_calls.append(args), workflow="需求1")
+
+    progress("爬取", "running", "开始爬取")
+    with profiler.call("http", "1688", "GET") as c:
+        time.sleep(0.01)
+        c["bytes_received"] = 2048
+    progress("爬取", "completed", "爬取完成")
+    progress("AI选品", "running", "调用大模型")
+    with pytest.raises(RuntimeError):
+        with profiler.call("llm", "llm", "chat"):
+            raise RuntimeError("超时")
+    progress("AI选品", "failed", "选品失败")
+    with profiler.call("http", "kuaidi100"):
+        pass
+
+    assert len(callback_calls) == 4
+    trace = profiler.chrome_trace()
+    events = events_by_name(trace)
+    crawl, call = events["爬取"], events["http:1688 GET"]
+    assert crawl["cat"] == "stage"
+    assert crawl["args"]["status"] == "completed" and crawl["args"]["calls"] == 1
+    # 调用嵌套在阶段区间内，同一条线程轨道
+    assert crawl["tid"] == call["tid"]
+    assert crawl["ts"] <= call["ts"] and call["ts"] + call["dur"] <= crawl["ts"] + crawl["dur"] + 1
+    assert call["dur"] >= 10_000 and call["args"]["bytes_received"] == 2048
+    assert events["AI选品"]["args"]["status"] == "failed"
+    assert events["llm:llm chat"]["args"]["ok"] is False
+    assert events["http:kuaidi100"]["args"]["stage"] == UNATTRIBUTED
+    names = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    assert names == {"需求1", "workflow"}
+
+
+def test_concurrent_workflows_get_own_tracks_and_calls():
+    profiler = PipelineProfiler()
+
+    async def workflow(label: str, platform: str):
+        progress = profiler.wrap(workflow=label)
+        progress("爬取", "running", "")
+        await asyncio.sleep(0.01)
+        with profiler.call("http", platform):
+            await asyncio.sleep(0.01)
+        progress("爬取", "completed", "")
+
+    async def run():
+        await asyncio.gather(workflow("需求1", "1688"), workflow("需求2", "jd"))
+
+    asyncio.run(run())
+    summary = profiler.summary()
+    assert summary["stages"]["爬取"]["count"] == 2
+    assert set(summary["platforms"]) == {("爬取", "http:1688"), ("爬取", "http:jd")}
+    trace = profiler.chrome_trace()
+    tracks = {e["tid"]: e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    stages = [e for e in trace["traceEvents"] if e.get("cat") == "stage"]
+    calls = [e for e in trace["traceEvents"] if e.get("cat") == "http"]
+    assert sorted(tracks[e["tid"]] for e in stages) == ["需求1", "需求2"]
+    # 每个工作流的调用归到自己的阶段（协程上下文隔离）
+    assert {(tracks[e["tid"]], e["name"]) for e in calls} == {("需求1", "http:1688"), ("需求2", "http:jd")}
+
+
+def test_write_trace_and_folded_stacks(tmp_path):
+    profiler = PipelineProfiler()
+    with profiler.stage("下单", workflow="需求1"):
+        profiler.record_call("browser", "1688", time.perf_counter(), 0.02, name="click")
+        time.sleep(0.03)
+    with pytest.raises(ValueError):
+        with profiler.stage("入库"):
+            time.sleep(0.001)
+            raise ValueError("库存表不存在")
+
+    paths = profiler.write(str(tmp_path / "profiles" / "run"))
+    with open(paths["trace"], encoding="utf-8") as f:
+        trace = json.load(f)
+    assert trace["displayTimeUnit"] == "ms"
+    assert events_by_name(trace)["入库"]["args"]["status"] == "failed"
+
+    with open(paths["folded"], encoding="utf-8") as f:
+        folded = dict(line.rsplit(" ", 1) for line in f.read().splitlines())
+    assert int(folded["下单;browser:1688"]) == 20_000
+    # 阶段自身时间扣除了外部调用耗时
+    assert 5_000 <= int(folded["下单"]) < events_by_name(trace)["下单"]["dur"]
+    assert "入库" in folded
+
+    report = profiler.report()
+    assert "下单 / browser:1688: 1次" in report
+
+
+def test_install_records_httpx_calls():
+    httpx = pytest.importorskip("httpx")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 100))
+    with PipelineProfiler() as profiler:
+        with pytest.raises(RuntimeError):
+            PipelineProfiler().install()
+        with profiler.stage("物流"):
+            with httpx.Client(transport=transport) as client:
+                client.post("https://poll.kuaidi100.com/poll/query.do", content=b"param=1")
+    with httpx.Client(transport=transport) as client:
+        client.get("https://poll.kuaidi100.com/poll/query.do")      # 卸载后不再记录
+
+    platforms = profiler.summary()["platforms"]
+    assert set(platforms) == {("物流", "http:kuaidi100")}
+    stats = platforms[("物流", "http:kuaidi100")]
+    assert stats["calls"] == 1 and stats["bytes_sent"] == 7 and stats["bytes_received"] == 100
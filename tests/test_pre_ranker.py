@@ -0,0 +1,130 @@
+"""AI选品：规则预排序的过滤/去重/截断、选品函数、截断补齐与流式输出"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from src.services.pre_ranker import ProductSelector, pre_rank, run_product_selection, select_top3  # noqa: E402
+
+CANDIDATES = [
+    {"platform": "1688", "product_id": "A", "product_name": "A4打印纸 70g", "unit_price": 20, "freight": 0},
+    {"platform": "1688", "product_id": "B", "product_name": "A4打印纸 80g", "unit_price": 22, "freight": 5},
+    {"platform": "jd", "product_id": "C", "product_name": "A4复印纸 70g", "unit_price": 25, "freight": 0},
+    {"platform": "jd", "product_id": "D", "product_name": "A4复印纸 80g", "unit_price": 30, "freight": 0},
+]
+
+
+
+
+def paper(product_id: str, unit_price: float, name: str = "A4打印纸 70g", platform: str = "1688", **extra) -> dict:
+    return {"platform": platform, "product_id": product_id, "product_name": name,
+            "unit_price": unit_price, "freight": 0, **extra}
+
+
+class RecordingClient:
+    """非流式：记录发给大模型的候选，按给定序号返回推荐"""
+    stream = False
+
+    def __init__(self, indexes=(2, 1, 3)):
+        self.indexes = indexes
+        self.payload = None
+
+    async def select_products(self, demand, candidates, instruction=None):
+        self.payload = candidates
+        recs = [{"index": i, "score": 90, "reason": f"理由{i}"} for i in self.indexes]
+        return {"parsed": {"recommendations": recs}}
+
+
+class StreamingClient:
+    """流式回调两条推荐后输出被截断"""
+    stream = True
+
+    def __init__(self):
+        self.payload = None
+
+    async def select_products_stream(self, demand, candidates, on_recommendation=None, instruction=None):
+        self.payload = candidates
+        for index in (3, 1):
+            on_recommendation({"index": index, "score": 90, "reason": f"理由{index}"})
+        return {"truncated": True, "recommendations": []}
+
+
+def test_streamed_picks_are_emitted_in_order_and_filled_by_rules():
+    client = StreamingClient()
+    progress = []
+    out = asyncio.run(select_top3({"product_name": "A4纸", "quantity": 1}, CANDIDATES, client=client,
+                                  progress_callback=lambda step, status, message: progress.append(message)))
+    picks = out["recommendations"]
+    assert out["mode"] == "llm+rules" and out["truncated"]
+    assert [p.rank for p in picks] == [1, 2, 3]
+    assert [p.product_id for p in picks[:2]] == [client.payload[2]["product_id"], client.payload[0]["product_id"]]
+    assert picks[2].reason.endswith("（规则补充）")
+    assert [m.split(":")[0] for m in progress] == ["🎯 推荐1", "🎯 推荐2", "🎯 推荐3"]
+
+
+def test_run_product_selection_reads_candidate_file(tmp_path, capsys):
+    path = tmp_path / "candidates.jsonl"
+    path.write_text("\n".join(json.dumps(c, ensure_ascii=False) for c in CANDIDATES), encoding="utf-8")
+    out = asyncio.run(run_product_selection(str(path), "A4纸", quantity=2, budget=55, use_llm=False))
+    assert out["mode"] == "rules"
+    assert [p.product_id for p in out["recommendations"]] == ["A", "C", "B"]
+    assert out["pre_rank"].dropped["超预算"] == 1
+    assert "推荐1" in capsys.readouterr().out
+
+
+def test_pre_rank_filters_and_dedupes():
+    candidates = [
+        paper("ok", 20),
+        paper("dup", 20.05, name="【包邮】A4打印纸70g 现货"),      # 同平台同标题、价差 1% 内
+        paper("other-platform", 20.05, name="【包邮】A4打印纸70g", platform="jd"),
+        paper("free", 0),
+        paper("expensive", 60),
+        paper("moq", 21, min_order=10),
+        paper("no-stock", 22, stock=1),
+        paper("80g", 19, name="A4打印纸 80g"),
+    ]
+    result = pre_rank(candidates, {"quantity": 2, "budget": 100, "specification": "70g"})
+    assert [c.product_id for c in result.candidates] == ["ok", "other-platform"]
+    assert result.dropped == {"价格无效": 1, "超预算": 1, "起订量/库存不足": 2, "规格不符": 1, "重复": 1}
+    assert result.total == len(candidates)
+    assert result.candidates[0].source is candidates[0]
+    assert result.candidates[0].total_cost == 40
+
+
+def test_pre_rank_orders_by_score_and_cuts_to_top_k():
+    candidates = [paper(f"P{i}", 10 + i, name=f"A4打印纸 款{i}", freight=i % 3) for i in range(12, 0, -1)]
+    result = pre_rank(candidates, {"quantity": 1}, top_k=5)
+    scores = [c.total_score for c in result.candidates]
+    assert len(result.candidates) == 5
+    assert scores == sorted(scores, reverse=True)
+    assert result.candidates[0].product_id == "P1"
+    # 截掉的候选评分都不高于保留的最后一个
+    full = pre_rank(candidates, {"quantity": 1}, top_k=len(candidates))
+    assert [c.product_id for c in full.candidates[:5]] == [c.product_id for c in result.candidates]
+    assert all(c.total_score <= scores[-1] for c in full.candidates[5:])
+    assert [c["index"] for c in result.compact_payload()] == [1, 2, 3, 4, 5]
+
+
+def test_product_selector_sends_only_top_k_to_llm():
+    candidates = [paper(f"P{i}", 10 + i, name=f"A4打印纸 款{i}") for i in range(20)]
+    client = RecordingClient()
+    selector = ProductSelector(client=client, top_k=4)
+    progress = []
+    out = asyncio.run(selector({"product_name": "A4纸", "quantity": 1}, candidates,
+                               progress_callback=lambda step, status, message: progress.append(step)))
+    assert len(client.payload) == 4
+    assert out["mode"] == "llm"
+    assert [p.product_id for p in out["recommendations"]] == ["P1", "P0", "P2"]
+    assert progress == ["AI选品"] * 3
+    # 外部传入的客户端不由选品函数关闭
+    asyncio.run(selector.close())
+    assert selector.client is client
+
+
+def test_product_selector_without_llm_uses_rules():
+    selector = ProductSelector(use_llm=False)
+    out = asyncio.run(selector({"product_name": "A4纸", "quantity": 2, "budget": 55}, CANDIDATES))
+    assert out["mode"] == "rules" and selector.client is None
+    assert [p.product_id for p in out["recommendations"]] == ["A", "C", "B"]
@@ -0,0 +1,97 @@
+"""进度事件总线：block 策略下同步发布不丢事件、阻塞的输出端不占用事件循环"""
+import asyncio
+import threading
+import time
+
+from src.services.progress_bus import BLOCK, CallbackSubscriber, ConsoleSubscriber, ProgressBus, Subscriber
+
+
+class Recorder(Subscriber):
+    name = "recorder"
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle(self, event):
+        await asyncio.sleep(0.001)
+        self.messages.append(event.message)
+
+
+def test_sync_publish_keeps_events_for_block_policy():
+    async def run():
+        bus = ProgressBus()
+        recorder = bus.subscribe(Recorder(), maxsize=2, policy=BLOCK)
+        await bus.start()
+        for i in range(20):
+            bus.publish("下单", "running", str(i))
+        stats = bus.stats()["recorder"]
+        await bus.close()
+        return recorder, stats, bus.stats()["recorder"]
+
+    recorder, during, after = asyncio.run(run())
+    assert during["pending"] == 20 and during["dropped"] == 0
+    assert recorder.messages == [str(i) for i in range(20)]
+    assert after["dropped"] == 0 and after["delivered"] == 20
+
+
+def test_blocking_callback_runs_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    seen = []
+
+    def slow(event):
+        time.sleep(0.2)
+        seen.append(threading.get_ident())
+
+    async def run():
+        bus = ProgressBus()
+        bus.subscribe(CallbackSubscriber(slow))
+        await bus.start()
+        bus.publish("下单", "completed", "下单成功")
+        # 回调在线程中睡眠时，事件循环上的其他协程照常运行
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        lag = time.perf_counter() - started
+        await bus.close()
+        return lag
+
+    lag = asyncio.run(run())
+    assert lag < 0.15
+    assert seen and seen[0] != loop_thread
+
+
+def test_async_callback_and_in_loop_option():
+    calls = []
+
+    async def coro(event):
+        calls.append(("async", threading.get_ident()))
+
+    def inline(event):
+        calls.append(("inline", threading.get_ident()))
+
+    async def run():
+        bus = ProgressBus()
+        bus.subscribe(CallbackSubscriber(coro, name="a"))
+        bus.subscribe(CallbackSubscriber(inline, name="b", in_thread=False))
+        await bus.start()
+        bus.publish("下单", "completed", "下单成功")
+        await bus.close()
+
+    asyncio.run(run())
+    assert sorted(kind for kind, _ in calls) == ["async", "inline"]
+    assert {ident for _, ident in calls} == {threading.get_ident()}
+
+
+def test_console_subscriber_writes_batches(capsys):
+    async def run():
+        bus = ProgressBus()
+        bus.subscribe(ConsoleSubscriber())
+        await bus.start()
+        bus.publish("下单", "running", "提交订单", workflow="需求1")
+        bus.publish("下单", "completed", "下单成功", workflow="需求1")
+        await bus.close()
+
+    asyncio.run(run())
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "🔄 [需求1] [下单] 提交订单"
+    assert lines[1].startswith("✅ [需求1] [下单] 下单成功 (")
@@ -0,0 +1,73 @@
+"""SKU 矩阵：规格文本顺序不同、有多余文字、全角写法时的查找"""
+import os
+
+import pytest
+
+from src.models.sku_matrix import SkuMatrix, normalize_spec
+from src.services.embedded_data import extract_embedded_data
+from src.services.tiered_fetcher import extract_offer
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "offer_725887578825.html")
+
+
+@pytest.fixture(scope="module")
+def paper():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return SkuMatrix.from_offer(extract_offer(extract_embedded_data(f.read())))
+
+
+@pytest.fixture
+def shirt():
+    """三个维度：排列不进索引，顺序不同时按维度匹配"""
+    matrix = SkuMatrix([("颜色", ["白色", "浅蓝色", "蓝色"]), ("尺码", ["M", "L", "XL"]), ("款式", ["长袖"])])
+    for i, color in enumerate(matrix.values[0]):
+        for j, size in enumerate(matrix.values[1]):
+            matrix.add(f"{color}>{size}>长袖", price=50 + 10 * i + j, stock=10 * j, sku_id=100 + 3 * i + j)
+    matrix._build_index()
+    return matrix
+
+
+def test_normalize_spec():
+    assert normalize_spec("Ａ４　70G &gt; 5包") == "a470g5包"
+    assert normalize_spec("A4/70g，5包") == normalize_spec("A4 70g>5包")
+
+
+@pytest.mark.parametrize("text", [
+    "A4 70g>5包",
+    "A4 70g 5包",
+    "5包 A4 70g",                   # 两个维度：所有排列都在索引中
+    "５包；Ａ４ ７０ｇ",              # 全角
+    "【现货】A4 70g 复印纸 5包装",    # 多余文字
+    "5包/A4 70g 整箱发货",
+])
+def test_find_tolerates_order_and_noise(paper, text):
+    variant = paper.find(text)
+    assert variant is not None
+    assert variant.values == ("A4 70g", "5包") and variant.indices == (0, 1)
+    assert variant.price == pytest.approx(88.8) and variant.sku_id == 5001002
+
+
+def test_find_prefers_longest_value(paper):
+    assert paper.find("A4 70g 10包").values == ("A4 70g", "10包")
+    assert paper.find("10包 A3 70g").indices == (2, 2)
+    assert paper.find("A5 70g 5包") is None
+    assert paper.find("A4 70g") is None                 # 包装有多个取值，不能省略
+
+
+def test_three_dimensions_reordered(shirt):
+    expected = shirt.get("浅蓝色", "L", "长袖")
+    assert expected.sku_id == 104
+    # 只有一个取值的维度（款式）可以不写
+    for text in ("浅蓝色>L>长袖", "长袖 L 浅蓝色", "L码 浅蓝色", "浅蓝色 长袖 l"):
+        assert shirt.find(text) == expected, text
+    # "浅蓝色" 包含 "蓝色"：取最长的命中
+    assert shirt.find("蓝色 XL").values == ("蓝色", "XL", "长袖")
+    assert shirt.find("XL 长袖") is None
+
+
+def test_cheapest_skips_out_of_stock(paper, shirt):
+    assert paper.cheapest().spec_attrs == "A4 70g>1包"
+    assert paper.cheapest(quantity=270).spec_attrs == "A4 70g>5包"
+    assert shirt.cheapest(quantity=1).values[:2] == ("白色", "L")
+    assert shirt.price_range() == (50, 72)
@@ -0,0 +1,61 @@
+"""页面快照存储：相同内容去重，每次抓取的信息记录在索引中"""
+from src.services.snapshot_store import Snapshot, SnapshotStore
+
+HTML = "<html><body>A4打印纸</body></html>"
+
+
+def test_same_content_keeps_per_capture_metadata(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    a = store.save(Snapshot(url="https://a.example/1", html=HTML, final_url="https://item.example/1",
+                            captured_at="2024-05-01T10:00:00"))
+    b = store.save(Snapshot(url="https://b.example/2", html=HTML, final_url="https://item.example/2",
+                            captured_at="2024-05-02T10:00:00"))
+    assert a == b
+    assert len(list((tmp_path / "objects").rglob("*.json.gz"))) == 1
+
+    first = store.load(a, url="https://a.example/1")
+    assert (first.url, first.final_url, first.captured_at) == (
+        "https://a.example/1", "https://item.example/1", "2024-05-01T10:00:00")
+    latest = store.latest("https://b.example/2")
+    assert (latest.url, latest.final_url, latest.captured_at) == (
+        "https://b.example/2", "https://item.example/2", "2024-05-02T10:00:00")
+    assert store.load(a).url == "https://b.example/2"
+
+
+def test_recapture_is_recorded_in_index(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    for day in (1, 2):
+        store.save(Snapshot(url="https://a.example/1", html=HTML, captured_at=f"2024-05-0{day}T10:00:00"))
+    assert [captured for _, _, captured in store.list()] == ["2024-05-01T10:00:00", "2024-05-02T10:00:00"]
+    assert store.latest("https://a.example/1").captured_at == "2024-05-02T10:00:00"
+
+
+def _save_many(root: str, worker: int, count: int):
+    store = SnapshotStore(root)
+    for i in range(count):
+        store.save(Snapshot(url=f"https://w{worker}.example/{i}", html=f"{HTML}{worker}-{i}",
+                            captured_at="2024-05-01T10:00:00"))
+
+
+def test_concurrent_saves_keep_every_index_entry(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_save_many, [str(tmp_path)] * 4, range(4), [25] * 4))
+    assert len(SnapshotStore(str(tmp_path)).list()) == 100
+
+
+def test_index_cache_reads_only_new_entries(tmp_path):
+    reader = SnapshotStore(str(tmp_path))
+    writer = SnapshotStore(str(tmp_path))
+    first = writer.save(Snapshot(url="https://a.example/1", html=HTML, captured_at="2024-05-01T10:00:00"))
+    assert reader.load(first[:8]).url == "https://a.example/1"
+    offset = reader._index_offset
+
+    writer.save(Snapshot(url="https://a.example/2", html=HTML + "2", captured_at="2024-05-02T10:00:00"))
+    # 另一个进程正在写入、还没写完的一行不会被读入
+    with open(tmp_path / "index.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"url": "https://a.example/3", "dig')
+    assert [url for url, _, _ in reader.list()] == ["https://a.example/1", "https://a.example/2"]
+    assert reader._index_offset > offset
+    assert reader.latest("https://a.example/2").captured_at == "2024-05-02T10:00:00"
@@ -0,0 +1,70 @@
+"""SQL脚本执行器：分割与重复执行"""
+import sqlite3
+
+import pytest
+
+from src.services.sql_runner import run_sql_script, split_sql
+
+SCRIPT = """-- 初始化
+CREATE TABLE IF NOT EXISTS supplier (id INTEGER PRIMARY KEY, name TEXT UNIQUE, note TEXT);
+
+INSERT INTO supplier VALUES (1, '晨光文具', 'a;b');
+INSERT INTO supplier VALUES (2, '得力', '/* 不是注释 */');
+INSERT INTO supplier VALUES (3, '齐心', "it''s");
+UPDATE supplier SET note = 'x' WHERE id = 1;
+"""
+
+
+def test_split_handles_quotes_comments_and_lines():
+    statements = split_sql(SCRIPT)
+    assert [s.kind for s in statements] == ["ddl", "dml", "dml", "dml", "dml"]
+    assert [s.line for s in statements] == [2, 4, 5, 6, 7]
+    assert statements[1].sql.endswith("'a;b')")
+    assert "/* 不是注释 */" in statements[2].sql
+
+
+def test_split_delimiter_block():
+    script = ("DELIMITER //\nCREATE TRIGGER t BEFORE INSERT ON supplier FOR EACH ROW BEGIN\n"
+              "  SET NEW.note = 'a;b';\nEND//\nDELIMITER ;\nSELECT 1;\n")
+    statements = split_sql(script)
+    assert len(statements) == 2
+    assert statements[0].sql.endswith("END")
+    assert [s.line for s in statements] == [2, 6]
+
+
+def test_split_line_numbers_large_script():
+    script = "".join(f"INSERT INTO t VALUES ({i});\n\n" for i in range(2000))
+    statements = split_sql(script)
+    assert [s.line for s in statements] == [1 + 2 * i for i in range(2000)]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "init.sqlite3"))
+    yield conn
+    conn.close()
+
+
+def test_rerun_ignores_duplicate_keys(conn):
+    first = run_sql_script(conn, SCRIPT)
+    assert (first.executed, first.failed, first.ignored) == (5, 0, 0)
+    second = run_sql_script(conn, SCRIPT)
+    assert (second.failed, second.ignored) == (0, 3)
+    assert second.warnings == []
+    assert conn.execute("SELECT COUNT(*) FROM supplier").fetchone()[0] == 3
+
+
+def test_failed_statement_does_not_roll_back_batch(conn):
+    script = SCRIPT + "INSERT INTO missing_table VALUES (1);\nINSERT INTO supplier VALUES (4, '广博', NULL);\n"
+    report = run_sql_script(conn, script)
+    assert report.failed == 1
+    assert report.executed == 6
+    assert len(report.warnings) == 1 and report.warnings[0].startswith("第8行")
+    assert report.commits == 2
+    assert conn.execute("SELECT COUNT(*) FROM supplier").fetchone()[0] == 4
+
+
+def test_dry_run_plans_without_executing():
+    report = run_sql_script(None, SCRIPT)
+    assert report.dry_run
+    assert (report.transactions, report.commits) == (1, 2)
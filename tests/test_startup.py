@@ -0,0 +1,27 @@
+"""启动导入检查：轻量命令不导入 benchmarks/bench_startup.py 中列出的重依赖"""
+import os
+
+import pytest
+
+from benchmarks.bench_startup import FORBIDDEN, INIT_SQL, SCRIPT, run_importtime
+
+
+def heavy_modules(rows: list) -> list:
+    return sorted(name for name, _, _, _ in rows
+                  if any(name == f or name.startswith(f + ".") for f in FORBIDDEN))
+
+
+def test_help_does_not_import_heavy_modules():
+    rows, _, returncode, errors = run_importtime([SCRIPT, "--help"])
+    assert returncode == 0, errors
+    assert rows, "没有解析到 -X importtime 输出"
+    assert heavy_modules(rows) == []
+
+
+def test_init_db_dry_run_does_not_import_heavy_modules():
+    pytest.importorskip("dotenv")
+    env = {**os.environ, "INIT_SQL_PATH": INIT_SQL}
+    rows, _, returncode, errors = run_importtime([SCRIPT, "--init-db", "--dry-run"], env)
+    assert returncode == 0, errors
+    assert "src.services.sql_runner" in {name for name, _, _, _ in rows}
+    assert heavy_modules(rows) == []
@@ -0,0 +1,144 @@
+"""分级抓取：离线样例页上的 http 直取与各升级原因（本地模拟传输和浏览器，不访问网络）"""
+import json
+import os
+import re
+from contextlib import contextmanager
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from src.services.embedded_data import extract_embedded_data  # noqa: E402
+from src.services.tiered_fetcher import (  # noqa: E402
+    ESCALATE_CAPTCHA, ESCALATE_FORCED, ESCALATE_HTTP_ERROR, ESCALATE_LOGIN, ESCALATE_NO_DATA,
+    TIER_BROWSER, TIER_HTTP, TieredFetcher
+)
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "offer_725887578825.html")
+BASE = "https://detail.1688.com"
+
+with open(FIXTURE, encoding="utf-8") as _f:
+    OFFER_HTML = _f.read()
+RENDER_HTML = re.sub(r"<script>window\.__INIT_DATA.*?</script>", "", OFFER_HTML, flags=re.S)
+
+
+def handler(request):
+    """与 bench_tiered_fetch.FixtureServer 类似的路径约定；/expired/ 为登录失效，跳转到登录页"""
+    kind = request.url.path.strip("/").partition("/")[0]
+    if kind == "offer":
+        return httpx.Response(200, html=OFFER_HTML)
+    if kind == "expired":
+        return httpx.Response(302, headers={"Location": f"{BASE}/member/login.htm"})
+    if kind == "member":
+        return httpx.Response(200, html="<html><body>请登录</body></html>")
+    if kind == "captcha":
+        return httpx.Response(200, html='<div id="baxia-dialog">请拖动滑块完成验证</div>')
+    if kind == "render":
+        return httpx.Response(200, html=RENDER_HTML)
+    if kind == "down":
+        raise httpx.ConnectError("连接被拒绝", request=request)
+    return httpx.Response(503, html="busy")
+
+
+class FakeDriver:
+    """渲染完成的浏览器：就绪探测立即通过，返回完整样例页"""
+
+    def __init__(self):
+        self.current_url = ""
+
+    def get(self, url):
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        if "__caigouReady" in script:
+            return {"readyState": "complete", "found": True, "sinceMutation": 1000,
+                    "sinceResource": 1000, "url": self.current_url}
+        if "outerHTML" in script:
+            return OFFER_HTML
+        return extract_embedded_data(OFFER_HTML)
+
+
+class FakePool:
+    """只有一个会话的浏览器会话池，会话即池本身"""
+
+    def __init__(self):
+        self.driver = FakeDriver()
+        self.sessions = 0
+
+    def get(self, url):
+        self.driver.get(url)
+
+    @contextmanager
+    def session(self, platform=None):
+        self.sessions += 1
+        yield self
+
+
+@pytest.fixture
+def cookie_dir(tmp_path):
+    (tmp_path / "1688.json").write_text(json.dumps([{"name": "cookie2", "value": "v", "domain": ".1688.com"}]),
+                                        encoding="utf-8")
+    return str(tmp_path)
+
+
+def make_fetcher(pool=None, cookie_dir=os.devnull):
+    client = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+    return TieredFetcher(pool=pool, client=client, cookie_dir=cookie_dir)
+
+
+def test_http_tier_parses_embedded_offer():
+    with make_fetcher(pool=FakePool()) as fetcher:
+        page = fetcher.fetch(f"{BASE}/offer/1.html")
+        assert page.tier == TIER_HTTP and page.escalation is None
+        assert page.status_code == 200
+        assert page.offer["offer_id"] == 725887578825
+        assert len(page.offer["skus"]) == 9
+        assert fetcher.pool.sessions == 0
+
+
+@pytest.mark.parametrize("kind, reason", [
+    ("expired", ESCALATE_LOGIN),
+    ("captcha", ESCALATE_CAPTCHA),
+    ("render", ESCALATE_NO_DATA),
+    ("busy", ESCALATE_HTTP_ERROR),
+    ("down", ESCALATE_HTTP_ERROR),
+])
+def test_escalation_reasons_without_pool(kind, reason):
+    with make_fetcher() as fetcher:
+        page = fetcher.fetch(f"{BASE}/{kind}/1.html")
+        assert page.tier is None and not page.ok
+        assert page.escalation == reason
+        assert page.login_required == (kind == "expired")
+        assert fetcher.stats.summary()["escalations"] == {reason: 1}
+
+
+def test_escalated_pages_are_fetched_by_browser():
+    pool = FakePool()
+    with make_fetcher(pool=pool) as fetcher:
+        pages = [fetcher.fetch(f"{BASE}/{kind}/1.html") for kind in ("offer", "captcha", "render")]
+        forced = fetcher.fetch(f"{BASE}/offer/1.html", require_browser=True)
+        summary = fetcher.stats.summary()
+
+    assert [p.tier for p in pages] == [TIER_HTTP, TIER_BROWSER, TIER_BROWSER]
+    assert [p.escalation for p in pages[1:]] == [ESCALATE_CAPTCHA, ESCALATE_NO_DATA]
+    assert all(len(p.offer["skus"]) == 9 for p in pages)
+    assert set(pages[2].timings) == {TIER_HTTP, TIER_BROWSER}
+    assert forced.tier == TIER_BROWSER and forced.escalation == ESCALATE_FORCED
+    assert TIER_HTTP not in forced.timings
+    assert pool.sessions == 3
+    assert summary["tiers"][TIER_BROWSER]["count"] == 3
+    assert summary["escalations"] == {ESCALATE_CAPTCHA: 1, ESCALATE_NO_DATA: 1, ESCALATE_FORCED: 1}
+
+
+def test_login_redirect_reloads_cookies(cookie_dir):
+    with make_fetcher(pool=FakePool(), cookie_dir=cookie_dir) as fetcher:
+        fetcher.fetch(f"{BASE}/offer/1.html", platform="1688")
+        assert fetcher._client.cookies.get("cookie2") == "v"
+        page = fetcher.fetch(f"{BASE}/expired/1.html", platform="1688")
+        # 浏览器会话仍是登录状态，由浏览器级返回
+        assert page.tier == TIER_BROWSER and page.escalation == ESCALATE_LOGIN
+        # 登录失效后清空，下次请求重新装入浏览器保存的 cookies
+        assert fetcher._client.cookies.get("cookie2") is None
+        fetcher.fetch(f"{BASE}/offer/1.html", platform="1688")
+        assert fetcher._client.cookies.get("cookie2") == "v"
@@ -0,0 +1,148 @@
+"""物流轮询：错误处理，以及对模拟快递100接口的自适应间隔、合并查询和预警"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.services.kuaidi100 import (
+    STATE_COLLECTED, STATE_DELIVERING, STATE_IN_TRANSIT, STATE_SIGNED, Kuaidi100Client, KuaidiError,
+    TrackingResult,
+)
+from src.services.tracking_scheduler import (
+    ALERT_STALLED, ALERT_UNSHIPPED, HOUR, TrackingScheduler, run_tracking,
+)
+from tests.kuaidi100_mock import CUSTOMER, KEY, MockKuaidi100Server, SimClock
+
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.error = error
+
+    async def query(self, company, number, phone=None):
+        if self.error is not None:
+            raise self.error
+        return TrackingResult(company, number, state="0", events=[(1.0, "已揽收")])
+
+
+def make_scheduler(client):
+    scheduler = TrackingScheduler(client, rate=1000, clock=lambda: 1000.0)
+    scheduler.add("PO1", "yuantong", "YT1", created_at=0.0)
+    return scheduler
+
+
+def test_kuaidi_error_backs_off():
+    scheduler = make_scheduler(FakeClient(KuaidiError("快递100请求失败: 超时")))
+    round_ = asyncio.run(scheduler.poll_due())
+    assert round_.errors == 1
+    assert scheduler.next_due() > 1000.0
+
+
+def test_programming_error_propagates_and_keeps_shipment():
+    scheduler = make_scheduler(FakeClient(AttributeError("'NoneType' object has no attribute 'json'")))
+    with pytest.raises(AttributeError):
+        asyncio.run(scheduler.poll_due())
+    assert len(scheduler.pop_due()) == 1
+
+
+def test_client_requires_credentials(monkeypatch):
+    monkeypatch.delenv("KUAIDI100_API_KEY", raising=False)
+    monkeypatch.delenv("KUAIDI100_CUSTOMER", raising=False)
+    with pytest.raises(ValueError, match="KUAIDI100_API_KEY, KUAIDI100_CUSTOMER"):
+        Kuaidi100Client()
+    assert Kuaidi100Client(key="k", customer="c").customer == "c"
+
+
+START = 1_714_521_600.0     # 2024-05-01 08:00 (UTC+8)
+
+TIMELINES = {
+    # 正常：揽收 → 在途 → 派件 → 签收
+    "YT1": [(START + 1 * HOUR, STATE_COLLECTED, "快件已揽收"),
+            (START + 5 * HOUR, STATE_IN_TRANSIT, "快件已到达转运中心"),
+            (START + 30 * HOUR, STATE_DELIVERING, "快递员正在派件"),
+            (START + 36 * HOUR, STATE_SIGNED, "快件已签收")],
+    # 一直未发货
+    "YT2": [],
+    # 在途后停滞
+    "YT3": [(START + 1 * HOUR, STATE_COLLECTED, "快件已揽收"),
+            (START + 2 * HOUR, STATE_IN_TRANSIT, "快件已到达转运中心")],
+}
+
+
+@pytest.fixture
+def mock_server():
+    pytest.importorskip("httpx")
+    clock = SimClock(START)
+    with MockKuaidi100Server(TIMELINES, clock) as server:
+        yield server, clock
+
+
+def test_adaptive_intervals_coalescing_and_alerts(mock_server):
+    server, clock = mock_server
+
+    async def run():
+        client = Kuaidi100Client(key=KEY, customer=CUSTOMER, url=server.url)
+        scheduler = TrackingScheduler(client, rate=1000, clock=clock)
+        scheduler.add("PO1", "yuantong", "YT1", created_at=START)
+        scheduler.add("PO2", "yuantong", "YT1", created_at=START)     # 合并发货
+        scheduler.add("PO3", "yuantong", "YT2", created_at=START)
+        scheduler.add("PO4", "yuantong", "YT3", created_at=START)
+
+        clock.now = START + 6 * HOUR
+        first = await scheduler.poll_due()
+        first_requests = server.requests
+        yt1, yt2 = scheduler.shipments[("yuantong", "YT1")], scheduler.shipments[("yuantong", "YT2")]
+        first_intervals = (yt1.interval, yt2.interval)
+
+        yt1_intervals, alerts = [yt1.interval], []
+        while scheduler.next_due() is not None and clock.now < START + 100 * HOUR:
+            clock.now = max(clock.now, scheduler.next_due())
+            await scheduler.poll_due()
+            if not yt1.done and yt1.last_polled == clock.now:
+                yt1_intervals.append(yt1.interval)
+            alerts += [(a.number, a.kind) for a in scheduler.alerts(only_new=True)]
+        await client.close()
+        return scheduler, first, first_requests, first_intervals, yt1_intervals, alerts
+
+    scheduler, first, first_requests, first_intervals, yt1_intervals, alerts = asyncio.run(run())
+
+    # 同一运单的两个订单只查一次
+    assert (first.polled, first.orders, first_requests) == (3, 4, 3)
+    assert scheduler.stats["coalesced"] == 1
+    # 在途 6 小时、尚无轨迹 2 小时；无新轨迹时按 1.5 倍拉长；派件中 30 分钟
+    assert first_intervals == (6 * HOUR, 2 * HOUR)
+    assert yt1_intervals[:4] == [6 * HOUR, 9 * HOUR, 12 * HOUR, HOUR / 2]
+    assert yt1_intervals[4] == 0.75 * HOUR
+    yt1 = scheduler.shipments[("yuantong", "YT1")]
+    assert yt1.signed and yt1.done
+    # 派件中最长 2 小时查一次（基础间隔的4倍），签收后很快被发现
+    assert yt1.last_polled - (START + 36 * HOUR) <= 2 * HOUR
+    # 停滞、未发货各预警一次，签收的运单不预警
+    assert sorted(alerts) == [("YT2", ALERT_UNSHIPPED), ("YT3", ALERT_STALLED)]
+
+
+def test_run_tracking_once_saves_state(mock_server, tmp_path, capsys):
+    server, clock = mock_server
+    clock.now = time.time()
+    # 模拟接口按模拟时钟返回轨迹：把运单轨迹平移到当前时间之前
+    server.timelines = {"YT1": [(clock.now - 2 * HOUR, STATE_COLLECTED, "快件已揽收")]}
+    shipments = tmp_path / "shipments.jsonl"
+    shipments.write_text(json.dumps({"order_id": "PO1", "company": "yuantong", "number": "YT1"}) + "\n",
+                         encoding="utf-8")
+    state = str(tmp_path / "tracking_state.json")
+
+    async def run(path):
+        client = Kuaidi100Client(key=KEY, customer=CUSTOMER, url=server.url)
+        try:
+            return await run_tracking(path, once=True, client=client, state_path=state)
+        finally:
+            await client.close()
+
+    scheduler = asyncio.run(run(str(shipments)))
+    shipment = scheduler.shipments[("yuantong", "YT1")]
+    assert shipment.state == STATE_COLLECTED and shipment.polls == 1
+    # 不带运单文件时从保存的状态继续，未到期的运单本轮不查询
+    resumed = asyncio.run(run(None))
+    assert resumed.shipments[("yuantong", "YT1")].polls == 1
+    assert server.requests == 1
+    assert "跟踪中的运单: 1 个" in capsys.readouterr().out
@@ -0,0 +1,130 @@
+"""工作流检查点：阶段跳过与续跑"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.workflow_checkpoint import (
+    CheckpointStore, STAGE_CRAWL, STAGE_ORDER, STAGE_SELECT, STATUS_COMPLETED, STATUS_ORDER_UNSAVED,
+    STATUS_RUNNING
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_resume_skips_completed_stages(store):
+    workflow_id = store.create({"product_name": "A4纸"})
+    calls = []
+
+    async def crawl():
+        calls.append(STAGE_CRAWL)
+        return ["商品1", "商品2"]
+
+    def select(candidates):
+        calls.append(STAGE_SELECT)
+        raise RuntimeError("模型超时")
+
+    checkpointer = store.checkpointer(workflow_id)
+    candidates = asyncio.run(checkpointer.run_stage(STAGE_CRAWL, crawl))
+    with pytest.raises(RuntimeError):
+        asyncio.run(checkpointer.run_stage(STAGE_SELECT, select, candidates))
+    assert store.get(workflow_id).stages == [STAGE_CRAWL]
+
+    resumed = store.checkpointer(workflow_id)
+    assert asyncio.run(resumed.run_stage(STAGE_CRAWL, crawl)) == ["商品1", "商品2"]
+    assert asyncio.run(resumed.run_stage(STAGE_SELECT, lambda c: c[0], candidates)) == "商品1"
+    assert calls == [STAGE_CRAWL, STAGE_SELECT]
+    assert resumed.skipped == [STAGE_CRAWL]
+
+
+def test_order_save_failure_is_not_resumable(store):
+    workflow_id = store.create({"product_name": "A4纸"})
+    checkpointer = store.checkpointer(workflow_id)
+    # 无法序列化的订单对象
+    order = asyncio.run(checkpointer.run_stage(STAGE_ORDER, lambda: (lambda: None)))
+    assert callable(order)
+    assert not checkpointer.resumable
+    run = store.get(workflow_id)
+    assert run.status == STATUS_ORDER_UNSAVED
+    assert STAGE_ORDER in run.error
+
+
+def test_purge_keeps_unfinished(store):
+    done = store.create({"product_name": "已完成"})
+    store.set_status(done, STATUS_COMPLETED)
+    running = store.create({"product_name": "进行中"})
+    store.set_status(running, STATUS_RUNNING)
+    assert store.purge(older_than=-1) == 1
+    assert [run.workflow_id for run in store.list()] == [running]
+
+
+class PlainOrchestrator:
+    """不支持检查点的编排器"""
+
+    def set_progress_callback(self, callback):
+        pass
+
+    async def execute_full_workflow(self, demand):
+        raise AssertionError("不应执行")
+
+
+def test_resume_requires_checkpointer(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKFLOW_CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite3"))
+    from run_purchase import run_auto_purchase
+
+    result = asyncio.run(run_auto_purchase(resume="WF1", orchestrator=PlainOrchestrator()))
+    assert result["status"] == "error"
+    result = asyncio.run(run_auto_purchase(resume="WF1", confirm=1, orchestrator=PlainOrchestrator()))
+    assert "检查点" in result["error"]
+
+
+def test_unsaved_order_refuses_resume(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    monkeypatch.setenv("WORKFLOW_CHECKPOINT_PATH", path)
+    from run_purchase import run_auto_purchase
+
+    store = CheckpointStore(path)
+    workflow_id = store.create({"product_name": "A4纸"})
+    store.checkpointer(workflow_id).save(STAGE_ORDER, lambda: None)
+    store.close()
+
+    class Orchestrator(PlainOrchestrator):
+        def set_checkpointer(self, checkpointer):
+            raise AssertionError("不应续跑")
+
+    result = asyncio.run(run_auto_purchase(resume=workflow_id, orchestrator=Orchestrator()))
+    assert result["status"] == "error"
+
+
+def test_confirm_requires_resume(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKFLOW_CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite3"))
+    from run_purchase import run_auto_purchase
+
+    result = asyncio.run(run_auto_purchase(product_name="A4纸", confirm=1, orchestrator=PlainOrchestrator()))
+    assert "--resume" in result["error"]
+    assert not (tmp_path / "checkpoints.sqlite3").exists()
+
+
+def test_plain_orchestrator_skips_checkpoints(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "checkpoints.sqlite3"
+    monkeypatch.setenv("WORKFLOW_CHECKPOINT_PATH", str(path))
+    monkeypatch.setenv("DASHBOARD_VERSION_DIR", str(tmp_path / "dashboard_version"))
+    import src.services.demand_builder as demand_builder
+    from run_purchase import run_auto_purchase
+
+    monkeypatch.setattr(demand_builder, "build_purchase_demand",
+                        lambda **kwargs: SimpleNamespace(**kwargs))
+
+    class FailingOrchestrator(PlainOrchestrator):
+        async def execute_full_workflow(self, demand):
+            return {"status": "failed", "error": "爬取失败", "workflow_id": "WF-ORCH"}
+
+    result = asyncio.run(run_auto_purchase(product_name="A4纸", quantity=2, orchestrator=FailingOrchestrator()))
+    assert result["workflow_id"] == "WF-ORCH"
+    assert not path.exists()
+    assert "--resume" not in capsys.readouterr().out